@@ -0,0 +1,74 @@
+"""
+Min-cost bipartite assignment (Hungarian algorithm) for batch dispatch.
+"""
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def min_cost_assignment(cost: Union[Sequence[Sequence[float]], np.ndarray]) -> List[Tuple[int, int]]:
+    """
+    Solve the rectangular assignment problem for an M x N cost matrix.
+
+    Returns (row, col) pairs with every row and column used at most once,
+    maximising the number of assigned rows first and then minimising total
+    cost. Entries that are inf or nan mark pairs that must not be assigned.
+    Runs in O(min(M, N)^2 * max(M, N)).
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.ndim != 2 or cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    feasible = np.isfinite(cost)
+    if not feasible.any():
+        return []
+    # Larger than any sum of feasible costs, so a forbidden pair is only used when unavoidable.
+    forbidden = float(np.abs(cost[feasible]).sum()) + 1.0
+    c = np.where(feasible, cost, forbidden)
+
+    # Shortest augmenting path with potentials; arrays are 1-based, index 0 is a sentinel column.
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # p[j] = row assigned to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = c[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            masked = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(masked)) + 1
+            delta = masked[j1 - 1]
+            used_cols = np.nonzero(used)[0]
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    pairs = []
+    for j in range(1, m + 1):
+        i = int(p[j])
+        if i and feasible[i - 1, j - 1]:
+            pairs.append((j - 1, i - 1) if transposed else (i - 1, j - 1))
+    pairs.sort()
+    return pairs
@@ -0,0 +1,49 @@
+"""
+Bloom filter over strings: a compact "definitely not present / maybe present" set.
+
+Sized for an expected number of items and false-positive rate. A key that was
+added always tests present. A key never added tests present with roughly that
+probability. Positions come from one blake2b digest split into two hashes
+(Kirsch-Mitzenmacher double hashing). Keys cannot be removed: rebuild the
+filter to drop them.
+"""
+import hashlib
+import math
+from typing import Iterable
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity  # beyond this many keys the false-positive rate climbs past error_rate
+        self.num_bits = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def of(cls, keys: Iterable[str], error_rate: float = 0.01, headroom: float = 1.5) -> "BloomFilter":
+        """A filter holding keys, sized for headroom times as many (room for keys added later)."""
+        keys = list(keys)
+        bloom = cls(int(len(keys) * headroom) + 16, error_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
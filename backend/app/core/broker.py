@@ -0,0 +1,235 @@
+"""
+Cross-worker message routing for ConnectionManager.
+
+With several uvicorn workers a socket lives in exactly one of them, while
+the request that wants to notify it may run in any. A broker carries
+(group, key, message) publications to the worker(s) holding a connection
+for that key.
+
+LocalBroker       single process; nothing to route (the default).
+UnixSocketBroker  hub-and-spoke over a Unix domain socket. The first worker
+                  to bind the socket path runs the hub; every worker
+                  (including that one) connects to it as a client. Workers
+                  subscribe to the (group, key) pairs they hold sockets for,
+                  and the hub forwards each publication only to subscribed
+                  workers other than the publisher. The hub is elected with
+                  an flock on <path>.lock, so a dead hub's lock is released
+                  by the OS and the remaining workers re-elect and resubscribe.
+
+Frames are newline-delimited JSON: {"op": "sub"|"unsub"|"pub", "g", "k", "m"}.
+"""
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+OnMessage = Callable[[str, int, dict], Awaitable[None]]
+Topic = Tuple[str, int]
+
+STREAM_LIMIT = 4 * 1024 * 1024  # longest frame (one JSON message) the hub or a worker will read
+
+
+class LocalBroker:
+    """No other workers: every connection is local, so publications go nowhere."""
+
+    connected = False
+
+    async def start(self, on_message: OnMessage) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def subscribe(self, group: str, key: int) -> None:
+        pass
+
+    def unsubscribe(self, group: str, key: int) -> None:
+        pass
+
+    def publish(self, group: str, key: int, message: dict) -> bool:
+        return False
+
+
+class _Hub:
+    def __init__(self):
+        self.subscribers: Dict[Topic, Set[asyncio.StreamWriter]] = defaultdict(set)
+        self.clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def close(self) -> None:
+        """Stop listening and drop every worker, so they notice and elect a new hub."""
+        self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+        if self.clients:
+            await asyncio.wait(list(self.clients.values()), timeout=1)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        topics: Set[Topic] = set()
+        self.clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                topic = (frame["g"], int(frame["k"]))
+                op = frame["op"]
+                if op == "sub":
+                    self.subscribers[topic].add(writer)
+                    topics.add(topic)
+                elif op == "unsub":
+                    self._unsubscribe(topic, writer)
+                    topics.discard(topic)
+                elif op == "pub":
+                    for sub in list(self.subscribers.get(topic, ())):
+                        if sub is not writer:
+                            sub.write(line)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            for topic in topics:
+                self._unsubscribe(topic, writer)
+            writer.close()
+
+    def _unsubscribe(self, topic: Topic, writer: asyncio.StreamWriter) -> None:
+        subs = self.subscribers.get(topic)
+        if subs is not None:
+            subs.discard(writer)
+            if not subs:
+                del self.subscribers[topic]
+
+
+class UnixSocketBroker:
+    def __init__(self, path: str, reconnect_delay: float = 0.5):
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self._topics: Set[Topic] = set()
+        self._hub: Optional[_Hub] = None
+        self._lock_fd: Optional[int] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._on_message: Optional[OnMessage] = None
+        self.published = 0
+        self.received = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def is_hub(self) -> bool:
+        return self._hub is not None
+
+    async def start(self, on_message: OnMessage) -> None:
+        self._on_message = on_message
+        await self._connect()
+        self._task = asyncio.create_task(self._read_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._hub is not None:
+            await self._hub.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+            self._hub = None
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _become_hub(self) -> bool:
+        if self._hub is not None:
+            return True
+        fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False  # another worker is the hub
+        # Holding the lock: any socket file left is from a dead hub.
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        hub = _Hub()
+        try:
+            hub.server = await asyncio.start_unix_server(hub.handle, path=self.path, limit=STREAM_LIMIT)
+        except OSError:
+            os.close(fd)
+            return False
+        self._hub, self._lock_fd = hub, fd
+        log.info("[ws-broker] pid=%s is the hub on %s", os.getpid(), self.path)
+        return True
+
+    async def _connect(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # No hub yet, or a stale socket file left by a dead one.
+                if not await self._become_hub():
+                    await asyncio.sleep(self.reconnect_delay)
+        self._reader, self._writer = reader, writer
+        for group, key in self._topics:
+            self._send({"op": "sub", "g": group, "k": key})
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                line = await self._reader.readline()
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                line = b""
+            if not line:
+                log.warning("[ws-broker] lost hub connection, reconnecting")
+                self._writer = None
+                await asyncio.sleep(self.reconnect_delay)
+                await self._connect()
+                continue
+            try:
+                frame = json.loads(line)
+                self.received += 1
+                await self._on_message(frame["g"], int(frame["k"]), frame["m"])
+            except Exception:
+                log.exception("[ws-broker] bad frame")
+
+    def _send(self, frame: dict) -> bool:
+        if not self.connected:
+            return False
+        self._writer.write(json.dumps(frame, separators=(",", ":")).encode() + b"\n")
+        return True
+
+    def subscribe(self, group: str, key: int) -> None:
+        """Route publications for (group, key) to this worker; called when its first socket for key connects."""
+        if (group, key) not in self._topics:
+            self._topics.add((group, key))
+            self._send({"op": "sub", "g": group, "k": key})
+
+    def unsubscribe(self, group: str, key: int) -> None:
+        if (group, key) in self._topics:
+            self._topics.discard((group, key))
+            self._send({"op": "unsub", "g": group, "k": key})
+
+    def publish(self, group: str, key: int, message: dict) -> bool:
+        """Hand a message to the hub for other workers. Never waits on the network."""
+        sent = self._send({"op": "pub", "g": group, "k": key, "m": message})
+        if sent:
+            self.published += 1
+        return sent
+
+
+def make_broker(kind: str, path: str):
+    if kind == "unix":
+        return UnixSocketBroker(path)
+    return LocalBroker()
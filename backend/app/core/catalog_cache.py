@@ -0,0 +1,168 @@
+"""
+In-process LRU cache of serialized catalog documents (menus, restaurant
+lists), versioned per owner, with ETags for conditional requests.
+
+Catalog data changes a few times a day and is read on every app open. The
+public catalog endpoints keep the finished JSON body here, keyed by
+(view, owner), along with a content-hash ETag. A hit returns the bytes
+as-is, skipping both the DB and response-model validation and
+serialization. A client that sends the same ETag back gets a 304 with no
+body:
+
+    doc = menu_cache.get_or_build("discovery", restaurant_id, lambda: load_document(restaurant_id))
+    if doc is None:
+        raise HTTPException(404)
+    return conditional_response(request, doc)
+
+Writes call cache.invalidate(owner) after the write, which bumps that owner's
+version; an entry is only served while its version is current, and a build
+that raced with a write stored the version it started from, so it is never
+served. invalidate() with no owner bumps every owner (category edits, or when
+the owner can't be resolved).
+
+Versions are per process. With several workers another worker's write is
+only seen after the cache TTL, which bounds staleness there. ETags hash the
+body, so they agree across workers and restarts.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from .config import (
+    CATALOG_CACHE_CONTROL,
+    MENU_CACHE_MAX_ENTRIES,
+    MENU_CACHE_TTL_SECONDS,
+    RESTAURANT_LIST_CACHE_TTL_SECONDS,
+)
+
+
+class CachedDocument(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def json_bytes(document: Any) -> bytes:
+    """The body FastAPI's default JSONResponse would send for document."""
+    return json.dumps(
+        jsonable_encoder(document), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def model_bytes(response_model: Any) -> Callable[[Any], bytes]:
+    """Serializer giving the body a route with this response_model would send."""
+    adapter = TypeAdapter(response_model)
+    return lambda document: json_bytes(adapter.dump_python(adapter.validate_python(document), mode="json"))
+
+
+def etag_of(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: "*" or any listed tag, compared weakly (W/ ignored)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def conditional_response(request: Request, doc: CachedDocument, cache_control: str = CATALOG_CACHE_CONTROL) -> Response:
+    """304 when the client already has this body (If-None-Match), else the body; both carry ETag and Cache-Control."""
+    headers = {"ETag": doc.etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), doc.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(doc.body, media_type="application/json", headers=headers)
+
+
+class VersionedCache:
+    def __init__(self, ttl_seconds: float, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], tuple]" = OrderedDict()  # key -> (version, expires at, doc)
+        self._versions: Dict[Hashable, int] = {}
+        self._epoch = 0  # bumped by invalidate() without an owner
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self, owner: Hashable) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._versions.get(owner, 0)
+
+    def get(self, view: str, owner: Hashable) -> Optional[CachedDocument]:
+        with self._lock:
+            entry = self._entries.get((view, owner))
+            current = (self._epoch, self._versions.get(owner, 0))
+            if entry is None or entry[0] != current or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(view, owner)]
+                self.misses += 1
+                return None
+            self._entries.move_to_end((view, owner))
+            self.hits += 1
+            return entry[2]
+
+    def put(self, view: str, owner: Hashable, version: Tuple[int, int], doc: CachedDocument) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if version != (self._epoch, self._versions.get(owner, 0)):
+                return  # invalidated while the document was being built
+            self._entries[(view, owner)] = (version, time.monotonic() + self.ttl_seconds, doc)
+            self._entries.move_to_end((view, owner))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_build(
+        self,
+        view: str,
+        owner: Hashable,
+        build: Callable[[], Any],
+        serialize: Callable[[Any], bytes] = json_bytes,
+    ) -> Optional[CachedDocument]:
+        """Cached document, or build() it (None means not found and is not cached) and cache serialize(document)."""
+        doc = self.get(view, owner)
+        if doc is not None:
+            return doc
+        version = self.version(owner)  # taken before reading, so a concurrent write makes this build stale
+        document = build()
+        if document is None:
+            return None
+        body = serialize(document)
+        doc = CachedDocument(body, etag_of(body))
+        self.put(view, owner, version, doc)
+        return doc
+
+    def invalidate(self, owner: Optional[Hashable] = None) -> None:
+        """Drop owner's documents (every owner's when None); call after the write."""
+        with self._lock:
+            self.invalidations += 1
+            if owner is None:
+                self._epoch += 1
+                self._entries.clear()
+                return
+            self._versions[owner] = self._versions.get(owner, 0) + 1
+            for key in [k for k in self._entries if k[1] == owner]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(e[2].body) for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+menu_cache = VersionedCache(MENU_CACHE_TTL_SECONDS, MENU_CACHE_MAX_ENTRIES)  # owner: restaurant id
+restaurant_list_cache = VersionedCache(RESTAURANT_LIST_CACHE_TTL_SECONDS, max_entries=200)  # owner: "restaurants"; view: query
@@ -5,6 +5,12 @@ load_dotenv()
 
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+# Repositories whose hot reads skip PostgREST and query DATABASE_URL directly (core/pg.py), e.g. "dispatch,consumer,customer".
+PG_READ_REPOSITORIES = {r.strip() for r in os.getenv("PG_READ_REPOSITORIES", "").split(",") if r.strip()}
+PG_POOL_SIZE = int(os.getenv("PG_POOL_SIZE", "5"))  # pooled connections per worker
+PG_POOL_MAX_OVERFLOW = int(os.getenv("PG_POOL_MAX_OVERFLOW", "5"))
+QUERY_STATS_RECENT = int(os.getenv("QUERY_STATS_RECENT", "200"))  # recent requests kept with their query breakdown for /debug/queries
+DATALOADER_MAX_BATCH_SIZE = int(os.getenv("DATALOADER_MAX_BATCH_SIZE", "200"))  # keys per in_() query from a request-scoped loader
 
 # Auth
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
@@ -16,6 +22,48 @@ STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY", "")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
 
+# WebSockets
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))  # outbound messages buffered per connection
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")  # "drop_oldest" or "disconnect"
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+WS_REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "100"))  # recent messages kept per recipient for reconnects
+WS_BROKER = os.getenv("WS_BROKER", "local")  # "local" (one worker) or "unix" (several workers on one host)
+WS_BROKER_SOCKET = os.getenv("WS_BROKER_SOCKET", "/tmp/food-delivery-ws.sock")
+
+# Dispatch
+DISPATCH_MODE = os.getenv("DISPATCH_MODE", "nearest")  # "nearest" (one task per order) or "batch"
+DISPATCH_REQUEST_TIMEOUT_SECONDS = int(os.getenv("DISPATCH_REQUEST_TIMEOUT_SECONDS", "180"))
+DISPATCH_OFFER_COUNT = int(os.getenv("DISPATCH_OFFER_COUNT", "1"))  # riders offered each order at once; first accept wins
+DISPATCH_BATCH_WINDOW_SECONDS = float(os.getenv("DISPATCH_BATCH_WINDOW_SECONDS", "2"))
+DISPATCH_BATCH_MAX_ORDERS = int(os.getenv("DISPATCH_BATCH_MAX_ORDERS", "50"))
+DISPATCH_BATCH_CANDIDATES = int(os.getenv("DISPATCH_BATCH_CANDIDATES", "10"))  # nearest riders considered per order
+DISPATCH_SEARCH_RADIUS_KM = float(os.getenv("DISPATCH_SEARCH_RADIUS_KM", "50"))
+DISPATCH_EXPIRY_SWEEP_SECONDS = float(os.getenv("DISPATCH_EXPIRY_SWEEP_SECONDS", "15"))  # DB sweep for overdue offers
+DISPATCH_REDISPATCH_CONCURRENCY = int(os.getenv("DISPATCH_REDISPATCH_CONCURRENCY", "8"))
+RIDER_INDEX_CELL_DEG = float(os.getenv("RIDER_INDEX_CELL_DEG", "0.01"))  # ~1.1 km grid cells
+DELIVERY_LONG_POLL_MAX_SECONDS = float(os.getenv("DELIVERY_LONG_POLL_MAX_SECONDS", "30"))
+DELIVERY_LONG_POLL_RECHECK_SECONDS = float(os.getenv("DELIVERY_LONG_POLL_RECHECK_SECONDS", "5"))  # catches offers made by other workers
+RIDER_LOCATION_FLUSH_SECONDS = float(os.getenv("RIDER_LOCATION_FLUSH_SECONDS", "5"))  # write-behind interval; 0 writes every ping
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "16"))  # blocking DB calls from async code run at most this many at once
+ORDER_SNAPSHOT_TTL_SECONDS = float(os.getenv("ORDER_SNAPSHOT_TTL_SECONDS", "10"))  # 0 disables the cache
+MENU_CACHE_TTL_SECONDS = float(os.getenv("MENU_CACHE_TTL_SECONDS", "300"))  # serialized menu documents; bounds staleness across workers, 0 disables
+MENU_CACHE_MAX_ENTRIES = int(os.getenv("MENU_CACHE_MAX_ENTRIES", "1000"))
+RESTAURANT_LIST_CACHE_TTL_SECONDS = float(os.getenv("RESTAURANT_LIST_CACHE_TTL_SECONDS", "60"))  # ratings etc. change without an invalidating write
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=30, stale-while-revalidate=60")  # public menus and restaurant lists
+POPULAR_ITEMS_HALF_LIFE_HOURS = float(os.getenv("POPULAR_ITEMS_HALF_LIFE_HOURS", "168"))  # trending decay; must match supabase/popular_items_schema.sql
+POPULAR_ITEMS_CACHE_SECONDS = float(os.getenv("POPULAR_ITEMS_CACHE_SECONDS", "30"))  # 0 reads the summary table on every request
+VOUCHER_RULES_REFRESH_SECONDS = float(os.getenv("VOUCHER_RULES_REFRESH_SECONDS", "10"))  # poll for changed vouchers; bounds staleness of validate
+VOUCHER_BLOOM_REBUILD_SECONDS = float(os.getenv("VOUCHER_BLOOM_REBUILD_SECONDS", "3600"))  # full reload of active codes (drops deactivated ones)
+VOUCHER_RULES_MAX_ENTRIES = int(os.getenv("VOUCHER_RULES_MAX_ENTRIES", "10000"))
+VOUCHER_RULES_OVERLAP_SECONDS = float(os.getenv("VOUCHER_RULES_OVERLAP_SECONDS", "5"))  # re-read window before the poll marker, for late commits
+TRACKING_SSE_KEEPALIVE_SECONDS = float(os.getenv("TRACKING_SSE_KEEPALIVE_SECONDS", "15"))
+RIDER_POSITION_MIN_INTERVAL_SECONDS = float(os.getenv("RIDER_POSITION_MIN_INTERVAL_SECONDS", "2"))  # max 1 push per tracked order per interval
+RIDER_POSITION_MIN_MOVE_METERS = float(os.getenv("RIDER_POSITION_MIN_MOVE_METERS", "10"))  # smaller moves are not pushed
+RIDER_POSITION_KEYFRAME_EVERY = int(os.getenv("RIDER_POSITION_KEYFRAME_EVERY", "10"))  # absolute position every N pushes
+RIDER_HEARTBEAT_SECONDS = float(os.getenv("RIDER_HEARTBEAT_SECONDS", "20"))  # server PING interval on rider sockets
+RIDER_PRESENCE_TIMEOUT_SECONDS = float(os.getenv("RIDER_PRESENCE_TIMEOUT_SECONDS", "60"))  # no heartbeat for this long -> unavailable; 0 disables
+RIDER_PRESENCE_DOWNGRADE_SILENT = os.getenv("RIDER_PRESENCE_DOWNGRADE_SILENT", "0") == "1"  # "1": also set available riders never heard from since startup unavailable (every app build must answer PING)
+
 
 class Settings:
     """Simple settings class to access all config"""
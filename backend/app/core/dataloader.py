@@ -0,0 +1,140 @@
+"""
+Request-scoped batch loaders for keyed lookups.
+
+A DataLoader wraps a batch function (list of keys -> {key: value}) that
+fetches many rows in one query, usually with in_(). load_many() fetches
+every key it has not seen before with one batch call and memoizes the
+results, so a service that needs the customer of each of 50 orders makes one
+users query instead of 50:
+
+    customers = loaders.users().load_many(o["user_id"] for o in orders)
+
+Loaders live for one HTTP request: DataLoaderMiddleware opens a scope, and
+request_loader(name, batch_fn) returns that request's loader for name,
+creating it on first use. Later lookups of the same keys anywhere in the
+request, including in run_db / threadpool workers (they copy the context),
+are served from memory. Outside a request each call gets a fresh loader.
+Loaders are meant for reads; code that writes and then reads the same rows
+in one request should clear() the loader in between.
+"""
+import contextlib
+import contextvars
+import inspect
+import threading
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, TypeVar
+
+from .config import DATALOADER_MAX_BATCH_SIZE
+from .db_executor import run_db
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_scope: contextvars.ContextVar[Optional[Dict[str, "DataLoader"]]] = contextvars.ContextVar("dataloaders", default=None)
+_scope_lock = threading.Lock()
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Memoized batched lookups. batch_fn gets at most max_batch_size keys (long in_() lists
+    make long URLs) and returns {key: value}; keys it leaves out are remembered as missing.
+    An async batch_fn (e.g. an @offload repository method) is used through aload_many().
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Any], max_batch_size: int = DATALOADER_MAX_BATCH_SIZE):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.batches = 0
+        self._cache: Dict[K, Optional[V]] = {}
+        self._lock = threading.Lock()
+
+    def _missing(self, keys: Iterable[K]) -> List[K]:
+        wanted = [k for k in dict.fromkeys(keys) if k is not None]
+        with self._lock:
+            return [k for k in wanted if k not in self._cache]
+
+    def _chunks(self, keys: List[K]) -> Iterator[List[K]]:
+        for i in range(0, len(keys), self.max_batch_size):
+            yield keys[i:i + self.max_batch_size]
+
+    def _store(self, chunk: List[K], found: Optional[Dict[K, V]]) -> None:
+        found = found or {}
+        with self._lock:
+            self.batches += 1
+            for key in chunk:
+                self._cache[key] = found.get(key)
+
+    def _result(self, keys: Iterable[K]) -> Dict[K, V]:
+        with self._lock:
+            return {k: self._cache[k] for k in dict.fromkeys(keys) if self._cache.get(k) is not None}
+
+    def load_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """{key: value} for the keys that exist; unseen keys are fetched in one batch call."""
+        keys = list(keys)
+        for chunk in self._chunks(self._missing(keys)):
+            self._store(chunk, self.batch_fn(chunk))
+        return self._result(keys)
+
+    async def aload_many(self, keys: Iterable[K]) -> Dict[K, V]:
+        """load_many for async callers: awaits an async batch_fn, runs a blocking one on the DB pool."""
+        keys = list(keys)
+        for chunk in self._chunks(self._missing(keys)):
+            if inspect.iscoroutinefunction(self.batch_fn):
+                found = await self.batch_fn(chunk)
+            else:
+                found = await run_db(self.batch_fn, chunk)
+            self._store(chunk, found)
+        return self._result(keys)
+
+    def load(self, key: K) -> Optional[V]:
+        return self.load_many([key]).get(key)
+
+    async def aload(self, key: K) -> Optional[V]:
+        return (await self.aload_many([key])).get(key)
+
+    def prime(self, key: K, value: V) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self, key: Optional[K] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+
+def request_loader(name: str, batch_fn: Callable[[List[Any]], Any]) -> DataLoader:
+    """The current request's loader called name (created with batch_fn on first use)."""
+    scope = _scope.get()
+    if scope is None:
+        return DataLoader(batch_fn)
+    with _scope_lock:
+        loader = scope.get(name)
+        if loader is None:
+            loader = scope[name] = DataLoader(batch_fn)
+        return loader
+
+
+@contextlib.contextmanager
+def request_scope() -> Iterator[Dict[str, DataLoader]]:
+    """Loaders created inside share one memo; what the middleware opens per HTTP request."""
+    loaders: Dict[str, DataLoader] = {}
+    token = _scope.set(loaders)
+    try:
+        yield loaders
+    finally:
+        _scope.reset(token)
+
+
+class DataLoaderMiddleware:
+    """ASGI middleware: one loader scope per HTTP request (WebSockets live too long to memoize)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_scope():
+            await self.app(scope, receive, send)
@@ -0,0 +1,68 @@
+"""
+Bounded thread pool for blocking data access from async code.
+
+The supabase client is synchronous: calling it from an async route or task
+blocks the event loop (and every WebSocket on it) for a full HTTP round
+trip. Async code hands such calls to run_db() instead; at most
+DB_EXECUTOR_MAX_WORKERS run at once and the rest queue here, off the loop.
+
+    rows = await run_db(DispatchRepository.get_available_riders)
+    response = await run_db(supabase.table("orders").select("*").eq("id", order_id).execute)
+
+offload turns a blocking function into a coroutine function running on the
+same pool, for repositories whose methods are awaited by their callers.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from .config import DB_EXECUTOR_MAX_WORKERS
+
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_MAX_WORKERS, thread_name_prefix="db")
+_lock = threading.Lock()
+_stats = {"submitted": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def _tracked(fn: Callable[..., T], *args, **kwargs) -> T:
+    with _lock:
+        _stats["in_flight"] += 1
+        _stats["max_in_flight"] = max(_stats["max_in_flight"], _stats["in_flight"])
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        with _lock:
+            _stats["in_flight"] -= 1
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking call on the DB pool and wait for it without blocking the event loop."""
+    with _lock:
+        _stats["submitted"] += 1
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()  # e.g. the request's query accounting (core/query_stats.py)
+    return await loop.run_in_executor(_executor, functools.partial(context.run, _tracked, fn, *args, **kwargs))
+
+
+def offload(fn: Callable[..., T]) -> Callable[..., "asyncio.Future[T]"]:
+    """Decorator: the blocking function becomes awaitable and runs on the DB pool."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_db(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {**_stats, "max_workers": DB_EXECUTOR_MAX_WORKERS}
+
+
+def shutdown() -> None:
+    """Wait for queued calls (e.g. the last location flush) and stop the pool threads."""
+    _executor.shutdown(wait=True)
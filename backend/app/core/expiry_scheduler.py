@@ -0,0 +1,111 @@
+"""
+One background task with a min-heap of deadlines, instead of one sleeping
+asyncio task per deadline.
+
+Entries whose deadline has passed are handed to on_due in bulk. An optional
+on_sweep callback runs every sweep_interval seconds so state owned by
+someone else (other workers, rows from before a restart) is still caught.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+Entry = Tuple[float, int, Any]  # (deadline epoch seconds, key, data)
+
+
+def to_epoch(value: Union[str, datetime, float, int]) -> float:
+    """ISO timestamp / datetime / epoch -> epoch seconds. Naive values are taken as UTC."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class ExpiryScheduler:
+    def __init__(
+        self,
+        on_due: Callable[[List[Tuple[int, Any]]], Awaitable[None]],
+        on_sweep: Optional[Callable[[], Awaitable[None]]] = None,
+        sweep_interval: float = 15.0,
+    ):
+        self.on_due = on_due
+        self.on_sweep = on_sweep
+        self.sweep_interval = sweep_interval
+        self._heap: List[Entry] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_sweep = 0.0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def track(self, key: int, deadline: Union[str, datetime, float, int], data: Any = None) -> None:
+        at = to_epoch(deadline)
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (at, key, data))
+        if self._wakeup is not None and (earliest is None or at < earliest):
+            self._wakeup.set()
+
+    def load(self, entries: Iterable[Tuple[int, Union[str, datetime, float, int], Any]]) -> None:
+        """Bulk-add (key, deadline, data) entries, e.g. when rebuilding state at startup."""
+        for key, deadline, data in entries:
+            self._heap.append((to_epoch(deadline), key, data))
+        heapq.heapify(self._heap)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_due(self, now: Optional[float] = None) -> int:
+        """Pop every entry that is due and pass them to on_due in one call. Returns how many."""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, key, data = heapq.heappop(self._heap)
+            due.append((key, data))
+        if due:
+            await self.on_due(due)
+        return len(due)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self.sweep_interval
+            if self._heap:
+                delay = min(delay, max(0.0, self._heap[0][0] - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.run_due()
+                if self.on_sweep is not None and time.monotonic() - self._last_sweep >= self.sweep_interval:
+                    self._last_sweep = time.monotonic()
+                    await self.on_sweep()
+            except Exception:
+                log.exception("expiry scheduler pass failed")
@@ -0,0 +1,431 @@
+"""
+In-memory stand-in for the supabase client, for offline tests and benchmarks.
+
+Implements the PostgREST query-builder subset this backend uses:
+
+    fake.table("orders").select("*, restaurants(name), order_items(*, menu_items(name))", count="exact")
+        .eq("user_id", 7).neq(...).in_("status", [...]).ilike("name", "%pizza%")
+        .gte(...).gt(...).lt(...).lte(...).is_(...)
+        .order("created_at", desc=True).range(0, 9).limit(10)
+        .single() / .maybe_single()
+        .execute()
+
+plus insert / update / upsert / delete and rpc() for functions registered
+with register_rpc(). Results are postgrest's own APIResponse /
+SingleAPIResponse and failures its APIError, so calling code cannot tell the
+difference (maybe_single() with no row returns None, as in supabase-py 2.x).
+
+Embedded relations follow this schema's naming: "restaurants(...)" from an
+orders row is many-to-one through orders.restaurant_id, "order_items(...)"
+one-to-many through order_items.order_id. "!col" picks the FK column
+("customer_user:users!user_id(...)"), "!inner" drops parents without a match,
+and filters on "embed.col" narrow the embedded rows.
+
+Each execute() sleeps `latency` seconds first (a number, or a function of
+(table, operation)), so round trips show up in benchmarks; `calls` counts
+executes per (table, operation).
+
+Use it with SUPABASE_FAKE=1 (see supabase_client.py), or install(fake) to
+swap it into every already imported module.
+"""
+import copy
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from postgrest import APIError, APIResponse
+from postgrest.base_request_builder import SingleAPIResponse
+
+Latency = Union[float, Callable[[str, str], float]]
+
+
+def _singular(table: str) -> str:
+    if table.endswith("ies"):
+        return table[:-3] + "y"
+    if table.endswith("sses"):
+        return table[:-2]
+    if table.endswith("s"):
+        return table[:-1]
+    return table
+
+
+def _split_top(text: str) -> List[str]:
+    """Split on commas outside parentheses."""
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+class _Embed:
+    __slots__ = ("table", "alias", "hint", "inner", "fields")
+
+    def __init__(self, table, alias, hint, inner, fields):
+        self.table, self.alias, self.hint, self.inner, self.fields = table, alias, hint, inner, fields
+
+
+def _parse_select(text: str) -> List[Any]:
+    """"*" | (column, alias) | _Embed for each top-level item."""
+    fields: List[Any] = []
+    for item in _split_top(text or "*"):
+        if "(" in item:
+            head, body = item[: item.index("(")], item[item.index("(") + 1: item.rindex(")")]
+            alias, _, target = head.rpartition(":")
+            table, *modifiers = target.strip().split("!")
+            inner = "inner" in modifiers
+            hints = [m for m in modifiers if m not in ("inner", "left")]
+            fields.append(_Embed(table.strip(), alias.strip() or table.strip(), hints[0] if hints else None,
+                                 inner, _parse_select(body)))
+        elif item == "*":
+            fields.append("*")
+        else:
+            alias, _, column = item.partition(":") if ":" in item.replace("::", "") else ("", "", item)
+            column = column.split("::")[0].strip()
+            fields.append((column, alias.strip() or column))
+    return fields
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _coerce(value: Any, like: Any) -> Any:
+    """Filter value as the row's type (PostgREST compares in the column type)."""
+    value = _plain(value)
+    if like is None or value is None:
+        return value
+    if isinstance(like, bool):
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+    if isinstance(like, (int, float)) and isinstance(value, str):
+        try:
+            return type(like)(float(value)) if isinstance(like, int) and "." not in value else float(value)
+        except ValueError:
+            return value
+    if isinstance(like, str) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _like(pattern: str, flags: int = 0) -> "re.Pattern":
+    regex = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern)
+    return re.compile(regex, flags | re.DOTALL)
+
+
+def _compare(op: str, rv: Any, value: Any) -> bool:
+    if op == "is":
+        target = {"null": None, "true": True, "false": False}.get(str(value).lower(), value) if value is not None else None
+        return rv is target if target is None or isinstance(target, bool) else rv == target
+    if op == "in":
+        return any(rv is not None and rv == _coerce(v, rv) for v in value)
+    if rv is None:
+        return False
+    if op in ("like", "ilike"):
+        return bool(_like(str(value), re.IGNORECASE if op == "ilike" else 0).fullmatch(str(rv)))
+    value = _coerce(value, rv)
+    try:
+        return {
+            "eq": rv == value, "neq": rv != value,
+            "gt": rv > value, "gte": rv >= value, "lt": rv < value, "lte": rv <= value,
+        }[op]
+    except TypeError:
+        return False
+
+
+def _error(message: str, code: str, details: Optional[str] = None) -> APIError:
+    return APIError({"message": message, "code": code, "hint": None, "details": details})
+
+
+class FakeQuery:
+    """One request being built; every filter / modifier returns self, execute() runs it."""
+
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table_name = table
+        self.operation = "select"
+        self.fields: List[Any] = ["*"]
+        self.payload: Any = None
+        self.on_conflict = "id"
+        self.filters: List[Tuple[Tuple[str, ...], str, str, Any, bool]] = []  # (embed path, column, op, value, negate)
+        self.orders: List[Tuple[str, bool, Optional[bool]]] = []
+        self.offset = 0
+        self.max_rows: Optional[int] = None
+        self.count_mode: Optional[str] = None
+        self.head = False
+        self.single_mode: Optional[str] = None
+        self._negate_next = False
+
+    # ----- operations -----
+    def select(self, *columns: str, count: Optional[str] = None, head: Optional[bool] = None) -> "FakeQuery":
+        self.fields = _parse_select(",".join(columns) if columns else "*")
+        self.count_mode = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, rows: Union[Dict, List[Dict]], count: Optional[str] = None, **_) -> "FakeQuery":
+        self.operation, self.payload, self.count_mode = "insert", rows, count
+        return self
+
+    def upsert(self, rows: Union[Dict, List[Dict]], on_conflict: str = "id", count: Optional[str] = None, **_) -> "FakeQuery":
+        self.operation, self.payload, self.on_conflict, self.count_mode = "upsert", rows, on_conflict or "id", count
+        return self
+
+    def update(self, values: Dict, count: Optional[str] = None, **_) -> "FakeQuery":
+        self.operation, self.payload, self.count_mode = "update", values, count
+        return self
+
+    def delete(self, count: Optional[str] = None, **_) -> "FakeQuery":
+        self.operation, self.count_mode = "delete", count
+        return self
+
+    # ----- filters -----
+    @property
+    def not_(self) -> "FakeQuery":
+        self._negate_next = True
+        return self
+
+    def _filter(self, column: str, op: str, value: Any) -> "FakeQuery":
+        *path, name = column.split(".")
+        self.filters.append((tuple(path), name, op, value, self._negate_next))
+        self._negate_next = False
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "lte", value)
+
+    def in_(self, column: str, values: Iterable[Any]) -> "FakeQuery":
+        return self._filter(column, "in", list(values))
+
+    def like(self, column: str, pattern: str) -> "FakeQuery":
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str) -> "FakeQuery":
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, "is", value)
+
+    def match(self, query: Dict[str, Any]) -> "FakeQuery":
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    # ----- modifiers -----
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None, **_) -> "FakeQuery":
+        self.orders.append((column, desc, nullsfirst))
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.offset, self.max_rows = start, max(0, end - start + 1)
+        return self
+
+    def limit(self, size: int) -> "FakeQuery":
+        self.max_rows = size
+        return self
+
+    def single(self) -> "FakeQuery":
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self) -> "FakeQuery":
+        self.single_mode = "maybe_single"
+        return self
+
+    # ----- execution -----
+    def execute(self):
+        self.client._round_trip(self.table_name, self.operation)
+        with self.client._lock:
+            rows, count = self._run()
+        rows = copy.deepcopy(rows)
+        if self.single_mode:
+            if len(rows) > 1 or (self.single_mode == "single" and not rows):
+                raise _error("Cannot coerce the result to a single JSON object", "PGRST116",
+                             f"The result contains {len(rows)} rows")
+            if not rows:
+                return None
+            return SingleAPIResponse(data=rows[0], count=count)
+        return APIResponse(data=[] if self.head else rows, count=count)
+
+    def _matches(self, row: Dict, path: Tuple[str, ...] = ()) -> bool:
+        for fpath, column, op, value, negate in self.filters:
+            if fpath == path and _compare(op, row.get(column), value) == negate:
+                return False
+        return True
+
+    def _run(self) -> Tuple[List[Dict], Optional[int]]:
+        table = self.client.tables.setdefault(self.table_name, [])
+        if self.operation in ("insert", "upsert"):
+            rows = self._write(table)
+            return rows, len(rows) if self.count_mode else None
+        matched = [row for row in table if self._matches(row)]
+        if self.operation == "update":
+            for row in matched:
+                row.update({k: _plain(v) for k, v in self.payload.items()})
+            return matched, len(matched) if self.count_mode else None
+        if self.operation == "delete":
+            ids = {id(row) for row in matched}
+            table[:] = [row for row in table if id(row) not in ids]
+            return matched, len(matched) if self.count_mode else None
+        pairs = [(p, row) for p, row in ((self.client._project(self.table_name, row, self.fields, self, ()), row)
+                                         for row in matched) if p is not None]
+        for column, desc, nullsfirst in reversed(self.orders):
+            pairs = _sorted(pairs, column, desc, desc if nullsfirst is None else nullsfirst)
+        rows = [p for p, _ in pairs]
+        count = len(rows) if self.count_mode else None
+        end = None if self.max_rows is None else self.offset + self.max_rows
+        return rows[self.offset:end], count
+
+    def _write(self, table: List[Dict]) -> List[Dict]:
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+        written = []
+        for values in payload:
+            values = {k: _plain(v) for k, v in values.items()}
+            if self.operation == "upsert":
+                keys = [k.strip() for k in self.on_conflict.split(",")]
+                existing = next((r for r in table if all(k in values and r.get(k) == values[k] for k in keys)), None)
+                if existing is not None:
+                    existing.update(values)
+                    written.append(existing)
+                    continue
+            row = {"id": self.client._next_id(self.table_name), "created_at": datetime.utcnow().isoformat(), **values}
+            table.append(row)
+            written.append(row)
+        return written
+
+
+def _sorted(pairs: List[Tuple[Dict, Dict]], column: str, desc: bool, nulls_first: bool) -> List[Tuple[Dict, Dict]]:
+    """Stable sort on one column; NULLs first or last as in Postgres (last for ASC, first for DESC)."""
+    nulls = [p for p in pairs if p[1].get(column) is None]
+    values = sorted((p for p in pairs if p[1].get(column) is not None), key=lambda p: p[1][column], reverse=desc)
+    return nulls + values if nulls_first else values + nulls
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabase", name: str, params: Dict):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self) -> APIResponse:
+        self.client._round_trip(self.name, "rpc")
+        fn = self.client.rpcs.get(self.name)
+        if fn is None:
+            raise _error(f"Could not find the function public.{self.name}", "PGRST202")
+        with self.client._lock:
+            data = fn(self.client, **(self.params or {}))
+        return APIResponse.model_construct(data=copy.deepcopy(data), count=None)  # as postgrest: scalars pass through
+
+
+class FakeSupabase:
+    def __init__(self, tables: Optional[Dict[str, List[Dict]]] = None, latency: Latency = 0.0):
+        self.tables: Dict[str, List[Dict]] = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.rpcs: Dict[str, Callable[..., Any]] = {}
+        self.calls: Counter = Counter()  # (table, operation) -> executes
+        self._lock = threading.RLock()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
+
+    def register_rpc(self, name: str, fn: Callable[..., Any]) -> None:
+        """fn(client, **params) runs under the client lock and returns the response data."""
+        self.rpcs[name] = fn
+
+    def seed(self, table: str, rows: Iterable[Dict]) -> None:
+        with self._lock:
+            target = self.tables.setdefault(table, [])
+            for row in rows:
+                target.append({"id": self._next_id(table), **{k: _plain(v) for k, v in row.items()}})
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+
+    def _round_trip(self, table: str, operation: str) -> None:
+        self.calls[(table, operation)] += 1
+        delay = self.latency(table, operation) if callable(self.latency) else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def _next_id(self, table: str) -> int:
+        return max((r.get("id") or 0 for r in self.tables.get(table, []) if isinstance(r.get("id"), int)), default=0) + 1
+
+    def _project(self, table: str, row: Dict, fields: List[Any], query: FakeQuery, path: Tuple[str, ...]) -> Optional[Dict]:
+        """Selected columns and embeds of row; None when an !inner embed has no match."""
+        out: Dict[str, Any] = {}
+        for field in fields:
+            if field == "*":
+                out.update(row)
+            elif isinstance(field, tuple):
+                out[field[1]] = row.get(field[0])
+            else:
+                value = self._embed(table, row, field, query, path + (field.alias,))
+                if field.inner and not value:
+                    return None
+                out[field.alias] = value
+        return out
+
+    def _embed(self, parent: str, row: Dict, embed: _Embed, query: FakeQuery, path: Tuple[str, ...]):
+        children = self.tables.get(embed.table, [])
+        fk = embed.hint or _singular(embed.table) + "_id"
+        if fk in row:  # many-to-one: parent holds the key
+            key = row.get(fk)
+            child = next((c for c in children if key is not None and c.get("id") == key), None)
+            if child is None or not query._matches(child, path):
+                return None
+            return self._project(embed.table, child, embed.fields, query, path)
+        back = embed.hint or _singular(parent) + "_id"  # one-to-many: children point at the parent
+        found = []
+        for child in children:
+            if child.get(back) == row.get("id") and query._matches(child, path):
+                projected = self._project(embed.table, child, embed.fields, query, path)
+                if projected is not None:
+                    found.append(projected)
+        return found
+
+
+def install(client: Any) -> int:
+    """
+    Make client the supabase client for every loaded app module, including
+    modules that did `from ..supabase_client import supabase`. Returns modules patched.
+    """
+    current = getattr(sys.modules.get("app.supabase_client"), "supabase", None)
+    patched = 0
+    for name, module in list(sys.modules.items()):
+        if name != "app" and not name.startswith("app."):
+            continue
+        value = getattr(module, "supabase", None)
+        if value is not None and (value is current or isinstance(value, FakeSupabase)):
+            setattr(module, "supabase", client)
+            patched += 1
+    return patched
@@ -0,0 +1,97 @@
+"""
+Location frames sent by the rider app over /delivery/ws/{user_id}.
+
+JSON (text frame):
+    {"type": "LOCATION", "points": [[lat, lon, ts_ms], ...]}
+    {"type": "LOCATION", "points": [{"lat": .., "lon": .., "ts": ts_ms}, ...]}
+    {"type": "LOCATION", "latitude": .., "longitude": .., "ts": ts_ms}   # single point
+Binary frame:
+    1 byte version (1), then N records of little-endian <iiQ:
+    latitude * 1e7, longitude * 1e7, timestamp in epoch milliseconds (16 bytes per point).
+
+ts is optional in JSON; points without one are stamped with the receive time.
+A ts that is not a number, or more than MAX_TS_SKEW_MS away from now, makes the
+frame malformed (ValueError).
+"""
+import json
+import math
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple, Union
+
+BINARY_VERSION = 1
+_RECORD = struct.Struct("<iiQ")
+MAX_POINTS_PER_FRAME = 500
+MAX_TS_SKEW_MS = 24 * 3600 * 1000  # points buffered offline for longer are not worth replaying
+
+Point = Tuple[float, float, Optional[datetime]]
+
+
+def _to_datetime(ts_ms) -> Optional[datetime]:
+    """UTC datetime for a client timestamp; ValueError for anything that is not a plausible epoch-ms value."""
+    if ts_ms is None:
+        return None
+    if isinstance(ts_ms, bool) or not isinstance(ts_ms, (int, float)):
+        raise ValueError("ts must be a number")
+    ts_ms = float(ts_ms)
+    if not math.isfinite(ts_ms) or abs(ts_ms - time.time() * 1000) > MAX_TS_SKEW_MS:
+        raise ValueError("ts out of range")
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _valid(lat: float, lon: float) -> bool:
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def parse_location_frame(data: Union[str, bytes]) -> Optional[List[Point]]:
+    """
+    Points in a frame as (lat, lon, utc datetime or None), invalid coordinates dropped.
+    Returns None when the frame is not a location frame; raises ValueError when it is malformed.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        if not data or data[0] != BINARY_VERSION:
+            raise ValueError("unknown binary frame version")
+        body = memoryview(data)[1:]
+        if len(body) % _RECORD.size:
+            raise ValueError("truncated binary location frame")
+        points = []
+        for lat_e7, lon_e7, ts_ms in _RECORD.iter_unpack(body[: MAX_POINTS_PER_FRAME * _RECORD.size]):
+            lat, lon = lat_e7 / 1e7, lon_e7 / 1e7
+            if _valid(lat, lon):
+                try:
+                    points.append((lat, lon, _to_datetime(ts_ms)))
+                except Exception:
+                    raise ValueError("bad location point")
+        return points
+
+    try:
+        msg = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(msg, dict) or msg.get("type") != "LOCATION":
+        return None
+    raw = msg.get("points")
+    if raw is None:
+        raw = [{"lat": msg.get("latitude"), "lon": msg.get("longitude"), "ts": msg.get("ts")}]
+    if not isinstance(raw, list):
+        raise ValueError("points must be a list")
+    points = []
+    for p in raw[:MAX_POINTS_PER_FRAME]:
+        try:
+            if isinstance(p, dict):
+                lat, lon, ts = float(p.get("lat", p.get("latitude"))), float(p.get("lon", p.get("longitude"))), p.get("ts")
+            else:
+                lat, lon, ts = float(p[0]), float(p[1]), (p[2] if len(p) > 2 else None)
+            if _valid(lat, lon):
+                points.append((lat, lon, _to_datetime(ts)))
+        except Exception:
+            raise ValueError("bad location point")
+    return points
+
+
+def pack_location_points(points: Iterable[Tuple[float, float, int]]) -> bytes:
+    """Binary frame for (lat, lon, ts_ms) points; the encoder counterpart of parse_location_frame."""
+    return bytes([BINARY_VERSION]) + b"".join(
+        _RECORD.pack(round(lat * 1e7), round(lon * 1e7), int(ts_ms)) for lat, lon, ts_ms in points
+    )
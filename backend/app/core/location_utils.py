@@ -1,4 +1,11 @@
 import math
+from typing import Sequence, Union
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+Coords = Union[Sequence[float], np.ndarray]
 
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -12,5 +19,34 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     dlon = lon2 - lon1
     a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
     c = 2 * math.asin(math.sqrt(a))
-    r = 6371  # Earth radius in km
+    r = EARTH_RADIUS_KM
     return c * r
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Same formula as haversine_distance on radian arrays (broadcasting)."""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    # Rounding can push a a hair above 1 for antipodal points.
+    return 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0))) * EARTH_RADIUS_KM
+
+
+def haversine_distances(lat: float, lon: float, lats: Coords, lons: Coords) -> np.ndarray:
+    """
+    Distance in km from one origin to N points.
+    lats/lons are equal-length sequences or arrays in decimal degrees; returns shape (N,).
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    return _haversine(math.radians(lat), math.radians(lon), lats, lons)
+
+
+def haversine_matrix(lats1: Coords, lons1: Coords, lats2: Coords, lons2: Coords) -> np.ndarray:
+    """
+    M x N distance matrix in km: entry [i, j] is the distance from point i of the
+    first set to point j of the second set.
+    """
+    lats1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, np.newaxis]
+    lons1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, np.newaxis]
+    lats2 = np.radians(np.asarray(lats2, dtype=np.float64))[np.newaxis, :]
+    lons2 = np.radians(np.asarray(lons2, dtype=np.float64))[np.newaxis, :]
+    return _haversine(lats1, lons1, lats2, lons2)
@@ -0,0 +1,71 @@
+"""
+Per-recipient message sequence numbers plus a bounded ring buffer of recent
+messages, so a reconnecting socket can be sent only what it missed.
+
+Sequence numbers are per process: each has a random epoch, and a client
+resuming against a different epoch (after a restart) has to resync from
+the REST API instead.
+"""
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class _Stream:
+    __slots__ = ("seq", "buffer")
+
+    def __init__(self, capacity: int):
+        self.seq = 0
+        self.buffer: Deque[Tuple[int, dict]] = deque(maxlen=capacity)
+
+
+class MessageLog:
+    def __init__(self, capacity: int = 100, max_streams: int = 10000):
+        self.capacity = capacity
+        self.max_streams = max_streams
+        self.epoch = uuid.uuid4().hex[:12]
+        self._streams: "OrderedDict[Hashable, _Stream]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def append(self, key: Hashable, message: dict) -> dict:
+        """Stamp message with the recipient's next "seq" and remember it. Returns the stamped copy."""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = _Stream(self.capacity)
+                while len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)  # least recently written recipient
+            else:
+                self._streams.move_to_end(key)
+            stream.seq += 1
+            stamped = dict(message, seq=stream.seq)
+            stream.buffer.append((stream.seq, stamped))
+            return stamped
+
+    def last_seq(self, key: Hashable) -> int:
+        stream = self._streams.get(key)
+        return stream.seq if stream else 0
+
+    def since(self, key: Hashable, last_seq: int, epoch: Optional[str] = None) -> Optional[List[dict]]:
+        """
+        Messages after last_seq, oldest first. None when the gap cannot be filled
+        (other epoch, or the oldest missed message already fell out of the buffer).
+        """
+        if epoch is not None and epoch != self.epoch:
+            return None
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                return [] if last_seq == 0 else None
+            if last_seq > stream.seq:
+                return None
+            if last_seq == stream.seq:
+                return []
+            oldest = stream.buffer[0][0] if stream.buffer else stream.seq + 1
+            if last_seq + 1 < oldest:
+                return None
+            return [m for seq, m in stream.buffer if seq > last_seq]
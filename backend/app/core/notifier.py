@@ -0,0 +1,38 @@
+"""
+Per-key wakeups for long-poll endpoints: waiters block on a key until
+someone calls notify(key) or the timeout passes. Process-local only.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, Hashable, Set
+
+
+class KeyedNotifier:
+    def __init__(self):
+        self._waiters: Dict[Hashable, Set[asyncio.Future]] = defaultdict(set)
+
+    def waiting(self, key: Hashable) -> int:
+        return len(self._waiters.get(key, ()))
+
+    def notify(self, key: Hashable) -> int:
+        """Wake everyone waiting on key. Returns how many were woken."""
+        waiters = self._waiters.pop(key, set())
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(True)
+        return len(waiters)
+
+    async def wait(self, key: Hashable, timeout: float) -> bool:
+        """True if notified, False on timeout."""
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[key].add(fut)
+        try:
+            return await asyncio.wait_for(fut, timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.discard(fut)
+                if not waiters:
+                    del self._waiters[key]
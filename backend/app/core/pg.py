@@ -0,0 +1,132 @@
+"""
+Optional direct-Postgres read path.
+
+Hot reads can skip PostgREST and query DATABASE_URL over a SQLAlchemy
+connection pool. Every query is a named server-side prepared statement:
+PREPAREd the first time a pooled connection runs it, EXECUTEd after that,
+so Postgres parses and plans it once per connection instead of per request.
+Queries return one json value, so rows come back in the same shape (and with
+the same ISO timestamps) PostgREST would produce.
+
+Turned on per repository with PG_READ_REPOSITORIES, e.g. "dispatch,customer";
+off by default. Before listing a repository, run benchmarks/bench_pg_reads.py
+against a copy of the database: it compares every direct read's shape with
+the PostgREST one before timing them.
+DATABASE_URL must be a session-mode connection (Supabase: the direct 5432
+port or the session pooler); transaction-mode pgbouncer does not keep
+prepared statements between transactions.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict
+
+from . import query_stats
+from .config import DATABASE_URL, PG_POOL_MAX_OVERFLOW, PG_POOL_SIZE, PG_READ_REPOSITORIES
+
+log = logging.getLogger(__name__)
+
+_engine = None
+_engine_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}  # statement name -> {"calls", "prepares", "errors", "total_ms"}
+
+
+def enabled(repository: str) -> bool:
+    """True when reads for this repository should go to Postgres directly."""
+    return bool(DATABASE_URL) and repository in PG_READ_REPOSITORIES
+
+
+def _driver_url(url: str) -> str:
+    """Pin the psycopg2 driver (the one in requirements); newer SQLAlchemy defaults postgresql:// to psycopg 3."""
+    for scheme in ("postgresql://", "postgres://"):
+        if url.startswith(scheme):
+            return "postgresql+psycopg2://" + url[len(scheme):]
+    return url
+
+
+def engine():
+    """Pooled engine for DATABASE_URL, created on first use (sqlalchemy is only imported then)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+
+                _engine = create_engine(
+                    _driver_url(DATABASE_URL),
+                    pool_size=PG_POOL_SIZE,
+                    max_overflow=PG_POOL_MAX_OVERFLOW,
+                    pool_pre_ping=True,
+                    isolation_level="AUTOCOMMIT",  # single-statement reads: no BEGIN/COMMIT round trips
+                )
+    return _engine
+
+
+class PreparedQuery:
+    """
+    A read statement with $1..$n placeholders. Calling it runs it on a pooled
+    connection and returns the first column of the first row (None if no row).
+    Parameters should be cast in the SQL ($1::bigint) since types are inferred at PREPARE time.
+    """
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql.strip()
+        self.arity = max((int(n) for n in re.findall(r"\$(\d+)", self.sql)), default=0)
+
+    def __call__(self, *params) -> Any:
+        if len(params) != self.arity:
+            raise TypeError(f"{self.name} takes {self.arity} parameters, got {len(params)}")
+        started = time.perf_counter()
+        prepared_now = False
+        try:
+            conn = engine().raw_connection()
+        except Exception:
+            self._record(started, False, error=True)
+            raise
+        try:
+            prepared = conn.info.setdefault("prepared", set())  # lives as long as the DBAPI connection
+            cur = conn.cursor()
+            try:
+                if self.name not in prepared:
+                    cur.execute(f"PREPARE {self.name} AS {self.sql}")
+                    prepared.add(self.name)
+                    prepared_now = True
+                if self.arity:
+                    cur.execute(f"EXECUTE {self.name}({', '.join(['%s'] * self.arity)})", params)
+                else:
+                    cur.execute(f"EXECUTE {self.name}")
+                row = cur.fetchone()
+            finally:
+                cur.close()
+        except Exception:
+            self._record(started, prepared_now, error=True)
+            raise
+        finally:
+            conn.close()  # back to the pool
+        self._record(started, prepared_now)
+        result = row[0] if row else None
+        query_stats.record("pg:" + self.name, "select", (time.perf_counter() - started) * 1000,
+                           len(result) if isinstance(result, list) else int(result is not None))
+        return result
+
+    def _record(self, started: float, prepared: bool, error: bool = False) -> None:
+        with _stats_lock:
+            s = _stats.setdefault(self.name, {"calls": 0, "prepares": 0, "errors": 0, "total_ms": 0.0})
+            s["calls"] += 1
+            s["prepares"] += int(prepared)
+            s["errors"] += int(error)
+            s["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        statements = {
+            name: {**s, "avg_ms": round(s["total_ms"] / s["calls"], 3) if s["calls"] else None,
+                   "total_ms": round(s["total_ms"], 3)}
+            for name, s in _stats.items()
+        }
+    pool = _engine.pool.status() if _engine is not None else None
+    return {"repositories": sorted(PG_READ_REPOSITORIES) if DATABASE_URL else [], "pool": pool, "statements": statements}
@@ -0,0 +1,49 @@
+"""
+Forward-decayed popularity scores, kept in log space.
+
+An order line of qty at time t adds qty * 2 ** ((t - LANDMARK) / half_life)
+to its item's score. Each score is stored as the log of that sum
+(log_weight / log_add), so it never overflows. Later orders weigh
+exponentially more, and every item decays by the same factor as time
+passes. Ordering by the stored log score is therefore the time-decayed
+ranking at any moment, and no counters need to be rescaled.
+current_score() turns a stored score into the decayed quantity as of now.
+
+supabase/popular_items_schema.sql does the same arithmetic in its trigger
+(popularity_log_weight / popularity_log_add). Change both together.
+"""
+import math
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+LANDMARK = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+Timestamp = Union[datetime, str]
+
+
+def _as_datetime(at: Timestamp) -> datetime:
+    if isinstance(at, str):
+        at = datetime.fromisoformat(at.replace("Z", "+00:00"))
+    return at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+
+
+def log_weight(qty: float, at: Timestamp, half_life_hours: float) -> float:
+    """ln(qty * 2 ** ((at - LANDMARK) / half_life))."""
+    elapsed = (_as_datetime(at) - LANDMARK).total_seconds()
+    return math.log(qty) + math.log(2) * elapsed / (half_life_hours * 3600)
+
+
+def log_add(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    """ln(exp(a) + exp(b)) without overflow; None is an empty score."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+def current_score(trend_log: Optional[float], half_life_hours: float, now: Optional[Timestamp] = None) -> float:
+    """The decayed quantity a stored score stands for at now (default: the current time)."""
+    if trend_log is None:
+        return 0.0
+    return math.exp(trend_log - log_weight(1, now or datetime.now(timezone.utc), half_life_hours))
@@ -0,0 +1,118 @@
+"""
+Rate limiting and delta encoding for rider positions pushed to customers.
+
+Each subscriber (an order being tracked) gets at most one update per
+min_interval seconds, moves shorter than min_move_m from the last position
+it was sent are dropped, and coordinates go out as integer microdegrees:
+
+    {"p": [lat_e6, lon_e6], "t": ts_ms}    keyframe (absolute)
+    {"d": [dlat_e6, dlon_e6], "t": ts_ms}  delta from the previous update
+
+A keyframe is sent first, every keyframe_every updates, and after a gap of
+keyframe_after seconds, so a client that joins late or missed updates only
+has to wait for the next keyframe. Bandwidth per tracked order is therefore
+bounded by min_interval no matter how often the rider app reports.
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .location_utils import haversine_distances
+
+E6 = 1_000_000
+
+
+class _Subscriber:
+    __slots__ = ("lat_e6", "lon_e6", "sent_at", "since_keyframe")
+
+    def __init__(self):
+        self.lat_e6: Optional[int] = None
+        self.lon_e6: Optional[int] = None
+        self.sent_at = float("-inf")
+        self.since_keyframe = 0
+
+
+class PositionThrottle:
+    def __init__(
+        self,
+        min_interval: float = 2.0,
+        min_move_m: float = 10.0,
+        keyframe_every: int = 10,
+        keyframe_after: float = 30.0,
+    ):
+        self.min_interval = min_interval
+        self.min_move_m = min_move_m
+        self.keyframe_every = keyframe_every
+        self.keyframe_after = keyframe_after
+        self._subs: Dict[int, _Subscriber] = {}
+        self._lock = threading.Lock()
+        self.offered = 0
+        self.sent = 0
+        self.keyframes = 0
+        self.rate_limited = 0
+        self.too_small = 0
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def offer(self, key: int, lat: float, lon: float, now: Optional[float] = None) -> Optional[Dict]:
+        """Encoded update for subscriber key, or None when it should be suppressed."""
+        now = time.monotonic() if now is None else now
+        lat_e6, lon_e6 = round(lat * E6), round(lon * E6)
+        with self._lock:
+            self.offered += 1
+            sub = self._subs.setdefault(key, _Subscriber())
+            if now - sub.sent_at < self.min_interval:
+                self.rate_limited += 1
+                return None
+            keyframe = (
+                sub.lat_e6 is None
+                or sub.since_keyframe + 1 >= self.keyframe_every
+                or now - sub.sent_at >= self.keyframe_after
+            )
+            if not keyframe:
+                moved_km = haversine_distances(
+                    sub.lat_e6 / E6, sub.lon_e6 / E6, [lat_e6 / E6], [lon_e6 / E6]
+                ).tolist()[0]
+                if moved_km * 1000 < self.min_move_m:
+                    self.too_small += 1
+                    return None
+            ts_ms = int(time.time() * 1000)
+            if keyframe:
+                update = {"p": [lat_e6, lon_e6], "t": ts_ms}
+                sub.since_keyframe = 0
+                self.keyframes += 1
+            else:
+                update = {"d": [lat_e6 - sub.lat_e6, lon_e6 - sub.lon_e6], "t": ts_ms}
+                sub.since_keyframe += 1
+            sub.lat_e6, sub.lon_e6, sub.sent_at = lat_e6, lon_e6, now
+            self.sent += 1
+            return update
+
+    def forget(self, key: int) -> None:
+        with self._lock:
+            self._subs.pop(key, None)
+
+    def metrics(self) -> Dict:
+        return {
+            "subscribers": len(self._subs),
+            "offered": self.offered,
+            "sent": self.sent,
+            "keyframes": self.keyframes,
+            "rate_limited": self.rate_limited,
+            "too_small": self.too_small,
+            "min_interval_seconds": self.min_interval,
+            "min_move_m": self.min_move_m,
+        }
+
+
+def decode_position(base: Optional[List[int]], update: Dict) -> Optional[List[int]]:
+    """
+    Apply an update to the last decoded [lat_e6, lon_e6]. Returns the new position,
+    or None for a delta that arrives before any keyframe.
+    """
+    if "p" in update:
+        return list(update["p"])
+    if base is None or "d" not in update:
+        return None
+    return [base[0] + update["d"][0], base[1] + update["d"][1]]
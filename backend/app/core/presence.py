@@ -0,0 +1,140 @@
+"""
+Last-seen tracking for connected clients (riders), fed by heartbeats.
+
+Every sign of life (a PONG to the server's PING, a location frame, a long
+poll) calls seen(). A background task runs on_tick every interval seconds
+(the server sends its PINGs there) and hands the keys not seen for
+timeout seconds to on_stale in one call, so they can be downgraded in bulk.
+
+Keys that went stale are remembered, and seen() reports when one of them
+comes back so the caller can restore it.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        interval: float = 20.0,
+        on_tick: Optional[Callable[[], Awaitable[None]]] = None,
+        on_stale: Optional[Callable[[List[int]], Awaitable[None]]] = None,
+        max_expired: int = 10000,
+    ):
+        self.timeout = timeout
+        self.interval = interval
+        self.on_tick = on_tick
+        self.on_stale = on_stale
+        self.max_expired = max_expired
+        self.started_at = time.monotonic()
+        self._last_seen: Dict[int, float] = {}
+        self._expired: "OrderedDict[int, float]" = OrderedDict()  # key -> when it went stale
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.heartbeats = 0
+        self.expired_total = 0
+        self.revived_total = 0
+        self.offers_avoided = 0
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._last_seen
+
+    def seen(self, key: int, now: Optional[float] = None) -> bool:
+        """Record a heartbeat. True when key had gone stale and is back."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.heartbeats += 1
+            self._last_seen[key] = now
+            if self._expired.pop(key, None) is not None:
+                self.revived_total += 1
+                return True
+        return False
+
+    def forget(self, key: int) -> None:
+        """Stop tracking a key that left on purpose (went offline); it is not reported stale."""
+        with self._lock:
+            self._last_seen.pop(key, None)
+            self._expired.pop(key, None)
+
+    def is_live(self, key: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        last = self._last_seen.get(key)
+        return last is not None and now - last <= self.timeout
+
+    @property
+    def warming_up(self) -> bool:
+        """Right after startup nobody has had the chance to heartbeat yet, so everyone counts as live."""
+        return time.monotonic() - self.started_at < self.timeout
+
+    def live(self, keys: Iterable[int], now: Optional[float] = None) -> List[int]:
+        now = time.monotonic() if now is None else now
+        return [k for k in keys if self.is_live(k, now)]
+
+    def expire(self, now: Optional[float] = None) -> List[int]:
+        """Stop tracking and return every key not seen for timeout seconds."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            stale = [k for k, at in self._last_seen.items() if now - at > self.timeout]
+        self.mark_expired(stale, now)
+        return stale
+
+    def mark_expired(self, keys: Iterable[int], now: Optional[float] = None) -> None:
+        """Treat keys as gone stale (including ones never seen), so seen() reports them coming back."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for key in keys:
+                self._last_seen.pop(key, None)
+                self._expired[key] = now
+                self._expired.move_to_end(key)
+                self.expired_total += 1
+            while len(self._expired) > self.max_expired:
+                self._expired.popitem(last=False)
+
+    def metrics(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "tracked": len(self._last_seen),
+            "live": len(self.live(list(self._last_seen), now)),
+            "timeout_seconds": self.timeout,
+            "heartbeats": self.heartbeats,
+            "expired_total": self.expired_total,
+            "revived_total": self.revived_total,
+            # Offers that would have gone to a rider with no live connection.
+            "offers_avoided": self.offers_avoided,
+        }
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self.started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self.on_tick is not None:
+                    await self.on_tick()
+                stale = self.expire()
+                if stale and self.on_stale is not None:
+                    await self.on_stale(stale)
+            except Exception:
+                log.exception("presence pass failed")
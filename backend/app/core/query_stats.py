@@ -0,0 +1,244 @@
+"""
+Per-request accounting of database queries.
+
+instrument() wraps execute() on the postgrest request builders (and on the
+in-memory fake), so every Supabase query records its table, operation,
+latency and rows returned; direct-Postgres reads (core/pg.py) record too.
+QueryStatsMiddleware opens a RequestQueries for each HTTP request, sends
+its totals in a Server-Timing header and keeps per-route aggregates and the
+last QUERY_STATS_RECENT requests for GET /debug/queries. Queries made
+outside a request (dispatch, flush loops) only add to the background totals.
+
+The current RequestQueries travels in a ContextVar. Starlette's threadpool
+and run_db copy the context into their worker threads, so a query made there
+counts for the request that is waiting on it. Work a request starts but does
+not wait for (dispatch) is started with spawn_background, so it runs as
+background; anything else that outlives its request records to the background
+totals once the request has finished.
+
+Tests pin an endpoint's query count with query_budget:
+
+    with query_budget(3):
+        client.get("/customer/orders")   # AssertionError with a per-table breakdown past 3
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .config import QUERY_STATS_RECENT
+
+_current: contextvars.ContextVar[Optional["RequestQueries"]] = contextvars.ContextVar("request_queries", default=None)
+
+_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+class RequestQueries:
+    """Queries made on behalf of one request (or one query_budget block)."""
+
+    def __init__(self, route: str = ""):
+        self.route = route
+        self.queries = 0
+        self.db_ms = 0.0
+        self.rows = 0
+        self.tables: Dict[str, Dict[str, Any]] = {}  # table -> {"queries", "ms", "rows", "operations"}
+        self.finished = False  # reported; tasks still holding it in their context record to the background
+        self._lock = threading.Lock()  # run_db calls gathered by one request record from several threads
+
+    def record(self, table: str, operation: str, ms: float, rows: int) -> None:
+        with self._lock:
+            self.queries += 1
+            self.db_ms += ms
+            self.rows += rows
+            t = self.tables.setdefault(table, {"queries": 0, "ms": 0.0, "rows": 0, "operations": {}})
+            t["queries"] += 1
+            t["ms"] += ms
+            t["rows"] += rows
+            t["operations"][operation] = t["operations"].get(operation, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "route": self.route,
+                "queries": self.queries,
+                "db_ms": round(self.db_ms, 3),
+                "rows": self.rows,
+                "tables": {
+                    name: {**t, "ms": round(t["ms"], 3), "operations": dict(t["operations"])}
+                    for name, t in sorted(self.tables.items(), key=lambda kv: -kv[1]["queries"])
+                },
+            }
+
+    def server_timing(self) -> str:
+        """Server-Timing value: the total, then one entry per table (most queried first)."""
+        with self._lock:
+            parts = [f'db;dur={self.db_ms:.1f};desc="{self.queries} queries, {self.rows} rows"']
+            for name, t in sorted(self.tables.items(), key=lambda kv: -kv[1]["queries"]):
+                metric = "db-" + "".join(c if c.isalnum() or c in "-_." else "." for c in name)
+                parts.append(f'{metric};dur={t["ms"]:.1f};desc="{t["queries"]}x, {t["rows"]} rows"')
+        return ", ".join(parts)
+
+
+_lock = threading.Lock()
+_background = RequestQueries("background")
+_recent: Deque[Dict[str, Any]] = deque(maxlen=QUERY_STATS_RECENT)
+_routes: Dict[str, Dict[str, Any]] = {}  # route -> {"requests", "queries", "max_queries", "db_ms"}
+_watchers: List[List[RequestQueries]] = []  # open query_budget blocks collecting finished requests
+
+
+def current() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+def record(table: str, operation: str, ms: float, rows: int) -> None:
+    queries = _current.get()
+    if queries is None or queries.finished:
+        queries = _background
+    queries.record(table, operation, ms, rows)
+
+
+def spawn_background(coro) -> "asyncio.Task":
+    """asyncio.create_task outside the current request's context: the task's queries count as background."""
+    return contextvars.Context().run(asyncio.create_task, coro)
+
+
+def _rows(result: Any) -> int:
+    data = getattr(result, "data", None)
+    if isinstance(data, list):
+        return len(data)
+    return 0 if data is None else 1
+
+
+def _describe(builder: Any) -> Tuple[str, str]:
+    """(table, operation) of a postgrest or fake builder."""
+    request = getattr(builder, "request", None)
+    if request is not None:
+        path = str(getattr(request.path, "path", request.path))
+        table = path.split("/rest/v1/", 1)[-1].strip("/")
+        operation = "rpc" if table.startswith("rpc/") else _OPERATIONS.get(str(request.http_method).upper(), "query")
+        return table, operation
+    if hasattr(builder, "table_name"):
+        return builder.table_name, builder.operation
+    return "rpc/" + getattr(builder, "name", "?"), "rpc"
+
+
+def _timed_execute(execute: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(execute)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = None
+        try:
+            result = execute(self, *args, **kwargs)
+            return result
+        finally:
+            table, operation = _describe(self)
+            record(table, operation, (time.perf_counter() - started) * 1000, _rows(result))
+
+    wrapper._query_stats = True
+    return wrapper
+
+
+def instrument() -> None:
+    """Time every execute() of the sync postgrest builders and of the fake client. Idempotent."""
+    from postgrest._sync import request_builder
+    from .fake_supabase import FakeQuery, FakeRpc
+
+    for cls in (
+        request_builder.SyncQueryRequestBuilder,
+        request_builder.SyncSingleRequestBuilder,
+        request_builder.SyncMaybeSingleRequestBuilder,
+        FakeQuery,
+        FakeRpc,
+    ):
+        if not getattr(cls.execute, "_query_stats", False):
+            cls.execute = _timed_execute(cls.execute)
+
+
+def _finish(queries: RequestQueries) -> None:
+    queries.finished = True
+    summary = queries.summary()
+    with _lock:
+        _recent.append(summary)
+        r = _routes.setdefault(queries.route, {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0})
+        r["requests"] += 1
+        r["queries"] += queries.queries
+        r["max_queries"] = max(r["max_queries"], queries.queries)
+        r["db_ms"] += queries.db_ms
+        for watcher in _watchers:
+            watcher.append(queries)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: a RequestQueries per HTTP request, reported in Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries = RequestQueries(f'{scope["method"]} {scope["path"]}')
+        token = _current.set(queries)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                if route is not None:
+                    queries.route = f'{scope["method"]} {route.path}'
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", queries.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _finish(queries)
+
+
+@contextlib.contextmanager
+def query_budget(max_queries: int) -> Iterator[RequestQueries]:
+    """
+    Fail if any HTTP request finished inside the block, or the block's own
+    direct calls, made more than max_queries queries.
+    """
+    own = RequestQueries("query_budget block")
+    finished: List[RequestQueries] = []
+    token = _current.set(own)
+    with _lock:
+        _watchers.append(finished)
+    try:
+        yield own
+    finally:
+        _current.reset(token)
+        with _lock:
+            _watchers.remove(finished)
+    for queries in [own, *finished]:
+        if queries.queries > max_queries:
+            tables = ", ".join(f"{name} x{t['queries']}" for name, t in queries.summary()["tables"].items())
+            raise AssertionError(f"{queries.route}: {queries.queries} queries, budget {max_queries} ({tables})")
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        routes = {
+            route: {**r, "avg_queries": round(r["queries"] / r["requests"], 2), "avg_db_ms": round(r["db_ms"] / r["requests"], 3),
+                    "db_ms": round(r["db_ms"], 3)}
+            for route, r in sorted(_routes.items(), key=lambda kv: -kv[1]["queries"] / kv[1]["requests"])
+        }
+        recent = list(_recent)
+    return {"routes": routes, "recent": recent[::-1], "background": _background.summary()}
+
+
+def reset() -> None:
+    with _lock:
+        _recent.clear()
+        _routes.clear()
+    global _background
+    _background = RequestQueries("background")
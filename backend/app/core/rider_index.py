@@ -0,0 +1,182 @@
+"""
+In-process spatial index of available riders for dispatch.
+
+Riders are bucketed on a fixed lat/lon grid so "k nearest available riders
+to (lat, lon) within R km" only looks at the cells around the point instead
+of every available rider. The index is fed by rider location and status
+updates; dispatch loads it from the database once when it is cold.
+"""
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import RIDER_INDEX_CELL_DEG
+from .location_utils import haversine_distances
+
+KM_PER_DEGREE = 111.32  # length of one degree of latitude in km
+
+Cell = Tuple[int, int]
+
+
+class RiderIndex:
+    def __init__(self, cell_size_deg: float = 0.01):
+        self.cell_size_deg = cell_size_deg
+        self._riders: Dict[int, Dict] = {}  # rider_id -> {"rider_id", "user_id", "lat", "lon", "cell"}
+        self._cells: Dict[Cell, Set[int]] = {}  # grid cell -> rider_ids
+        # Sync routes run in the threadpool while dispatch runs on the event loop.
+        self._lock = threading.Lock()
+        self.warm = False
+
+    def __len__(self) -> int:
+        return len(self._riders)
+
+    def __contains__(self, rider_id: int) -> bool:
+        return rider_id in self._riders
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return (math.floor(lat / self.cell_size_deg), math.floor(lon / self.cell_size_deg))
+
+    def _place(self, rider_id: int, user_id: Optional[int], lat: float, lon: float) -> None:
+        self._unplace(rider_id)
+        cell = self._cell(lat, lon)
+        self._riders[rider_id] = {"rider_id": rider_id, "user_id": user_id, "lat": lat, "lon": lon, "cell": cell}
+        self._cells.setdefault(cell, set()).add(rider_id)
+
+    def _unplace(self, rider_id: int) -> Optional[Dict]:
+        entry = self._riders.pop(rider_id, None)
+        if entry is not None:
+            bucket = self._cells.get(entry["cell"])
+            if bucket is not None:
+                bucket.discard(rider_id)
+                if not bucket:
+                    del self._cells[entry["cell"]]
+        return entry
+
+    def load(self, riders: Iterable[Tuple[int, Optional[int], float, float]]) -> None:
+        """Replace the index contents with (rider_id, user_id, lat, lon) entries and mark it warm."""
+        with self._lock:
+            self._riders.clear()
+            self._cells.clear()
+            for rider_id, user_id, lat, lon in riders:
+                self._place(int(rider_id), user_id, float(lat), float(lon))
+            self.warm = True
+
+    def upsert(self, rider_id: int, user_id: Optional[int], lat: float, lon: float) -> None:
+        """Add an available rider or move an existing one."""
+        with self._lock:
+            if user_id is None and rider_id in self._riders:
+                user_id = self._riders[rider_id]["user_id"]
+            self._place(int(rider_id), user_id, float(lat), float(lon))
+
+    def update_location(self, rider_id: int, lat: float, lon: float) -> bool:
+        """Move a rider that is already indexed. Returns False if the rider is not available."""
+        with self._lock:
+            entry = self._riders.get(rider_id)
+            if entry is None:
+                return False
+            self._place(rider_id, entry["user_id"], float(lat), float(lon))
+            return True
+
+    def remove(self, rider_id: int) -> None:
+        with self._lock:
+            self._unplace(rider_id)
+
+    def invalidate(self) -> None:
+        """Drop everything; the next dispatch reloads from the database."""
+        with self._lock:
+            self._riders.clear()
+            self._cells.clear()
+            self.warm = False
+
+    def rider_ids(self) -> List[int]:
+        with self._lock:
+            return list(self._riders)
+
+    def get(self, rider_id: int) -> Optional[Dict]:
+        entry = self._riders.get(rider_id)
+        return dict(entry) if entry else None
+
+    def _ring(self, center: Cell, ring: int) -> Iterable[Cell]:
+        ci, cj = center
+        if ring == 0:
+            yield center
+            return
+        for dj in range(-ring, ring + 1):
+            yield (ci - ring, cj + dj)
+            yield (ci + ring, cj + dj)
+        for di in range(-ring + 1, ring):
+            yield (ci + di, cj - ring)
+            yield (ci + di, cj + ring)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 1,
+        radius_km: Optional[float] = None,
+        exclude: Iterable[int] = (),
+        where: Optional[Callable[[Dict], bool]] = None,
+    ) -> List[Dict]:
+        """
+        Return up to k indexed riders nearest to (lat, lon), closest first, as
+        {"rider_id", "user_id", "distance_km"} dicts. Riders farther than
+        radius_km (when given), rider_ids in exclude and candidates for which
+        where(candidate) is false are skipped.
+        """
+        if k <= 0:
+            return []
+        with self._lock:
+            if not self._riders:
+                return []
+            center = self._cell(lat, lon)
+            found: List[Dict] = []
+            considered = set(exclude)  # where() is called once per rider, even across the flat-scan fallback
+
+            def consider(rider_ids: List[int]) -> None:
+                entries = [self._riders[r] for r in rider_ids if r not in considered]
+                considered.update(rider_ids)
+                if not entries:
+                    return
+                dists = haversine_distances(
+                    lat, lon,
+                    [e["lat"] for e in entries],
+                    [e["lon"] for e in entries],
+                )
+                for entry, dist in zip(entries, dists.tolist()):
+                    if radius_km is not None and dist > radius_km:
+                        continue
+                    candidate = {"rider_id": entry["rider_id"], "user_id": entry["user_id"], "distance_km": dist}
+                    if where is not None and not where(candidate):
+                        continue
+                    found.append(candidate)
+
+            ring = 0
+            visited_cells = 0
+            while True:
+                # Once a ring has more cells than are occupied, a flat scan is cheaper.
+                if max(1, 8 * ring) > len(self._cells) - visited_cells:
+                    consider(list(self._riders))
+                    break
+                ring_ids: List[int] = []
+                for cell in self._ring(center, ring):
+                    bucket = self._cells.get(cell)
+                    if bucket:
+                        visited_cells += 1
+                        ring_ids.extend(bucket)
+                consider(ring_ids)
+                # Every cell outside this ring is at least `ring` whole cells away.
+                edge_lat = min(89.0, abs(lat) + (ring + 1) * self.cell_size_deg)
+                bound_km = ring * self.cell_size_deg * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+                if len(found) >= k:
+                    found.sort(key=lambda r: r["distance_km"])
+                    if found[k - 1]["distance_km"] <= bound_km:
+                        break
+                if radius_km is not None and bound_km > radius_km:
+                    break
+                ring += 1
+
+            found.sort(key=lambda r: r["distance_km"])
+            return found[:k]
+
+
+rider_index = RiderIndex(RIDER_INDEX_CELL_DEG)
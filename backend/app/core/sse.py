@@ -0,0 +1,62 @@
+"""
+Server-Sent Events helpers.
+
+QueueSocket lets an SSE response register with ConnectionManager like a
+WebSocket: the manager's writer task "sends" frames into an asyncio.Queue
+the response generator reads from. The stream gets the same queueing,
+cross-worker routing and seq/replay as a socket, and Last-Event-ID maps
+onto last_seq/epoch.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+CLOSED = object()  # pushed to the queue when the manager drops the stream
+
+
+class QueueSocket:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        self.queue.put_nowait(json.loads(text))
+
+    async def close(self, code: int = 1000) -> None:
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(CLOSED)
+
+
+def format_event(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """One SSE event. data is JSON-encoded on a single line."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":"), default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+def event_id(epoch: str, seq: int) -> str:
+    return f"{epoch}:{seq}"
+
+
+def parse_event_id(value: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    """Last-Event-ID "epoch:seq" -> (last_seq, epoch); (None, None) when absent or malformed."""
+    if not value or ":" not in value:
+        return None, None
+    epoch, _, seq = value.rpartition(":")
+    try:
+        return int(seq), epoch
+    except ValueError:
+        return None, None
+
+
+def diff(old: Dict, new: Dict) -> Dict:
+    """Top-level keys of new whose value changed (a JSON merge patch without deletions)."""
+    return {k: v for k, v in new.items() if old.get(k) != v}
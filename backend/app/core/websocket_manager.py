@@ -1,58 +1,297 @@
 from fastapi import WebSocket
-from typing import Dict
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+import asyncio
 import json
+import logging
+import time
+
+from .broker import LocalBroker, make_broker
+from .message_log import MessageLog
+from .config import (
+    WS_BROKER,
+    WS_BROKER_SOCKET,
+    WS_REPLAY_BUFFER_SIZE,
+    WS_SEND_QUEUE_SIZE,
+    WS_SEND_TIMEOUT_SECONDS,
+    WS_SLOW_CONSUMER_POLICY,
+)
+
+log = logging.getLogger(__name__)
+
+
+class Connection:
+    """
+    One WebSocket with a bounded outbound queue drained by its own writer task,
+    so a slow client only ever delays its own messages.
+    When the queue is full: policy "drop_oldest" discards the oldest queued message,
+    "disconnect" closes the socket (the client reconnects and resyncs).
+    """
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager", group: str, key: int):
+        self.websocket = websocket
+        self.manager = manager
+        self.group = group
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=manager.queue_size)
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self.resumed = False  # reconnect whose missed messages were all replayed
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, message: dict) -> bool:
+        return self.send_text(json.dumps(message))
+
+    def send_text(self, text: str) -> bool:
+        """Queue a frame without waiting for the client. False if the connection is gone or was cut off."""
+        if self.closed:
+            return False
+        if self.queue.full():
+            if self.manager.policy == "disconnect":
+                log.warning("[ws] %s %s send queue full, disconnecting slow client", self.group, self.key)
+                self.dropped += self.queue.qsize()
+                self.manager._drop(self)
+                asyncio.create_task(self._close_socket(code=1013))
+                return False
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((time.perf_counter(), text))
+        return True
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self.closed:
+                queued_at, text = await self.queue.get()
+                # asyncio.wait rather than wait_for: wait_for can swallow a cancellation that races a finished send.
+                sending = asyncio.ensure_future(self.websocket.send_text(text))
+                done, _ = await asyncio.wait({sending}, timeout=self.manager.send_timeout)
+                if not done:
+                    sending.cancel()
+                    raise asyncio.TimeoutError("send timed out")
+                sending.result()
+                self.sent += 1
+                self.manager.latencies_ms.append((time.perf_counter() - queued_at) * 1000)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.info("[ws] %s %s send failed, dropping connection: %s", self.group, self.key, e)
+            self.manager._drop(self)
+            await self._close_socket()
+
+    async def _close_socket(self, code: int = 1000) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    def stats(self) -> Dict:
+        return {"queue_depth": self.queue.qsize(), "sent": self.sent, "dropped": self.dropped}
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}  # Rider: user_id -> WebSocket
-        self.customer_connections: Dict[int, WebSocket] = {}  # Customer: user_id -> WebSocket
-        self.restaurant_connections: Dict[int, WebSocket] = {}  # Restaurant: restaurant_id -> WebSocket
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+        broker=None,
+    ):
+        # Routes messages for sockets held by other uvicorn workers (see core/broker.py).
+        self.broker = broker or LocalBroker()
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        # Every user / restaurant may hold several sockets (phone + web, several tabs).
+        self.active_connections: Dict[int, Set[Connection]] = {}  # Rider: user_id -> connections
+        self.customer_connections: Dict[int, Set[Connection]] = {}  # Customer: user_id -> connections
+        self.restaurant_connections: Dict[int, Set[Connection]] = {}  # Restaurant: restaurant_id -> connections
+        self.latencies_ms: Deque[float] = deque(maxlen=1000)  # enqueue -> sent, most recent sends
+        # Outgoing messages get a per-recipient "seq"; recent ones are kept for replay on reconnect
+        # (except transient frames sent with replay=False, such as rider positions).
+        self.message_log = MessageLog(capacity=WS_REPLAY_BUFFER_SIZE)
+        self.dropped_connections = 0
+
+    @property
+    def single_process(self) -> bool:
+        """True when every socket lives in this process (no cross-worker broker)."""
+        return isinstance(self.broker, LocalBroker)
+
+    def _groups(self) -> Dict[str, Dict[int, Set[Connection]]]:
+        return {
+            "rider": self.active_connections,
+            "customer": self.customer_connections,
+            "restaurant": self.restaurant_connections,
+        }
 
-    async def connect(self, user_id: int, websocket: WebSocket):
+    async def _add(
+        self, group: str, key: int, websocket: WebSocket,
+        last_seq: Optional[int] = None, epoch: Optional[str] = None,
+    ) -> Connection:
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        conn = Connection(websocket, self, group, key)
+        conns = self._groups()[group].setdefault(key, set())
+        if not conns:
+            self.broker.subscribe(group, key)
+        conns.add(conn)
+        self._sync(conn, last_seq, epoch)
+        conn.start()
+        return conn
 
-    def disconnect(self, user_id: int):
-        self.active_connections.pop(user_id, None)
+    def _sync(self, conn: Connection, last_seq: Optional[int], epoch: Optional[str]) -> None:
+        """
+        First frame on every socket: {"type": "SYNC", "epoch", "seq", "resumed", "replayed"}.
+        A client that passed last_seq (and epoch) gets the messages it missed right after;
+        resumed=false means it must refetch state over HTTP. Replay is single-worker only:
+        with a cross-worker broker other workers may have sent messages this log never saw.
+        """
+        missed = None
+        if last_seq is not None and self.single_process:
+            missed = self.message_log.since((conn.group, conn.key), last_seq, epoch)
+        conn.resumed = missed is not None
+        conn.send({
+            "type": "SYNC",
+            "epoch": self.message_log.epoch,
+            "seq": self.message_log.last_seq((conn.group, conn.key)),
+            "resumed": conn.resumed,
+            "replayed": len(missed or ()),
+        })
+        for message in missed or ():
+            conn.send(message)
+
+    def _remove(self, group: str, key: int, websocket: Optional[WebSocket] = None) -> None:
+        conns = self._groups()[group].get(key)
+        if not conns:
+            return
+        for conn in list(conns):
+            if websocket is None or conn.websocket is websocket:
+                conn.close()
+                conns.discard(conn)
+        if not conns:
+            self._groups()[group].pop(key, None)
+            self.broker.unsubscribe(group, key)
+
+    def _drop(self, conn: Connection) -> None:
+        """Writer-side removal of a dead or too-slow connection."""
+        if not conn.closed:
+            self.dropped_connections += 1
+        self._remove(conn.group, conn.key, conn.websocket)
+
+    def _fan_out(self, group: str, key: int, message: dict, replay: bool = True) -> bool:
+        """
+        Queue to local sockets and hand to the broker for sockets in other workers.
+        replay=False: a transient frame, not sequenced or buffered (the next one supersedes it).
+        """
+        if replay:
+            message = self.message_log.append((group, key), message)
+        published = self.broker.publish(group, key, message)
+        return self._deliver_local(group, key, message) or published
+
+    def _deliver_local(self, group: str, key: int, message: dict) -> bool:
+        conns = self._groups()[group].get(key)
+        if not conns:
+            return False
+        text = json.dumps(message)  # serialize once for every device
+        delivered = False
+        for conn in list(conns):
+            delivered = conn.send_text(text) or delivered
+        return delivered
+
+    def broadcast_local(self, group: str, message: dict) -> int:
+        """
+        Queue a control frame (e.g. PING) to every socket of a group held by this process.
+        Not sequenced or buffered for replay. Returns how many sockets it was queued to.
+        """
+        text = json.dumps(message)
+        queued = 0
+        for conns in list(self._groups()[group].values()):
+            for conn in list(conns):
+                queued += conn.send_text(text)
+        return queued
+
+    async def _on_broker_message(self, group: str, key: int, message: dict) -> None:
+        self._deliver_local(group, key, message)
+
+    async def start_broker(self, broker=None) -> None:
+        """Startup: switch to the configured broker (WS_BROKER) and start routing."""
+        self.broker = broker or make_broker(WS_BROKER, WS_BROKER_SOCKET)
+        await self.broker.start(self._on_broker_message)
+        for group, by_key in self._groups().items():
+            for key in by_key:
+                self.broker.subscribe(group, key)
+
+    async def stop_broker(self) -> None:
+        await self.broker.stop()
+
+    async def connect(
+        self, user_id: int, websocket: WebSocket, last_seq: Optional[int] = None, epoch: Optional[str] = None,
+    ) -> Connection:
+        return await self._add("rider", user_id, websocket, last_seq, epoch)
+
+    def disconnect(self, user_id: int, websocket: Optional[WebSocket] = None):
+        """Remove one socket, or every socket of the user when websocket is None."""
+        self._remove("rider", user_id, websocket)
 
     async def send_personal_message(self, message: dict, user_id: int) -> bool:
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].send_text(json.dumps(message))
-            return True
-        return False
+        return self._fan_out("rider", user_id, message)
 
-    async def connect_customer(self, user_id: int, websocket: WebSocket):
-        await websocket.accept()
-        self.customer_connections[user_id] = websocket
+    async def connect_customer(
+        self, user_id: int, websocket: WebSocket, last_seq: Optional[int] = None, epoch: Optional[str] = None,
+    ) -> Connection:
+        return await self._add("customer", user_id, websocket, last_seq, epoch)
 
-    def disconnect_customer(self, user_id: int):
-        self.customer_connections.pop(user_id, None)
+    def disconnect_customer(self, user_id: int, websocket: Optional[WebSocket] = None):
+        self._remove("customer", user_id, websocket)
 
-    async def send_to_customer(self, user_id: int, message: dict) -> bool:
-        if user_id in self.customer_connections:
-            try:
-                await self.customer_connections[user_id].send_text(json.dumps(message))
-                return True
-            except Exception:
-                self.disconnect_customer(user_id)
-        return False
+    async def send_to_customer(self, user_id: int, message: dict, replay: bool = True) -> bool:
+        return self._fan_out("customer", user_id, message, replay)
 
-    async def connect_restaurant(self, restaurant_id: int, websocket: WebSocket):
-        await websocket.accept()
-        self.restaurant_connections[restaurant_id] = websocket
+    async def connect_restaurant(
+        self, restaurant_id: int, websocket: WebSocket, last_seq: Optional[int] = None, epoch: Optional[str] = None,
+    ) -> Connection:
+        return await self._add("restaurant", restaurant_id, websocket, last_seq, epoch)
 
-    def disconnect_restaurant(self, restaurant_id: int):
-        self.restaurant_connections.pop(restaurant_id, None)
+    def disconnect_restaurant(self, restaurant_id: int, websocket: Optional[WebSocket] = None):
+        self._remove("restaurant", restaurant_id, websocket)
 
     async def send_to_restaurant(self, restaurant_id: int, message: dict) -> bool:
-        if restaurant_id in self.restaurant_connections:
-            try:
-                await self.restaurant_connections[restaurant_id].send_text(json.dumps(message))
-                return True
-            except Exception:
-                self.disconnect_restaurant(restaurant_id)
-        return False
+        return self._fan_out("restaurant", restaurant_id, message)
+
+    def stats(self) -> Dict:
+        """Connection counts, send queue depths and recent enqueue-to-sent latencies."""
+        groups = {}
+        for name, by_key in self._groups().items():
+            conns: List[Connection] = [c for cs in by_key.values() for c in cs]
+            depths = [c.queue.qsize() for c in conns]
+            groups[name] = {
+                "keys": len(by_key),
+                "connections": len(conns),
+                "queued": sum(depths),
+                "max_queue_depth": max(depths, default=0),
+                "dropped_messages": sum(c.dropped for c in conns),
+            }
+        lat = sorted(self.latencies_ms)
+        return {
+            "groups": groups,
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "dropped_connections": self.dropped_connections,
+            "broker": type(self.broker).__name__,
+            "send_latency_ms": {
+                "samples": len(lat),
+                "p50": round(lat[len(lat) // 2], 3) if lat else None,
+                "p99": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))], 3) if lat else None,
+                "max": round(lat[-1], 3) if lat else None,
+            },
+        }
 
 
 manager = ConnectionManager()
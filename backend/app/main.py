@@ -6,6 +6,9 @@ from fastapi.routing import APIRoute, APIWebSocketRoute
 from starlette.requests import Request
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.routes import delivery_routes, auth_routes, admin_users_routes, customer_routes, admin_menu_routes, admin_restaurant_routes, discovery_routes, menu_routes, restaurant_routes, consumer_routes, admin_order_routes, payment_routes
+from app.core import query_stats
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.dataloader import DataLoaderMiddleware
 import os
 
 # Allowed frontend origins for CORS - Add your server IP
@@ -31,6 +34,12 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Query count / DB time per request: Server-Timing header and /debug/queries
+query_stats.instrument()
+app.add_middleware(QueryStatsMiddleware)
+# Request-scoped batch loaders for keyed lookups (core/dataloader.py)
+app.add_middleware(DataLoaderMiddleware)
+
 
 def _cors_headers(origin) -> dict:
     if origin and origin in CORS_ORIGINS:
@@ -101,6 +110,23 @@ def root():
 def health_check():
     return {"status": "healthy", "cors_origins": CORS_ORIGINS}
 
+@app.get("/debug/queries")
+def debug_queries():
+    """Database queries per route (average / max), the most recent requests with a per-table breakdown, and background totals."""
+    return query_stats.stats()
+
+@app.get("/debug/catalog-cache")
+def debug_catalog_cache():
+    """Serialized menu and restaurant-list documents cached in this worker: entries, bytes, hits / misses, invalidations."""
+    from app.core.catalog_cache import menu_cache, restaurant_list_cache
+    return {"menus": menu_cache.stats(), "restaurant_lists": restaurant_list_cache.stats()}
+
+@app.get("/debug/voucher-rules")
+def debug_voucher_rules():
+    """Voucher codes in this worker's Bloom filter, compiled rules, and checks answered without a query."""
+    from app.services.voucher_service import voucher_rules
+    return voucher_rules.stats()
+
 @app.on_event("startup")
 async def startup_event():
     print("\n" + "=" * 80)
@@ -113,4 +139,27 @@ async def startup_event():
         elif isinstance(route, APIWebSocketRoute):
             print(f"[WebSocket] Path: {route.path}, Name: {route.name}")
 
-    print("=" * 80 + "\n")
\ No newline at end of file
+    print("=" * 80 + "\n")
+
+    from app.services.dispatch_service import DispatchService
+    from app.services.location_service import rider_locations
+    from app.services.presence_service import rider_presence
+    from app.core.websocket_manager import manager
+    await manager.start_broker()
+    await DispatchService.start_expiry()
+    rider_locations.start()
+    rider_presence.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.dispatch_service import dispatch_expiry
+    from app.services.location_service import rider_locations
+    from app.services.presence_service import rider_presence
+    from app.core.websocket_manager import manager
+    from app.core import db_executor
+    await rider_presence.stop()
+    await dispatch_expiry.stop()
+    await rider_locations.stop()
+    await manager.stop_broker()
+    db_executor.shutdown()
\ No newline at end of file
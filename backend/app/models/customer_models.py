@@ -1,4 +1,4 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 import re
 from pydantic import BaseModel
 from typing import List, Optional
@@ -78,6 +78,18 @@ class VoucherValidateResponse(BaseModel):
     discount_cents: int = 0
     message: str = ""
 
+class VoucherBulkValidateRequest(BaseModel):
+    codes: List[str] = Field(..., min_length=1, max_length=20)
+    subtotal_cents: int
+    restaurant_id: Optional[int] = None
+
+class VoucherCodeResult(VoucherValidateResponse):
+    code: str
+
+class VoucherBulkValidateResponse(BaseModel):
+    results: List[VoucherCodeResult]
+    best_code: Optional[str] = None  # valid code with the largest discount
+
 class OrderItemResponse(BaseModel):
     id: int
     order_id: int
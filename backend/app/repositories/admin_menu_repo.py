@@ -1,11 +1,13 @@
 from typing import List, Optional, Dict, Any
 from ..supabase_client import supabase
+from ..core.db_executor import offload, run_db
 
 class MenuRepository:
     
     # Restaurant methods
     @staticmethod
-    async def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict]:
+    @offload
+    def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict]:
         """Get restaurant by ID"""
         try:
             response = supabase.table("restaurants") \
@@ -19,7 +21,8 @@ class MenuRepository:
             return None
     
     @staticmethod
-    async def get_restaurant_by_user_id(user_id: int) -> Optional[Dict]:
+    @offload
+    def get_restaurant_by_user_id(user_id: int) -> Optional[Dict]:
         """Get restaurant owned by user"""
         try:
             response = supabase.table("restaurants") \
@@ -34,7 +37,8 @@ class MenuRepository:
     
     # Menu methods
     @staticmethod
-    async def get_menus_by_restaurant(restaurant_id: int) -> List[Dict]:
+    @offload
+    def get_menus_by_restaurant(restaurant_id: int) -> List[Dict]:
         """Get all menus for a restaurant"""
         try:
             response = supabase.table("menus") \
@@ -48,7 +52,8 @@ class MenuRepository:
             return []
     
     @staticmethod
-    async def get_menu_by_id(menu_id: int) -> Optional[Dict]:
+    @offload
+    def get_menu_by_id(menu_id: int) -> Optional[Dict]:
         """Get menu by ID"""
         try:
             response = supabase.table("menus") \
@@ -62,7 +67,8 @@ class MenuRepository:
             return None
     
     @staticmethod
-    async def create_menu(menu_data: dict) -> Optional[Dict]:
+    @offload
+    def create_menu(menu_data: dict) -> Optional[Dict]:
         """Create a new menu"""
         try:
             response = supabase.table("menus").insert(menu_data).execute()
@@ -72,7 +78,8 @@ class MenuRepository:
             return None
     
     @staticmethod
-    async def update_menu(menu_id: int, menu_data: dict) -> bool:
+    @offload
+    def update_menu(menu_id: int, menu_data: dict) -> bool:
         """Update menu"""
         try:
             response = supabase.table("menus") \
@@ -85,7 +92,8 @@ class MenuRepository:
             return False
     
     @staticmethod
-    async def delete_menu(menu_id: int) -> bool:
+    @offload
+    def delete_menu(menu_id: int) -> bool:
         """Delete menu"""
         try:
             response = supabase.table("menus") \
@@ -99,7 +107,8 @@ class MenuRepository:
     
     # Menu Items methods
     @staticmethod
-    async def get_menu_items(menu_id: int) -> List[Dict]:
+    @offload
+    def get_menu_items(menu_id: int) -> List[Dict]:
         """Get all items for a menu"""
         try:
             response = supabase.table("menu_items") \
@@ -113,7 +122,27 @@ class MenuRepository:
             return []
     
     @staticmethod
-    async def get_menu_item_by_id(item_id: int) -> Optional[Dict]:
+    @offload
+    def get_menu_items_by_menu_ids(menu_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Items of several menus in one query, grouped by menu_id"""
+        grouped: Dict[int, List[Dict]] = {menu_id: [] for menu_id in menu_ids}
+        try:
+            if menu_ids:
+                response = supabase.table("menu_items") \
+                    .select("*") \
+                    .in_("menu_id", menu_ids) \
+                    .order("id") \
+                    .execute()
+                for item in response.data or []:
+                    grouped.setdefault(item["menu_id"], []).append(item)
+            return grouped
+        except Exception as e:
+            print(f"Error getting menu items for menus {menu_ids}: {e}")
+            return {}
+    
+    @staticmethod
+    @offload
+    def get_menu_item_by_id(item_id: int) -> Optional[Dict]:
         """Get menu item by ID"""
         try:
             response = supabase.table("menu_items") \
@@ -127,7 +156,8 @@ class MenuRepository:
             return None
     
     @staticmethod
-    async def create_menu_item(item_data: dict) -> Optional[Dict]:
+    @offload
+    def create_menu_item(item_data: dict) -> Optional[Dict]:
         """Create a new menu item"""
         try:
             response = supabase.table("menu_items").insert(item_data).execute()
@@ -137,7 +167,8 @@ class MenuRepository:
             return None
     
     @staticmethod
-    async def create_menu_items_bulk(items_data: List[dict]) -> List[Dict]:
+    @offload
+    def create_menu_items_bulk(items_data: List[dict]) -> List[Dict]:
         """Create multiple menu items"""
         try:
             response = supabase.table("menu_items").insert(items_data).execute()
@@ -147,7 +178,8 @@ class MenuRepository:
             return []
     
     @staticmethod
-    async def update_menu_item(item_id: int, item_data: dict) -> bool:
+    @offload
+    def update_menu_item(item_id: int, item_data: dict) -> bool:
         """Update menu item"""
         try:
             response = supabase.table("menu_items") \
@@ -160,7 +192,8 @@ class MenuRepository:
             return False
     
     @staticmethod
-    async def delete_menu_item(item_id: int) -> bool:
+    @offload
+    def delete_menu_item(item_id: int) -> bool:
         """Delete menu item"""
         try:
             response = supabase.table("menu_items") \
@@ -174,7 +207,8 @@ class MenuRepository:
     
     # Categories methods
     @staticmethod
-    async def get_all_categories() -> List[Dict]:
+    @offload
+    def get_all_categories() -> List[Dict]:
         """Get all categories"""
         try:
             response = supabase.table("categories") \
@@ -187,7 +221,8 @@ class MenuRepository:
             return []
 
     @staticmethod
-    async def get_category_by_id(category_id: int) -> Optional[Dict]:
+    @offload
+    def get_category_by_id(category_id: int) -> Optional[Dict]:
         """Get category by ID"""
         try:
             response = supabase.table("categories") \
@@ -201,7 +236,8 @@ class MenuRepository:
             return None
 
     @staticmethod
-    async def get_category_by_name(name: str) -> Optional[Dict]:
+    @offload
+    def get_category_by_name(name: str) -> Optional[Dict]:
         """Get category by name"""
         try:
             response = supabase.table("categories") \
@@ -227,7 +263,7 @@ class MenuRepository:
                 return existing
             
             # Insert the category
-            response = supabase.table("categories").insert(category_data).execute()
+            response = await run_db(supabase.table("categories").insert(category_data).execute)
             
             # Log the response for debugging
             print(f"Insert response: {response}")
@@ -247,11 +283,13 @@ class MenuRepository:
                     import asyncio
                     await asyncio.sleep(0.5)
                     
-                    fetch_response = supabase.table("categories") \
-                        .select("*") \
-                        .eq("name", name) \
-                        .maybe_single() \
-                        .execute()
+                    fetch_response = await run_db(
+                        supabase.table("categories")
+                        .select("*")
+                        .eq("name", name)
+                        .maybe_single()
+                        .execute
+                    )
                     
                     if fetch_response.data:
                         print(f"Found category after insert: {fetch_response.data}")
@@ -273,10 +311,12 @@ class MenuRepository:
                 return False
             
             # Delete the category
-            response = supabase.table("categories") \
-                .delete() \
-                .eq("id", category_id) \
-                .execute()
+            response = await run_db(
+                supabase.table("categories")
+                .delete()
+                .eq("id", category_id)
+                .execute
+            )
             
             # Check if deletion was successful
             success = response.data is not None and len(response.data) > 0
@@ -288,7 +328,8 @@ class MenuRepository:
     
     # Menu Item Categories junction methods
     @staticmethod
-    async def get_categories_for_item(menu_item_id: int) -> List[Dict]:
+    @offload
+    def get_categories_for_item(menu_item_id: int) -> List[Dict]:
         """Get all categories for a menu item"""
         try:
             response = supabase.table("menu_item_categories") \
@@ -304,7 +345,27 @@ class MenuRepository:
             return []
     
     @staticmethod
-    async def assign_categories_to_item(menu_item_id: int, category_ids: List[int]) -> bool:
+    @offload
+    def get_categories_for_items(menu_item_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Categories of several menu items in one query, grouped by menu_item_id"""
+        grouped: Dict[int, List[Dict]] = {item_id: [] for item_id in menu_item_ids}
+        try:
+            if menu_item_ids:
+                response = supabase.table("menu_item_categories") \
+                    .select("menu_item_id, category_id, categories(*)") \
+                    .in_("menu_item_id", menu_item_ids) \
+                    .execute()
+                for row in response.data or []:
+                    if row.get("categories"):
+                        grouped.setdefault(row["menu_item_id"], []).append(row["categories"])
+            return grouped
+        except Exception as e:
+            print(f"Error getting categories for items {menu_item_ids}: {e}")
+            return {}
+    
+    @staticmethod
+    @offload
+    def assign_categories_to_item(menu_item_id: int, category_ids: List[int]) -> bool:
         """Assign categories to a menu item"""
         try:
             # First, delete existing assignments
@@ -326,7 +387,8 @@ class MenuRepository:
             print(f"Error assigning categories to item {menu_item_id}: {e}")
             return False
     @staticmethod
-    async def get_restaurant_metrics(restaurant_id: int) -> Dict:
+    @offload
+    def get_restaurant_metrics(restaurant_id: int) -> Dict:
         """Get metrics for a specific restaurant"""
         try:
             print(f"Getting metrics for restaurant {restaurant_id}")
@@ -1,5 +1,6 @@
 from typing import List, Optional, Dict, Any
 from ..supabase_client import supabase
+from .dispatch_repo import DispatchRepository
 from datetime import datetime, timedelta
 
 
@@ -146,6 +147,7 @@ class AdminOrderRepository:
                 "status": new_status,
                 "updated_at": datetime.now().isoformat()
             }).eq("id", order_id).execute()
+            DispatchRepository.invalidate_order_snapshot(order_id)
             
             if response.data:
                 return response.data[0]
@@ -159,6 +161,7 @@ class AdminOrderRepository:
         """Delete an order (cascade will delete order_items)"""
         try:
             response = supabase.table("orders").delete().eq("id", order_id).execute()
+            DispatchRepository.invalidate_order_snapshot(order_id)
             count = getattr(response, "count", None)
             if count is not None:
                 return count > 0
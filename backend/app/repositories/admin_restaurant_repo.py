@@ -1,12 +1,14 @@
 from typing import List, Optional, Dict, Any
 from ..supabase_client import supabase
+from ..core.db_executor import offload
 from collections import defaultdict
 
 class RestaurantRepository:
     
     # Restaurant CRUD
     @staticmethod
-    async def get_all_restaurants(approved_only: bool = False) -> List[Dict]:
+    @offload
+    def get_all_restaurants(approved_only: bool = False) -> List[Dict]:
         """Get all restaurants"""
         try:
             query = supabase.table("restaurants").select("*")
@@ -21,7 +23,8 @@ class RestaurantRepository:
             return []
     
     @staticmethod
-    async def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict]:
+    @offload
+    def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict]:
         """Get restaurant by ID"""
         try:
             response = supabase.table("restaurants") \
@@ -35,7 +38,8 @@ class RestaurantRepository:
             return None
     
     @staticmethod
-    async def create_restaurant(restaurant_data: dict) -> Optional[Dict]:
+    @offload
+    def create_restaurant(restaurant_data: dict) -> Optional[Dict]:
         """Create a new restaurant"""
         try:
             response = supabase.table("restaurants").insert(restaurant_data).execute()
@@ -45,7 +49,8 @@ class RestaurantRepository:
             return None
     
     @staticmethod
-    async def update_restaurant(restaurant_id: int, restaurant_data: dict) -> bool:
+    @offload
+    def update_restaurant(restaurant_id: int, restaurant_data: dict) -> bool:
         """Update restaurant"""
         try:
             response = supabase.table("restaurants") \
@@ -58,7 +63,8 @@ class RestaurantRepository:
             return False
     
     @staticmethod
-    async def delete_restaurant(restaurant_id: int) -> bool:
+    @offload
+    def delete_restaurant(restaurant_id: int) -> bool:
         """Delete restaurant"""
         try:
             response = supabase.table("restaurants") \
@@ -71,7 +77,8 @@ class RestaurantRepository:
             return False
     
     @staticmethod
-    async def approve_restaurant(restaurant_id: int, approve: bool = True) -> bool:
+    @offload
+    def approve_restaurant(restaurant_id: int, approve: bool = True) -> bool:
         """Approve or reject restaurant"""
         try:
             response = supabase.table("restaurants") \
@@ -85,7 +92,8 @@ class RestaurantRepository:
     
     # Statistics and counts
     @staticmethod
-    async def get_restaurant_stats() -> Dict:
+    @offload
+    def get_restaurant_stats() -> Dict:
         """Get restaurant statistics"""
         try:
             # Get all restaurants
@@ -135,7 +143,8 @@ class RestaurantRepository:
             }
     
     @staticmethod
-    async def get_bulk_restaurant_metrics(restaurant_ids: List[int]) -> Dict[int, Dict]:
+    @offload
+    def get_bulk_restaurant_metrics(restaurant_ids: List[int]) -> Dict[int, Dict]:
         """
         Get metrics for multiple restaurants in just 3-4 queries instead of N*4 queries.
         Returns a dictionary mapping restaurant_id to metrics.
@@ -1,6 +1,8 @@
 from typing import List, Optional, Dict
 from datetime import datetime
 from ..supabase_client import supabase
+from ..core import pg
+from .pg_read_repo import PgReadRepository
 
 
 def _safe_data(response, default=None):
@@ -218,6 +220,10 @@ class CustomerRepository:
     @staticmethod
     def get_order_tracking(order_id: int, user_id: int) -> Optional[Dict]:
         """Full order details for tracking: order, restaurant, items, delivery, rider."""
+        if pg.enabled("customer"):
+            order = PgReadRepository.get_order_tracking(order_id, user_id)
+            if order is not None:
+                return order
         order_resp = supabase.table("orders").select("*").eq("id", order_id).eq("user_id", user_id).maybe_single().execute()
         order = _safe_data(order_resp)
         if not order:
@@ -243,36 +249,60 @@ class CustomerRepository:
         response = supabase.table("order_items").select("*").eq("order_id", order_id).execute()
         return _safe_data(response) or []
 
+    @staticmethod
+    def get_order_items_by_order_ids(order_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Items of several orders in one query, grouped by order_id (orders without items map to [])."""
+        grouped: Dict[int, List[Dict]] = {oid: [] for oid in order_ids}
+        if order_ids:
+            response = supabase.table("order_items").select("*").in_("order_id", order_ids).order("id").execute()
+            for item in _safe_data(response) or []:
+                grouped.setdefault(item["order_id"], []).append(item)
+        return grouped
+
     @staticmethod
     def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict]:
         response = supabase.table("restaurants").select("id, name").eq("id", restaurant_id).maybe_single().execute()
         return _safe_data(response)
 
+    @staticmethod
+    def get_restaurants_by_ids(restaurant_ids: List[int]) -> Dict[int, Dict]:
+        if not restaurant_ids:
+            return {}
+        response = supabase.table("restaurants").select("id, name").in_("id", restaurant_ids).execute()
+        return {r["id"]: r for r in (_safe_data(response) or [])}
+
     # ----- Public: list restaurants and restaurant with menu (for customer app browsing) -----
     @staticmethod
     def get_restaurants_list() -> List[Dict]:
-        """List restaurants (id, name, description, city, cuisine_type, average_rating, total_reviews, image_url)."""
-        try:
-            response = supabase.table("restaurants") \
-                .select("id, name, description, city, cuisine_type, average_rating, total_reviews, image_url") \
-                .eq("is_approved", True) \
-                .execute()
-            
-            data = _safe_data(response) or []
-            print(f"Fetched {len(data)} restaurants from database")
-            
-            # Log first restaurant to verify image_url
-            if data:
-                print(f"First restaurant: {data[0].get('name')} - image_url: {data[0].get('image_url')}")
-                
-            return data
-        except Exception as e:
-            print(f"Error in get_restaurants_list: {e}")
-            return []
+        """
+        List restaurants (id, name, description, city, cuisine_type, average_rating, total_reviews, image_url).
+        Raises on DB errors: the list is cached and served publicly, so a failure must not look like "no restaurants".
+        """
+        if pg.enabled("customer"):
+            rows = PgReadRepository.get_approved_restaurants()
+            if rows is not None:
+                return rows
+        response = supabase.table("restaurants") \
+            .select("id, name, description, city, cuisine_type, average_rating, total_reviews, image_url") \
+            .eq("is_approved", True) \
+            .execute()
+
+        data = _safe_data(response) or []
+        print(f"Fetched {len(data)} restaurants from database")
+
+        # Log first restaurant to verify image_url
+        if data:
+            print(f"First restaurant: {data[0].get('name')} - image_url: {data[0].get('image_url')}")
+
+        return data
 
     @staticmethod
     def get_restaurant_with_menu(restaurant_id: int) -> Optional[Dict]:
         """Get one restaurant and its menu items (via menus). Returns restaurant + menus with items."""
+        if pg.enabled("customer"):
+            result = PgReadRepository.get_restaurant_with_menu(restaurant_id)
+            if result is not None:
+                return result
         try:
             # Get restaurant
             restaurant_resp = supabase.table("restaurants") \
@@ -34,6 +34,36 @@ class DeliveryRepository:
             .execute()
         return response.data[0] if response.data else None
     
+    @staticmethod
+    def get_rider_by_id(rider_id: int) -> Optional[Dict]:
+        """Get rider id, user_id, status and location (for the dispatch rider index)."""
+        try:
+            response = supabase.table("riders") \
+                .select("id, user_id, status, current_latitude, current_longitude") \
+                .eq("id", rider_id) \
+                .maybe_single() \
+                .execute()
+            data = getattr(response, "data", None)
+            if data is None:
+                return None
+            return data[0] if isinstance(data, list) and data else data
+        except Exception:
+            return None
+
+    @staticmethod
+    def get_user_ids_by_rider_ids(rider_ids: List[int]) -> Dict[int, int]:
+        """Map rider_id -> user_id (for WebSocket notifications)."""
+        if not rider_ids:
+            return {}
+        try:
+            response = supabase.table("riders") \
+                .select("id, user_id") \
+                .in_("id", rider_ids) \
+                .execute()
+            return {r["id"]: r["user_id"] for r in (response.data or []) if r.get("user_id") is not None}
+        except Exception:
+            return {}
+
     @staticmethod
     def create_delivery(order_id: int, rider_id: int, status: str = "assigned") -> Optional[Dict]:
         """Create a delivery row when a rider accepts. Links order to rider."""
@@ -72,6 +102,25 @@ class DeliveryRepository:
         except Exception:
             return None
 
+    @staticmethod
+    def get_active_deliveries_for_rider(rider_id: int) -> List[Dict]:
+        """Deliveries the rider has not finished yet, as [{"order_id", "user_id"}] (user_id = customer)."""
+        try:
+            response = supabase.table("deliveries") \
+                .select("order_id") \
+                .eq("rider_id", rider_id) \
+                .in_("status", ["assigned", "picked_up"]) \
+                .execute()
+            order_ids = [d["order_id"] for d in (response.data or []) if d.get("order_id") is not None]
+            orders = DeliveryRepository.get_orders_by_ids(order_ids)
+            return [
+                {"order_id": oid, "user_id": orders[oid]["user_id"]}
+                for oid in order_ids
+                if orders.get(oid, {}).get("user_id") is not None
+            ]
+        except Exception:
+            return []
+
     @staticmethod
     def update_delivery_status(
         delivery_id: int,
@@ -210,6 +259,21 @@ class DeliveryRepository:
             return len(data) > 0
         return True
 
+    @staticmethod
+    def set_riders_status(rider_ids: List[int], status: str, from_status: str) -> List[int]:
+        """Conditional bulk update from_status -> status. Returns the rider ids that actually changed."""
+        if not rider_ids:
+            return []
+        try:
+            response = supabase.table("riders") \
+                .update({"status": status}) \
+                .in_("id", rider_ids) \
+                .eq("status", from_status) \
+                .execute()
+            return [r["id"] for r in (response.data or [])]
+        except Exception:
+            return []
+
     @staticmethod
     def update_rider_location(rider_id: int, latitude: float, longitude: float) -> bool:
         """Update rider GPS location for dispatch."""
@@ -224,6 +288,32 @@ class DeliveryRepository:
         except Exception:
             return False
 
+    @staticmethod
+    def bulk_update_rider_locations(rows: List[Dict]) -> int:
+        """
+        Write many rider locations at once ([{"id", "current_latitude", "current_longitude", "last_location_update"}]).
+        Uses the bulk_update_rider_locations RPC (supabase/rider_locations_rpc.sql), or one UPDATE per rider if it is missing.
+        """
+        if not rows:
+            return 0
+        try:
+            supabase.rpc("bulk_update_rider_locations", {"locations": rows}).execute()
+            return len(rows)
+        except Exception:
+            pass
+        written = 0
+        for row in rows:
+            try:
+                supabase.table("riders").update({
+                    "current_latitude": row["current_latitude"],
+                    "current_longitude": row["current_longitude"],
+                    "last_location_update": row["last_location_update"],
+                }).eq("id", row["id"]).execute()
+                written += 1
+            except Exception:
+                pass
+        return written
+
     @staticmethod
     def update_rider_vehicle(rider_id: int, vehicle_type: str) -> bool:
         """Update rider vehicle type."""
@@ -1,19 +1,43 @@
-from typing import List, Optional, Dict
+import copy
+import logging
+from typing import Iterable, List, Optional, Dict, Tuple
 from ..supabase_client import supabase
+from ..core import pg
+from ..core.config import ORDER_SNAPSHOT_TTL_SECONDS
+from ..core.ttl_cache import TTLCache
+from .pg_read_repo import PgReadRepository
 from datetime import datetime, timedelta
 
+# Order statuses a rider can still claim (no rider assigned yet).
+CLAIMABLE_ORDER_STATUSES = ["pending", "confirmed", "preparing", "ready"]
+
+# Order + restaurant + customer (with addresses) + items (with menu item names) in one request.
+# Relations are pinned by FK column so the embed does not depend on constraint names.
+ORDER_SNAPSHOT_SELECT = (
+    "*, "
+    "restaurant:restaurants!restaurant_id(name, latitude, longitude), "
+    "customer_user:users!user_id(first_name, last_name, phone, "
+    "addresses(street, city, state, postal_code, country, latitude, longitude, is_default)), "
+    "order_items(id, order_id, menu_item_id, quantity, price_cents, menu_items(name))"
+)
+
+# order_id -> snapshot dict, short-lived; invalidated whenever the order status changes.
+order_snapshots = TTLCache(ORDER_SNAPSHOT_TTL_SECONDS, max_entries=2000)
+
 
 class DispatchRepository:
     @staticmethod
     def get_available_riders(city: Optional[str] = None) -> List[Dict]:
         import logging
-        query = supabase.table("riders").select(
-            "id, user_id, current_latitude, current_longitude, status"
-        ).eq("status", "available")
-        if city:
-            query = query.eq("city", city)
-        response = query.execute()
-        riders = response.data or []
+        riders = PgReadRepository.get_available_riders(city) if pg.enabled("dispatch") else None
+        if riders is None:
+            query = supabase.table("riders").select(
+                "id, user_id, current_latitude, current_longitude, status"
+            ).eq("status", "available")
+            if city:
+                query = query.eq("city", city)
+            response = query.execute()
+            riders = response.data or []
         logging.getLogger(__name__).info("[dispatch] get_available_riders count=%s riders=%s", len(riders), [(r.get("id"), r.get("user_id")) for r in riders])
         return riders
 
@@ -34,6 +58,47 @@ class DispatchRepository:
         except Exception:
             return None
 
+    @staticmethod
+    def create_dispatch_requests(
+        pairs: List[Tuple[int, int]], timeout_seconds: int = 60
+    ) -> List[Dict]:
+        """Insert one pending request per (order_id, rider_id) pair in a single round trip."""
+        if not pairs:
+            return []
+        expires_at = (datetime.utcnow() + timedelta(seconds=timeout_seconds)).isoformat()
+        rows = [
+            {"order_id": order_id, "rider_id": rider_id, "status": "pending", "expires_at": expires_at}
+            for order_id, rider_id in pairs
+        ]
+        try:
+            response = supabase.table("dispatch_requests").insert(rows).execute()
+            return response.data or []
+        except Exception:
+            # One conflicting row fails the whole insert; fall back to row by row.
+            created = []
+            for order_id, rider_id in pairs:
+                request = DispatchRepository.create_dispatch_request(order_id, rider_id, timeout_seconds)
+                if request:
+                    created.append(request)
+            return created
+
+    @staticmethod
+    def get_busy_rider_ids(rider_ids: List[int]) -> List[int]:
+        """Riders among rider_ids that already hold a pending dispatch request."""
+        if not rider_ids:
+            return []
+        if pg.enabled("dispatch"):
+            busy = PgReadRepository.get_busy_rider_ids(rider_ids)
+            if busy is not None:
+                return busy
+        try:
+            response = supabase.table("dispatch_requests").select(
+                "rider_id"
+            ).in_("rider_id", rider_ids).eq("status", "pending").execute()
+            return list({r["rider_id"] for r in (response.data or []) if r.get("rider_id") is not None})
+        except Exception:
+            return []
+
     @staticmethod
     def update_dispatch_status(request_id: int, status: str) -> bool:
         try:
@@ -45,15 +110,105 @@ class DispatchRepository:
             return False
 
     @staticmethod
-    def expire_other_requests_for_order(order_id: int, except_request_id: int) -> None:
-        """When one rider accepts, mark all other pending requests for this order as expired."""
+    def expire_other_requests_for_order(order_id: int, except_request_id: int) -> List[Dict]:
+        """When one rider accepts, mark all other pending requests for this order as expired. Returns the expired rows."""
         try:
-            supabase.table("dispatch_requests").update({"status": "expired"}).eq(
+            response = supabase.table("dispatch_requests").update({"status": "expired"}).eq(
                 "order_id", order_id
             ).eq("status", "pending").neq("id", except_request_id).execute()
+            return response.data or []
+        except Exception:
+            return []
+
+    @staticmethod
+    def close_if_pending(request_id: int, status: str) -> bool:
+        """Conditional update pending -> status. True only for the caller that actually moved it."""
+        try:
+            response = supabase.table("dispatch_requests").update(
+                {"status": status}
+            ).eq("id", request_id).eq("status", "pending").execute()
+            return bool(response.data)
+        except Exception:
+            return False
+
+    @staticmethod
+    def get_pending_expiries() -> List[Dict]:
+        """id, order_id, expires_at of every pending request; used to rebuild the expiry heap at startup."""
+        try:
+            response = supabase.table("dispatch_requests").select(
+                "id, order_id, expires_at"
+            ).eq("status", "pending").execute()
+            return response.data or []
+        except Exception:
+            return []
+
+    @staticmethod
+    def expire_requests(request_ids: List[int]) -> List[Dict]:
+        """Bulk conditional pending -> rejected for timed-out offers. Returns only the rows actually moved."""
+        if not request_ids:
+            return []
+        try:
+            response = supabase.table("dispatch_requests").update(
+                {"status": "rejected"}
+            ).in_("id", request_ids).eq("status", "pending").execute()
+            return response.data or []
+        except Exception:
+            return []
+
+    @staticmethod
+    def expire_overdue_requests() -> List[Dict]:
+        """Bulk pending -> rejected for every request past expires_at, whoever scheduled it."""
+        try:
+            response = supabase.table("dispatch_requests").update(
+                {"status": "rejected"}
+            ).eq("status", "pending").lt("expires_at", datetime.utcnow().isoformat()).execute()
+            return response.data or []
+        except Exception:
+            return []
+
+    @staticmethod
+    def claim_order(order_id: int) -> Optional[Dict]:
+        """
+        Atomically move an order that has no rider yet to rider_assigned.
+        Single conditional UPDATE, so with several riders accepting at once only one gets the row back.
+        """
+        try:
+            response = supabase.table("orders").update({
+                "status": "rider_assigned",
+                "updated_at": datetime.utcnow().isoformat(),
+            }).eq("id", order_id).in_("status", CLAIMABLE_ORDER_STATUSES).execute()
+            order_snapshots.invalidate(order_id)
+            data = response.data or []
+            return data[0] if data else None
+        except Exception:
+            return None
+
+    @staticmethod
+    def release_order(order_id: int) -> None:
+        """Undo claim_order when the delivery row could not be created."""
+        try:
+            supabase.table("orders").update({
+                "status": "ready",
+                "updated_at": datetime.utcnow().isoformat(),
+            }).eq("id", order_id).eq("status", "rider_assigned").execute()
+            order_snapshots.invalidate(order_id)
         except Exception:
             pass
 
+    @staticmethod
+    def has_pending_requests(order_id: int) -> bool:
+        if pg.enabled("dispatch"):
+            pending = PgReadRepository.has_pending_requests(order_id)
+            if pending is not None:
+                return pending
+        try:
+            response = supabase.table("dispatch_requests").select("id").eq(
+                "order_id", order_id
+            ).eq("status", "pending").limit(1).execute()
+            return bool(response.data)
+        except Exception:
+            return False
+
     @staticmethod
     def expire_rider_pending_requests_for_order(order_id: int, rider_id: int) -> None:
         """Ensure no pending requests remain for this rider for the given order after decline."""
@@ -83,6 +238,10 @@ class DispatchRepository:
 
     @staticmethod
     def get_attempted_rider_ids(order_id: int) -> List[int]:
+        if pg.enabled("dispatch"):
+            rows = PgReadRepository.get_attempted([order_id])
+            if rows is not None:
+                return [r["rider_id"] for r in rows if r.get("rider_id") is not None]
         try:
             response = supabase.table("dispatch_requests").select(
                 "rider_id"
@@ -92,9 +251,98 @@ class DispatchRepository:
         except Exception:
             return []
 
+    @staticmethod
+    def get_attempted_rider_ids_for_orders(order_ids: List[int]) -> Dict[int, List[int]]:
+        """get_attempted_rider_ids for many orders in one query: order_id -> rider_ids."""
+        out: Dict[int, List[int]] = {oid: [] for oid in order_ids}
+        if not order_ids:
+            return out
+        try:
+            rows = PgReadRepository.get_attempted(order_ids) if pg.enabled("dispatch") else None
+            if rows is None:
+                rows = supabase.table("dispatch_requests").select(
+                    "order_id, rider_id"
+                ).in_("order_id", order_ids).execute().data
+            for r in rows or []:
+                if r.get("rider_id") is not None and r.get("order_id") in out:
+                    out[r["order_id"]].append(r["rider_id"])
+        except Exception:
+            pass
+        return out
+
     @staticmethod
     def get_order_details(order_id: int) -> Optional[Dict]:
-        """Get order with restaurant and order_items. Uses separate queries so relation names don't matter."""
+        """Order with restaurant, customer, delivery address and order_items (with menu item names)."""
+        return DispatchRepository.get_order_details_many([order_id]).get(order_id)
+
+    @staticmethod
+    def get_order_details_many(order_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Batched get_order_details: order_id -> snapshot for every order found.
+        Cached snapshots are reused; the rest are loaded with one embedded select.
+        """
+        out: Dict[int, Dict] = {}
+        missing = []
+        for order_id in dict.fromkeys(int(o) for o in order_ids):
+            cached = order_snapshots.get(order_id)
+            if cached is not None:
+                out[order_id] = copy.deepcopy(cached)
+            else:
+                missing.append(order_id)
+        if not missing:
+            return out
+        rows = PgReadRepository.get_order_snapshots(missing) if pg.enabled("dispatch") else None
+        if rows is not None:
+            rows = [DispatchRepository._shape_snapshot(r) for r in rows]
+        else:
+            try:
+                response = supabase.table("orders").select(ORDER_SNAPSHOT_SELECT).in_("id", missing).execute()
+                rows = [DispatchRepository._shape_snapshot(r) for r in (response.data or [])]
+            except Exception as e:
+                logging.warning("order snapshot select failed, using per-table queries: %s", e)
+                rows = [r for r in (DispatchRepository._get_order_details_separate(o) for o in missing) if r]
+        for row in rows:
+            order_snapshots.set(int(row["id"]), copy.deepcopy(row))
+            out[int(row["id"])] = row
+        return out
+
+    @staticmethod
+    def invalidate_order_snapshot(order_id: int) -> None:
+        order_snapshots.invalidate(int(order_id))
+
+    @staticmethod
+    def _shape_snapshot(row: Dict) -> Dict:
+        """Give an embedded-select row the same shape _get_order_details_separate builds."""
+        restaurant = row.get("restaurant")
+        row["restaurant"] = (restaurant[0] if isinstance(restaurant, list) and restaurant else restaurant) or {}
+        customer = row.get("customer_user")
+        customer = (customer[0] if isinstance(customer, list) and customer else customer) or {}
+        addresses = customer.pop("addresses", None) or []
+        row["customer_user"] = customer
+        # Same pick as the per-table path: a non-default address supplies the delivery point.
+        address_row = next((a for a in addresses if a.get("is_default") is False), None)
+        if address_row:
+            row["delivery_latitude"] = address_row.get("latitude")
+            row["delivery_longitude"] = address_row.get("longitude")
+            full_address = ", ".join(filter(None, [
+                address_row.get("street"),
+                address_row.get("city"),
+                address_row.get("state"),
+                address_row.get("postal_code"),
+                address_row.get("country")
+            ]))
+            row["delivery_address"] = full_address or row.get("delivery_address")
+        items = row.get("order_items") or []
+        for it in items:
+            mi = it.get("menu_items")
+            mi = mi[0] if isinstance(mi, list) and mi else mi
+            it["menu_items"] = {"name": (mi.get("name") if isinstance(mi, dict) else None) or "Item"}
+        row["order_items"] = items
+        return row
+
+    @staticmethod
+    def _get_order_details_separate(order_id: int) -> Optional[Dict]:
+        """Fallback for get_order_details: one query per table, used if the embedded select is rejected."""
         try:
             order_resp = supabase.table("orders").select("*, delivery_latitude, delivery_longitude").eq("id", order_id).maybe_single().execute()
             data = getattr(order_resp, "data", None)
@@ -158,13 +406,16 @@ class DispatchRepository:
             row["order_items"] = items
             return row
         except Exception as e:
-            import logging
             logging.warning("get_order_details failed for order_id=%s: %s", order_id, e)
             return None
 
     @staticmethod
     def get_pending_requests_for_rider(rider_id: int) -> List[Dict]:
         """Pending dispatch_requests for this rider (status=pending, not expired)."""
+        if pg.enabled("dispatch"):
+            pending = PgReadRepository.get_pending_requests_for_rider(rider_id)
+            if pending is not None:
+                return pending
         try:
             response = supabase.table("dispatch_requests").select(
                 "id, order_id, rider_id, status, expires_at"
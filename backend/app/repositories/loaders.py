@@ -0,0 +1,44 @@
+"""
+Request-scoped batch loaders (core/dataloader.py) over the repositories'
+by-ids lookups. Each function returns the current request's loader, so
+lookups of the same keys share one query per request.
+"""
+from ..core.dataloader import DataLoader, request_loader
+from .admin_menu_repo import MenuRepository
+from .customer_repo import CustomerRepository
+from .user_repo import UserRepository
+
+CUSTOMER_CONTACT_COLUMNS = ("first_name", "last_name", "phone")
+
+
+def customer_contacts() -> DataLoader:
+    """user id -> {"id", "first_name", "last_name", "phone"}"""
+    return request_loader(
+        "users.contact",
+        lambda ids: UserRepository.find_users_by_ids(ids, ", ".join(CUSTOMER_CONTACT_COLUMNS)),
+    )
+
+
+def order_items() -> DataLoader:
+    """order id -> [order_items rows]"""
+    return request_loader("order_items.by_order", CustomerRepository.get_order_items_by_order_ids)
+
+
+def menu_item_names() -> DataLoader:
+    """menu item id -> {"id", "name", "price_cents"}"""
+    return request_loader("menu_items.name", CustomerRepository.get_menu_items_by_ids)
+
+
+def restaurant_names() -> DataLoader:
+    """restaurant id -> {"id", "name"}"""
+    return request_loader("restaurants.name", CustomerRepository.get_restaurants_by_ids)
+
+
+def menu_items_by_menu() -> DataLoader:
+    """menu id -> [menu_items rows]; async (aload_many)"""
+    return request_loader("menu_items.by_menu", MenuRepository.get_menu_items_by_menu_ids)
+
+
+def item_categories() -> DataLoader:
+    """menu item id -> [categories rows]; async (aload_many)"""
+    return request_loader("menu_item_categories.by_item", MenuRepository.get_categories_for_items)
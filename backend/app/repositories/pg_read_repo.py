@@ -0,0 +1,229 @@
+"""
+Direct-Postgres versions of the hot PostgREST reads (see core/pg.py).
+
+Each method returns rows shaped like the PostgREST query it replaces, or
+None if the direct read failed, in which case the caller falls back to
+PostgREST. Single-row reads also return None when the row does not exist,
+so a miss costs one extra PostgREST query to confirm.
+"""
+import logging
+from typing import Dict, List, Optional
+
+from ..core.pg import PreparedQuery
+
+log = logging.getLogger(__name__)
+
+# ----- Catalog -----
+
+RESTAURANTS = PreparedQuery("restaurants_list", """
+SELECT coalesce(json_agg(r ORDER BY r.average_rating DESC), '[]')
+FROM restaurants r
+WHERE ($1::text IS NULL OR r.name ILIKE '%' || $1::text || '%')
+  AND ($2::text IS NULL OR r.cuisine_type ILIKE '%' || $2::text || '%')
+""")
+
+# Same rows as the restaurant_categories!inner(category_id, categories!inner(name)) embed.
+RESTAURANTS_BY_CATEGORY = PreparedQuery("restaurants_by_category", """
+SELECT coalesce(jsonb_agg(to_jsonb(r) || jsonb_build_object('restaurant_categories', rc.cats)
+                          ORDER BY r.average_rating DESC), '[]')
+FROM restaurants r
+JOIN LATERAL (
+    SELECT jsonb_agg(jsonb_build_object('category_id', x.category_id, 'categories', jsonb_build_object('name', c.name))) AS cats
+    FROM restaurant_categories x
+    JOIN categories c ON c.id = x.category_id
+    WHERE x.restaurant_id = r.id AND c.name ILIKE '%' || $2::text || '%'
+) rc ON rc.cats IS NOT NULL
+WHERE ($1::text IS NULL OR r.name ILIKE '%' || $1::text || '%')
+""")
+
+APPROVED_RESTAURANTS = PreparedQuery("restaurants_approved", """
+SELECT coalesce(json_agg(json_build_object(
+    'id', r.id, 'name', r.name, 'description', r.description, 'city', r.city,
+    'cuisine_type', r.cuisine_type, 'average_rating', r.average_rating,
+    'total_reviews', r.total_reviews, 'image_url', r.image_url)), '[]')
+FROM restaurants r
+WHERE r.is_approved
+""")
+
+RESTAURANT = PreparedQuery("restaurant_by_id", """
+SELECT row_to_json(r) FROM restaurants r WHERE r.id = $1::bigint
+""")
+
+MENU_ITEMS = PreparedQuery("restaurant_menu_items", """
+SELECT coalesce(json_agg(mi ORDER BY mi.menu_id, mi.id), '[]')
+FROM menu_items mi
+JOIN menus m ON m.id = mi.menu_id
+WHERE m.restaurant_id = $1::bigint
+""")
+
+RESTAURANT_WITH_MENU = PreparedQuery("restaurant_with_menu", """
+SELECT to_jsonb(r) || jsonb_build_object(
+    'menus', (
+        SELECT coalesce(jsonb_agg(jsonb_build_object('id', m.id, 'name', m.name, 'restaurant_id', m.restaurant_id)
+                                  ORDER BY m.id), '[]')
+        FROM menus m WHERE m.restaurant_id = r.id),
+    'menu_items', (
+        SELECT coalesce(jsonb_agg(jsonb_build_object(
+            'id', mi.id, 'menu_id', mi.menu_id, 'name', mi.name, 'description', mi.description,
+            'price_cents', mi.price_cents, 'is_available', mi.is_available, 'image_url', mi.image_url)
+            ORDER BY mi.menu_id, mi.id), '[]')
+        FROM menu_items mi JOIN menus m ON m.id = mi.menu_id
+        WHERE m.restaurant_id = r.id))
+FROM restaurants r
+WHERE r.id = $1::bigint
+""")
+
+# ----- Order tracking -----
+
+# Order + restaurant + items (with menu item) + first delivery + its rider (with user), in one statement.
+# Like the PostgREST reads, "delivery" and "rider" are left out (not null) when there is none.
+# $2 restricts to the customer's own orders; NULL skips the check.
+TRACKING = PreparedQuery("order_tracking", """
+SELECT to_jsonb(o)
+    || jsonb_build_object(
+        'restaurants', (
+            SELECT jsonb_build_object('id', r.id, 'name', r.name, 'latitude', r.latitude, 'longitude', r.longitude)
+            FROM restaurants r WHERE r.id = o.restaurant_id),
+        'items', (
+            SELECT coalesce(jsonb_agg(to_jsonb(oi) || jsonb_build_object('menu_items', (
+                SELECT jsonb_build_object('name', mi.name, 'image_url', mi.image_url)
+                FROM menu_items mi WHERE mi.id = oi.menu_item_id)) ORDER BY oi.id), '[]')
+            FROM order_items oi WHERE oi.order_id = o.id))
+    || coalesce((
+        SELECT jsonb_build_object('delivery', to_jsonb(d)) || coalesce((
+            SELECT jsonb_build_object('rider', to_jsonb(rd) || jsonb_build_object('users', (
+                SELECT jsonb_build_object('first_name', u.first_name, 'last_name', u.last_name, 'phone', u.phone)
+                FROM users u WHERE u.id = rd.user_id)))
+            FROM riders rd WHERE rd.id = d.rider_id), '{}')
+        FROM deliveries d WHERE d.order_id = o.id
+        ORDER BY d.id LIMIT 1), '{}')
+FROM orders o
+WHERE o.id = $1::bigint AND ($2::bigint IS NULL OR o.user_id = $2::bigint)
+""")
+
+# ----- Dispatch -----
+
+AVAILABLE_RIDERS = PreparedQuery("riders_available", """
+SELECT coalesce(json_agg(json_build_object(
+    'id', id, 'user_id', user_id, 'current_latitude', current_latitude,
+    'current_longitude', current_longitude, 'status', status)), '[]')
+FROM riders
+WHERE status = 'available' AND ($1::text IS NULL OR city = $1::text)
+""")
+
+PENDING_FOR_RIDER = PreparedQuery("dispatch_pending_for_rider", """
+SELECT coalesce(json_agg(json_build_object(
+    'id', id, 'order_id', order_id, 'rider_id', rider_id, 'status', status, 'expires_at', expires_at)), '[]')
+FROM dispatch_requests
+WHERE rider_id = $1::bigint AND status = 'pending'
+""")
+
+ATTEMPTED = PreparedQuery("dispatch_attempted", """
+SELECT coalesce(json_agg(json_build_object('order_id', order_id, 'rider_id', rider_id)), '[]')
+FROM dispatch_requests
+WHERE order_id = ANY($1::bigint[])
+""")
+
+BUSY_RIDERS = PreparedQuery("dispatch_busy_riders", """
+SELECT coalesce(json_agg(DISTINCT rider_id), '[]')
+FROM dispatch_requests
+WHERE rider_id = ANY($1::bigint[]) AND status = 'pending'
+""")
+
+HAS_PENDING = PreparedQuery("dispatch_has_pending", """
+SELECT EXISTS (SELECT 1 FROM dispatch_requests WHERE order_id = $1::bigint AND status = 'pending')
+""")
+
+# Same rows as dispatch_repo.ORDER_SNAPSHOT_SELECT (before _shape_snapshot).
+ORDER_SNAPSHOTS = PreparedQuery("order_snapshots", """
+SELECT coalesce(jsonb_agg(to_jsonb(o) || jsonb_build_object(
+    'restaurant', (
+        SELECT jsonb_build_object('name', r.name, 'latitude', r.latitude, 'longitude', r.longitude)
+        FROM restaurants r WHERE r.id = o.restaurant_id),
+    'customer_user', (
+        SELECT jsonb_build_object(
+            'first_name', u.first_name, 'last_name', u.last_name, 'phone', u.phone,
+            'addresses', (
+                SELECT coalesce(jsonb_agg(jsonb_build_object(
+                    'street', a.street, 'city', a.city, 'state', a.state, 'postal_code', a.postal_code,
+                    'country', a.country, 'latitude', a.latitude, 'longitude', a.longitude,
+                    'is_default', a.is_default) ORDER BY a.id), '[]')
+                FROM addresses a WHERE a.user_id = u.id))
+        FROM users u WHERE u.id = o.user_id),
+    'order_items', (
+        SELECT coalesce(jsonb_agg(jsonb_build_object(
+            'id', oi.id, 'order_id', oi.order_id, 'menu_item_id', oi.menu_item_id,
+            'quantity', oi.quantity, 'price_cents', oi.price_cents,
+            'menu_items', (SELECT jsonb_build_object('name', mi.name) FROM menu_items mi WHERE mi.id = oi.menu_item_id))
+            ORDER BY oi.id), '[]')
+        FROM order_items oi WHERE oi.order_id = o.id))), '[]')
+FROM orders o
+WHERE o.id = ANY($1::bigint[])
+""")
+
+
+def _fetch(query: PreparedQuery, *params):
+    try:
+        return query(*params)
+    except Exception as e:
+        log.warning("[pg] %s failed, falling back to PostgREST: %s", query.name, e)
+        return None
+
+
+class PgReadRepository:
+    # Catalog
+    @staticmethod
+    def get_restaurants(cuisine: Optional[str] = None, search: Optional[str] = None) -> Optional[List[Dict]]:
+        """ConsumerService.get_restaurants: category match first, then cuisine_type."""
+        if cuisine:
+            rows = _fetch(RESTAURANTS_BY_CATEGORY, search, cuisine)
+            if rows:
+                return rows
+        return _fetch(RESTAURANTS, search, cuisine)
+
+    @staticmethod
+    def get_approved_restaurants() -> Optional[List[Dict]]:
+        return _fetch(APPROVED_RESTAURANTS)
+
+    @staticmethod
+    def get_restaurant(restaurant_id: int) -> Optional[Dict]:
+        return _fetch(RESTAURANT, restaurant_id)
+
+    @staticmethod
+    def get_menu_items(restaurant_id: int) -> Optional[List[Dict]]:
+        return _fetch(MENU_ITEMS, restaurant_id)
+
+    @staticmethod
+    def get_restaurant_with_menu(restaurant_id: int) -> Optional[Dict]:
+        return _fetch(RESTAURANT_WITH_MENU, restaurant_id)
+
+    # Order tracking
+    @staticmethod
+    def get_order_tracking(order_id: int, user_id: Optional[int] = None) -> Optional[Dict]:
+        return _fetch(TRACKING, order_id, user_id)
+
+    # Dispatch
+    @staticmethod
+    def get_available_riders(city: Optional[str] = None) -> Optional[List[Dict]]:
+        return _fetch(AVAILABLE_RIDERS, city)
+
+    @staticmethod
+    def get_pending_requests_for_rider(rider_id: int) -> Optional[List[Dict]]:
+        return _fetch(PENDING_FOR_RIDER, rider_id)
+
+    @staticmethod
+    def get_attempted(order_ids: List[int]) -> Optional[List[Dict]]:
+        """[{"order_id", "rider_id"}] for every dispatch request of these orders."""
+        return _fetch(ATTEMPTED, list(order_ids))
+
+    @staticmethod
+    def get_busy_rider_ids(rider_ids: List[int]) -> Optional[List[int]]:
+        return _fetch(BUSY_RIDERS, list(rider_ids))
+
+    @staticmethod
+    def has_pending_requests(order_id: int) -> Optional[bool]:
+        return _fetch(HAS_PENDING, order_id)
+
+    @staticmethod
+    def get_order_snapshots(order_ids: List[int]) -> Optional[List[Dict]]:
+        return _fetch(ORDER_SNAPSHOTS, list(order_ids))
@@ -0,0 +1,35 @@
+"""Repository for the popular items summary (menu_item_popularity, see supabase/popular_items_schema.sql).
+If the table does not exist, top_items returns None and callers fall back to aggregating order_items;
+any other error is raised, so a transient failure does not turn into a scan of every order line.
+"""
+from typing import Dict, List, Optional
+from postgrest import APIError
+from ..supabase_client import supabase
+
+ITEM_COLUMNS = "id, menu_id, name, description, price_cents, image_url, is_available"
+
+
+def _table_missing(error: APIError) -> bool:
+    """PostgREST (schema cache) or Postgres found no such relation: popular_items_schema.sql was not run."""
+    return error.code in ("PGRST205", "42P01")
+
+
+class PopularityRepository:
+    @staticmethod
+    def top_items(limit: int, restaurant_id: Optional[int] = None, trending: bool = False) -> Optional[List[Dict]]:
+        """Top summary rows with their menu item embedded, by total quantity or by decayed score (one indexed query)."""
+        try:
+            query = supabase.table("menu_item_popularity").select(
+                f"menu_item_id, restaurant_id, total_qty, order_count, trend_log, menu_items({ITEM_COLUMNS})"
+            )
+            if restaurant_id is not None:
+                query = query.eq("restaurant_id", restaurant_id)
+            if trending:
+                query = query.order("trend_log", desc=True, nullsfirst=False)
+            else:
+                query = query.order("total_qty", desc=True).order("order_count", desc=True)
+            return query.limit(limit).execute().data or []
+        except APIError as e:
+            if not _table_missing(e):
+                raise
+            return None
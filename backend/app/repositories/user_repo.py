@@ -50,6 +50,15 @@ class UserRepository:
             return data
         return None
 
+    @staticmethod
+    def find_users_by_ids(user_ids: List[int], columns: str = "*") -> Dict[int, Dict]:
+        """Users keyed by id, one query for the whole list"""
+        response = supabase.table("users") \
+            .select(columns if columns == "*" else f"id, {columns}") \
+            .in_("id", user_ids) \
+            .execute()
+        return {u["id"]: u for u in (response.data or [])}
+
     @staticmethod
     def find_users_by_email_pattern(email_pattern: str) -> List[Dict]:
         """Find users by email pattern (for username search)"""
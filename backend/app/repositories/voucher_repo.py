@@ -1,10 +1,84 @@
-"""Repository for vouchers: lookup by code, validate, increment use_count.
+"""Repository for vouchers: lookup by code, validate, redeem (atomically count a use).
 If the vouchers table does not exist in the database, all methods fail gracefully (return None / error message).
 """
-from typing import Optional, Dict
-from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from postgrest import APIError
 from ..supabase_client import supabase
 
+# redeem_voucher RPC error codes -> the messages validate() gives for the same case
+REDEEM_ERRORS = {
+    "not_found": "Invalid voucher code",
+    "inactive": "Voucher is no longer active",
+    "not_started": "Voucher is not yet valid",
+    "expired": "Voucher has expired",
+    "wrong_restaurant": "Voucher is not valid for this restaurant",
+    "use_limit": "Voucher has reached its use limit",
+    "user_limit": "You have already used this voucher the maximum number of times",
+}
+
+
+def _rpc_missing(error: APIError) -> bool:
+    """PostgREST found no such function (supabase/voucher_redemption_rpc.sql was not run)."""
+    return error.code == "PGRST202"
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    except Exception:
+        return None  # unparseable bounds are not enforced
+
+
+class VoucherRule:
+    """A vouchers row with its dates and numbers parsed once, checked against a cart."""
+
+    __slots__ = ("row", "code", "is_active", "valid_from", "valid_until", "min_order_cents", "restaurant_id",
+                 "max_uses", "use_count", "percentage", "discount_value")
+
+    def __init__(self, row: Dict):
+        self.row = row
+        self.code = (row.get("code") or "").strip().upper()
+        self.is_active = bool(row.get("is_active"))
+        self.valid_from = _parse_time(row.get("valid_from"))
+        self.valid_until = _parse_time(row.get("valid_until"))
+        self.min_order_cents = int(row.get("min_order_cents") or 0)
+        self.restaurant_id = int(row["restaurant_id"]) if row.get("restaurant_id") is not None else None
+        self.max_uses = int(row["max_uses"]) if row.get("max_uses") is not None else None
+        self.use_count = int(row.get("use_count") or 0)
+        self.percentage = (row.get("discount_type") or "fixed") == "percentage"
+        self.discount_value = int(row.get("discount_value") or 0)
+
+    def check(
+        self,
+        subtotal_cents: int,
+        restaurant_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> tuple[Optional[Dict], Optional[str]]:
+        """Same contract as VoucherRepository.validate."""
+        if not self.is_active:
+            return None, "Voucher is no longer active"
+        now = now or datetime.now(timezone.utc)
+        if self.valid_from and now < self.valid_from:
+            return None, "Voucher is not yet valid"
+        if self.valid_until and now > self.valid_until:
+            return None, "Voucher has expired"
+        if subtotal_cents < self.min_order_cents:
+            return None, f"Minimum order for this voucher is {self.min_order_cents / 100:.2f}"
+        if self.restaurant_id is not None and restaurant_id is not None and self.restaurant_id != int(restaurant_id):
+            return None, "Voucher is not valid for this restaurant"
+        if self.max_uses is not None and self.use_count >= self.max_uses:
+            return None, "Voucher has reached its use limit"
+        if self.percentage:
+            discount_cents = min(subtotal_cents * self.discount_value // 100, subtotal_cents)
+        else:
+            discount_cents = min(self.discount_value, subtotal_cents)
+        return {**self.row, "discount_cents": discount_cents}, None
+
 
 class VoucherRepository:
     @staticmethod
@@ -34,59 +108,130 @@ class VoucherRepository:
         row = VoucherRepository.get_by_code(code)
         if not row:
             return None, "Invalid voucher code"
-        if not row.get("is_active"):
-            return None, "Voucher is no longer active"
-        now = datetime.utcnow()
-        valid_from = row.get("valid_from")
-        if valid_from:
-            try:
-                if isinstance(valid_from, str):
-                    valid_from = datetime.fromisoformat(valid_from.replace("Z", "+00:00"))
-                if now < valid_from:
-                    return None, "Voucher is not yet valid"
-            except Exception:
-                pass
-        valid_until = row.get("valid_until")
-        if valid_until:
-            try:
-                if isinstance(valid_until, str):
-                    valid_until = datetime.fromisoformat(valid_until.replace("Z", "+00:00"))
-                if now > valid_until:
-                    return None, "Voucher has expired"
-            except Exception:
-                pass
-        min_order = int(row.get("min_order_cents") or 0)
-        if subtotal_cents < min_order:
-            return None, f"Minimum order for this voucher is {min_order / 100:.2f}"
-        rid = row.get("restaurant_id")
-        if rid is not None and restaurant_id is not None and int(rid) != int(restaurant_id):
-            return None, "Voucher is not valid for this restaurant"
-        max_uses = row.get("max_uses")
-        use_count = int(row.get("use_count") or 0)
-        if max_uses is not None and use_count >= int(max_uses):
-            return None, "Voucher has reached its use limit"
-        # Compute discount_cents
-        discount_type = row.get("discount_type") or "fixed"
-        discount_value = int(row.get("discount_value") or 0)
-        if discount_type == "percentage":
-            discount_cents = min(subtotal_cents * discount_value // 100, subtotal_cents)
-        else:
-            discount_cents = min(discount_value, subtotal_cents)
-        out = dict(row)
-        out["discount_cents"] = discount_cents
-        return out, None
+        return VoucherRule(row).check(subtotal_cents, restaurant_id)
+
+    @staticmethod
+    def get_active_codes(page_size: int = 1000) -> Optional[List[str]]:
+        """Codes of every active voucher (paged: PostgREST caps rows per request). None if the table is unavailable."""
+        try:
+            codes: List[str] = []
+            while True:
+                resp = supabase.table("vouchers").select("code").eq("is_active", True).order("id").range(
+                    len(codes), len(codes) + page_size - 1
+                ).execute()
+                rows = resp.data or []
+                codes.extend(r["code"] for r in rows if r.get("code"))
+                if len(rows) < page_size:
+                    return codes
+        except Exception:
+            return None
+
+    @staticmethod
+    def get_latest_update() -> Optional[Tuple[str, int]]:
+        """(updated_at, id) of the most recently changed voucher."""
+        try:
+            resp = supabase.table("vouchers").select("id, updated_at").order("updated_at", desc=True, nullsfirst=False) \
+                .order("id", desc=True).limit(1).execute()
+            row = resp.data[0] if resp.data else None
+            return (row["updated_at"], row["id"]) if row and row.get("updated_at") else None
+        except Exception:
+            return None
+
+    @staticmethod
+    def get_changed_since(after: Optional[Tuple[str, int]], limit: int = 1000) -> Optional[List[Dict]]:
+        """
+        Up to limit vouchers past the (updated_at, id) key, in that order (every write touches
+        updated_at): the rest of after's timestamp, then newer ones. Rows sharing one timestamp
+        (a bulk UPDATE) are paged by id, so a page boundary never repeats or skips them.
+        """
+        try:
+            if after is None:
+                return supabase.table("vouchers").select("*").order("updated_at").order("id").limit(limit).execute().data or []
+            updated_at, last_id = after
+            rows = supabase.table("vouchers").select("*").eq("updated_at", updated_at).gt("id", last_id) \
+                .order("id").limit(limit).execute().data or []
+            if len(rows) < limit:
+                rows += supabase.table("vouchers").select("*").gt("updated_at", updated_at) \
+                    .order("updated_at").order("id").limit(limit - len(rows)).execute().data or []
+            return rows
+        except Exception:
+            return None
+
+    @staticmethod
+    def redeem(
+        code: str,
+        subtotal_cents: int,
+        restaurant_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+    ) -> tuple[Optional[Dict], Optional[str]]:
+        """
+        Validate and count one use in a single atomic call (redeem_voucher RPC, see
+        supabase/voucher_redemption_rpc.sql), enforcing max_uses and max_uses_per_user.
+        Same return shape as validate. Without the RPC: validate, then increment_use.
+        Any other RPC failure raises: the call may have committed (timeout), so counting
+        the use again, or skipping the per-user limit, would be wrong.
+        """
+        if not code or not code.strip():
+            return None, "Invalid voucher code"
+        try:
+            resp = supabase.rpc("redeem_voucher", {
+                "p_code": code.strip(),
+                "p_subtotal_cents": subtotal_cents,
+                "p_restaurant_id": restaurant_id,
+                "p_user_id": user_id,
+            }).execute()
+        except APIError as e:
+            if not _rpc_missing(e):
+                raise
+            voucher, err = VoucherRepository.validate(code, subtotal_cents, restaurant_id)
+            if err:
+                return None, err
+            if not VoucherRepository.increment_use(voucher["id"], voucher.get("max_uses")):
+                return None, REDEEM_ERRORS["use_limit"]
+            return voucher, None
+        row = resp.data if isinstance(resp.data, dict) else None
+        if not row:
+            return None, REDEEM_ERRORS["not_found"]
+        reason = row.get("error")
+        if reason == "min_order":
+            return None, f"Minimum order for this voucher is {int(row.get('min_order_cents') or 0) / 100:.2f}"
+        if reason:
+            return None, REDEEM_ERRORS.get(reason, "Invalid voucher code")
+        return row, None
 
     @staticmethod
-    def increment_use(voucher_id: int) -> bool:
+    def release(voucher_id: int, user_id: Optional[int] = None) -> bool:
+        """Give back a use taken by redeem when the order it was for could not be created (raises like redeem)."""
         try:
-            resp = supabase.table("vouchers").select("use_count").eq("id", voucher_id).maybe_single().execute()
-            if not resp.data:
-                return False
-            new_count = int(resp.data.get("use_count") or 0) + 1
-            supabase.table("vouchers").update({
-                "use_count": new_count,
-                "updated_at": datetime.utcnow().isoformat(),
-            }).eq("id", voucher_id).execute()
-            return True
+            resp = supabase.rpc("release_voucher", {"p_voucher_id": voucher_id, "p_user_id": user_id}).execute()
+            return bool(resp.data)
+        except APIError as e:
+            if not _rpc_missing(e):
+                raise
+            return VoucherRepository.increment_use(voucher_id, delta=-1)
+
+    @staticmethod
+    def increment_use(voucher_id: int, max_uses: Optional[int] = None, delta: int = 1, attempts: int = 5) -> bool:
+        """
+        Add delta to use_count with a compare-and-set UPDATE (only applies if use_count is
+        still the value read), retrying on a lost race. False if max_uses would be exceeded.
+        """
+        try:
+            for _ in range(attempts):
+                resp = supabase.table("vouchers").select("use_count").eq("id", voucher_id).maybe_single().execute()
+                if not resp or not resp.data:
+                    return False
+                raw = resp.data.get("use_count")
+                current = int(raw or 0)
+                if max_uses is not None and delta > 0 and current + delta > int(max_uses):
+                    return False
+                query = supabase.table("vouchers").update({
+                    "use_count": max(current + delta, 0),
+                    "updated_at": datetime.utcnow().isoformat(),
+                }).eq("id", voucher_id)
+                query = query.is_("use_count", "null") if raw is None else query.eq("use_count", current)
+                if query.execute().data:
+                    return True
+            return False
         except Exception:
             return False
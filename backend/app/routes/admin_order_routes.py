@@ -11,7 +11,7 @@ router = APIRouter(prefix="/admin/orders", tags=["Admin - Orders"])
 
 
 @router.get("/", response_model=OrdersListResponse)
-async def list_orders(
+def list_orders(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     status: Optional[str] = Query(None, description="Filter by status"),
@@ -74,7 +74,7 @@ async def list_orders(
 
 
 @router.get("/stats", response_model=OrderStatsResponse)
-async def get_order_stats():
+def get_order_stats():
     """
     Get order statistics
     """
@@ -90,7 +90,7 @@ async def get_order_stats():
 
 
 @router.get("/{order_id}", response_model=OrderDetailResponse)
-async def get_order(order_id: int):
+def get_order(order_id: int):
     """
     Get single order by ID
     """
@@ -118,7 +118,7 @@ async def get_order(order_id: int):
 
 
 @router.patch("/{order_id}/status")
-async def update_order_status(
+def update_order_status(
     order_id: int,
     status_update: OrderStatusUpdate
 ):
@@ -161,7 +161,7 @@ async def update_order_status(
 
 
 @router.delete("/{order_id}")
-async def delete_order(order_id: int):
+def delete_order(order_id: int):
     """
     Delete an order
     """
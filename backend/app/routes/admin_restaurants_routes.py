@@ -20,7 +20,7 @@ def get_admin_user(authorization: Optional[str] = Header(None, alias="Authorizat
 
 
 @router.get("/pending")
-async def get_pending_restaurants(
+def get_pending_restaurants(
     authorization: Optional[str] = Header(None, alias="Authorization"),
 ):
     try:
@@ -16,7 +16,7 @@ class UpdateUserRequest(BaseModel):
 
 # User Management Routes
 @router.get("/users/")
-async def list_users(user_type: Optional[str] = Query(None)):
+def list_users(user_type: Optional[str] = Query(None)):
     """
     Get all users (optionally filter by role)
     Always returns: { "users": [...] }
@@ -38,7 +38,7 @@ async def list_users(user_type: Optional[str] = Query(None)):
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int):
+def get_user(user_id: int):
     """
     Get single user
     """
@@ -54,7 +54,7 @@ async def get_user(user_id: int):
 
 
 @router.put("/users/{user_id}/role", response_model=UserResponse)
-async def update_user_role(user_id: int, request: UpdateUserRoleRequest):
+def update_user_role(user_id: int, request: UpdateUserRoleRequest):
     """
     Update user role
     """
@@ -73,7 +73,7 @@ async def update_user_role(user_id: int, request: UpdateUserRoleRequest):
 
 
 @router.put("/users/{user_id}")
-async def update_user(user_id: int, request: UpdateUserRequest):
+def update_user(user_id: int, request: UpdateUserRequest):
     """
     Update user details (email, first_name, last_name, phone)
     """
@@ -115,7 +115,7 @@ async def update_user(user_id: int, request: UpdateUserRequest):
 
 
 @router.delete("/users/{user_id}")
-async def delete_user(user_id: int):
+def delete_user(user_id: int):
     """
     Delete user
     """
@@ -153,7 +153,7 @@ async def delete_user(user_id: int):
 
 # Dashboard Statistics
 @router.get("/dashboard/stats")
-async def get_dashboard_stats():
+def get_dashboard_stats():
     """
     Get admin dashboard statistics (users, orders, etc.)
     Note: Restaurant stats are now handled in restaurant_routes.py
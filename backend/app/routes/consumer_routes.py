@@ -1,15 +1,23 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
+from fastapi import APIRouter, HTTPException, Header, Request, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from app.services.consumer_service import ConsumerService
 from app.supabase_client import supabase
+from app.core import pg
+from app.core.catalog_cache import conditional_response
+from app.core.db_executor import run_db
 from app.core.websocket_manager import manager
-from app.repositories.voucher_repo import VoucherRepository
+from app.services.dispatch_service import DispatchService
+from app.services.tracking_service import SSE_HEADERS, TrackingService
+from app.repositories.pg_read_repo import PgReadRepository
+from app.services.voucher_service import VoucherService
 from app.models.consumer import (
     RestaurantResponse,
     MenuItemResponse,
     OrderCreate,
     OrderResponse,
 )
+from app.models.customer_models import VoucherBulkValidateRequest, VoucherBulkValidateResponse
 
 router = APIRouter(prefix="/consumer", tags=["Consumer"])
 
@@ -21,23 +29,28 @@ def validate_voucher(
     restaurant_id: Optional[int] = Query(None),
 ):
     """Public: validate a voucher code for subtotal/restaurant. Used by guest checkout."""
-    voucher, err = VoucherRepository.validate(code, subtotal_cents, restaurant_id)
+    voucher, err = VoucherService.validate(code, subtotal_cents, restaurant_id)
     if err:
         return {"valid": False, "discount_cents": 0, "message": err}
     return {"valid": True, "discount_cents": voucher["discount_cents"], "message": "Voucher applied"}
 
 
+@router.post("/vouchers/validate-bulk", response_model=VoucherBulkValidateResponse)
+def validate_vouchers(data: VoucherBulkValidateRequest):
+    """Public: validate several codes against one cart; best_code is the valid one with the largest discount."""
+    return VoucherService.validate_many(data.codes, data.subtotal_cents, data.restaurant_id)
+
+
 @router.get("/restaurants", response_model=List[RestaurantResponse])
-async def get_restaurants(cuisine: str = None, search: str = None):
+def get_restaurants(request: Request, cuisine: str = None, search: str = None):
     try:
-        restaurants = ConsumerService.get_restaurants(cuisine, search)
-        return restaurants
+        return conditional_response(request, ConsumerService.get_restaurants_json(cuisine, search))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/restaurants/{restaurant_id}", response_model=RestaurantResponse)
-async def get_restaurant(restaurant_id: int):
+def get_restaurant(restaurant_id: int):
     try:
         restaurant = ConsumerService.get_restaurant_by_id(restaurant_id)
         if not restaurant:
@@ -50,32 +63,25 @@ async def get_restaurant(restaurant_id: int):
 
 
 @router.get("/popular-items", response_model=List[MenuItemResponse])
-async def get_popular_items():
+def get_popular_items(
+    restaurant_id: Optional[int] = Query(None, description="Only this restaurant's items"),
+    trending: bool = Query(False, description="Rank by recent orders (time-decayed) instead of all time"),
+    limit: int = Query(10, ge=1, le=50),
+):
     try:
-        items = ConsumerService.get_popular_items()
+        items = ConsumerService.get_popular_items(restaurant_id, trending, limit)
         return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/restaurants/{restaurant_id}/menu")
-async def get_menu(restaurant_id: int):
+def get_menu(restaurant_id: int, request: Request):
     try:
-        restaurant = ConsumerService.get_restaurant_by_id(restaurant_id)
-        if not restaurant:
+        doc = ConsumerService.get_menu_json(restaurant_id)
+        if doc is None:
             raise HTTPException(status_code=404, detail="Restaurant not found")
-        menu_items = ConsumerService.get_menu_items(restaurant_id)
-        categories = {}
-        for item in menu_items:
-            cat = item.get("category", "General")
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(item)
-        menus = [{"name": cat, "items": items} for cat, items in categories.items()]
-        if not menus:
-            menus = [{"name": "Menu", "items": []}]
-        result = {**restaurant, "menus": menus}
-        return result
+        return conditional_response(request, doc)
     except HTTPException:
         raise
     except Exception as e:
@@ -85,7 +91,9 @@ async def get_menu(restaurant_id: int):
 @router.post("/orders", response_model=OrderResponse)
 async def create_order(order_data: OrderCreate):
     try:
-        order = ConsumerService.create_order(order_data.model_dump())
+        data = order_data.model_dump()
+        order = await run_db(ConsumerService.create_order, data)
+        DispatchService.schedule(order["id"], data.get("delivery_latitude"), data.get("delivery_longitude"))
         return order
     except HTTPException:
         raise
@@ -96,8 +104,45 @@ async def create_order(order_data: OrderCreate):
 # ---------- Order Tracking ----------
 
 
+def _tracking_document(order_id: int) -> Optional[dict]:
+    """Order with restaurant, items, delivery and rider; None if the order does not exist."""
+    if pg.enabled("consumer"):
+        order = PgReadRepository.get_order_tracking(order_id)
+        if order is not None:
+            return order
+
+    order_resp = supabase.table("orders").select(
+        "*, restaurants(name, latitude, longitude)"
+    ).eq("id", order_id).execute()
+
+    if not order_resp.data:
+        return None
+
+    order = order_resp.data[0]
+
+    items_resp = supabase.table("order_items").select(
+        "*, menu_items(name, image_url)"
+    ).eq("order_id", order_id).execute()
+    order["items"] = items_resp.data or []
+
+    delivery_resp = supabase.table("deliveries").select("*").eq(
+        "order_id", order_id
+    ).execute()
+
+    if delivery_resp.data:
+        delivery = delivery_resp.data[0]
+        order["delivery"] = delivery
+        rider_resp = supabase.table("riders").select(
+            "*, users(first_name, last_name, phone)"
+        ).eq("id", delivery["rider_id"]).execute()
+        if rider_resp.data:
+            order["rider"] = rider_resp.data[0]
+
+    return order
+
+
 @router.get("/orders/{order_id}/track")
-async def track_order(order_id: int):
+def track_order(order_id: int):
     """
     Get full tracking info for an order:
     - Current status
@@ -106,33 +151,9 @@ async def track_order(order_id: int):
     - Delivery details
     """
     try:
-        order_resp = supabase.table("orders").select(
-            "*, restaurants(name, latitude, longitude)"
-        ).eq("id", order_id).execute()
-
-        if not order_resp.data:
+        order = _tracking_document(order_id)
+        if not order:
             raise HTTPException(status_code=404, detail="Order not found")
-
-        order = order_resp.data[0]
-
-        items_resp = supabase.table("order_items").select(
-            "*, menu_items(name, image_url)"
-        ).eq("order_id", order_id).execute()
-        order["items"] = items_resp.data or []
-
-        delivery_resp = supabase.table("deliveries").select("*").eq(
-            "order_id", order_id
-        ).execute()
-
-        if delivery_resp.data:
-            delivery = delivery_resp.data[0]
-            order["delivery"] = delivery
-            rider_resp = supabase.table("riders").select(
-                "*, users(first_name, last_name, phone)"
-            ).eq("id", delivery["rider_id"]).execute()
-            if rider_resp.data:
-                order["rider"] = rider_resp.data[0]
-
         return order
     except HTTPException:
         raise
@@ -140,15 +161,42 @@ async def track_order(order_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/orders/{order_id}/track/stream")
+async def track_order_stream(
+    order_id: int,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events alternative to polling /track: one "snapshot" event with the
+    full document, then "delta" events for status, rider assignment and rider position.
+    """
+    order_resp = await run_db(supabase.table("orders").select("user_id").eq("id", order_id).execute)
+    if not order_resp.data:
+        raise HTTPException(status_code=404, detail="Order not found")
+    user_id = int(order_resp.data[0]["user_id"])
+    return StreamingResponse(
+        TrackingService.stream(order_id, user_id, lambda: _tracking_document(order_id), last_event_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 # ---------- Customer WebSocket ----------
 
 
 @router.websocket("/ws/{user_id}")
-async def customer_websocket(websocket: WebSocket, user_id: int):
+async def customer_websocket(
+    websocket: WebSocket,
+    user_id: int,
+    last_seq: Optional[int] = Query(None, description="Last message seq received, to replay only the gap"),
+    epoch: Optional[str] = Query(None, description="epoch from the SYNC frame of the previous connection"),
+):
     """Customer WebSocket for real-time order status updates."""
-    await manager.connect_customer(user_id, websocket)
+    await manager.connect_customer(user_id, websocket, last_seq, epoch)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect_customer(user_id)
+        pass
+    finally:
+        manager.disconnect_customer(user_id, websocket)
@@ -1,5 +1,5 @@
-import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
 from ..models.customer_models import (
@@ -18,9 +18,13 @@ from ..models.customer_models import (
     EmailUpdateRequest,
     ChangePasswordRequest,
     VoucherValidateResponse,
+    VoucherBulkValidateRequest,
+    VoucherBulkValidateResponse,
 )
 from ..services.customer_service import CustomerService
 from ..services.dispatch_service import DispatchService
+from ..services.tracking_service import SSE_HEADERS, TrackingService
+from ..core.db_executor import run_db
 from ..core.security import decode_access_token
 from ..core.websocket_manager import manager
 
@@ -132,6 +136,15 @@ def validate_voucher(
     return result
 
 
+@router.post("/vouchers/validate-bulk", response_model=VoucherBulkValidateResponse)
+def validate_vouchers(
+    data: VoucherBulkValidateRequest,
+    user_id: int = Depends(get_current_customer_id),
+):
+    """Validate several codes against one cart; best_code is the valid one with the largest discount."""
+    return CustomerService.validate_vouchers(data.codes, data.subtotal_cents, data.restaurant_id)
+
+
 # ----- Payments (read-only; payments are created when placing an order) -----
 @router.get("/payments", response_model=list[PaymentResponse])
 def list_payments(user_id: int = Depends(get_current_customer_id)):
@@ -152,7 +165,7 @@ async def place_order(data: OrderCreate, user_id: int = Depends(get_current_cust
     """Place order. Use delivery_address text or address_id to resolve from saved address; prices from menu_items. Triggers rider dispatch."""
     delivery_address = data.delivery_address or ""
     if data.address_id is not None:
-        addr = CustomerService.get_address(user_id, data.address_id)
+        addr = await run_db(CustomerService.get_address, user_id, data.address_id)
         if addr:
             delivery_address = CustomerService.format_address_as_text(
                 {"street": addr.street, "city": addr.city, "state": addr.state, "postal_code": addr.postal_code, "country": addr.country}
@@ -167,7 +180,8 @@ async def place_order(data: OrderCreate, user_id: int = Depends(get_current_cust
         }
         for i in data.items
     ]
-    order, err = CustomerService.place_order(
+    order, err = await run_db(
+        CustomerService.place_order,
         user_id,
         data.restaurant_id,
         delivery_address,
@@ -179,7 +193,7 @@ async def place_order(data: OrderCreate, user_id: int = Depends(get_current_cust
     )
     if err or not order:
         raise HTTPException(status_code=400, detail=err or "Failed to place order")
-    asyncio.create_task(DispatchService.dispatch_order(order.id))
+    DispatchService.schedule(order.id)
     return {"message": "Order placed", "order": order}
 
 
@@ -205,15 +219,40 @@ def track_order(order_id: int, user_id: int = Depends(get_current_customer_id)):
     return data
 
 
+@router.get("/orders/{order_id}/track/stream")
+def track_order_stream(
+    order_id: int,
+    user_id: int = Depends(get_current_customer_id),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events: full tracking snapshot once, then deltas (status, rider, rider position)."""
+    if not CustomerService.owns_order(user_id, order_id):
+        raise HTTPException(status_code=404, detail="Order not found")
+    return StreamingResponse(
+        TrackingService.stream(
+            order_id, user_id, lambda: CustomerService.get_order_tracking(user_id, order_id), last_event_id
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.websocket("/ws/{user_id}")
-async def customer_websocket(websocket: WebSocket, user_id: int):
+async def customer_websocket(
+    websocket: WebSocket,
+    user_id: int,
+    last_seq: Optional[int] = Query(None, description="Last message seq received, to replay only the gap"),
+    epoch: Optional[str] = Query(None, description="epoch from the SYNC frame of the previous connection"),
+):
     """Customer WebSocket for real-time order status updates."""
-    await manager.connect_customer(int(user_id), websocket)
+    await manager.connect_customer(int(user_id), websocket, last_seq, epoch)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect_customer(int(user_id))
+        pass
+    finally:
+        manager.disconnect_customer(int(user_id), websocket)
 
 
 # ----- Reviews -----
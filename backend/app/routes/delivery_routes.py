@@ -9,11 +9,19 @@ from ..models.delivery_models import (
     DeliveryHistoryResponse, RiderProfileResponse
 )
 from ..services.delivery_service import DeliveryService
-from ..services.dispatch_service import DispatchService
+from ..services.dispatch_service import DispatchService, offer_notifier
+from ..services.location_service import LocationService, rider_locations
+from ..services.presence_service import PresenceService, rider_presence
+from ..services.rider_position_service import RiderPositionService, rider_positions
 from ..repositories.delivery_repo import DeliveryRepository
 from ..repositories.dispatch_repo import DispatchRepository
+from ..core import pg
+from ..core.db_executor import run_db, stats as db_executor_stats
 from ..core.websocket_manager import manager
-from ..core.location_utils import haversine_distance
+from ..core.rider_index import rider_index
+from ..core.location_frames import parse_location_frame
+from ..core.config import DELIVERY_LONG_POLL_MAX_SECONDS, DELIVERY_LONG_POLL_RECHECK_SECONDS
+import asyncio
 import logging
 
 log = logging.getLogger(__name__)
@@ -22,18 +30,49 @@ router = APIRouter(prefix="/delivery", tags=["Delivery"])
 
 
 @router.websocket("/ws/{user_id}")
-async def rider_websocket(websocket: WebSocket, user_id: int):
-    """Rider WebSocket: register connection so dispatch can send NEW_ORDER_REQUEST."""
+async def rider_websocket(
+    websocket: WebSocket,
+    user_id: int,
+    last_seq: Optional[int] = Query(None, description="Last message seq received, to replay only the gap"),
+    epoch: Optional[str] = Query(None, description="epoch from the SYNC frame of the previous connection"),
+):
+    """
+    Rider WebSocket: register connection so dispatch can send NEW_ORDER_REQUEST.
+    Inbound LOCATION frames (JSON or binary, see core/location_frames.py) feed the location store.
+    """
     log.info("[delivery] rider WebSocket connected user_id=%s", user_id)
-    await manager.connect(user_id, websocket)
+    conn = await manager.connect(user_id, websocket, last_seq, epoch)
     try:
-        await DispatchService.send_pending_requests_for_rider(user_id, websocket)
+        rider = await run_db(DeliveryRepository.get_rider_by_user_id, user_id)
+        rider_id = rider.get("id") if rider else None
+        if PresenceService.heartbeat(rider_id):
+            await run_db(PresenceService.restore, rider_id)
+        if not conn.resumed:
+            # Missed offers were not replayed from the buffer: load them from the DB.
+            await DispatchService.send_pending_requests_for_rider(user_id, conn, rider)
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if PresenceService.heartbeat(rider_id):  # PONG, location or anything else the app sends
+                await run_db(PresenceService.restore, rider_id)
+            data = message.get("bytes") if message.get("bytes") is not None else message.get("text")
+            try:
+                points = parse_location_frame(data)
+            except ValueError as e:
+                log.debug("[delivery] bad location frame from user_id=%s: %s", user_id, e)
+                continue
+            if points and rider_id:
+                if LocationService.writes_through():
+                    await run_db(LocationService.record_points, rider_id, points)
+                else:
+                    LocationService.record_points(rider_id, points)
+                latest = rider_locations.get(rider_id)
+                await RiderPositionService.publish(rider_id, latest["current_latitude"], latest["current_longitude"])
     except Exception as e:
         log.info("[delivery] rider WebSocket closed user_id=%s: %s", user_id, e)
     finally:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
         log.info("[delivery] rider WebSocket disconnected user_id=%s", user_id)
 
 
@@ -64,10 +103,40 @@ def debug_ws():
     return {
         "connected_rider_user_ids": sorted(connected),
         "count": len(connected),
+        "indexed_available_riders": len(rider_index),
+        "queues": manager.stats(),
         "hint": "When rider app is Available and open, their user_id (e.g. 41) should appear here.",
     }
 
 
+@router.get("/debug/dispatch-batches")
+def debug_dispatch_batches():
+    """Recent batch dispatch reports: assignment latency and total pickup distance (DISPATCH_MODE=batch)."""
+    from ..services.batch_dispatch_service import batch_dispatcher
+    return {"batches": list(batch_dispatcher.reports)}
+
+
+@router.get("/debug/locations")
+def debug_locations():
+    """Write-behind location buffer: pings received vs rows written to the DB; position pushes to customers."""
+    return {**rider_locations.metrics(), "customer_push": rider_positions.metrics()}
+
+
+@router.get("/debug/presence")
+def debug_presence():
+    """Rider heartbeats: live riders, riders set unavailable for going silent, offers avoided."""
+    return {**rider_presence.metrics(), "enabled": PresenceService.enabled(), "warming_up": rider_presence.warming_up}
+
+
+@router.get("/debug/db-executor")
+def debug_db_executor():
+    """
+    Blocking DB calls handed off by async code (submitted, in flight now and at peak, pool size),
+    and the direct-Postgres read path: enabled repositories, connection pool, per-statement timings.
+    """
+    return {**db_executor_stats(), "postgres": pg.stats()}
+
+
 @router.post("/login", response_model=RiderLoginResponse)
 def rider_login(request: RiderLoginRequest):
     """Login for riders"""
@@ -131,16 +200,23 @@ class RiderLocationBody(BaseModel):
     longitude: float
 
 @router.post("/location")
-def update_rider_location(body: RiderLocationBody):
-    """Update rider GPS location (for dispatch and map)."""
-    success = DeliveryRepository.update_rider_location(body.rider_id, body.latitude, body.longitude)
-    if not success:
-        raise HTTPException(status_code=400, detail="Failed to update location")
+async def update_rider_location(body: RiderLocationBody):
+    """
+    Update rider GPS location (for dispatch and map). Buffered in memory and flushed to the DB in bulk,
+    and pushed (throttled) to the customers of the rider's active deliveries.
+    """
+    if LocationService.writes_through():
+        await run_db(LocationService.record, body.rider_id, body.latitude, body.longitude)
+    else:
+        LocationService.record(body.rider_id, body.latitude, body.longitude)
+    if PresenceService.heartbeat(body.rider_id):
+        await run_db(PresenceService.restore, body.rider_id)
+    await RiderPositionService.publish(body.rider_id, body.latitude, body.longitude)
     return {"success": True}
 
 @router.get("/location")
 def get_rider_location(rider_id: int = Query(..., description="Rider ID")):
-    loc = DeliveryRepository.get_rider_location(rider_id)
+    loc = LocationService.get(rider_id)
     if not loc:
         return {"latitude": None, "longitude": None}
     lat = loc.get("current_latitude") or loc.get("latitude")
@@ -159,33 +235,31 @@ def update_vehicle(request: UpdateVehicleRequest):
 def get_pending_requests(rider_id: int = Query(..., description="Rider ID")):
     """Get pending dispatch requests for this rider (for polling when WebSocket may have missed)."""
     pending = DispatchRepository.get_pending_requests_for_rider(rider_id)
-    out = []
-    for req in pending:
-        order_id = req.get("order_id")
-        if not order_id:
-            continue
-        order_details = DispatchRepository.get_order_details(order_id)
-        if not order_details:
-            continue
-        
-        # Calculate distance to customer if coordinates are available
-        distance_to_customer = 0.0
-        rider_location = DeliveryRepository.get_rider_location(rider_id)
-        if rider_location and \
-           rider_location.get("current_latitude") is not None and \
-           rider_location.get("current_longitude") is not None and \
-           order_details.get("delivery_latitude") is not None and \
-           order_details.get("delivery_longitude") is not None:
-            distance_to_customer = haversine_distance(
-                rider_location["current_latitude"],
-                rider_location["current_longitude"],
-                order_details["delivery_latitude"],
-                order_details["delivery_longitude"]
-            )
-        
-        payload = DispatchService._build_request_payload(order_details, req, distance=distance_to_customer)
-        out.append(payload)
-    return {"requests": out}
+    return {"requests": DispatchService.pending_request_payloads(pending, rider_id=rider_id)}
+
+
+@router.get("/requests/wait")
+async def wait_for_pending_requests(
+    rider_id: int = Query(..., description="Rider ID"),
+    after_id: int = Query(0, description="Highest request id the app already has"),
+    timeout: float = Query(25, ge=0, le=DELIVERY_LONG_POLL_MAX_SECONDS, description="Seconds to wait"),
+):
+    """
+    Long-poll variant of GET /requests: returns as soon as the rider has a pending
+    request with id > after_id, or the current list once timeout passes.
+    """
+    if PresenceService.heartbeat(rider_id):
+        await run_db(PresenceService.restore, rider_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        pending = await run_db(DispatchRepository.get_pending_requests_for_rider, rider_id)
+        remaining = deadline - loop.time()
+        if remaining <= 0 or any(int(r["id"]) > after_id for r in pending):
+            break
+        await offer_notifier.wait(rider_id, timeout=min(remaining, DELIVERY_LONG_POLL_RECHECK_SECONDS))
+    payloads = await run_db(DispatchService.pending_request_payloads, pending, rider_id=rider_id)
+    return {"requests": payloads}
 
 
 @router.post("/requests/{request_id}/respond")
@@ -196,31 +270,34 @@ async def respond_to_dispatch_request(
 ):
     """
     Rider accepts or rejects a delivery request.
-    On accept: creates delivery, sets order status to rider_assigned, notifies customer.
+    On accept: the first rider to accept claims the order, creates delivery, sets order
+    status to rider_assigned, notifies customer and withdraws the other riders' offers.
     """
-    success, customer_user_id, delivery_id_str = DeliveryService.respond_to_dispatch_request(
-        request_id, rider_id, action
+    success, customer_user_id, delivery_id_str, withdrawn = await run_db(
+        DeliveryService.respond_to_dispatch_request, request_id, rider_id, action
     )
     if not success:
         raise HTTPException(status_code=400, detail=delivery_id_str or "Failed to respond")
+    if withdrawn:
+        await DispatchService.withdraw_offers(withdrawn)
     # On accept: notify customer so Order Progress updates in real time
+    req = None
+    if customer_user_id is not None or action == "reject":
+        req = await run_db(DispatchRepository.get_dispatch_request_by_id, request_id)
     if customer_user_id is not None:
-        from ..repositories.dispatch_repo import DispatchRepository
-        req = DispatchRepository.get_dispatch_request_by_id(request_id)
         if req:
             order_id = req.get("order_id")
+            await run_db(RiderPositionService.delivery_started, rider_id, int(order_id), int(customer_user_id))
             await manager.send_to_customer(
                 int(customer_user_id),
                 {"type": "ORDER_STATUS_UPDATE", "order_id": order_id, "status": "rider_assigned"},
             )
-    # On reject: re-dispatch to next nearest rider
+    # On reject: re-dispatch to next nearest rider once no parallel offer is still open
     if action == "reject":
-        from ..repositories.dispatch_repo import DispatchRepository
-        req = DispatchRepository.get_dispatch_request_by_id(request_id)
         if req:
             order_id = req.get("order_id")
             if order_id:
-                await DispatchService.dispatch_order(int(order_id))
+                await DispatchService.redispatch_if_idle(int(order_id))
     return {"success": True, "action": action, "delivery_id": delivery_id_str if action == "accept" else None}
 
 
@@ -230,8 +307,8 @@ async def mark_picked_up(
     rider_id: int = Query(..., description="Rider ID"),
 ):
     """Rider marks order as picked up from restaurant. Updates customer Order Progress to 'On the Way'."""
-    success, order_id, customer_user_id, err = DeliveryService.update_delivery_progress(
-        delivery_id, rider_id, "picked_up"
+    success, order_id, customer_user_id, err = await run_db(
+        DeliveryService.update_delivery_progress, delivery_id, rider_id, "picked_up"
     )
     if not success:
         raise HTTPException(status_code=400, detail=err or "Failed to update")
@@ -249,11 +326,12 @@ async def mark_delivered(
     rider_id: int = Query(..., description="Rider ID"),
 ):
     """Rider marks order as delivered. Updates customer Order Progress to 'Delivered'."""
-    success, order_id, customer_user_id, err = DeliveryService.update_delivery_progress(
-        delivery_id, rider_id, "delivered"
+    success, order_id, customer_user_id, err = await run_db(
+        DeliveryService.update_delivery_progress, delivery_id, rider_id, "delivered"
     )
     if not success:
         raise HTTPException(status_code=400, detail=err or "Failed to update")
+    RiderPositionService.delivery_finished(rider_id, order_id)
     if customer_user_id is not None:
         await manager.send_to_customer(
             int(customer_user_id),
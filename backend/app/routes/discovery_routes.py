@@ -2,9 +2,10 @@
 Public routes for customer app: browse restaurants and menus (no auth).
 Used by the consumer frontend for home, restaurant list, and restaurant detail.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 import logging
 
+from ..core.catalog_cache import conditional_response
 from ..services.customer_service import CustomerService
 
 logger = logging.getLogger(__name__)
@@ -13,32 +14,23 @@ router = APIRouter(prefix="/restaurants", tags=["Discovery"])
 
 
 @router.get("")
-def list_restaurants():
+def list_restaurants(request: Request):
     """List approved restaurants from Supabase. No auth required."""
     try:
-        restaurants = CustomerService.get_restaurants_list()
-        logger.info(f"Returning {len(restaurants)} restaurants")
-        
-        # Log first restaurant's image_url for debugging
-        if restaurants:
-            logger.info(f"First restaurant: {restaurants[0].get('name')} - image_url: {restaurants[0].get('image_url')}")
-            
-        return {"restaurants": restaurants}
+        return conditional_response(request, CustomerService.get_restaurants_list_json())
     except Exception as e:
         logger.error(f"Error fetching restaurants: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch restaurants")
 
 
 @router.get("/{restaurant_id}")
-def get_restaurant_with_menu(restaurant_id: int):
+def get_restaurant_with_menu(restaurant_id: int, request: Request):
     """Get one restaurant with its menus and menu items. No auth required."""
     try:
-        result = CustomerService.get_restaurant_with_menu(restaurant_id)
-        if not result:
+        doc = CustomerService.get_restaurant_with_menu_json(restaurant_id)
+        if doc is None:
             raise HTTPException(status_code=404, detail="Restaurant not found")
-        
-        logger.info(f"Returning restaurant {restaurant_id} with image_url: {result.get('image_url')}")
-        return result
+        return conditional_response(request, doc)
     except HTTPException:
         raise
     except Exception as e:
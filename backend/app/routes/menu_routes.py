@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query, Header, Depends
+from fastapi import APIRouter, HTTPException, Query, Header, Depends, Request
 from typing import List, Optional
 from ..models.menu_models import (
     MenuCategoryCreate,
@@ -10,6 +10,7 @@ from ..models.menu_models import (
 )
 from ..services.menu_service import MenuService
 from ..services.restaurant_service import RestaurantService
+from ..core.catalog_cache import conditional_response
 from ..core.security import decode_access_token
 
 router = APIRouter(prefix="/restaurant/menus", tags=["Restaurant Menus"])
@@ -42,8 +43,9 @@ def create_menu_category(
 
 
 @router.get("", response_model=List[MenuWithItemsResponse])
-def get_menus_with_items(restaurant_id: int = Query(...)):
-    return MenuService.get_menus_with_items(restaurant_id)
+def get_menus_with_items(request: Request, restaurant_id: int = Query(...)):
+    # owner dashboard: always revalidate, so an edit shows up on the next load
+    return conditional_response(request, MenuService.get_menus_with_items_json(restaurant_id), "no-cache")
 
 
 @router.post("/{menu_id}/items", response_model=MenuItemResponse)
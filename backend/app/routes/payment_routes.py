@@ -11,6 +11,7 @@ from ..models.payment_models import (
 )
 from ..services.stripe_service import StripeService
 from ..services.customer_service import CustomerService
+from ..core.db_executor import run_db
 from ..core.security import get_current_active_user  # Import this instead
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,7 @@ router = APIRouter(prefix="/payment", tags=["Payment"])
 
 
 @router.post("/create-payment-intent", response_model=CreatePaymentIntentResponse)
-async def create_payment_intent(
+def create_payment_intent(
     request: CreatePaymentIntentRequest,
     current_user: dict = Depends(get_current_active_user),  # Use the existing dependency
 ):
@@ -63,7 +64,7 @@ async def create_payment_intent(
 
 
 @router.post("/confirm-payment", response_model=PaymentConfirmResponse)
-async def confirm_payment(
+def confirm_payment(
     request: ConfirmPaymentRequest,
     current_user: dict = Depends(get_current_active_user),  # Use the existing dependency
 ):
@@ -107,7 +108,7 @@ async def stripe_webhook(request: Request):
     if not sig_header:
         raise HTTPException(status_code=400, detail="Missing stripe-signature header")
 
-    result = StripeService.handle_webhook(payload, sig_header)
+    result = await run_db(StripeService.handle_webhook, payload, sig_header)
 
     if not result:
         raise HTTPException(status_code=400, detail="Webhook error")
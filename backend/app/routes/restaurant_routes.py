@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException, Header, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Header, Query, WebSocket, WebSocketDisconnect
 from typing import Optional
 from pydantic import BaseModel
 from ..services.restaurant_service import RestaurantService
+from ..core.db_executor import run_db
 from ..core.security import decode_access_token
 from ..core.websocket_manager import manager
 
@@ -37,7 +38,7 @@ def get_restaurant_profile(
 
 
 @router.get("/orders")
-async def get_restaurant_orders(
+def get_restaurant_orders(
     authorization: Optional[str] = Header(None, alias="Authorization"),
     restaurant_id: Optional[int] = None,
 ):
@@ -61,7 +62,7 @@ async def update_order_status(
         rid = restaurant_id
     else:
         user = get_restaurant_user(authorization)
-        rest = RestaurantService.get_restaurant_by_user_id(user["user_id"])
+        rest = await run_db(RestaurantService.get_restaurant_by_user_id, user["user_id"])
         if not rest:
             raise HTTPException(status_code=404, detail="Restaurant not found")
         rid = rest["id"]
@@ -75,10 +76,17 @@ async def update_order_status(
 
 
 @router.websocket("/ws/{restaurant_id}")
-async def restaurant_websocket(websocket: WebSocket, restaurant_id: int):
-    await manager.connect_restaurant(int(restaurant_id), websocket)
+async def restaurant_websocket(
+    websocket: WebSocket,
+    restaurant_id: int,
+    last_seq: Optional[int] = Query(None),
+    epoch: Optional[str] = Query(None),
+):
+    await manager.connect_restaurant(int(restaurant_id), websocket, last_seq, epoch)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect_restaurant(int(restaurant_id))
+        pass
+    finally:
+        manager.disconnect_restaurant(int(restaurant_id), websocket)
@@ -1,5 +1,7 @@
 from typing import List, Optional, Dict, Any
 import asyncio
+from ..core.catalog_cache import menu_cache
+from ..repositories import loaders
 from ..repositories.admin_menu_repo import MenuRepository
 from ..models.admin_menu_models import (
     MenuItemCreate, MenuItemUpdate, MenuItemResponse,
@@ -10,6 +12,11 @@ from ..models.admin_menu_models import (
 
 class MenuService:
     
+    @staticmethod
+    def _invalidate_menu_cache(menu: Optional[Dict]) -> None:
+        """Drop cached menu documents of the menu's restaurant (every restaurant's if unknown)."""
+        menu_cache.invalidate(menu.get("restaurant_id") if menu else None)
+    
     # Category methods
     @staticmethod
     async def get_all_categories() -> List[CategoryResponse]:
@@ -37,6 +44,7 @@ class MenuService:
             
             # Create the category
             category = await MenuRepository.create_category({"name": category_data.name})
+            menu_cache.invalidate()
             
             if category:
                 print(f"Service: Category created successfully: {category}")
@@ -70,6 +78,7 @@ class MenuService:
                 return False
             
             result = await MenuRepository.delete_category(category_id)
+            menu_cache.invalidate()
             print(f"Service: Delete category {category_id}: {result}")
             return result
         except Exception as e:
@@ -93,15 +102,19 @@ class MenuService:
             menus_data = await MenuRepository.get_menus_by_restaurant(restaurant_id)
             print(f"Service: Found {len(menus_data)} menus for restaurant {restaurant_id}")
             
+            # Items of every menu, then categories of every item: one query each
+            items_by_menu = await loaders.menu_items_by_menu().aload_many(m["id"] for m in menus_data)
+            categories_by_item = await loaders.item_categories().aload_many(
+                item["id"] for items_data in items_by_menu.values() for item in items_data
+            )
+            
             menus = []
             for menu_data in menus_data:
-                # Get items for this menu
-                items_data = await MenuRepository.get_menu_items(menu_data["id"])
+                items_data = items_by_menu.get(menu_data["id"], [])
                 
                 items = []
                 for item_data in items_data:
-                    # Get categories for this item
-                    categories = await MenuRepository.get_categories_for_item(item_data["id"])
+                    categories = categories_by_item.get(item_data["id"], [])
                     items.append(MenuItemResponse(
                         id=item_data["id"],
                         menu_id=item_data["menu_id"],
@@ -143,6 +156,7 @@ class MenuService:
                 return None
             
             menu = await MenuRepository.create_menu(menu_data.dict())
+            menu_cache.invalidate(menu_data.restaurant_id)
             if menu:
                 print(f"Service: Menu created successfully: {menu}")
                 return MenuResponse(
@@ -175,6 +189,7 @@ class MenuService:
                 return False
             
             result = await MenuRepository.update_menu(menu_id, update_data)
+            MenuService._invalidate_menu_cache(existing)
             print(f"Service: Update menu {menu_id}: {result}")
             return result
         except Exception as e:
@@ -194,6 +209,7 @@ class MenuService:
                 return False
             
             result = await MenuRepository.delete_menu(menu_id)
+            MenuService._invalidate_menu_cache(existing)
             print(f"Service: Delete menu {menu_id}: {result}")
             return result
         except Exception as e:
@@ -217,6 +233,7 @@ class MenuService:
             item_dict = item_data.dict(exclude={"category_ids"})
             item_dict["menu_id"] = menu_id
             item = await MenuRepository.create_menu_item(item_dict)
+            MenuService._invalidate_menu_cache(menu)
             
             if item:
                 print(f"Service: Menu item created: {item}")
@@ -265,6 +282,7 @@ class MenuService:
             
             # Bulk insert items
             created_items = await MenuRepository.create_menu_items_bulk(items_to_create)
+            MenuService._invalidate_menu_cache(menu)
             print(f"Service: Created {len(created_items)} menu items")
             
             # Assign categories
@@ -275,9 +293,10 @@ class MenuService:
                     await MenuRepository.assign_categories_to_item(item["id"], category_ids)
             
             # Build response
+            categories_by_item = await loaders.item_categories().aload_many(item["id"] for item in created_items)
             response_items = []
             for item in created_items:
-                categories = await MenuRepository.get_categories_for_item(item["id"])
+                categories = categories_by_item.get(item["id"], [])
                 response_items.append(MenuItemResponse(
                     id=item["id"],
                     menu_id=item["menu_id"],
@@ -319,6 +338,7 @@ class MenuService:
                 print(f"Service: Updating categories to {item_data.category_ids}")
                 await MenuRepository.assign_categories_to_item(item_id, item_data.category_ids)
             
+            MenuService._invalidate_menu_cache(await MenuRepository.get_menu_by_id(existing["menu_id"]))
             print(f"Service: Update menu item {item_id}: {success}")
             return success
         except Exception as e:
@@ -338,6 +358,7 @@ class MenuService:
                 return False
             
             result = await MenuRepository.delete_menu_item(item_id)
+            MenuService._invalidate_menu_cache(await MenuRepository.get_menu_by_id(existing["menu_id"]))
             print(f"Service: Delete menu item {item_id}: {result}")
             return result
         except Exception as e:
@@ -357,6 +378,7 @@ class MenuService:
                 return False
             
             result = await MenuRepository.update_menu_item(item_id, {"is_available": is_available})
+            MenuService._invalidate_menu_cache(await MenuRepository.get_menu_by_id(existing["menu_id"]))
             print(f"Service: Toggle item {item_id}: {result}")
             return result
         except Exception as e:
@@ -1,4 +1,5 @@
 from typing import List, Optional, Dict, Any
+from ..core.catalog_cache import menu_cache, restaurant_list_cache
 from ..repositories.admin_restaurant_repo import RestaurantRepository
 from ..models.admin_restaurant_models import (
     RestaurantCreate, RestaurantUpdate, RestaurantResponse,
@@ -7,7 +8,13 @@ from ..models.admin_restaurant_models import (
 from datetime import datetime
 
 class RestaurantService:
-    
+
+    @staticmethod
+    def _invalidate_catalog(restaurant_id: int) -> None:
+        """Restaurant rows appear in the public lists and in that restaurant's menu documents."""
+        restaurant_list_cache.invalidate()
+        menu_cache.invalidate(restaurant_id)
+
     @staticmethod
     async def get_all_restaurants(approved_only: bool = False) -> List[Dict]:
         """Get all restaurants with metrics using bulk queries"""
@@ -79,6 +86,7 @@ class RestaurantService:
             restaurant = await RestaurantRepository.create_restaurant(restaurant_dict)
             
             if restaurant:
+                RestaurantService._invalidate_catalog(restaurant["id"])
                 # Get metrics for new restaurant
                 metrics = await RestaurantRepository.get_restaurant_metrics(restaurant["id"])
                 restaurant.update(metrics)
@@ -96,7 +104,10 @@ class RestaurantService:
             if not update_data:
                 return False
             
-            return await RestaurantRepository.update_restaurant(restaurant_id, update_data)
+            updated = await RestaurantRepository.update_restaurant(restaurant_id, update_data)
+            if updated:
+                RestaurantService._invalidate_catalog(restaurant_id)
+            return updated
         except Exception as e:
             print(f"Error in update_restaurant service for {restaurant_id}: {e}")
             return False
@@ -105,7 +116,10 @@ class RestaurantService:
     async def delete_restaurant(restaurant_id: int) -> bool:
         """Delete a restaurant"""
         try:
-            return await RestaurantRepository.delete_restaurant(restaurant_id)
+            deleted = await RestaurantRepository.delete_restaurant(restaurant_id)
+            if deleted:
+                RestaurantService._invalidate_catalog(restaurant_id)
+            return deleted
         except Exception as e:
             print(f"Error in delete_restaurant service for {restaurant_id}: {e}")
             return False
@@ -116,6 +130,7 @@ class RestaurantService:
         try:
             success = await RestaurantRepository.approve_restaurant(restaurant_id, approve)
             if success:
+                RestaurantService._invalidate_catalog(restaurant_id)
                 restaurant = await RestaurantRepository.get_restaurant_by_id(restaurant_id)
                 if restaurant:
                     metrics = await RestaurantRepository.get_restaurant_metrics(restaurant_id)
@@ -0,0 +1,173 @@
+"""
+Batched dispatch (DISPATCH_MODE=batch).
+
+Ready orders are collected for a short window, then the whole batch is
+matched to riders at once with a min-cost assignment on restaurant pickup
+distance, so concurrent orders no longer race for the same nearest rider.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.assignment import min_cost_assignment
+from ..core.config import (
+    DISPATCH_BATCH_CANDIDATES,
+    DISPATCH_BATCH_MAX_ORDERS,
+    DISPATCH_BATCH_WINDOW_SECONDS,
+    DISPATCH_REQUEST_TIMEOUT_SECONDS,
+    DISPATCH_SEARCH_RADIUS_KM,
+)
+from ..core.db_executor import run_db
+from ..core.location_utils import haversine_matrix
+from ..core.query_stats import spawn_background
+from ..core.rider_index import rider_index
+from ..repositories.dispatch_repo import DispatchRepository
+from .dispatch_service import DispatchService
+from .presence_service import PresenceService
+
+log = logging.getLogger(__name__)
+
+# order_id -> (order_details, restaurant coords, first submitted at)
+Prepared = Tuple[Dict, Tuple[float, float], float]
+
+
+class BatchDispatcher:
+    def __init__(
+        self,
+        window_seconds: float = DISPATCH_BATCH_WINDOW_SECONDS,
+        max_orders: int = DISPATCH_BATCH_MAX_ORDERS,
+        candidates_per_order: int = DISPATCH_BATCH_CANDIDATES,
+    ):
+        self.window_seconds = window_seconds
+        self.max_orders = max_orders
+        self.candidates_per_order = candidates_per_order
+        self._pending: Dict[int, Optional[Prepared]] = {}  # insertion ordered
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.reports: Deque[Dict] = deque(maxlen=50)
+
+    def submit(self, order_id: int) -> None:
+        """Queue an order for the next batch. Must be called from the event loop."""
+        self._pending.setdefault(order_id, None)
+        if len(self._pending) >= self.max_orders:
+            spawn_background(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = spawn_background(self._flush_after_window())
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        await self.flush()
+
+    async def flush(self) -> Optional[Dict]:
+        async with self._lock:
+            if not self._pending:
+                return None
+            batch = dict(self._pending)
+            self._pending.clear()
+            report = await self.dispatch_batch(batch)
+        timer = self._timer
+        if self._pending and (timer is None or timer.done() or timer is asyncio.current_task()):
+            self._timer = spawn_background(self._flush_after_window())
+        return report
+
+    async def dispatch_batch(self, batch: Dict[int, Optional[Prepared]]) -> Dict:
+        started = time.perf_counter()
+        now = time.monotonic()
+        orders: List[Tuple[int, Dict, Tuple[float, float], float]] = []
+        for order_id, prepared in batch.items():
+            if prepared is None:
+                loaded = await run_db(DispatchService.prepare_order, order_id)
+                if not loaded:
+                    continue
+                prepared = (loaded[0], loaded[1], now)
+            orders.append((order_id, *prepared))
+
+        if not rider_index.warm:
+            await run_db(DispatchService.load_rider_index)
+        attempted = await run_db(DispatchRepository.get_attempted_rider_ids_for_orders, [o[0] for o in orders])
+
+        # Candidate riders: union of each order's nearest riders, minus riders already holding an offer.
+        candidates: Dict[int, Dict] = {}
+        for order_id, _, (lat, lon), _ in orders:
+            for r in PresenceService.nearest_live(
+                lat, lon,
+                k=self.candidates_per_order,
+                radius_km=DISPATCH_SEARCH_RADIUS_KM,
+                exclude=attempted.get(order_id, ()),
+            ):
+                candidates.setdefault(r["rider_id"], r)
+        busy = set(await run_db(DispatchRepository.get_busy_rider_ids, list(candidates)))
+        riders = [rider_index.get(rid) for rid in candidates if rid not in busy]
+        riders = [r for r in riders if r]
+
+        pairs: List[Tuple[int, int]] = []
+        cost = np.zeros((len(orders), len(riders)))
+        solve_ms = 0.0
+        if orders and riders:
+            cost = haversine_matrix(
+                [o[2][0] for o in orders], [o[2][1] for o in orders],
+                [r["lat"] for r in riders], [r["lon"] for r in riders],
+            )
+            cost[cost > DISPATCH_SEARCH_RADIUS_KM] = np.inf
+            col_of = {r["rider_id"]: j for j, r in enumerate(riders)}
+            for i, (order_id, *_rest) in enumerate(orders):
+                for rider_id in attempted.get(order_id, ()):
+                    if rider_id in col_of:
+                        cost[i, col_of[rider_id]] = np.inf
+            solve_started = time.perf_counter()
+            pairs = min_cost_assignment(cost)
+            solve_ms = (time.perf_counter() - solve_started) * 1000
+
+        requests = await run_db(
+            DispatchRepository.create_dispatch_requests,
+            [(orders[i][0], riders[j]["rider_id"]) for i, j in pairs],
+            timeout_seconds=DISPATCH_REQUEST_TIMEOUT_SECONDS,
+        )
+        request_by_pair = {(int(r["order_id"]), int(r["rider_id"])): r for r in requests}
+        sends = []
+        total_pickup_km = 0.0
+        assigned = set()
+        for i, j in pairs:
+            order_id, order_details = orders[i][0], orders[i][1]
+            rider = riders[j]
+            request = request_by_pair.get((order_id, rider["rider_id"]))
+            if not request:
+                continue
+            candidate = {"rider_id": rider["rider_id"], "user_id": rider["user_id"], "distance_km": float(cost[i, j])}
+            sends.append(DispatchService.send_offer(order_details, request, candidate))
+            total_pickup_km += candidate["distance_km"]
+            assigned.add(order_id)
+        await asyncio.gather(*sends, return_exceptions=True)
+
+        # Orders that lost out to another order this round retry next window until an offer would have expired.
+        carried = []
+        for order_id, order_details, coords, first_seen in orders:
+            if order_id in assigned:
+                continue
+            if now - first_seen < DISPATCH_REQUEST_TIMEOUT_SECONDS:
+                self._pending.setdefault(order_id, (order_details, coords, first_seen))
+                carried.append(order_id)
+            else:
+                log.warning("[dispatch] order_id=%s no rider found in batch dispatch, giving up", order_id)
+
+        report = {
+            "at": datetime.utcnow().isoformat(),
+            "orders": len(batch),
+            "riders_considered": len(riders),
+            "assigned": len(assigned),
+            "carried_over": carried,
+            "assignment_ms": round(solve_ms, 3),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+            "total_pickup_km": round(total_pickup_km, 3),
+        }
+        self.reports.append(report)
+        log.info("[dispatch] batch %s", report)
+        return report
+
+
+batch_dispatcher = BatchDispatcher()
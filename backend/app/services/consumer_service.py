@@ -1,14 +1,27 @@
 from ..supabase_client import supabase
 from typing import List, Dict, Any, Optional
-import asyncio
-from .dispatch_service import DispatchService
+from ..core import pg
+from ..core.catalog_cache import CachedDocument, menu_cache, model_bytes, restaurant_list_cache
+from ..core.config import POPULAR_ITEMS_CACHE_SECONDS, POPULAR_ITEMS_HALF_LIFE_HOURS
+from ..core.popularity import current_score, log_add, log_weight
+from ..core.ttl_cache import TTLCache
+from ..models.consumer import RestaurantResponse
+from ..repositories.pg_read_repo import PgReadRepository
+from ..repositories.popularity_repo import ITEM_COLUMNS, PopularityRepository
 from ..repositories.voucher_repo import VoucherRepository
 from collections import defaultdict
 
+_RESTAURANTS_BODY = model_bytes(List[RestaurantResponse])
+_popular_cache = TTLCache(POPULAR_ITEMS_CACHE_SECONDS, max_entries=512)  # (restaurant_id, trending, limit) -> items
+
 
 class ConsumerService:
     @staticmethod
     def get_restaurants(cuisine: Optional[str] = None, search: Optional[str] = None) -> List[Dict[str, Any]]:
+        if pg.enabled("consumer"):
+            rows = PgReadRepository.get_restaurants(cuisine, search)
+            if rows is not None:
+                return rows
         if cuisine:
             try:
                 relational_query = supabase.table("restaurants").select(
@@ -36,89 +49,148 @@ class ConsumerService:
         response = query.order("average_rating", desc=True).execute()
         return response.data or []
 
+    @staticmethod
+    def get_restaurants_json(cuisine: Optional[str] = None, search: Optional[str] = None) -> CachedDocument:
+        """get_restaurants as a response body, from the restaurant list cache when current."""
+        return restaurant_list_cache.get_or_build(
+            f"consumer_restaurants:{cuisine or ''}:{search or ''}", "restaurants",
+            lambda: ConsumerService.get_restaurants(cuisine, search), _RESTAURANTS_BODY,
+        )
+
     @staticmethod
     def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict[str, Any]]:
+        if pg.enabled("consumer"):
+            row = PgReadRepository.get_restaurant(restaurant_id)
+            if row is not None:
+                return row
         resp = supabase.table("restaurants").select("*").eq("id", restaurant_id).execute()
         return resp.data[0] if resp.data else None
 
     @staticmethod
     def get_menu_items(restaurant_id: int) -> List[Dict[str, Any]]:
-        try:
-            menus_resp = supabase.table("menus").select("id").eq("restaurant_id", restaurant_id).execute()
-            if not menus_resp.data:
-                return []
-            menu_ids = [m["id"] for m in menus_resp.data]
-            all_items = []
-            for mid in menu_ids:
-                items_resp = supabase.table("menu_items").select("*").eq("menu_id", mid).execute()
-                all_items.extend(items_resp.data or [])
-            return all_items
-        except Exception:
+        if pg.enabled("consumer"):
+            rows = PgReadRepository.get_menu_items(restaurant_id)
+            if rows is not None:
+                return rows
+        # DB errors propagate: an empty list here would be cached as the restaurant's menu.
+        menus_resp = supabase.table("menus").select("id").eq("restaurant_id", restaurant_id).execute()
+        if not menus_resp.data:
             return []
+        menu_ids = [m["id"] for m in menus_resp.data]
+        items_resp = supabase.table("menu_items").select("*").in_("menu_id", menu_ids).order("menu_id").order("id").execute()
+        return items_resp.data or []
+
+    @staticmethod
+    def get_menu_document(restaurant_id: int) -> Optional[Dict[str, Any]]:
+        """Restaurant with its items grouped by category (GET /consumer/restaurants/{id}/menu); None if not found."""
+        restaurant = ConsumerService.get_restaurant_by_id(restaurant_id)
+        if not restaurant:
+            return None
+        categories: Dict[str, List[Dict[str, Any]]] = {}
+        for item in ConsumerService.get_menu_items(restaurant_id):
+            categories.setdefault(item.get("category", "General"), []).append(item)
+        menus = [{"name": cat, "items": items} for cat, items in categories.items()]
+        if not menus:
+            menus = [{"name": "Menu", "items": []}]
+        return {**restaurant, "menus": menus}
+
+    @staticmethod
+    def get_menu_json(restaurant_id: int) -> Optional[CachedDocument]:
+        """get_menu_document as a response body, from the menu cache when current."""
+        return menu_cache.get_or_build("consumer_menu", restaurant_id, lambda: ConsumerService.get_menu_document(restaurant_id))
+
+    @staticmethod
+    def get_popular_items(restaurant_id: Optional[int] = None, trending: bool = False, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Most ordered items, all time or time-decayed (trending), overall or for one restaurant.
+        Read from the menu_item_popularity summary, which a trigger keeps current as orders are
+        placed, so the cost does not grow with order history; aggregates order_items without it.
+        """
+        key = (restaurant_id, trending, limit)
+        items = _popular_cache.get(key)
+        if items is None:
+            items = ConsumerService._popular_from_summary(restaurant_id, trending, limit)
+            if items is None:
+                items = ConsumerService._popular_from_order_items(restaurant_id, trending, limit)
+            _popular_cache.set(key, items)
+        return items
+
+    @staticmethod
+    def _popular_from_summary(restaurant_id: Optional[int], trending: bool, limit: int) -> Optional[List[Dict[str, Any]]]:
+        rows = PopularityRepository.top_items(limit, restaurant_id, trending)
+        if rows is None:
+            return None
+        if not rows:
+            return ConsumerService._unranked_items(restaurant_id, limit)
+        return [
+            {
+                **row["menu_items"],
+                "restaurant_id": row.get("restaurant_id"),
+                "total_ordered_qty": row.get("total_qty", 0),
+                "order_count": row.get("order_count", 0),
+                "trending_score": round(current_score(row.get("trend_log"), POPULAR_ITEMS_HALF_LIFE_HOURS), 3),
+            }
+            for row in rows
+            if row.get("menu_items")
+        ]
 
     @staticmethod
-    def get_popular_items() -> List[Dict[str, Any]]:
+    def _popular_from_order_items(restaurant_id: Optional[int], trending: bool, limit: int) -> List[Dict[str, Any]]:
+        """Fallback when the summary table is missing: one pass over every order line."""
         try:
             order_items_resp = supabase.table("order_items").select(
-                "menu_item_id, quantity"
+                "menu_item_id, quantity, orders(created_at, restaurant_id)"
             ).execute()
-            order_rows = order_items_resp.data or []
-            if not order_rows:
-                resp = supabase.table("menu_items").select("*").limit(10).execute()
-                return resp.data or []
-
             qty_by_item: Dict[int, int] = defaultdict(int)
             count_by_item: Dict[int, int] = defaultdict(int)
-            for row in order_rows:
+            trend_by_item: Dict[int, float] = {}
+            restaurant_by_item: Dict[int, Any] = {}
+            for row in order_items_resp.data or []:
                 menu_item_id = row.get("menu_item_id")
-                if menu_item_id is None:
+                order = row.get("orders") or {}
+                if menu_item_id is None or (restaurant_id is not None and order.get("restaurant_id") != restaurant_id):
                     continue
-                qty = int(row.get("quantity") or 0)
-                qty_by_item[menu_item_id] += max(qty, 0)
+                qty = max(int(row.get("quantity") or 0), 0)
+                qty_by_item[menu_item_id] += qty
                 count_by_item[menu_item_id] += 1
+                restaurant_by_item[menu_item_id] = order.get("restaurant_id")
+                if qty and order.get("created_at"):
+                    weight = log_weight(qty, order["created_at"], POPULAR_ITEMS_HALF_LIFE_HOURS)
+                    trend_by_item[menu_item_id] = log_add(trend_by_item.get(menu_item_id), weight)
 
             if not qty_by_item:
-                resp = supabase.table("menu_items").select("*").limit(10).execute()
-                return resp.data or []
-
-            ranked_item_ids = sorted(
-                qty_by_item.keys(),
-                key=lambda item_id: (qty_by_item[item_id], count_by_item[item_id]),
-                reverse=True,
-            )[:10]
-
-            items_resp = supabase.table("menu_items").select(
-                "id, menu_id, name, description, price_cents, image_url, is_available"
-            ).in_("id", ranked_item_ids).execute()
-            items = items_resp.data or []
-            if not items:
-                return []
-
-            menu_ids = list({i.get("menu_id") for i in items if i.get("menu_id") is not None})
-            menu_to_restaurant: Dict[int, int] = {}
-            if menu_ids:
-                menus_resp = supabase.table("menus").select("id, restaurant_id").in_(
-                    "id", menu_ids
-                ).execute()
-                for m in (menus_resp.data or []):
-                    menu_to_restaurant[m["id"]] = m.get("restaurant_id")
-
-            item_map = {item["id"]: item for item in items}
-            ordered_items: List[Dict[str, Any]] = []
-            for item_id in ranked_item_ids:
-                item = item_map.get(item_id)
-                if not item:
-                    continue
-                ordered_items.append({
-                    **item,
-                    "restaurant_id": menu_to_restaurant.get(item.get("menu_id")),
+                return ConsumerService._unranked_items(restaurant_id, limit)
+
+            if trending:
+                rank = lambda item_id: trend_by_item.get(item_id, float("-inf"))
+            else:
+                rank = lambda item_id: (qty_by_item[item_id], count_by_item[item_id])
+            ranked_item_ids = sorted(qty_by_item.keys(), key=rank, reverse=True)[:limit]
+
+            items_resp = supabase.table("menu_items").select(ITEM_COLUMNS).in_("id", ranked_item_ids).execute()
+            item_map = {item["id"]: item for item in items_resp.data or []}
+            return [
+                {
+                    **item_map[item_id],
+                    "restaurant_id": restaurant_by_item.get(item_id),
                     "total_ordered_qty": qty_by_item[item_id],
                     "order_count": count_by_item[item_id],
-                })
-            return ordered_items
+                    "trending_score": round(current_score(trend_by_item.get(item_id), POPULAR_ITEMS_HALF_LIFE_HOURS), 3),
+                }
+                for item_id in ranked_item_ids
+                if item_id in item_map
+            ]
         except Exception as e:
             return []
 
+    @staticmethod
+    def _unranked_items(restaurant_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """Nothing ordered yet: some items to show instead."""
+        if restaurant_id is not None:
+            return ConsumerService.get_menu_items(restaurant_id)[:limit]
+        resp = supabase.table("menu_items").select("*").limit(limit).execute()
+        return resp.data or []
+
     @staticmethod
     def create_order(order_data: dict) -> Dict[str, Any]:
         try:
@@ -161,17 +233,19 @@ class ConsumerService:
             delivery_fee_cents = int(float(order_data.get("delivery_fee", 0)) * 100)
             discount_cents = 0
             voucher_code_saved = None
+            redeemed_voucher_id = None
             restaurant_id = order_data.get("restaurant_id")
             if order_data.get("voucher_code") and str(order_data.get("voucher_code", "")).strip():
-                voucher, err = VoucherRepository.validate(
+                voucher, err = VoucherRepository.redeem(
                     str(order_data["voucher_code"]).strip(),
                     subtotal_cents,
                     restaurant_id,
+                    user_id,
                 )
                 if voucher and not err:
                     discount_cents = voucher["discount_cents"]
                     voucher_code_saved = voucher.get("code")
-                    VoucherRepository.increment_use(voucher["id"])
+                    redeemed_voucher_id = voucher["id"]
             total_cents = max(0, subtotal_cents + tax_cents + delivery_fee_cents - discount_cents)
 
             # Schema: orders has no discount_cents or voucher_code; total_cents already reflects discount.
@@ -185,8 +259,13 @@ class ConsumerService:
                 "total_cents": total_cents,
                 "delivery_address": full_address_str,
             }
-            order_resp = supabase.table("orders").insert(new_order).execute()
-            if not order_resp.data:
+            try:
+                order_resp = supabase.table("orders").insert(new_order).execute()
+            except Exception:
+                order_resp = None
+            if not order_resp or not order_resp.data:
+                if redeemed_voucher_id is not None:
+                    VoucherRepository.release(redeemed_voucher_id, user_id)
                 raise Exception("Failed to create order")
             order_id = order_resp.data[0]["id"]
 
@@ -211,10 +290,6 @@ class ConsumerService:
                 "status": "paid" if order_data.get("payment_method") != "cash" else "pending",
             }).execute()
 
-            lat = order_data.get("delivery_latitude")
-            lon = order_data.get("delivery_longitude")
-            asyncio.create_task(DispatchService.dispatch_order(order_id, lat, lon))
-
             return order_resp.data[0]
         except Exception as e:
             from fastapi import HTTPException
@@ -1,7 +1,10 @@
 from typing import List, Optional, Dict, Tuple
+from ..repositories import loaders
 from ..repositories.customer_repo import CustomerRepository
 from ..repositories.user_repo import UserRepository
 from ..repositories.voucher_repo import VoucherRepository
+from .voucher_service import VoucherService
+from ..core.catalog_cache import CachedDocument, menu_cache, restaurant_list_cache
 from ..core.security import verify_password, hash_password
 from ..models.customer_models import (
     AddressResponse,
@@ -12,6 +15,7 @@ from ..models.customer_models import (
     NotificationResponse,
     CustomerProfileResponse,
     VoucherValidateResponse,
+    VoucherBulkValidateResponse,
 )
 
 
@@ -148,7 +152,7 @@ class CustomerService:
     ) -> VoucherValidateResponse:
         if not code or not code.strip():
             return VoucherValidateResponse(valid=False, discount_cents=0, message="No voucher code")
-        voucher, err = VoucherRepository.validate(code, subtotal_cents, restaurant_id)
+        voucher, err = VoucherService.validate(code, subtotal_cents, restaurant_id)
         if err:
             return VoucherValidateResponse(valid=False, discount_cents=0, message=err)
         return VoucherValidateResponse(
@@ -157,6 +161,14 @@ class CustomerService:
             message="Voucher applied",
         )
 
+    @staticmethod
+    def validate_vouchers(
+        codes: List[str],
+        subtotal_cents: int,
+        restaurant_id: Optional[int] = None,
+    ) -> VoucherBulkValidateResponse:
+        return VoucherBulkValidateResponse(**VoucherService.validate_many(codes, subtotal_cents, restaurant_id))
+
     # ----- Orders -----
     @staticmethod
     def place_order(
@@ -186,7 +198,8 @@ class CustomerService:
         voucher_code_saved: Optional[str] = None
         validated_voucher: Optional[Dict] = None
         if voucher_code and voucher_code.strip():
-            voucher, err = VoucherRepository.validate(voucher_code.strip(), subtotal_cents, restaurant_id)
+            # validated and counted in one atomic call; given back below if the order is not created
+            voucher, err = VoucherRepository.redeem(voucher_code.strip(), subtotal_cents, restaurant_id, user_id)
             if voucher and not err:
                 discount_cents = voucher["discount_cents"]
                 voucher_code_saved = voucher.get("code")
@@ -207,9 +220,9 @@ class CustomerService:
         }
         order = CustomerRepository.create_order(user_id, order_data)
         if not order:
+            if validated_voucher:
+                VoucherRepository.release(validated_voucher["id"], user_id)
             return None, "Failed to create order (database insert failed)"
-        if validated_voucher:
-            VoucherRepository.increment_use(validated_voucher["id"])
         for it in items:
             price_cents = menu_map[it["menu_item_id"]]["price_cents"]
             CustomerRepository.create_order_item(
@@ -232,51 +245,60 @@ class CustomerService:
         """Full order details for tracking page (order, restaurant, items, delivery, rider)."""
         return CustomerRepository.get_order_tracking(order_id, user_id)
 
+    @staticmethod
+    def owns_order(user_id: int, order_id: int) -> bool:
+        return CustomerRepository.get_order_by_id(order_id, user_id) is not None
+
     @staticmethod
     def get_order(user_id: int, order_id: int) -> Optional[OrderResponse]:
         order = CustomerRepository.get_order_by_id(order_id, user_id)
         if not order:
             return None
-        items = CustomerRepository.get_order_items(order_id)
-        menu_ids = [i["menu_item_id"] for i in items if i.get("menu_item_id")]
-        menu_map = CustomerRepository.get_menu_items_by_ids(menu_ids) if menu_ids else {}
-        restaurant = CustomerRepository.get_restaurant_by_id(order["restaurant_id"]) if order.get("restaurant_id") else None
-        item_resps = [
-            OrderItemResponse(
-                id=i["id"],
-                order_id=i["order_id"],
-                menu_item_id=i.get("menu_item_id"),
-                quantity=i["quantity"],
-                price_cents=i["price_cents"],
-                special_instructions=i.get("special_instructions"),
-                name=menu_map.get(i["menu_item_id"], {}).get("name") if i.get("menu_item_id") else None,
-            )
-            for i in items
-        ]
-        return OrderResponse(
-            id=order["id"],
-            user_id=order["user_id"],
-            restaurant_id=order.get("restaurant_id"),
-            status=order["status"],
-            subtotal_cents=order.get("subtotal_cents", 0),
-            tax_cents=order.get("tax_cents", 0),
-            delivery_fee_cents=order.get("delivery_fee_cents", 0),
-            total_cents=order.get("total_cents", 0),
-            delivery_address=order.get("delivery_address"),
-            created_at=order.get("created_at"),
-            updated_at=order.get("updated_at"),
-            items=item_resps,
-            restaurant_name=restaurant.get("name") if restaurant else None,
-        )
+        return CustomerService._order_responses([order])[0]
 
     @staticmethod
     def list_orders(user_id: int) -> List[OrderResponse]:
         orders = CustomerRepository.get_orders_by_user_id(user_id)
+        return CustomerService._order_responses(orders)
+
+    @staticmethod
+    def _order_responses(orders: List[Dict]) -> List[OrderResponse]:
+        """Items, item names and restaurant names for all orders with one query per table (request-scoped loaders)."""
+        items_by_order = loaders.order_items().load_many(o["id"] for o in orders)
+        menu_map = loaders.menu_item_names().load_many(
+            i["menu_item_id"] for items in items_by_order.values() for i in items if i.get("menu_item_id")
+        )
+        restaurants = loaders.restaurant_names().load_many(o.get("restaurant_id") for o in orders)
         result = []
-        for o in orders:
-            ord_resp = CustomerService.get_order(user_id, o["id"])
-            if ord_resp:
-                result.append(ord_resp)
+        for order in orders:
+            restaurant = restaurants.get(order.get("restaurant_id"))
+            item_resps = [
+                OrderItemResponse(
+                    id=i["id"],
+                    order_id=i["order_id"],
+                    menu_item_id=i.get("menu_item_id"),
+                    quantity=i["quantity"],
+                    price_cents=i["price_cents"],
+                    special_instructions=i.get("special_instructions"),
+                    name=menu_map.get(i["menu_item_id"], {}).get("name") if i.get("menu_item_id") else None,
+                )
+                for i in items_by_order.get(order["id"], [])
+            ]
+            result.append(OrderResponse(
+                id=order["id"],
+                user_id=order["user_id"],
+                restaurant_id=order.get("restaurant_id"),
+                status=order["status"],
+                subtotal_cents=order.get("subtotal_cents", 0),
+                tax_cents=order.get("tax_cents", 0),
+                delivery_fee_cents=order.get("delivery_fee_cents", 0),
+                total_cents=order.get("total_cents", 0),
+                delivery_address=order.get("delivery_address"),
+                created_at=order.get("created_at"),
+                updated_at=order.get("updated_at"),
+                items=item_resps,
+                restaurant_name=restaurant.get("name") if restaurant else None,
+            ))
         return result
 
     # ----- Reviews -----
@@ -305,14 +327,17 @@ class CustomerService:
     # ----- Public: browse restaurants (no auth) -----
     @staticmethod
     def get_restaurants_list() -> List[dict]:
-        """List approved restaurants for customer app."""
-        try:
-            restaurants = CustomerRepository.get_restaurants_list()
-            print(f"CustomerService: Retrieved {len(restaurants)} restaurants")
-            return restaurants
-        except Exception as e:
-            print(f"Error in get_restaurants_list: {e}")
-            return []
+        """List approved restaurants for customer app; DB errors propagate (nothing is cached for them)."""
+        restaurants = CustomerRepository.get_restaurants_list()
+        print(f"CustomerService: Retrieved {len(restaurants)} restaurants")
+        return restaurants
+
+    @staticmethod
+    def get_restaurants_list_json() -> CachedDocument:
+        """{"restaurants": get_restaurants_list()} as a response body, from the restaurant list cache when current."""
+        return restaurant_list_cache.get_or_build(
+            "restaurants_list", "restaurants", lambda: {"restaurants": CustomerService.get_restaurants_list()}
+        )
 
     @staticmethod
     def get_restaurant_with_menu(restaurant_id: int) -> Optional[dict]:
@@ -325,3 +350,10 @@ class CustomerService:
         except Exception as e:
             print(f"Error in get_restaurant_with_menu for {restaurant_id}: {e}")
             return None
+
+    @staticmethod
+    def get_restaurant_with_menu_json(restaurant_id: int) -> Optional[CachedDocument]:
+        """get_restaurant_with_menu as a response body, from the menu cache when current; None if not found."""
+        return menu_cache.get_or_build(
+            "restaurant_with_menu", restaurant_id, lambda: CustomerService.get_restaurant_with_menu(restaurant_id)
+        )
@@ -92,22 +92,23 @@ class DeliveryService:
     @staticmethod
     def respond_to_dispatch_request(
         request_id: int, rider_id: int, action: str
-    ) -> Tuple[bool, Optional[int], str]:
+    ) -> Tuple[bool, Optional[int], str, List[dict]]:
         """
         Rider accepts or rejects a dispatch request.
-        Returns (success, customer_user_id_for_notify, error_message).
-        On accept: creates delivery, sets order status to rider_assigned, updates dispatch status.
+        Returns (success, customer_user_id_for_notify, error_message, withdrawn_requests).
+        On accept: claims the order atomically, creates delivery and expires the other
+        riders' pending offers for the order (returned as withdrawn_requests).
         """
         req = DispatchRepository.get_dispatch_request_by_id(request_id)
         if not req:
             print(f"[DeliveryService] Request {request_id} not found.")
-            return False, None, "Request not found"
+            return False, None, "Request not found", []
         if str(req.get("status")) != "pending":
             print(f"[DeliveryService] Request {request_id} status is not pending: {req.get('status')}.")
-            return False, None, "Request already responded"
+            return False, None, "Request already responded", []
         if int(req.get("rider_id", 0)) != int(rider_id):
             print(f"[DeliveryService] Rider ID mismatch for request {request_id}. Expected {req.get('rider_id')}, got {rider_id}.")
-            return False, None, "Rider does not match request"
+            return False, None, "Rider does not match request", []
         order_id = int(req["order_id"])
 
         if action == "reject":
@@ -116,36 +117,39 @@ class DeliveryService:
                 DispatchRepository.expire_rider_pending_requests_for_order(order_id, rider_id)
             except Exception:
                 pass
-            return True, None, ""
+            return True, None, "", []
 
         if action != "accept":
             print(f"[DeliveryService] Invalid action for request {request_id}: {action}.")
-            return False, None, "Invalid action"
+            return False, None, "Invalid action", []
 
-        # Get order to find customer user_id for WebSocket notify
-        order_row = supabase.table("orders").select("user_id").eq("id", order_id).maybe_single().execute()
-        order_data = getattr(order_row, "data", None)
-        customer_user_id = None
-        if order_data:
-            customer_user_id = order_data.get("user_id") if isinstance(order_data, dict) else (order_data[0].get("user_id") if isinstance(order_data, list) and order_data else None)
+        # The request may have timed out or been withdrawn since it was read.
+        if not DispatchRepository.close_if_pending(request_id, "accepted"):
+            return False, None, "Request already responded", []
+
+        # First accept wins: one conditional UPDATE moves the order to rider_assigned
+        # (so customer Order Progress shows "Rider Assigned"); later accepts get nothing back.
+        order_row = DispatchRepository.claim_order(order_id)
+        if not order_row:
+            print(f"[DeliveryService] Order {order_id} already claimed; request {request_id} loses.")
+            DispatchRepository.update_dispatch_status(request_id, "expired")
+            return False, None, "Order already assigned to another rider", []
+        customer_user_id = order_row.get("user_id")
 
         # Create delivery row (order_id, rider_id)
         delivery = DeliveryRepository.create_delivery(order_id, rider_id, status="assigned")
         if not delivery:
             print(f"[DeliveryService] Failed to create delivery for order {order_id}, rider {rider_id}.")
-            return False, None, "Failed to create delivery"
-        
-        delivery_id = delivery.get("id")
+            DispatchRepository.release_order(order_id)
+            DispatchRepository.update_dispatch_status(request_id, "pending")
+            return False, None, "Failed to create delivery", []
 
-        # Update order status so customer Order Progress shows "Rider Assigned"
-        from datetime import datetime
-        supabase.table("orders").update({"status": "rider_assigned", "updated_at": datetime.utcnow().isoformat()}).eq("id", order_id).execute()
+        delivery_id = delivery.get("id")
 
-        # Mark dispatch request as accepted and expire other riders' pending requests for this order
-        DispatchRepository.update_dispatch_status(request_id, "accepted")
-        DispatchRepository.expire_other_requests_for_order(order_id, request_id)
+        # Expire other riders' pending offers for this order right away
+        withdrawn = DispatchRepository.expire_other_requests_for_order(order_id, request_id)
 
-        return True, customer_user_id, str(delivery_id) if delivery_id else ""
+        return True, customer_user_id, str(delivery_id) if delivery_id else "", withdrawn
 
     @staticmethod
     def update_delivery_progress(
@@ -172,11 +176,13 @@ class DeliveryService:
                 delivery_id, rider_id, "picked_up", picked_up_at=now
             )
             supabase.table("orders").update({"status": "picked_up", "updated_at": now}).eq("id", order_id).execute()
+            DispatchRepository.invalidate_order_snapshot(order_id)
         elif status == "delivered":
             DeliveryRepository.update_delivery_status(
                 delivery_id, rider_id, "delivered", delivered_at=now
             )
             supabase.table("orders").update({"status": "delivered", "updated_at": now}).eq("id", order_id).execute()
+            DispatchRepository.invalidate_order_snapshot(order_id)
             # Mark COD payment as paid (cash collected by rider)
             CustomerRepository.mark_payment_paid_for_order(order_id)
         else:
@@ -257,7 +263,16 @@ class DeliveryService:
         """Update rider status"""
         if status not in ["available", "unavailable"]:
             return False
-        return DeliveryRepository.update_rider_status(rider_id, status)
+        if not DeliveryRepository.update_rider_status(rider_id, status):
+            return False
+        from .dispatch_service import DispatchService
+        from .presence_service import PresenceService
+        DispatchService.track_rider_status(rider_id, status)
+        if status == "available":
+            PresenceService.heartbeat(rider_id)
+        else:
+            PresenceService.went_offline(rider_id)
+        return True
 
     @staticmethod
     def update_rider_vehicle(rider_id: int, vehicle_type: str) -> bool:
@@ -1,19 +1,49 @@
 import asyncio
-import json
 import logging
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from ..repositories.dispatch_repo import DispatchRepository
-from ..core.location_utils import haversine_distance
-from ..core.websocket_manager import manager
+from ..core.location_utils import haversine_distances
+from ..core.db_executor import run_db
+from ..core.query_stats import spawn_background
+from ..core.expiry_scheduler import ExpiryScheduler
+from ..core.notifier import KeyedNotifier
+from ..core.rider_index import rider_index
+from ..core.config import (
+    DISPATCH_EXPIRY_SWEEP_SECONDS,
+    DISPATCH_MODE,
+    DISPATCH_OFFER_COUNT,
+    DISPATCH_REDISPATCH_CONCURRENCY,
+    DISPATCH_REQUEST_TIMEOUT_SECONDS,
+    DISPATCH_SEARCH_RADIUS_KM,
+)
+from ..core.websocket_manager import Connection, manager
 from datetime import datetime
-from fastapi import WebSocket
 from ..repositories.delivery_repo import DeliveryRepository
+from .location_service import LocationService, rider_locations
+from .presence_service import PresenceService
 
 log = logging.getLogger(__name__)
 
+FALLBACK_COORDS = (16.87, 96.20)  # used when a rider or restaurant has no coordinates yet
+
 
 class DispatchService:
-    ORDER_COORDS: Dict[int, Dict[str, float]] = {}
+    @staticmethod
+    def schedule(
+        order_id: int,
+        customer_latitude: Optional[float] = None,
+        customer_longitude: Optional[float] = None,
+    ) -> None:
+        """
+        Start dispatch for an order that is ready, using the configured DISPATCH_MODE.
+        Customer coordinates are read from the order row (delivery_latitude/longitude), so nothing
+        is kept per worker; the arguments are accepted for existing callers.
+        """
+        if DISPATCH_MODE == "batch":
+            from .batch_dispatch_service import batch_dispatcher
+            batch_dispatcher.submit(order_id)
+        else:
+            spawn_background(DispatchService.dispatch_order(order_id))
 
     @staticmethod
     async def dispatch_order(
@@ -22,17 +52,41 @@ class DispatchService:
         customer_longitude: Optional[float] = None,
     ):
         log.info("[dispatch] order_id=%s dispatch_order started", order_id)
-        if customer_latitude is not None and customer_longitude is not None:
-            DispatchService.ORDER_COORDS[order_id] = {
-                "lat": float(customer_latitude),
-                "lon": float(customer_longitude),
-            }
-        saved_coords = DispatchService.ORDER_COORDS.get(order_id)
 
+        prepared = await run_db(DispatchService.prepare_order, order_id)
+        if not prepared:
+            return
+        order_details, (rest_lat, rest_lon) = prepared
+
+        if not rider_index.warm:
+            await run_db(DispatchService.load_rider_index)
+        if not len(rider_index):
+            log.warning("[dispatch] order_id=%s no available riders", order_id)
+            return
+
+        attempted = set(await run_db(DispatchRepository.get_attempted_rider_ids, order_id))
+        nearest = PresenceService.nearest_live(
+            rest_lat, rest_lon,
+            k=DISPATCH_OFFER_COUNT,
+            radius_km=DISPATCH_SEARCH_RADIUS_KM,
+            exclude=attempted,
+        )
+        log.info("[dispatch] order_id=%s nearest riders=%s", order_id, [(r["rider_id"], round(r["distance_km"], 2)) for r in nearest])
+        if not nearest:
+            log.warning("[dispatch] order_id=%s no candidate after scoring", order_id)
+            return
+        if len(nearest) == 1:
+            await DispatchService.offer(order_id, order_details, nearest[0])
+        else:
+            await DispatchService.offer_many(order_id, order_details, nearest)
+
+    @staticmethod
+    def prepare_order(order_id: int) -> Optional[Tuple[Dict, Tuple[float, float]]]:
+        """Load order details, mark the order ready and return (order_details, restaurant coords)."""
         order_details = DispatchRepository.get_order_details(order_id)
         if not order_details:
             log.warning("[dispatch] order_id=%s get_order_details returned None", order_id)
-            return
+            return None
         log.info("[dispatch] order_id=%s order_details ok, restaurant_id=%s", order_id, order_details.get("restaurant_id"))
 
         # Set order status to "ready" so customer Order Progress shows "Finding a delivery rider"
@@ -42,6 +96,7 @@ class DispatchService:
                 "status": "ready",
                 "updated_at": datetime.utcnow().isoformat(),
             }).eq("id", order_id).execute()
+            DispatchRepository.invalidate_order_snapshot(order_id)
         except Exception:
             pass
 
@@ -51,89 +106,179 @@ class DispatchService:
         rest_lat = restaurant.get("latitude")
         rest_lon = restaurant.get("longitude")
         if rest_lat is None or rest_lon is None:
-            rest_lat, rest_lon = 16.87, 96.20
-
-        all_riders = DispatchRepository.get_available_riders()
-        if not all_riders:
-            log.warning("[dispatch] order_id=%s no available riders (get_available_riders empty)", order_id)
-            return
-        log.info("[dispatch] order_id=%s found %s available riders, user_ids=%s", order_id, len(all_riders), [r.get("user_id") for r in all_riders])
-
-        FALLBACK = 16.87, 96.20
-        attempted = set(DispatchRepository.get_attempted_rider_ids(order_id))
-        rider_scores = []
-        for rider in all_riders:
-            if rider["id"] in attempted:
-                continue
-            rlat = rider.get("current_latitude") or FALLBACK[0]
-            rlon = rider.get("current_longitude") or FALLBACK[1]
-            dist_rest = haversine_distance(
-                float(rest_lat), float(rest_lon), float(rlat), float(rlon)
-            )
-            dist_cust = None
-            score = dist_rest
-            rider_scores.append({
-                "rider_id": rider["id"],
-                "user_id": rider["user_id"],
-                "distance_to_restaurant": dist_rest,
-                "distance_to_customer": dist_cust,
-                "score": score,
-            })
-
-        rider_scores.sort(key=lambda x: x["score"])
-        order_items = order_details.get("order_items") or []
-        items_payload = []
-        for i in order_items:
-            mi = i.get("menu_items") or i.get("menu_item")
-            name = (mi.get("name") if isinstance(mi, dict) else None) or "Item"
-            items_payload.append({"name": name, "quantity": i.get("quantity", 0)})
+            rest_lat, rest_lon = FALLBACK_COORDS
+        return order_details, (float(rest_lat), float(rest_lon))
 
-        # Prepare customer info
-        customer_user = order_details.get("customer_user") or {}
-        customer_name = f"{customer_user.get('first_name', '')} {customer_user.get('last_name', '')}".strip() or "Customer"
-        
-        candidate = next((c for c in rider_scores), None)
-        if not candidate:
-            log.warning("[dispatch] order_id=%s no candidate after scoring", order_id)
-            return
-        request = DispatchRepository.create_dispatch_request(order_id, candidate["rider_id"], timeout_seconds=180)
+    @staticmethod
+    async def offer(order_id: int, order_details: Dict, candidate: Dict) -> Optional[Dict]:
+        """
+        Create a dispatch request for candidate ({"rider_id", "user_id", "distance_km"}),
+        push NEW_ORDER_REQUEST to the rider and start the timeout. Returns the request row.
+        """
+        request = await run_db(
+            DispatchRepository.create_dispatch_request,
+            order_id, candidate["rider_id"], timeout_seconds=DISPATCH_REQUEST_TIMEOUT_SECONDS,
+        )
         if not request:
             log.warning("[dispatch] order_id=%s create_dispatch_request failed for rider_id=%s", order_id, candidate["rider_id"])
-            return
-        payload = {
-            "type": "NEW_ORDER_REQUEST",
-            "request_id": request["id"],
-            "order_id": order_id,
-            "restaurant_name": restaurant.get("name", ""),
-            "restaurant_latitude": restaurant.get("latitude"),
-            "restaurant_longitude": restaurant.get("longitude"),
-            "items": items_payload,
-            "customer_name": customer_name,
-            "customer_phone": customer_user.get("phone"),
-            "delivery_address": order_details.get("delivery_address"),
-            "delivery_latitude": order_details.get("delivery_latitude"),
-            "delivery_longitude": order_details.get("delivery_longitude"),
-            "distance": round(candidate["distance_to_restaurant"], 2),
-            "distance_to_customer": round(candidate["distance_to_customer"], 2) if candidate.get("distance_to_customer") else 0,
-            "expires_at": request.get("expires_at"),
-        }
+            return None
+        await DispatchService.send_offer(order_details, request, candidate)
+        return request
+
+    @staticmethod
+    async def offer_many(order_id: int, order_details: Dict, candidates: List[Dict]) -> List[Dict]:
+        """
+        Offer the order to several riders at once (DISPATCH_OFFER_COUNT > 1).
+        The first rider to accept claims it; the other offers are expired on accept.
+        """
+        by_rider = {c["rider_id"]: c for c in candidates}
+        requests = await run_db(
+            DispatchRepository.create_dispatch_requests,
+            [(order_id, c["rider_id"]) for c in candidates],
+            timeout_seconds=DISPATCH_REQUEST_TIMEOUT_SECONDS,
+        )
+        await asyncio.gather(*(
+            DispatchService.send_offer(order_details, request, by_rider[int(request["rider_id"])])
+            for request in requests
+            if int(request["rider_id"]) in by_rider
+        ), return_exceptions=True)
+        log.info("[dispatch] order_id=%s offered to %s riders in parallel", order_id, len(requests))
+        return requests
+
+    @staticmethod
+    async def send_offer(order_details: Dict, request: Dict, candidate: Dict) -> bool:
+        """Push NEW_ORDER_REQUEST for an existing dispatch request and register its expiry."""
+        order_id = int(request["order_id"])
+        payload = DispatchService._build_request_payload(order_details, request, distance=candidate["distance_km"])
         user_id = candidate["user_id"]
         success = await manager.send_personal_message(payload, user_id)
         log.info("[dispatch] order_id=%s send_personal_message to user_id=%s -> %s", order_id, user_id, success)
-        asyncio.create_task(DispatchService._monitor_timeout(request["id"], order_id, timeout_seconds=180))
-        return
+        offer_notifier.notify(int(request["rider_id"]))
+        if request.get("expires_at"):
+            dispatch_expiry.track(request["id"], request["expires_at"], order_id)
+        return success
 
     @staticmethod
-    async def _monitor_timeout(request_id: int, order_id: int, timeout_seconds: int = 180):
-        await asyncio.sleep(timeout_seconds)
-        from ..supabase_client import supabase
-        try:
-            resp = supabase.table("dispatch_requests").select("status").eq("id", request_id).maybe_single().execute()
-            if resp.data and resp.data.get("status") == "pending":
-                supabase.table("dispatch_requests").update({"status": "rejected"}).eq("id", request_id).execute()
-                await DispatchService.dispatch_order(order_id)
-        except Exception:
-            pass
+    def load_rider_index() -> None:
+        """Cold start: fill the rider index from the available riders in the DB."""
+        riders = DispatchRepository.get_available_riders()
+        rider_index.load(
+            (r["id"], r.get("user_id"), *DispatchService.rider_coords(r))
+            for r in riders
+        )
+        log.info("[dispatch] rider index loaded with %s available riders", len(riders))
+
+    @staticmethod
+    def rider_coords(rider: Dict) -> tuple:
+        """Rider position, preferring a buffered GPS ping that has not been flushed to the row yet."""
+        rider = rider_locations.get(rider.get("id")) or rider
+        lat = rider.get("current_latitude")
+        lon = rider.get("current_longitude")
+        if lat is None or lon is None:
+            return FALLBACK_COORDS
+        return float(lat), float(lon)
+
+    @staticmethod
+    def track_rider_status(rider_id: int, status: str) -> None:
+        """Keep the rider index in step with availability changes."""
+        if status != "available":
+            rider_index.remove(rider_id)
+            return
+        if not rider_index.warm:
+            return  # next dispatch loads everything
+        rider = DeliveryRepository.get_rider_by_id(rider_id)
+        if rider:
+            rider_index.upsert(rider_id, rider.get("user_id"), *DispatchService.rider_coords(rider))
+
+    @staticmethod
+    async def start_expiry() -> None:
+        """Startup: rebuild the expiry heap from pending dispatch_requests.expires_at and start it."""
+        pending = await run_db(DispatchRepository.get_pending_expiries)
+        dispatch_expiry.load(
+            (r["id"], r["expires_at"], r.get("order_id"))
+            for r in pending
+            if r.get("expires_at")
+        )
+        dispatch_expiry.start()
+        log.info("[dispatch] expiry scheduler started with %s pending requests", len(pending))
+
+    @staticmethod
+    async def _expire_due(entries: List[Tuple[int, int]]) -> None:
+        # Conditional bulk update, so a request accepted at the last second is left alone.
+        expired = await run_db(DispatchRepository.expire_requests, [request_id for request_id, _ in entries])
+        await DispatchService._redispatch_expired(expired)
+
+    @staticmethod
+    async def _sweep_overdue() -> None:
+        await DispatchService._redispatch_expired(await run_db(DispatchRepository.expire_overdue_requests))
+
+    @staticmethod
+    async def _redispatch_expired(expired: List[Dict]) -> None:
+        """Re-dispatch each order whose last open offer just lapsed, a bounded number at a time."""
+        order_ids = list(dict.fromkeys(int(r["order_id"]) for r in expired if r.get("order_id") is not None))
+        if not order_ids:
+            return
+        log.info("[dispatch] %s offers expired, orders=%s", len(expired), order_ids)
+        await DispatchService.withdraw_offers(expired)
+        limit = asyncio.Semaphore(DISPATCH_REDISPATCH_CONCURRENCY)
+
+        async def redispatch(order_id: int) -> None:
+            async with limit:
+                if await run_db(DispatchRepository.has_pending_requests, order_id):
+                    return
+                if DISPATCH_MODE == "batch":
+                    DispatchService.schedule(order_id)
+                else:
+                    await DispatchService.dispatch_order(order_id)
+
+        await asyncio.gather(*(redispatch(o) for o in order_ids), return_exceptions=True)
+
+    @staticmethod
+    async def redispatch_if_idle(order_id: int) -> None:
+        """Re-dispatch once no offer for the order is still open (parallel offers lapse one by one)."""
+        if not await run_db(DispatchRepository.has_pending_requests, order_id):
+            DispatchService.schedule(order_id)
+
+    @staticmethod
+    async def withdraw_offers(requests: List[Dict]) -> None:
+        """Tell riders whose offers were expired (another rider took the order) to drop them."""
+        rider_ids = list({r["rider_id"] for r in requests if r.get("rider_id") is not None})
+        if not rider_ids:
+            return
+        user_ids = await run_db(DeliveryRepository.get_user_ids_by_rider_ids, rider_ids)
+        await asyncio.gather(*(
+            manager.send_personal_message(
+                {"type": "REQUEST_EXPIRED", "request_id": r["id"], "order_id": r.get("order_id")},
+                user_ids[r["rider_id"]],
+            )
+            for r in requests
+            if r.get("rider_id") in user_ids
+        ), return_exceptions=True)
+
+    @staticmethod
+    def distances_to_customers(rider_location: Optional[Dict], orders: List[Dict]) -> List[float]:
+        """Rider -> delivery point distance (km) for each order; 0.0 where coordinates are missing."""
+        out = [0.0] * len(orders)
+        if not rider_location:
+            return out
+        rlat = rider_location.get("current_latitude") or rider_location.get("latitude")
+        rlon = rider_location.get("current_longitude") or rider_location.get("longitude")
+        if rlat is None or rlon is None:
+            return out
+        known = [
+            i for i, o in enumerate(orders)
+            if o.get("delivery_latitude") is not None and o.get("delivery_longitude") is not None
+        ]
+        if not known:
+            return out
+        dists = haversine_distances(
+            float(rlat), float(rlon),
+            [float(orders[i]["delivery_latitude"]) for i in known],
+            [float(orders[i]["delivery_longitude"]) for i in known],
+        )
+        for i, d in zip(known, dists.tolist()):
+            out[i] = d
+        return out
 
     @staticmethod
     def _build_request_payload(
@@ -175,42 +320,47 @@ class DispatchService:
         }
 
     @staticmethod
-    async def send_pending_requests_for_rider(user_id: int, websocket: WebSocket) -> None:
+    async def send_pending_requests_for_rider(user_id: int, conn: Connection, rider: Optional[Dict] = None) -> None:
         """When rider connects, send any pending dispatch requests they have (so they see orders they missed)."""
-        from ..repositories.delivery_repo import DeliveryRepository
-        rider = DeliveryRepository.get_rider_by_user_id(user_id)
+        rider = rider or await run_db(DeliveryRepository.get_rider_by_user_id, user_id)
         if not rider:
             log.warning("[dispatch] send_pending: no rider for user_id=%s", user_id)
             return
         rider_id = rider.get("id")
         if not rider_id:
             return
-        pending = DispatchRepository.get_pending_requests_for_rider(rider_id)
+        pending = await run_db(DispatchRepository.get_pending_requests_for_rider, rider_id)
         log.info("[dispatch] send_pending: user_id=%s rider_id=%s pending_count=%s", user_id, rider_id, len(pending))
-        for req in pending:
-            order_id = req.get("order_id")
-            if not order_id:
-                continue
-            order_details = DispatchRepository.get_order_details(order_id)
-            if not order_details:
-                continue
-            
-            # Calculate distance to customer if coordinates are available
-            distance_to_customer = 0.0
-            rider_location = DeliveryRepository.get_rider_location(rider_id)
-            if rider_location and order_details.get("delivery_latitude") and order_details.get("delivery_longitude"):
-                rlat = rider_location.get("current_latitude") or rider_location.get("latitude")
-                rlon = rider_location.get("current_longitude") or rider_location.get("longitude")
-                if rlat is not None and rlon is not None:
-                    distance_to_customer = haversine_distance(
-                        float(rlat),
-                        float(rlon),
-                        float(order_details["delivery_latitude"]),
-                        float(order_details["delivery_longitude"])
-                    )
-            
-            payload = DispatchService._build_request_payload(order_details, req, distance=distance_to_customer)
-            try:
-                await websocket.send_text(json.dumps(payload))
-            except Exception:
+        # The rider row already carries current_latitude/current_longitude
+        payloads = await run_db(DispatchService.pending_request_payloads, pending, rider_locations.get(rider_id) or rider)
+        for payload in payloads:
+            if not conn.send(payload):
                 break
+
+    @staticmethod
+    def pending_request_payloads(pending: List[Dict], rider_location: Optional[Dict] = None, rider_id: Optional[int] = None) -> List[Dict]:
+        """
+        NEW_ORDER_REQUEST payloads for a rider's pending requests in a constant number of queries:
+        one batched order snapshot load, plus the rider location if it was not passed in.
+        """
+        snapshots = DispatchRepository.get_order_details_many(r["order_id"] for r in pending if r.get("order_id"))
+        found = [(req, snapshots[req["order_id"]]) for req in pending if req.get("order_id") in snapshots]
+        if not found:
+            return []
+        if rider_location is None and rider_id is not None:
+            rider_location = LocationService.get(rider_id)
+        distances = DispatchService.distances_to_customers(rider_location, [d for _, d in found])
+        return [
+            DispatchService._build_request_payload(order_details, req, distance=distance_to_customer)
+            for (req, order_details), distance_to_customer in zip(found, distances)
+        ]
+
+
+# rider_id -> long-poll waiters on GET /delivery/requests/wait, woken when an offer is sent.
+offer_notifier = KeyedNotifier()
+
+dispatch_expiry = ExpiryScheduler(
+    on_due=DispatchService._expire_due,
+    on_sweep=DispatchService._sweep_overdue,
+    sweep_interval=DISPATCH_EXPIRY_SWEEP_SECONDS,
+)
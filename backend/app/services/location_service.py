@@ -0,0 +1,52 @@
+"""
+Rider last-known locations: served from memory, written to riders in bulk (write-behind).
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..core.config import RIDER_LOCATION_FLUSH_SECONDS
+from ..core.location_frames import Point
+from ..core.location_store import LocationStore
+from ..core.rider_index import rider_index
+from ..repositories.delivery_repo import DeliveryRepository
+
+rider_locations = LocationStore(DeliveryRepository.bulk_update_rider_locations, RIDER_LOCATION_FLUSH_SECONDS)
+
+
+class LocationService:
+    @staticmethod
+    def writes_through() -> bool:
+        """True when record() writes to the DB before returning (RIDER_LOCATION_FLUSH_SECONDS <= 0): async callers use run_db."""
+        return rider_locations.flush_interval <= 0
+
+    @staticmethod
+    def record(rider_id: int, latitude: float, longitude: float, at: Optional[datetime] = None) -> None:
+        """Take a GPS ping: update the in-memory store and the dispatch index; the DB write is deferred."""
+        row = rider_locations.record(rider_id, latitude, longitude, at)
+        rider_index.update_location(rider_id, row["current_latitude"], row["current_longitude"])
+
+    @staticmethod
+    def record_points(rider_id: int, points: List[Point]) -> int:
+        """
+        Take a batch of timestamped points (e.g. from a WebSocket location frame).
+        Client clocks are not trusted to be ahead of ours, so timestamps are capped at now.
+        """
+        if not points:
+            return 0
+        now = datetime.utcnow()
+        row = None
+        for lat, lon, at in sorted(points, key=lambda p: p[2] or now):
+            row = rider_locations.record(rider_id, lat, lon, min(at or now, now))
+        rider_index.update_location(rider_id, row["current_latitude"], row["current_longitude"])
+        return len(points)
+
+    @staticmethod
+    def get(rider_id: int) -> Optional[Dict]:
+        """Last known {"current_latitude", "current_longitude", ...}; falls back to the riders row."""
+        loc = rider_locations.get(rider_id)
+        if loc:
+            return loc
+        loc = DeliveryRepository.get_rider_location(rider_id)
+        if loc and loc.get("current_latitude") is not None and loc.get("current_longitude") is not None:
+            rider_locations.seed(rider_id, loc["current_latitude"], loc["current_longitude"])
+        return loc
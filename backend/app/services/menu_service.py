@@ -1,5 +1,9 @@
 from typing import List, Optional
 from ..supabase_client import supabase
+from ..core.catalog_cache import CachedDocument, menu_cache, model_bytes
+from ..models.menu_models import MenuWithItemsResponse
+
+_MENUS_BODY = model_bytes(List[MenuWithItemsResponse])
 
 
 class MenuService:
@@ -20,6 +24,7 @@ class MenuService:
         data = {"restaurant_id": restaurant_id, "name": name}
         try:
             resp = supabase.table("menus").insert(data).execute()
+            menu_cache.invalidate(restaurant_id)
             return resp.data[0] if resp.data else None
         except Exception:
             return None
@@ -37,6 +42,13 @@ class MenuService:
             category["items"] = [item for item in items if item["menu_id"] == category["id"]]
         return categories
 
+    @staticmethod
+    def get_menus_with_items_json(restaurant_id: int) -> CachedDocument:
+        """get_menus_with_items as a response body, from the menu cache when current."""
+        return menu_cache.get_or_build(
+            "restaurant_menus", restaurant_id, lambda: MenuService.get_menus_with_items(restaurant_id), _MENUS_BODY
+        )
+
     @staticmethod
     def add_menu_item(menu_id: int, item_data: dict) -> Optional[dict]:
         data = {
@@ -48,7 +60,9 @@ class MenuService:
             "image_url": item_data.get("image_url"),
         }
         try:
+            restaurant_id = MenuService.get_restaurant_id_for_menu(menu_id)
             resp = supabase.table("menu_items").insert(data).execute()
+            menu_cache.invalidate(restaurant_id)
             return resp.data[0] if resp.data else None
         except Exception:
             return None
@@ -59,7 +73,9 @@ class MenuService:
         if not cleaned:
             return None
         try:
+            restaurant_id = MenuService.get_restaurant_id_for_item(item_id)
             resp = supabase.table("menu_items").update(cleaned).eq("id", item_id).execute()
+            menu_cache.invalidate(restaurant_id)
             return resp.data[0] if resp.data else None
         except Exception:
             return None
@@ -67,7 +83,9 @@ class MenuService:
     @staticmethod
     def delete_menu_item(item_id: int) -> bool:
         try:
+            restaurant_id = MenuService.get_restaurant_id_for_item(item_id)
             resp = supabase.table("menu_items").delete().eq("id", item_id).execute()
+            menu_cache.invalidate(restaurant_id)
             return bool(resp.data)
         except Exception:
             return False
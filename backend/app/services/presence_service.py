@@ -0,0 +1,118 @@
+"""
+Rider presence: which available riders still have the app open.
+
+Rider sockets get a PING every RIDER_HEARTBEAT_SECONDS and the app answers
+PONG; that, location frames and long polls count as heartbeats. Dispatch
+only offers orders to live riders, and riders silent for
+RIDER_PRESENCE_TIMEOUT_SECONDS are set unavailable in one bulk update (and
+made available again if they come back). Available riders never heard from
+since startup are only downgraded with RIDER_PRESENCE_DOWNGRADE_SILENT=1:
+app builds that predate PING would otherwise all be taken offline.
+
+Presence is per process. With a cross-worker broker (WS_BROKER=unix) a rider
+may be connected to another worker, so filtering and downgrades are off.
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from ..core.config import RIDER_HEARTBEAT_SECONDS, RIDER_PRESENCE_DOWNGRADE_SILENT, RIDER_PRESENCE_TIMEOUT_SECONDS
+from ..core.db_executor import run_db
+from ..core.presence import PresenceTracker
+from ..core.rider_index import rider_index
+from ..core.websocket_manager import manager
+from ..repositories.delivery_repo import DeliveryRepository
+
+log = logging.getLogger(__name__)
+
+
+class PresenceService:
+    @staticmethod
+    def enabled() -> bool:
+        return RIDER_PRESENCE_TIMEOUT_SECONDS > 0 and manager.single_process
+
+    @staticmethod
+    def heartbeat(rider_id: Optional[int]) -> bool:
+        """
+        Record a sign of life. True when the rider had been downgraded for going
+        silent and should be made available again with restore().
+        """
+        if rider_id is None:
+            return False
+        return rider_presence.seen(int(rider_id)) and PresenceService.enabled()
+
+    @staticmethod
+    def restore(rider_id: int) -> None:
+        """Make a rider that came back available again (blocking: async callers use run_db)."""
+        restored = DeliveryRepository.set_riders_status([int(rider_id)], "available", from_status="unavailable")
+        if restored:
+            from .dispatch_service import DispatchService
+            DispatchService.track_rider_status(int(rider_id), "available")
+            log.info("[presence] rider_id=%s is back, available again", rider_id)
+
+    @staticmethod
+    def went_offline(rider_id: int) -> None:
+        """The rider set themselves unavailable: stop tracking without treating it as a dropout."""
+        rider_presence.forget(int(rider_id))
+
+    @staticmethod
+    def is_live(rider_id: int) -> bool:
+        if not PresenceService.enabled() or rider_presence.warming_up:
+            return True
+        return rider_presence.is_live(int(rider_id))
+
+    @staticmethod
+    def nearest_live(lat: float, lon: float, k: int, **kwargs) -> List[Dict]:
+        """
+        rider_index.nearest() restricted to live riders. Counts how many of the
+        unfiltered top k were dead riders (offers avoided).
+        """
+        if not PresenceService.enabled() or rider_presence.warming_up:
+            return rider_index.nearest(lat, lon, k=k, **kwargs)
+        now = time.monotonic()
+        dead: List[Dict] = []
+
+        def live(candidate: Dict) -> bool:
+            if rider_presence.is_live(candidate["rider_id"], now):
+                return True
+            dead.append(candidate)
+            return False
+
+        found = rider_index.nearest(lat, lon, k=k, where=live, **kwargs)
+        if dead:
+            dead_ids = {c["rider_id"] for c in dead}
+            unfiltered = sorted(found + dead, key=lambda c: c["distance_km"])[:k]
+            avoided = sum(1 for c in unfiltered if c["rider_id"] in dead_ids)
+            rider_presence.offers_avoided += avoided
+            if avoided:
+                log.info("[presence] skipped %s riders without a live connection", avoided)
+        return found
+
+    @staticmethod
+    async def _tick() -> None:
+        manager.broadcast_local("rider", {"type": "PING", "ts": int(time.time() * 1000)})
+        if RIDER_PRESENCE_DOWNGRADE_SILENT and PresenceService.enabled() and not rider_presence.warming_up:
+            # Indexed (available) riders that never sent a heartbeat since startup.
+            silent = [r for r in rider_index.rider_ids() if r not in rider_presence]
+            if silent:
+                rider_presence.mark_expired(silent)
+                await PresenceService._downgrade(silent)
+
+    @staticmethod
+    async def _downgrade(rider_ids: List[int]) -> None:
+        """Bulk: riders not heard from in time go unavailable and leave the dispatch index."""
+        if not PresenceService.enabled():
+            return
+        changed = await run_db(DeliveryRepository.set_riders_status, rider_ids, "unavailable", from_status="available")
+        for rider_id in changed:
+            rider_index.remove(rider_id)
+        if changed:
+            log.info("[presence] %s silent riders set unavailable: %s", len(changed), changed)
+
+
+rider_presence = PresenceTracker(
+    timeout=RIDER_PRESENCE_TIMEOUT_SECONDS,
+    interval=RIDER_HEARTBEAT_SECONDS,
+    on_tick=PresenceService._tick,
+    on_stale=PresenceService._downgrade,
+)
@@ -1,8 +1,10 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from ..supabase_client import supabase
+from ..core.db_executor import run_db
 from ..core.websocket_manager import manager
+from ..repositories import loaders
+from ..repositories.dispatch_repo import DispatchRepository
 from datetime import datetime
-import asyncio
 
 VALID_TRANSITIONS = {
     "pending": ["confirmed", "cancelled"],
@@ -22,32 +24,43 @@ class RestaurantService:
                 "*, order_items(*, menu_items(name))"
             ).eq("restaurant_id", restaurant_id).order("created_at", desc=True).execute()
             orders = resp.data or []
+            customers = loaders.customer_contacts().load_many(o.get("user_id") for o in orders)
             for order in orders:
-                uid = order.get("user_id")
-                if uid:
-                    u = supabase.table("users").select("first_name, last_name, phone").eq("id", uid).maybe_single().execute()
-                    if u.data:
-                        order["customer"] = u.data
+                customer = customers.get(order.get("user_id"))
+                if customer:
+                    order["customer"] = {k: customer.get(k) for k in loaders.CUSTOMER_CONTACT_COLUMNS}
             return orders
         except Exception:
             return []
 
+    @staticmethod
+    def _apply_status(
+        order_id: int, new_status: str, restaurant_id: int
+    ) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """Validate and write the transition; (order before, order after), or None if not found."""
+        order_resp = supabase.table("orders").select("*").eq("id", order_id).eq("restaurant_id", restaurant_id).maybe_single().execute()
+        if not order_resp.data:
+            return None
+        order = order_resp.data
+        current = order.get("status", "pending")
+        allowed = VALID_TRANSITIONS.get(current, [])
+        if new_status not in allowed:
+            raise ValueError(f"Cannot move from '{current}' to '{new_status}'")
+        supabase.table("orders").update({"status": new_status}).eq("id", order_id).execute()
+        DispatchRepository.invalidate_order_snapshot(order_id)
+        updated = supabase.table("orders").select("*").eq("id", order_id).maybe_single().execute()
+        return order, updated.data
+
     @staticmethod
     async def update_order_status(
         order_id: int, new_status: str, restaurant_id: int
     ) -> Optional[Dict[str, Any]]:
         try:
-            order_resp = supabase.table("orders").select("*").eq("id", order_id).eq("restaurant_id", restaurant_id).maybe_single().execute()
-            if not order_resp.data:
+            applied = await run_db(RestaurantService._apply_status, order_id, new_status, restaurant_id)
+            if not applied:
                 return None
-            order = order_resp.data
-            current = order.get("status", "pending")
-            allowed = VALID_TRANSITIONS.get(current, [])
-            if new_status not in allowed:
-                raise ValueError(f"Cannot move from '{current}' to '{new_status}'")
-            supabase.table("orders").update({"status": new_status}).eq("id", order_id).execute()
-            updated = supabase.table("orders").select("*").eq("id", order_id).maybe_single().execute()
-            if updated.data and order.get("user_id"):
+            order, updated = applied
+            if updated and order.get("user_id"):
                 await manager.send_to_customer(order["user_id"], {
                     "type": "ORDER_STATUS_UPDATE",
                     "order_id": order_id,
@@ -56,8 +69,8 @@ class RestaurantService:
                 })
             if new_status == "ready":
                 from ..services.dispatch_service import DispatchService
-                asyncio.create_task(DispatchService.dispatch_order(order_id))
-            return updated.data
+                DispatchService.schedule(order_id)
+            return updated
         except ValueError:
             raise
         except Exception:
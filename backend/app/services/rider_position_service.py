@@ -0,0 +1,81 @@
+"""
+Live rider position for customers: each location ping from a rider on an
+active delivery is pushed to the customer's sockets as
+
+    {"type": "RIDER_LOCATION", "order_id", "p" | "d": [..], "t"}
+
+throttled and delta-encoded per order (see core/position_throttle.py), so
+the tracking page no longer polls GET /delivery/location.
+
+Positions are transient: they are not sequenced or kept in the replay
+buffer, which stays for status messages. A client that missed some waits for
+the next keyframe; when nobody was listening, the next update is one.
+"""
+import logging
+from typing import Dict, List
+
+from ..core.config import (
+    RIDER_POSITION_KEYFRAME_EVERY,
+    RIDER_POSITION_MIN_INTERVAL_SECONDS,
+    RIDER_POSITION_MIN_MOVE_METERS,
+)
+from ..core.db_executor import run_db
+from ..core.position_throttle import PositionThrottle
+from ..core.ttl_cache import TTLCache
+from ..core.websocket_manager import manager
+from ..repositories.delivery_repo import DeliveryRepository
+
+log = logging.getLogger(__name__)
+
+# rider_id -> [{"order_id", "user_id"}] for deliveries not finished yet; updated on accept / deliver.
+active_deliveries = TTLCache(60, max_entries=5000)
+
+
+class RiderPositionService:
+    @staticmethod
+    def deliveries_for(rider_id: int) -> List[Dict]:
+        cached = active_deliveries.get(rider_id)
+        if cached is None:
+            cached = DeliveryRepository.get_active_deliveries_for_rider(rider_id)
+            active_deliveries.set(rider_id, cached)
+        return cached
+
+    @staticmethod
+    def delivery_started(rider_id: int, order_id: int, customer_user_id: int) -> None:
+        current = [d for d in RiderPositionService.deliveries_for(rider_id) if d["order_id"] != order_id]
+        active_deliveries.set(rider_id, current + [{"order_id": order_id, "user_id": customer_user_id}])
+
+    @staticmethod
+    def delivery_finished(rider_id: int, order_id: int) -> None:
+        cached = active_deliveries.get(rider_id)
+        if cached is not None:
+            active_deliveries.set(rider_id, [d for d in cached if d["order_id"] != order_id])
+        rider_positions.forget(order_id)
+
+    @staticmethod
+    async def publish(rider_id: int, latitude: float, longitude: float) -> int:
+        """Push the rider's position to the customer of every active delivery. Returns updates sent."""
+        deliveries = active_deliveries.get(rider_id)
+        if deliveries is None:
+            deliveries = await run_db(RiderPositionService.deliveries_for, rider_id)
+        sent = 0
+        for delivery in deliveries:
+            update = rider_positions.offer(delivery["order_id"], latitude, longitude)
+            if update is None:
+                continue
+            delivered = await manager.send_to_customer(
+                int(delivery["user_id"]),
+                {"type": "RIDER_LOCATION", "order_id": delivery["order_id"], **update},
+                replay=False,
+            )
+            if not delivered:
+                rider_positions.forget(delivery["order_id"])  # start the next subscriber with a keyframe
+            sent += 1
+        return sent
+
+
+rider_positions = PositionThrottle(
+    min_interval=RIDER_POSITION_MIN_INTERVAL_SECONDS,
+    min_move_m=RIDER_POSITION_MIN_MOVE_METERS,
+    keyframe_every=RIDER_POSITION_KEYFRAME_EVERY,
+)
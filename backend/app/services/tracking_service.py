@@ -0,0 +1,105 @@
+"""
+Per-order tracking over Server-Sent Events.
+
+The stream sends the full tracking document once ("snapshot") and then
+only "delta" events (top-level fields that changed):
+- status changes, from the ORDER_STATUS_UPDATE messages already pushed to
+  the customer's sockets (the stream registers as one of them);
+- rider assignment, where the delivery and rider fields are re-read once;
+- rider position, from the RIDER_LOCATION pushes (decoded to absolute
+  coordinates here, since SSE clients are expected to be simple).
+
+Event ids are the customer message seq, so a client reconnecting with
+Last-Event-ID gets just the status events it missed, or a fresh snapshot
+when they are no longer buffered. Positions are not sequenced: they carry
+no id, and a reconnecting stream starts from the current position.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from ..core.config import TRACKING_SSE_KEEPALIVE_SECONDS
+from ..core.db_executor import run_db
+from ..core.position_throttle import E6, decode_position
+from ..core.sse import CLOSED, QueueSocket, diff, event_id, format_event, parse_event_id
+from ..core.websocket_manager import manager
+from .location_service import rider_locations
+
+log = logging.getLogger(__name__)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # no proxy buffering of the stream
+FINAL_STATUSES = ("delivered", "cancelled")
+# Statuses after which delivery / rider fields exist or change.
+RIDER_STATUSES = ("rider_assigned", "picked_up")
+
+
+class TrackingService:
+    @staticmethod
+    def _rider_position(doc: Dict) -> Optional[Dict]:
+        rider = doc.get("rider") or {}
+        rider_id = rider.get("id") or (doc.get("delivery") or {}).get("rider_id")
+        loc = rider_locations.get(rider_id) if rider_id else None
+        if not loc:
+            return None
+        return {
+            "latitude": loc["current_latitude"],
+            "longitude": loc["current_longitude"],
+            "at": loc.get("last_location_update") or None,
+        }
+
+    @staticmethod
+    async def stream(
+        order_id: int,
+        user_id: int,
+        snapshot: Callable[[], Optional[Dict]],
+        last_event_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        SSE body for one order. snapshot() builds the full tracking document (it runs
+        on the DB pool); it is called once, and again only when a rider is assigned.
+        """
+        last_seq, epoch = parse_event_id(last_event_id)
+        sock = QueueSocket()
+        await manager.connect_customer(user_id, sock, last_seq, epoch)
+        try:
+            sync = await sock.queue.get()
+            resumed = sync.get("resumed", False)
+            doc = await run_db(snapshot) or {}
+            if not resumed:
+                yield format_event(doc, event="snapshot", event_id=event_id(sync["epoch"], sync["seq"]))
+            position = TrackingService._rider_position(doc)
+            if position:
+                yield format_event({"rider_location": position}, event="delta")
+            base = None  # last decoded [lat_e6, lon_e6]
+            while doc.get("status") not in FINAL_STATUSES:
+                try:
+                    message = await asyncio.wait_for(sock.queue.get(), timeout=TRACKING_SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"  # comment line: keeps proxies from closing an idle stream
+                    continue
+                if message is CLOSED:
+                    break
+                if message.get("order_id") != order_id:
+                    continue
+                if message.get("type") == "RIDER_LOCATION":
+                    base = decode_position(base, message)
+                    if base is not None:
+                        at = datetime.utcfromtimestamp(message["t"] / 1000).isoformat() if message.get("t") else None
+                        position = {"latitude": base[0] / E6, "longitude": base[1] / E6, "at": at}
+                        yield format_event({"rider_location": position}, event="delta")
+                elif message.get("type") == "ORDER_STATUS_UPDATE":
+                    status = message.get("status")
+                    delta = {"status": status}
+                    if message.get("timestamp"):
+                        delta["updated_at"] = message["timestamp"]
+                    if status in RIDER_STATUSES and not doc.get("rider"):
+                        fresh = await run_db(snapshot)
+                        if fresh:
+                            delta = {**diff(doc, fresh), **delta}
+                    doc.update(delta)
+                    yield format_event(delta, event="delta", event_id=event_id(sync["epoch"], message["seq"]))
+            if doc.get("status") in FINAL_STATUSES:
+                yield format_event({"status": doc["status"]}, event="end")
+        finally:
+            manager.disconnect_customer(user_id, sock)
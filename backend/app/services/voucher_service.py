@@ -0,0 +1,204 @@
+"""
+Voucher validation from an in-memory rule table.
+
+Checkout screens validate the code as it is typed, so most checks are for
+codes that do not exist. Each worker keeps:
+
+- a Bloom filter over every active code, so an unknown code is rejected
+  without a query;
+- compiled rules (VoucherRule: dates parsed once), LRU-bounded, for codes
+  that pass the filter. A filter false positive is remembered as "no such
+  voucher" after one lookup.
+
+Every VOUCHER_RULES_REFRESH_SECONDS the vouchers changed since the last poll
+are fetched, paged on (updated_at, id); the trigger in
+supabase/vouchers_updated_at_trigger.sql sets updated_at on every UPDATE.
+The poll starts VOUCHER_RULES_OVERLAP_SECONDS before its marker, so a
+transaction that commits after a later-stamped one is still seen; rows
+already applied at the same updated_at are skipped. Changed rows replace
+their compiled rules, and codes that became active join the filter.
+The filter can't forget codes, so it is rebuilt every
+VOUCHER_BLOOM_REBUILD_SECONDS, or sooner once it fills up; deleted vouchers
+drop out then.
+
+Validation answers may therefore lag writes by the refresh interval.
+Redemption at checkout (VoucherRepository.redeem) always checks the database.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..core.bloom import BloomFilter
+from ..core.config import (VOUCHER_BLOOM_REBUILD_SECONDS, VOUCHER_RULES_MAX_ENTRIES, VOUCHER_RULES_OVERLAP_SECONDS,
+                           VOUCHER_RULES_REFRESH_SECONDS)
+from ..repositories.voucher_repo import VoucherRepository, VoucherRule, _parse_time
+
+_UNKNOWN = object()
+
+
+def _key(row: Dict) -> Tuple[str, int]:
+    return row.get("updated_at"), row.get("id")
+
+
+class VoucherRuleCache:
+    page_size = 1000
+
+    def __init__(self, refresh_seconds: float, rebuild_seconds: float, max_rules: int = 10000,
+                 overlap_seconds: float = VOUCHER_RULES_OVERLAP_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.max_rules = max_rules
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._bloom: Optional[BloomFilter] = None
+        self._rules: "OrderedDict[str, Optional[VoucherRule]]" = OrderedDict()  # code -> rule; None: no such voucher
+        self._marker: Optional[Tuple[str, int]] = None  # (updated_at, id) of the newest change applied
+        self._applied: Dict[int, str] = {}  # id -> updated_at applied, for rows inside the overlap window
+        self._generation = 0  # bumped whenever changes are applied; a lookup racing one is not stored
+        self._checked = float("-inf")  # monotonic time of the last poll
+        self._built = float("-inf")
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self.rejected = 0  # answered by the filter alone
+        self.hits = 0
+        self.lookups = 0
+
+    def validate(self, code: str, subtotal_cents: int, restaurant_id: Optional[int] = None) -> tuple[Optional[Dict], Optional[str]]:
+        """Same contract as VoucherRepository.validate."""
+        key = (code or "").strip().upper()
+        if not key:
+            return None, "Invalid voucher code"
+        self.refresh()
+        rule = self._rule(key)
+        if rule is None:
+            return None, "Invalid voucher code"
+        return rule.check(subtotal_cents, restaurant_id)
+
+    def _rule(self, key: str) -> Optional[VoucherRule]:
+        with self._lock:
+            if self._bloom is not None and key not in self._bloom:
+                self.rejected += 1
+                return None
+            rule = self._rules.get(key, _UNKNOWN)
+            if rule is not _UNKNOWN:
+                self._rules.move_to_end(key)
+                self.hits += 1
+                return rule
+            self.lookups += 1
+            generation = self._generation
+        row = VoucherRepository.get_by_code(key)
+        rule = VoucherRule(row) if row else None
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, rule)
+        return rule
+
+    def _store(self, key: str, rule: Optional[VoucherRule]) -> None:
+        self._rules[key] = rule
+        self._rules.move_to_end(key)
+        while len(self._rules) > self.max_rules:
+            self._rules.popitem(last=False)
+
+    def refresh(self, force: bool = False) -> None:
+        """Apply changes since the last poll, or rebuild; at most once per refresh interval unless forced."""
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_seconds:
+            return
+        if not self._refreshing.acquire(blocking=force):
+            return  # another request is already refreshing
+        try:
+            self._checked = now
+            full = self._bloom is None or now - self._built >= self.rebuild_seconds or self._bloom.count > self._bloom.capacity
+            if full:
+                self._rebuild(now)
+            else:
+                self._apply_changes()
+        finally:
+            self._refreshing.release()
+
+    def _rebuild(self, now: float) -> None:
+        marker = VoucherRepository.get_latest_update()  # read first: changes made during the load are replayed
+        codes = VoucherRepository.get_active_codes()
+        if codes is None:
+            return  # table unavailable: keep validating through the database
+        bloom = BloomFilter.of((c.strip().upper() for c in codes), headroom=2)
+        with self._lock:
+            self._bloom = bloom
+            self._rules.clear()
+            self._generation += 1
+            self._marker = marker
+            self._applied.clear()
+            self._built = now
+
+    def _apply_changes(self) -> None:
+        start = _parse_time(self._marker[0]) if self._marker else None
+        after = ((start - self.overlap).isoformat(), 0) if start else self._marker
+        rows: List[Dict] = []
+        while True:
+            page = VoucherRepository.get_changed_since(after, self.page_size)
+            if page is None:
+                return  # retried from the same marker next poll
+            rows += page
+            if len(page) < self.page_size:
+                break
+            after = _key(page[-1])
+        fresh = [r for r in rows if self._applied.get(r.get("id")) != r.get("updated_at")]
+        with self._lock:
+            if fresh:
+                self._generation += 1
+            for row in fresh:
+                self._applied[row.get("id")] = row.get("updated_at")
+                rule = VoucherRule(row)
+                if not rule.code:
+                    continue
+                if rule.is_active and rule.code not in self._bloom:
+                    self._bloom.add(rule.code)
+                if rule.is_active or rule.code in self._rules:
+                    self._store(rule.code, rule)
+            if rows and (start is None or _parse_time(rows[-1].get("updated_at")) >= start):
+                self._marker = _key(rows[-1])
+            horizon = _parse_time(self._marker[0]) - self.overlap if self._marker else None
+            if horizon:
+                self._applied = {i: at for i, at in self._applied.items() if _parse_time(at) >= horizon}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "codes": self._bloom.count if self._bloom else None,
+                "filter_bytes": self._bloom.size_bytes if self._bloom else 0,
+                "rules": len(self._rules),
+                "rejected": self.rejected,
+                "hits": self.hits,
+                "lookups": self.lookups,
+            }
+
+
+voucher_rules = VoucherRuleCache(VOUCHER_RULES_REFRESH_SECONDS, VOUCHER_BLOOM_REBUILD_SECONDS, VOUCHER_RULES_MAX_ENTRIES)
+
+
+class VoucherService:
+    @staticmethod
+    def validate(code: str, subtotal_cents: int, restaurant_id: Optional[int] = None) -> tuple[Optional[Dict], Optional[str]]:
+        return voucher_rules.validate(code, subtotal_cents, restaurant_id)
+
+    @staticmethod
+    def validate_many(codes: Iterable[str], subtotal_cents: int, restaurant_id: Optional[int] = None) -> Dict[str, Any]:
+        """One result per distinct code (in the order given) for the same cart, and the valid code with the largest discount."""
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for code in codes:
+            key = (code or "").strip().upper()
+            if key in seen:
+                continue
+            seen.add(key)
+            voucher, err = voucher_rules.validate(key, subtotal_cents, restaurant_id)
+            results.append({
+                "code": key,
+                "valid": err is None,
+                "discount_cents": voucher["discount_cents"] if voucher else 0,
+                "message": err or "Voucher applied",
+            })
+        valid = [r for r in results if r["valid"]]
+        best = max(valid, key=lambda r: r["discount_cents"]) if valid else None
+        return {"results": results, "best_code": best["code"] if best else None}
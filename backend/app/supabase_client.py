@@ -9,6 +9,8 @@ from supabase import create_client, Client
 
 load_dotenv()  # automatically finds backend/.env
 
+SUPABASE_FAKE = os.getenv("SUPABASE_FAKE", "").lower() in ("1", "true", "yes")  # in-memory client (core/fake_supabase.py), no network
+SUPABASE_FAKE_LATENCY_MS = float(os.getenv("SUPABASE_FAKE_LATENCY_MS", "0"))  # simulated round trip per fake request
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
@@ -16,10 +18,15 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 print(f"URL: {SUPABASE_URL}")
 print(f"Key starts with: {SUPABASE_KEY[:10] if SUPABASE_KEY else 'None'}...")
 
-if not SUPABASE_URL:
-    raise ValueError("SUPABASE_URL is not set")
-if not SUPABASE_KEY:
-    raise ValueError("SUPABASE_KEY is not set")
+if SUPABASE_FAKE:
+    from .core.fake_supabase import FakeSupabase
 
-# Initialize the client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+    supabase: Client = FakeSupabase(latency=SUPABASE_FAKE_LATENCY_MS / 1000)
+else:
+    if not SUPABASE_URL:
+        raise ValueError("SUPABASE_URL is not set")
+    if not SUPABASE_KEY:
+        raise ValueError("SUPABASE_KEY is not set")
+
+    # Initialize the client
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
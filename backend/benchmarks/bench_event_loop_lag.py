@@ -0,0 +1,83 @@
+"""
+Event-loop lag while async handlers make blocking DB calls.
+
+A ticker task asks to wake every TICK_MS and records how late it actually
+ran; meanwhile concurrent "requests" each make CALLS blocking calls of
+CALL_MS (time.sleep standing in for a supabase HTTP round trip), either
+inline on the loop (how async routes used to call the sync client) or via
+run_db on the bounded DB pool. Lag is what every WebSocket, SSE stream and
+timer on the worker waits on top of its own work; a starved loop also shows
+up as far fewer ticks than elapsed / TICK_MS. No server or Supabase needed.
+From backend dir: python benchmarks/bench_event_loop_lag.py [requests]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core import db_executor
+from app.core.db_executor import run_db
+
+TICK_MS = 5
+CALL_MS = 20
+CALLS = 3  # e.g. order, items, delivery lookups in one handler
+
+
+def blocking_query():
+    time.sleep(CALL_MS / 1000)
+
+
+async def handler_inline():
+    for _ in range(CALLS):
+        blocking_query()
+        await asyncio.sleep(0)
+
+
+async def handler_offloaded():
+    for _ in range(CALLS):
+        await run_db(blocking_query)
+
+
+async def ticker(lags_ms, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        due = loop.time() + TICK_MS / 1000
+        await asyncio.sleep(TICK_MS / 1000)
+        lags_ms.append(max(0.0, (loop.time() - due) * 1000))
+
+
+async def run(handler, n):
+    lags_ms, stop = [], asyncio.Event()
+    tick = asyncio.create_task(ticker(lags_ms, stop))
+    await asyncio.sleep(TICK_MS / 1000 * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    return lags_ms, elapsed
+
+
+def summarize(name, lags_ms, elapsed, n):
+    lags_ms = sorted(lags_ms)
+    print(
+        f"{name:<10} ticks={len(lags_ms):<5} lag p50={statistics.median(lags_ms):7.1f}ms "
+        f"p99={lags_ms[int(len(lags_ms) * 0.99) - 1]:7.1f}ms max={lags_ms[-1]:7.1f}ms  "
+        f"{n} requests in {elapsed * 1000:7.1f}ms"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{n} concurrent requests x {CALLS} blocking calls of {CALL_MS}ms, "
+          f"DB pool of {db_executor.stats()['max_workers']}")
+    summarize("inline", *asyncio.run(run(handler_inline, n)), n)
+    summarize("run_db", *asyncio.run(run(handler_offloaded, n)), n)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Micro-benchmark: scalar haversine_distance loop vs the NumPy batch API.
+No server or Supabase needed.
+From backend dir: python benchmarks/bench_location_utils.py [n_riders]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.location_utils import haversine_distance, haversine_distances, haversine_matrix
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(42)
+    lats = [16.7 + rng.random() * 0.4 for _ in range(n)]
+    lons = [96.0 + rng.random() * 0.4 for _ in range(n)]
+    origin = (16.87, 96.20)
+    orders = 50
+    olats = [16.7 + rng.random() * 0.4 for _ in range(orders)]
+    olons = [96.0 + rng.random() * 0.4 for _ in range(orders)]
+
+    scalar = best_of(lambda: [haversine_distance(origin[0], origin[1], la, lo) for la, lo in zip(lats, lons)])
+    batch = best_of(lambda: haversine_distances(origin[0], origin[1], lats, lons))
+    print(f"1 x {n} riders:  scalar {scalar * 1000:8.2f} ms   batch {batch * 1000:8.2f} ms   speedup {scalar / batch:6.1f}x")
+
+    scalar_m = best_of(
+        lambda: [[haversine_distance(a, b, la, lo) for la, lo in zip(lats, lons)] for a, b in zip(olats, olons)],
+        repeat=2,
+    )
+    batch_m = best_of(lambda: haversine_matrix(olats, olons, lats, lons))
+    print(f"{orders} x {n} matrix: scalar {scalar_m * 1000:8.2f} ms   batch {batch_m * 1000:8.2f} ms   speedup {scalar_m / batch_m:6.1f}x")
+
+    got = haversine_distances(origin[0], origin[1], lats, lons)
+    worst = max(abs(g - haversine_distance(origin[0], origin[1], la, lo)) for g, la, lo in zip(got.tolist(), lats, lons))
+    print(f"max abs difference vs scalar: {worst:.3e} km")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Simulated time-to-assign: one offer at a time vs parallel top-K offers.
+
+Each rider either ignores the offer (it lapses after the dispatch timeout) or
+answers after a random delay, accepting with some probability. With K > 1 the
+first accept claims the order and the remaining offers are withdrawn; if all K
+lapse or decline, the next K riders are tried. This models the dispatch policy
+only; no server or Supabase needed.
+From backend dir: python benchmarks/bench_offer_modes.py [trials]
+"""
+import random
+import statistics
+import sys
+
+TIMEOUT_S = 180
+P_IGNORE = 0.3      # app killed / rider away: offer lapses after TIMEOUT_S
+P_ACCEPT = 0.5      # of riders who answer
+RESPONSE_S = (5, 40)
+RIDERS = 20
+
+
+def rider_response(rng):
+    """(seconds until the rider answers or the offer lapses, accepted?)"""
+    if rng.random() < P_IGNORE:
+        return TIMEOUT_S, False
+    return rng.uniform(*RESPONSE_S), rng.random() < P_ACCEPT
+
+
+def time_to_assign(rng, k):
+    elapsed = 0.0
+    for _ in range(0, RIDERS, k):
+        answers = [rider_response(rng) for _ in range(k)]
+        accepts = [t for t, ok in answers if ok]
+        if accepts:
+            return elapsed + min(accepts)
+        # Round ends when the last open offer declines or lapses.
+        elapsed += max(t for t, _ in answers)
+    return None
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"{trials} orders, p_ignore={P_IGNORE}, p_accept={P_ACCEPT}, timeout={TIMEOUT_S}s")
+    for k in (1, 2, 3, 5):
+        rng = random.Random(1)
+        times = [time_to_assign(rng, k) for _ in range(trials)]
+        done = [t for t in times if t is not None]
+        p90 = statistics.quantiles(done, n=10)[-1]
+        print(f"  K={k}: median {statistics.median(done):6.1f}s   p90 {p90:6.1f}s   unassigned {len(times) - len(done)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
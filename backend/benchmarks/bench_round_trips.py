@@ -0,0 +1,62 @@
+"""
+Round trips per request on the hot read paths, against the in-memory Supabase
+fake (core/fake_supabase.py) with a simulated per-request latency.
+
+Seeds a restaurant with N orders from 5 customers, then runs the restaurant
+order list, the customer order history and the admin menu listing, printing
+how many PostgREST requests each made and the wall time at LATENCY_MS per
+request. Counts that grow with N are N+1 query patterns. No server or Supabase needed.
+From backend dir: python benchmarks/bench_round_trips.py [orders] [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from app.core.fake_supabase import FakeSupabase, install
+from app.services.admin_menu_service import MenuService
+from app.services.customer_service import CustomerService
+from app.services.restaurant_service import RestaurantService
+
+
+def seed(n: int) -> FakeSupabase:
+    db = FakeSupabase()
+    db.seed("users", [{"first_name": f"User{i}", "last_name": "T", "phone": str(i), "email": f"u{i}@x.io"} for i in range(5)])
+    db.seed("restaurants", [{"name": "Bench Bistro", "status": "approved", "owner_id": 1}])
+    db.seed("menus", [{"restaurant_id": 1, "name": f"Menu {i}", "is_active": True} for i in range(5)])
+    db.seed("menu_items", [{"restaurant_id": 1, "menu_id": 1 + i % 5, "name": f"Dish {i}", "price_cents": 1000,
+                            "is_available": True} for i in range(20)])
+    db.seed("categories", [{"name": name} for name in ("Mains", "Sides", "Drinks")])
+    db.seed("menu_item_categories", [{"menu_item_id": 1 + i, "category_id": 1 + i % 3} for i in range(20)])
+    db.seed("orders", [{"user_id": 1 + i % 5, "restaurant_id": 1, "status": "pending", "total_cents": 2000} for i in range(n)])
+    db.seed("order_items", [{"order_id": 1 + i, "menu_item_id": 1 + i % 20, "quantity": 1, "price_cents": 1000} for i in range(n)])
+    return db
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    db = seed(n)
+    install(db)
+    db.latency = latency_ms / 1000
+    cases = [
+        ("restaurant order list", lambda: RestaurantService.get_orders_for_restaurant(1)),
+        ("customer order history", lambda: CustomerService.list_orders(1)),
+        ("admin restaurant menus", lambda: asyncio.run(MenuService.get_restaurant_menus(1))),
+    ]
+    print(f"{'read':<28} {'requests':>9} {'wall ms':>9}   at {latency_ms:g} ms per request")
+    for name, fn in cases:
+        db.reset_calls()
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{name:<28} {sum(db.calls.values()):>9} {elapsed:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
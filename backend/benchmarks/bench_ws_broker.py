@@ -0,0 +1,124 @@
+"""
+Per-message routing latency through the Unix-socket WebSocket broker.
+
+Two real processes stand in for two uvicorn workers: the child holds a
+customer socket, the parent publishes send_to_customer() for that user and
+the child records the time from publish until the message is queued on its
+socket (CLOCK_MONOTONIC is shared between processes). Same-worker delivery
+is measured too for comparison. No server or Supabase needed.
+From backend dir: python benchmarks/bench_ws_broker.py [messages]
+"""
+import asyncio
+import multiprocessing as mp
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.broker import UnixSocketBroker
+from app.core.websocket_manager import ConnectionManager
+
+CUSTOMER_ID = 7
+
+
+class RecordingSocket:
+    def __init__(self, expected, done):
+        self.latencies_us = []
+        self.expected = expected
+        self.done = done
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+def _record(manager, sock):
+    deliver = manager._deliver_local
+
+    def wrapped(group, key, message):
+        sock.latencies_us.append((time.monotonic() - message["t"]) * 1e6)
+        if len(sock.latencies_us) >= sock.expected:
+            sock.done.set()
+        return deliver(group, key, message)
+
+    manager._deliver_local = wrapped
+
+
+def worker(path, n, ready, results):
+    async def run():
+        manager = ConnectionManager(queue_size=n + 1)
+        await manager.start_broker(UnixSocketBroker(path))
+        sock = RecordingSocket(n, asyncio.Event())
+        _record(manager, sock)
+        await manager.connect_customer(CUSTOMER_ID, sock)
+        ready.set()
+        await asyncio.wait_for(sock.done.wait(), timeout=60)
+        results.put(sock.latencies_us)
+        manager.disconnect_customer(CUSTOMER_ID)
+        await manager.stop_broker()
+
+    asyncio.run(run())
+
+
+def summarize(name, lat):
+    lat = sorted(lat)
+    print(
+        f"{name:<22} n={len(lat):<6} p50={statistics.median(lat):8.1f}us "
+        f"p99={lat[int(len(lat) * 0.99) - 1]:8.1f}us max={lat[-1]:8.1f}us"
+    )
+
+
+async def publish(n, path, ready):
+    manager = ConnectionManager()
+    await manager.start_broker(UnixSocketBroker(path))
+    while not ready.is_set():
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.2)  # let the child's subscription reach the hub
+    for i in range(n):
+        await manager.send_to_customer(CUSTOMER_ID, {"type": "ORDER_STATUS_UPDATE", "i": i, "t": time.monotonic()})
+        await asyncio.sleep(0.0005)  # one status update at a time, not a single burst
+    return manager
+
+
+async def local_baseline(n):
+    manager = ConnectionManager(queue_size=n + 1)
+    sock = RecordingSocket(n, asyncio.Event())
+    _record(manager, sock)
+    await manager.connect_customer(CUSTOMER_ID, sock)
+    for i in range(n):
+        await manager.send_to_customer(CUSTOMER_ID, {"i": i, "t": time.monotonic()})
+    manager.disconnect_customer(CUSTOMER_ID)
+    return sock.latencies_us
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    path = str(Path(tempfile.mkdtemp()) / "ws.sock")
+    ctx = mp.get_context("spawn")
+    ready, results = ctx.Event(), ctx.Queue()
+    child = ctx.Process(target=worker, args=(path, n, ready, results))
+    child.start()
+
+    async def run():
+        manager = await publish(n, path, ready)
+        latencies = await asyncio.get_running_loop().run_in_executor(None, results.get, True, 60)
+        await manager.stop_broker()
+        return latencies
+
+    remote = asyncio.run(run())
+    child.join(timeout=10)
+    summarize("same worker", asyncio.run(local_baseline(n)))
+    summarize("other worker (broker)", remote)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+pytest setup for the offline tests: the app's Supabase client is the in-memory
+fake (core/fake_supabase.py), so no SUPABASE_URL / SUPABASE_KEY are needed.
+Tests that exercise endpoints install their own FakeSupabase with seeded tables.
+"""
+import os
+
+os.environ.setdefault("SUPABASE_FAKE", "1")
@@ -0,0 +1,64 @@
+"""
+Offline tests for the min-cost assignment used by batch dispatch.
+From backend dir: python tests/test_assignment.py  (or python -m pytest tests/test_assignment.py)
+"""
+import itertools
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.assignment import min_cost_assignment
+
+INF = float("inf")
+
+
+def _brute_force(cost):
+    """(assigned count, total cost) of the best assignment: most rows first, then cheapest."""
+    rows, cols = len(cost), len(cost[0])
+    for size in range(min(rows, cols), -1, -1):
+        best = None
+        for rs in itertools.combinations(range(rows), size):
+            for cs in itertools.permutations(range(cols), size):
+                if all(cost[r][c] != INF for r, c in zip(rs, cs)):
+                    total = sum(cost[r][c] for r, c in zip(rs, cs))
+                    best = total if best is None else min(best, total)
+        if best is not None:
+            return size, best
+    return 0, 0.0
+
+
+def test_matches_brute_force_on_small_matrices():
+    rng = random.Random(11)
+    for _ in range(200):
+        rows, cols = rng.randint(1, 5), rng.randint(1, 5)
+        cost = [[rng.random() * 10 if rng.random() > 0.25 else INF for _ in range(cols)] for _ in range(rows)]
+        pairs = min_cost_assignment(cost)
+        assert len({r for r, _ in pairs}) == len(pairs) == len({c for _, c in pairs})
+        size, best = _brute_force(cost)
+        assert len(pairs) == size
+        assert abs(sum(cost[r][c] for r, c in pairs) - best) < 1e-9
+
+
+def test_beats_greedy_when_orders_compete_for_one_rider():
+    # Both orders are closest to rider 0; greedy gives it to order 0 and strands order 1 far away.
+    cost = [[1.0, 2.0], [1.5, 9.0]]
+    assert min_cost_assignment(cost) == [(0, 1), (1, 0)]
+
+
+def test_empty_and_all_forbidden():
+    assert min_cost_assignment([]) == []
+    assert min_cost_assignment([[INF, INF]]) == []
+
+
+def main():
+    test_matches_brute_force_on_small_matrices()
+    test_beats_greedy_when_orders_compete_for_one_rider()
+    test_empty_and_all_forbidden()
+    print("assignment tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
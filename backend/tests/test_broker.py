@@ -0,0 +1,91 @@
+"""
+Offline tests for cross-worker WebSocket routing over the Unix-socket broker
+(no server or Supabase needed). Two ConnectionManagers stand in for two workers.
+From backend dir: python tests/test_broker.py  (or python -m pytest tests/test_broker.py)
+"""
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.broker import UnixSocketBroker
+from app.core.websocket_manager import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.syncs = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        frame = json.loads(text)
+        if frame.get("type") == "SYNC":
+            self.syncs.append(frame)
+            return
+        frame.pop("seq", None)
+        self.sent.append(frame)
+
+    async def close(self, code=1000):
+        pass
+
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0.005)
+
+
+def test_message_reaches_socket_in_other_worker_only():
+    async def scenario():
+        path = str(Path(tempfile.mkdtemp()) / "ws.sock")
+        a, b = ConnectionManager(), ConnectionManager()
+        await a.start_broker(UnixSocketBroker(path, reconnect_delay=0.01))
+        await b.start_broker(UnixSocketBroker(path, reconnect_delay=0.01))
+        assert a.broker.is_hub and not b.broker.is_hub
+
+        ws_a = FakeSocket()
+        await a.connect_customer(7, ws_a)
+        ws_b = FakeSocket()
+        await b.connect_restaurant(3, ws_b)
+        await _settle()
+
+        assert await b.send_to_customer(7, {"type": "ORDER_STATUS_UPDATE", "order_id": 1})
+        assert await a.send_to_restaurant(3, {"type": "NEW_ORDER", "order_id": 2})
+        await _settle()
+        assert ws_a.sent == [{"type": "ORDER_STATUS_UPDATE", "order_id": 1}]
+        assert ws_b.sent == [{"type": "NEW_ORDER", "order_id": 2}]
+
+        # Not delivered twice to a worker that holds the socket itself.
+        await a.send_to_customer(7, {"n": 3})
+        await _settle()
+        assert ws_a.sent[-1] == {"n": 3} and len(ws_a.sent) == 2
+
+        # After the socket goes away the other worker's messages are no longer routed to a.
+        a.disconnect_customer(7)
+        await _settle()
+        await b.send_to_customer(7, {"n": 4})
+        await _settle()
+        assert b.broker.received == 1 and a.broker.received == 1
+
+        # Hub worker exits: b takes over and keeps routing for its own sockets.
+        await a.stop_broker()
+        await asyncio.sleep(0.1)
+        assert b.broker.is_hub and b.broker.connected
+        await b.stop_broker()
+
+    asyncio.run(scenario())
+
+
+def main():
+    test_message_reaches_socket_in_other_worker_only()
+    print("broker tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Offline tests for the versioned catalog cache, its invalidation by writes, and ETag / 304 responses (no server or Supabase needed).
+From backend dir: python tests/test_catalog_cache.py  (or python -m pytest tests/test_catalog_cache.py)
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from fastapi.testclient import TestClient
+
+from app.core import query_stats
+from app.core.fake_supabase import FakeSupabase, install
+from app.core.catalog_cache import VersionedCache, etag_matches, json_bytes, menu_cache, restaurant_list_cache
+from app.core.query_stats import query_budget
+
+
+def test_hits_until_invalidated_and_stale_builds_are_not_stored():
+    cache = VersionedCache(60, max_entries=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"n": len(builds)}
+
+    first = cache.get_or_build("menu", 1, build)
+    assert first.body == b'{"n":1}' and first.etag.startswith('"') and first.etag.endswith('"')
+    assert cache.get_or_build("menu", 1, build) == first and len(builds) == 1
+    cache.invalidate(1)
+    second = cache.get_or_build("menu", 1, build)
+    assert second.body == b'{"n":2}' and second.etag != first.etag
+
+    def racing_build():
+        cache.invalidate(1)  # a write lands while the document is being read
+        return {"stale": True}
+
+    cache.invalidate(1)
+    assert cache.get_or_build("menu", 1, racing_build).body == b'{"stale":true}'
+    assert cache.get("menu", 1) is None  # built from the old version: served once, never cached
+    assert cache.get_or_build("menu", 2, lambda: None) is None and cache.get("menu", 2) is None  # not found: not cached
+
+
+def test_lru_ttl_and_global_invalidation():
+    cache = VersionedCache(60, max_entries=2)
+    for owner in (1, 2, 3):
+        cache.get_or_build("menu", owner, lambda: {"owner": owner})
+    assert cache.get("menu", 1) is None and cache.get("menu", 3) is not None  # least recently used went first
+    cache.invalidate()
+    assert cache.get("menu", 3) is None and cache.stats()["entries"] == 0
+    short = VersionedCache(0.01)
+    short.get_or_build("menu", 1, lambda: {})
+    time.sleep(0.02)
+    assert short.get("menu", 1) is None
+    assert json_bytes({"name": "Café", "price": 9.5}) == '{"name":"Café","price":9.5}'.encode()
+
+
+def test_if_none_match_parsing():
+    assert etag_matches('"abc"', '"abc"') and etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"') and etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"') and not etag_matches('"abcd"', '"abc"') and not etag_matches("abc", '"abc"')
+
+
+def shop():
+    return FakeSupabase(tables={
+        "restaurants": [{"id": 1, "name": "Luigi's", "status": "approved", "image_url": None}],
+        "menus": [{"id": 1, "restaurant_id": 1, "name": "Lunch", "is_active": True}],
+        "menu_items": [
+            {"id": 1, "menu_id": 1, "name": "Margherita", "description": "", "price_cents": 950, "is_available": True, "image_url": None},
+            {"id": 2, "menu_id": 1, "name": "Calzone", "description": "", "price_cents": 1100, "is_available": True, "image_url": None},
+        ],
+    })
+
+
+def test_menu_endpoints_serve_cached_bytes_until_a_menu_write():
+    from app import supabase_client
+    from app.main import app
+
+    original = supabase_client.supabase
+    query_stats.instrument()
+    install(shop())
+    menu_cache.invalidate()
+    restaurant_list_cache.invalidate()
+    try:
+        client = TestClient(app)
+        for path in ("/consumer/restaurants/1/menu", "/restaurants/1", "/restaurant/menus?restaurant_id=1"):
+            first = client.get(path)
+            assert first.status_code == 200, (path, first.text)
+            with query_budget(0):
+                second = client.get(path)
+            assert second.content == first.content and second.headers["content-type"] == "application/json"
+        menus = client.get("/restaurant/menus?restaurant_id=1").json()
+        assert menus[0]["items"][1] == {"id": 2, "menu_id": 1, "name": "Calzone", "description": "", "price_cents": 1100,
+                                        "is_available": True, "image_url": None}
+        assert client.get("/consumer/restaurants/9/menu").status_code == 404
+
+        r = client.patch("/menu/items/2/availability", params={"is_available": False})
+        assert r.status_code == 200, r.text
+        items = client.get("/consumer/restaurants/1/menu").json()["menus"][0]["items"]
+        assert [i["is_available"] for i in items] == [True, False]
+        assert client.get("/restaurants/1").json()["menu_items"][1]["is_available"] is False
+    finally:
+        install(original)
+        menu_cache.invalidate()
+
+
+def test_catalog_endpoints_answer_304_without_a_query_until_a_write():
+    from app import supabase_client
+    from app.main import app
+
+    original = supabase_client.supabase
+    query_stats.instrument()
+    db = shop()
+    db.tables["restaurants"][0]["average_rating"] = 4.5
+    install(db)
+    menu_cache.invalidate()
+    restaurant_list_cache.invalidate()
+    try:
+        client = TestClient(app)
+        for path in ("/restaurants", "/consumer/restaurants", "/consumer/restaurants?search=lu",
+                     "/consumer/restaurants/1/menu", "/restaurants/1", "/restaurant/menus?restaurant_id=1"):
+            first = client.get(path)
+            assert first.status_code == 200, (path, first.text)
+            etag = first.headers["etag"]
+            with query_budget(0):
+                again = client.get(path, headers={"If-None-Match": etag})
+            assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag, path
+            assert again.headers["cache-control"] == first.headers["cache-control"]
+            assert client.get(path, headers={"If-None-Match": '"other"'}).content == first.content
+        assert client.get("/restaurant/menus?restaurant_id=1").headers["cache-control"] == "no-cache"
+        assert client.get("/restaurants").headers["cache-control"].startswith("public")
+        assert client.get("/consumer/restaurants").json()[0]["name"] == "Luigi's"
+
+        menu_etag = client.get("/consumer/restaurants/1/menu").headers["etag"]
+        list_etag = client.get("/consumer/restaurants").headers["etag"]
+        assert client.patch("/menu/items/1/availability", params={"is_available": False}).status_code == 200
+        changed = client.get("/consumer/restaurants/1/menu", headers={"If-None-Match": menu_etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != menu_etag
+        assert client.get("/consumer/restaurants", headers={"If-None-Match": list_etag}).status_code == 304
+
+        from app.services.admin_restaurant_service import RestaurantService
+        RestaurantService._invalidate_catalog(1)  # what an admin restaurant update does after the write
+        db.tables["restaurants"][0]["name"] = "Luigi's Trattoria"
+        renamed = client.get("/consumer/restaurants", headers={"If-None-Match": list_etag})
+        assert renamed.status_code == 200 and renamed.json()[0]["name"] == "Luigi's Trattoria"
+    finally:
+        install(original)
+        menu_cache.invalidate()
+        restaurant_list_cache.invalidate()
+
+
+class DownSupabase(FakeSupabase):
+    """Raises on reads of the given tables (every table when none are given)."""
+
+    def __init__(self, *down, **kwargs):
+        super().__init__(**kwargs)
+        self.down = set(down) if down else None
+
+    def table(self, name):
+        if self.down is None or name in self.down:
+            raise ConnectionError("database unavailable")
+        return super().table(name)
+
+
+def test_db_errors_are_not_cached_or_served_publicly():
+    from app import supabase_client
+    from app.main import app
+
+    original = supabase_client.supabase
+    restaurant_list_cache.invalidate()
+    try:
+        install(DownSupabase())
+        client = TestClient(app)
+        for path in ("/restaurants", "/consumer/restaurants"):
+            r = client.get(path)
+            assert r.status_code == 500 and "etag" not in r.headers and "cache-control" not in r.headers, path
+        assert restaurant_list_cache.stats()["entries"] == 0
+        db = shop()
+        db.tables["restaurants"][0]["is_approved"] = True
+        install(db)
+        assert client.get("/restaurants").json()["restaurants"][0]["name"] == "Luigi's"
+    finally:
+        install(original)
+        restaurant_list_cache.invalidate()
+
+
+def test_menu_read_errors_are_not_cached():
+    from app import supabase_client
+    from app.main import app
+
+    original = supabase_client.supabase
+    db = DownSupabase("menus", tables=shop().tables)
+    install(db)
+    menu_cache.invalidate()
+    try:
+        client = TestClient(app)
+        r = client.get("/consumer/restaurants/1/menu")
+        assert r.status_code == 500 and "etag" not in r.headers
+        assert menu_cache.stats()["entries"] == 0
+        db.down.clear()
+        items = client.get("/consumer/restaurants/1/menu").json()["menus"][0]["items"]
+        assert [i["name"] for i in items] == ["Margherita", "Calzone"]
+    finally:
+        install(original)
+        menu_cache.invalidate()
+
+
+def main():
+    test_hits_until_invalidated_and_stale_builds_are_not_stored()
+    test_lru_ttl_and_global_invalidation()
+    test_if_none_match_parsing()
+    test_menu_endpoints_serve_cached_bytes_until_a_menu_write()
+    test_catalog_endpoints_answer_304_without_a_query_until_a_write()
+    test_db_errors_are_not_cached_or_served_publicly()
+    test_menu_read_errors_are_not_cached()
+    print("catalog cache tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
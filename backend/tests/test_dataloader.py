@@ -0,0 +1,143 @@
+"""
+Offline tests for request-scoped batch loaders and the services using them (no server or Supabase needed).
+From backend dir: python tests/test_dataloader.py  (or python -m pytest tests/test_dataloader.py)
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from app.core import query_stats
+from app.core.dataloader import DataLoader, request_loader, request_scope
+from app.core.fake_supabase import FakeSupabase, install
+from app.core.query_stats import query_budget
+
+
+def test_load_many_batches_and_memoizes():
+    calls = []
+
+    def batch(keys):
+        calls.append(list(keys))
+        return {k: k * 10 for k in keys if k != 3}
+
+    loader = DataLoader(batch, max_batch_size=2)
+    assert loader.load_many([1, 2, 2, None, 3]) == {1: 10, 2: 20}
+    assert calls == [[1, 2], [3]]  # deduplicated, None skipped, chunked by max_batch_size
+    assert loader.load_many([3, 2, 4]) == {2: 20, 4: 40}  # 3 is remembered as missing
+    assert calls[-1] == [4] and loader.load(1) == 10 and loader.batches == 3
+    loader.clear(1)
+    assert loader.load(1) == 10 and calls[-1] == [1]
+
+
+def test_aload_many_with_async_and_blocking_batch_functions():
+    async def async_batch(keys):
+        return {k: str(k) for k in keys}
+
+    async def run():
+        a = await DataLoader(async_batch).aload_many([1, 2])
+        b = await DataLoader(lambda keys: {k: -k for k in keys}).aload_many([1, 2])
+        return a, b
+
+    assert asyncio.run(run()) == ({1: "1", 2: "2"}, {1: -1, 2: -2})
+
+
+def test_loaders_are_shared_within_a_request_scope_only():
+    def batch(keys):
+        return {k: k for k in keys}
+
+    assert request_loader("numbers", batch) is not request_loader("numbers", batch)
+    with request_scope():
+        first = request_loader("numbers", batch)
+        first.load_many([1, 2])
+        assert request_loader("numbers", batch) is first and first.batches == 1
+    with request_scope():
+        assert request_loader("numbers", batch) is not first
+
+
+def shop(orders=12):
+    return FakeSupabase(tables={
+        "users": [{"id": u, "first_name": f"U{u}", "last_name": "L", "phone": str(u), "email": f"{u}@x.io"} for u in (1, 2, 3)],
+        "restaurants": [{"id": 1, "name": "Luigi's"}, {"id": 2, "name": "Tokyo Bar"}],
+        "menus": [{"id": 1, "restaurant_id": 1, "name": "Lunch", "is_active": True},
+                  {"id": 2, "restaurant_id": 1, "name": "Dinner", "is_active": True}],
+        "menu_items": [{"id": i, "menu_id": 1 + i % 2, "name": f"Dish {i}", "price_cents": 100 * i, "is_available": True}
+                       for i in range(1, 7)],
+        "categories": [{"id": 1, "name": "Pizza"}, {"id": 2, "name": "Pasta"}],
+        "menu_item_categories": [{"id": i, "menu_item_id": i, "category_id": 1 + i % 2} for i in range(1, 6)],
+        "orders": [{"id": o, "user_id": 1 + o % 3, "restaurant_id": 1 + o % 2, "status": "pending", "total_cents": 500,
+                    "created_at": f"2026-01-{o:02d}T10:00:00"} for o in range(1, orders + 1)],
+        "order_items": [{"id": o, "order_id": o, "menu_item_id": 1 + o % 6, "quantity": 1, "price_cents": 100}
+                        for o in range(1, orders + 1)],
+    })
+
+
+def with_fake(test):
+    from app import supabase_client
+
+    original = supabase_client.supabase
+    query_stats.instrument()
+    install(shop())
+    try:
+        test()
+    finally:
+        install(original)
+
+
+def test_restaurant_orders_fetch_customers_in_one_query():
+    from app.services.restaurant_service import RestaurantService
+
+    def run():
+        with query_budget(2):
+            orders = RestaurantService.get_orders_for_restaurant(1)
+        assert len(orders) == 6 and [o["id"] for o in orders][:2] == [12, 10]
+        assert orders[0]["customer"] == {"first_name": "U1", "last_name": "L", "phone": "1"}
+        assert orders[0]["order_items"][0]["menu_items"] == {"name": "Dish 1"}
+
+    with_fake(run)
+
+
+def test_customer_order_history_is_a_fixed_number_of_queries():
+    from app.services.customer_service import CustomerService
+
+    def run():
+        with request_scope(), query_budget(5):  # orders, order_items, menu_items, restaurants; then the one order
+            orders = CustomerService.list_orders(1)
+            single = CustomerService.get_order(1, orders[0].id)  # same request: only the order row is fetched
+        assert [o.id for o in orders] == [12, 9, 6, 3]
+        assert orders[0].restaurant_name == "Luigi's" and orders[1].restaurant_name == "Tokyo Bar"
+        assert orders[0].items[0].name == "Dish 1" and orders[0].items[0].price_cents == 100
+        assert single == orders[0]
+
+    with_fake(run)
+
+
+def test_admin_menus_fetch_items_and_categories_per_table():
+    from app.services.admin_menu_service import MenuService
+
+    def run():
+        with query_budget(4):  # restaurant, menus, menu_items, menu_item_categories
+            menus = asyncio.run(MenuService.get_restaurant_menus(1))
+        assert [m.name for m in menus.menus] == ["Lunch", "Dinner"]
+        assert [i.id for i in menus.menus[0].items] == [2, 4, 6]
+        assert [c.name for c in menus.menus[1].items[0].categories] == ["Pasta"]
+        assert menus.menus[0].items[2].categories == []
+
+    with_fake(run)
+
+
+def main():
+    test_load_many_batches_and_memoizes()
+    test_aload_many_with_async_and_blocking_batch_functions()
+    test_loaders_are_shared_within_a_request_scope_only()
+    test_restaurant_orders_fetch_customers_in_one_query()
+    test_customer_order_history_is_a_fixed_number_of_queries()
+    test_admin_menus_fetch_items_and_categories_per_table()
+    print("dataloader tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Offline tests for the bounded DB executor (no server or Supabase needed).
+From backend dir: python tests/test_db_executor.py  (or python -m pytest tests/test_db_executor.py)
+"""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core import db_executor
+from app.core.db_executor import offload, run_db
+
+
+def test_blocking_calls_leave_the_loop_free():
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        result = await run_db(lambda x: time.sleep(0.1) or x * 2, 21)
+        ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result == 42
+    assert ticks >= 5  # the loop kept running while the call slept
+
+
+def test_offload_makes_a_sync_function_awaitable_on_the_pool():
+    @offload
+    def whoami(prefix, suffix=""):
+        return prefix + threading.current_thread().name + suffix
+
+    name = asyncio.run(whoami("t:", suffix="!"))
+    assert name.startswith("t:db") and name.endswith("!")
+    assert whoami.__name__ == "whoami"
+
+
+def test_concurrency_is_bounded_and_errors_propagate():
+    workers = db_executor.stats()["max_workers"]
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def query():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+
+    def broken():
+        raise ValueError("boom")
+
+    async def run():
+        await asyncio.gather(*(run_db(query) for _ in range(workers * 3)))
+        try:
+            await run_db(broken)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(run()) == "boom"
+    assert peak[0] <= workers
+    stats = db_executor.stats()
+    assert stats["in_flight"] == 0 and stats["max_in_flight"] <= workers
+
+
+def main():
+    test_blocking_calls_leave_the_loop_free()
+    test_offload_makes_a_sync_function_awaitable_on_the_pool()
+    test_concurrency_is_bounded_and_errors_propagate()
+    print("db executor tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Offline tests for the dispatch expiry scheduler (no server or Supabase needed).
+From backend dir: python tests/test_expiry_scheduler.py  (or python -m pytest tests/test_expiry_scheduler.py)
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.expiry_scheduler import ExpiryScheduler, to_epoch
+
+
+def test_to_epoch_accepts_db_and_naive_timestamps():
+    assert to_epoch("1970-01-01T00:01:00") == 60.0
+    assert to_epoch("1970-01-01T00:01:00+00:00") == 60.0
+    assert to_epoch("1970-01-01T00:01:00Z") == 60.0
+    assert to_epoch("1970-01-01T01:01:00+01:00") == 60.0
+    assert to_epoch(datetime(1970, 1, 1, 0, 1)) == 60.0
+
+
+def test_run_due_pops_in_deadline_order_and_batches():
+    calls = []
+
+    async def on_due(entries):
+        calls.append(entries)
+
+    async def scenario():
+        s = ExpiryScheduler(on_due)
+        s.load([(3, 30.0, "c"), (1, 10.0, "a")])
+        s.track(2, 20.0, "b")
+        s.track(4, 40.0, "d")
+        assert await s.run_due(now=5.0) == 0
+        assert await s.run_due(now=30.0) == 3
+        assert len(s) == 1
+        return s
+
+    asyncio.run(scenario())
+    assert calls == [[(1, "a"), (2, "b"), (3, "c")]]
+
+
+def test_background_task_fires_without_sleep_per_entry():
+    fired = []
+    sweeps = []
+
+    async def on_due(entries):
+        fired.extend(k for k, _ in entries)
+
+    async def on_sweep():
+        sweeps.append(1)
+
+    async def scenario():
+        s = ExpiryScheduler(on_due, on_sweep, sweep_interval=60)
+        s.start()
+        now = time.time()
+        for i in range(1000):
+            s.track(i, now + 0.05 + (i % 5) * 0.01)
+        # Earlier deadline added after start wakes the loop up.
+        s.track(-1, datetime.fromtimestamp(now + 0.02, tz=timezone.utc))
+        for _ in range(200):
+            if len(fired) == 1001:
+                break
+            await asyncio.sleep(0.01)
+        await s.stop()
+        assert not s.running
+
+    asyncio.run(scenario())
+    assert sorted(fired) == [-1] + list(range(1000))
+    assert fired[0] == -1
+    assert sweeps == [1]
+
+
+def main():
+    test_to_epoch_accepts_db_and_naive_timestamps()
+    test_run_due_pops_in_deadline_order_and_batches()
+    test_background_task_fires_without_sleep_per_entry()
+    print("expiry scheduler tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
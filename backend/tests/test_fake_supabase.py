@@ -0,0 +1,170 @@
+"""
+Offline tests for the in-memory Supabase fake (no server or Supabase needed).
+From backend dir: python tests/test_fake_supabase.py  (or python -m pytest tests/test_fake_supabase.py)
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from postgrest import APIError
+
+from app.core.fake_supabase import FakeSupabase, install
+
+
+def shop():
+    return FakeSupabase(tables={
+        "users": [
+            {"id": 1, "first_name": "Ada", "last_name": "L", "phone": "1"},
+            {"id": 2, "first_name": "Bob", "last_name": "M", "phone": "2"},
+        ],
+        "addresses": [{"id": 1, "user_id": 1, "street": "Main St"}],
+        "categories": [{"id": 1, "name": "Pizza"}, {"id": 2, "name": "Sushi"}],
+        "restaurants": [
+            {"id": 1, "name": "Luigi's", "status": "approved", "rating": 4.5},
+            {"id": 2, "name": "Tokyo Bar", "status": "approved", "rating": None},
+            {"id": 3, "name": "Pizza Hut", "status": "pending", "rating": 3.0},
+        ],
+        "restaurant_categories": [
+            {"id": 1, "restaurant_id": 1, "category_id": 1},
+            {"id": 2, "restaurant_id": 2, "category_id": 2},
+            {"id": 3, "restaurant_id": 3, "category_id": 1},
+        ],
+        "menu_items": [
+            {"id": 1, "restaurant_id": 1, "name": "Margherita", "price": 9.5, "is_available": True},
+            {"id": 2, "restaurant_id": 1, "name": "Calzone", "price": 11.0, "is_available": False},
+        ],
+        "orders": [
+            {"id": 10, "user_id": 1, "restaurant_id": 1, "status": "pending", "created_at": "2026-01-01T10:00:00"},
+            {"id": 11, "user_id": 2, "restaurant_id": 1, "status": "delivered", "created_at": "2026-01-02T10:00:00"},
+            {"id": 12, "user_id": 1, "restaurant_id": 2, "status": "pending", "created_at": "2026-01-03T10:00:00"},
+        ],
+        "order_items": [
+            {"id": 1, "order_id": 10, "menu_item_id": 1, "quantity": 2},
+            {"id": 2, "order_id": 10, "menu_item_id": 2, "quantity": 1},
+        ],
+    })
+
+
+def test_filters_order_and_range():
+    db = shop()
+    rows = db.table("orders").select("id").eq("restaurant_id", "1").order("created_at", desc=True).execute().data
+    assert rows == [{"id": 11}, {"id": 10}]
+    assert [r["id"] for r in db.table("orders").select("*").in_("status", ["pending"]).neq("user_id", 2).execute().data] == [10, 12]
+    assert [r["id"] for r in db.table("orders").select("*").gte("created_at", "2026-01-02").lt("created_at", "2026-01-03").execute().data] == [11]
+    assert [r["name"] for r in db.table("restaurants").select("name").ilike("name", "%PIZZA%").execute().data] == ["Pizza Hut"]
+    # NULLs sort last ascending and first descending, as in Postgres
+    assert [r["id"] for r in db.table("restaurants").select("id").order("rating").execute().data] == [3, 1, 2]
+    assert [r["id"] for r in db.table("restaurants").select("id").order("rating", desc=True).execute().data] == [2, 1, 3]
+    page = db.table("orders").select("id", count="exact").order("id").range(1, 2).execute()
+    assert [r["id"] for r in page.data] == [11, 12] and page.count == 3
+    head = db.table("orders").select("id", count="exact", head=True).eq("user_id", 1).execute()
+    assert head.data == [] and head.count == 2
+    assert len(db.table("orders").select("*").limit(1).execute().data) == 1
+
+
+def test_embedded_relations():
+    db = shop()
+    order = db.table("orders").select(
+        "*, order_items(*, menu_items(name)), restaurant:restaurants!restaurant_id(name), "
+        "customer_user:users!user_id(first_name, addresses(street))"
+    ).eq("id", 10).single().execute().data
+    assert [i["menu_items"]["name"] for i in order["order_items"]] == ["Margherita", "Calzone"]
+    assert order["restaurant"] == {"name": "Luigi's"}
+    assert order["customer_user"] == {"first_name": "Ada", "addresses": [{"street": "Main St"}]}
+    # !inner with a filter on the embedded table narrows the parents
+    pizza = db.table("restaurants").select(
+        "*, restaurant_categories!inner(category_id, categories!inner(name))"
+    ).eq("status", "approved").eq("restaurant_categories.categories.name", "Pizza").execute().data
+    assert [r["id"] for r in pizza] == [1]
+    assert pizza[0]["restaurant_categories"] == [{"category_id": 1, "categories": {"name": "Pizza"}}]
+    # without !inner the parent stays, with an empty embed
+    menus = db.table("restaurants").select("id, menu_items(name)").eq("menu_items.is_available", True).order("id").execute().data
+    assert menus[0]["menu_items"] == [{"name": "Margherita"}] and menus[1]["menu_items"] == []
+
+
+def test_single_and_maybe_single():
+    db = shop()
+    assert db.table("users").select("*").eq("id", 99).maybe_single().execute() is None
+    assert db.table("users").select("first_name").eq("id", 2).maybe_single().execute().data == {"first_name": "Bob"}
+    for query in (db.table("users").select("*").maybe_single(), db.table("users").select("*").eq("id", 99).single()):
+        try:
+            query.execute()
+            raise AssertionError("expected APIError")
+        except APIError as e:
+            assert e.code == "PGRST116"
+
+
+def test_writes_return_rows_and_do_not_alias_storage():
+    db = shop()
+    created = db.table("orders").insert({"user_id": 2, "restaurant_id": 2, "status": "pending"}).execute().data
+    assert created[0]["id"] == 13 and created[0]["created_at"]
+    created[0]["status"] = "mutated"
+    assert db.table("orders").select("status").eq("id", 13).single().execute().data["status"] == "pending"
+    updated = db.table("orders").update({"status": "confirmed"}).eq("status", "pending").eq("user_id", 1).execute().data
+    assert sorted(r["id"] for r in updated) == [10, 12]
+    db.table("menu_items").upsert({"id": 2, "is_available": True}).execute()
+    assert db.table("menu_items").select("*").eq("id", 2).single().execute().data["name"] == "Calzone"
+    assert [r["id"] for r in db.table("order_items").delete().eq("order_id", 10).execute().data] == [1, 2]
+    assert db.table("order_items").select("*").execute().data == []
+
+
+def test_rpc():
+    db = shop()
+    db.register_rpc("count_orders", lambda client, user_id: sum(o["user_id"] == user_id for o in client.tables["orders"]))
+    assert db.rpc("count_orders", {"user_id": 1}).execute().data == 2
+    try:
+        db.rpc("missing", {}).execute()
+        raise AssertionError("expected APIError")
+    except APIError as e:
+        assert e.code == "PGRST202"
+
+
+def test_latency_and_call_counts():
+    db = shop()
+    db.latency = lambda table, operation: 0.02 if table == "users" else 0.0
+    started = time.perf_counter()
+    db.table("orders").select("*").execute()
+    assert time.perf_counter() - started < 0.02
+    db.table("users").select("*").execute()
+    assert time.perf_counter() - started >= 0.02
+    assert db.calls[("orders", "select")] == 1 and db.calls[("users", "select")] == 1
+
+
+def test_install_reaches_modules_that_imported_the_client():
+    from app import supabase_client
+    from app.services import restaurant_service
+    from app.services.restaurant_service import RestaurantService
+
+    original = supabase_client.supabase
+    db = shop()
+    try:
+        assert install(db) >= 2
+        assert restaurant_service.supabase is db
+        orders = RestaurantService.get_orders_for_restaurant(1)
+        assert [o["id"] for o in orders] == [11, 10]
+        assert orders[1]["customer"] == {"first_name": "Ada", "last_name": "L", "phone": "1"}
+        assert orders[1]["order_items"][0]["menu_items"] == {"name": "Margherita"}
+        assert db.calls[("users", "select")] == 1  # customers of every order in one query
+    finally:
+        install(original)
+    assert restaurant_service.supabase is original
+
+
+def main():
+    test_filters_order_and_range()
+    test_embedded_relations()
+    test_single_and_maybe_single()
+    test_writes_return_rows_and_do_not_alias_storage()
+    test_rpc()
+    test_latency_and_call_counts()
+    test_install_reaches_modules_that_imported_the_client()
+    print("fake supabase tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
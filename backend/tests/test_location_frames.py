@@ -0,0 +1,81 @@
+"""
+Offline tests for rider WebSocket location frames (no server or Supabase needed).
+From backend dir: python tests/test_location_frames.py  (or python -m pytest tests/test_location_frames.py)
+"""
+import json
+import sys
+import time
+from datetime import timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.location_frames import MAX_TS_SKEW_MS, pack_location_points, parse_location_frame
+
+NOW_MS = int(time.time() * 1000)
+
+
+def test_json_frames():
+    pts = parse_location_frame(json.dumps({"type": "LOCATION", "points": [[16.8, 96.1, NOW_MS], [16.81, 96.11]]}))
+    assert [(p[0], p[1]) for p in pts] == [(16.8, 96.1), (16.81, 96.11)]
+    assert round(pts[0][2].replace(tzinfo=timezone.utc).timestamp() * 1000) == NOW_MS and pts[1][2] is None
+    single = parse_location_frame(json.dumps({"type": "LOCATION", "latitude": 1.5, "longitude": 2.5}))
+    assert single == [(1.5, 2.5, None)]
+    dicts = parse_location_frame(json.dumps({"type": "LOCATION", "points": [{"lat": 95, "lon": 0}, {"lat": 1, "lon": 2, "ts": NOW_MS}]}))
+    assert len(dicts) == 1 and dicts[0][:2] == (1.0, 2.0)  # latitude 95 dropped
+    assert parse_location_frame("ping") is None
+    assert parse_location_frame(json.dumps({"type": "PING"})) is None
+
+
+def test_binary_round_trip():
+    frame = pack_location_points([(16.8661234, 96.1951234, NOW_MS), (-33.9, 151.2, NOW_MS + 1000)])
+    assert len(frame) == 1 + 2 * 16
+    pts = parse_location_frame(frame)
+    assert abs(pts[0][0] - 16.8661234) < 1e-7 and abs(pts[1][1] - 151.2) < 1e-7
+    assert round(pts[0][2].replace(tzinfo=timezone.utc).timestamp() * 1000) == NOW_MS
+
+
+def test_malformed_frames_raise():
+    for bad in (b"\x02", pack_location_points([(1, 2, NOW_MS)])[:-1]):
+        try:
+            parse_location_frame(bad)
+        except ValueError:
+            continue
+        raise AssertionError("expected ValueError")
+    try:
+        parse_location_frame(json.dumps({"type": "LOCATION", "points": [["x", 1]]}))
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+def test_implausible_timestamps_are_malformed_points():
+    bad_json = [1e20, 1e400, float("-inf"), [1], "soon", True, NOW_MS - MAX_TS_SKEW_MS - 1000]
+    for ts in bad_json:
+        for point in ([1, 2, ts], {"lat": 1, "lon": 2, "ts": ts}):
+            try:
+                parse_location_frame(json.dumps({"type": "LOCATION", "points": [point]}))
+            except ValueError as e:
+                assert str(e) == "bad location point", e
+                continue
+            raise AssertionError(f"expected ValueError for ts={ts!r}")
+    for ts in (2 ** 63, 2 ** 64 - 1, 10 ** 13, 0):  # Q field: no infinities, but far past / future
+        try:
+            parse_location_frame(pack_location_points([(1, 2, ts)]))
+        except ValueError as e:
+            assert str(e) == "bad location point", e
+            continue
+        raise AssertionError(f"expected ValueError for binary ts={ts}")
+
+
+def main():
+    test_json_frames()
+    test_binary_round_trip()
+    test_malformed_frames_raise()
+    test_implausible_timestamps_are_malformed_points()
+    print("location frame tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
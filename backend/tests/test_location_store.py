@@ -0,0 +1,100 @@
+"""
+Offline tests for the write-behind rider location store (no server or Supabase needed).
+From backend dir: python tests/test_location_store.py  (or python -m pytest tests/test_location_store.py)
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from app.core.location_store import LocationStore
+
+
+def test_pings_are_coalesced_per_rider():
+    written = []
+    store = LocationStore(lambda rows: written.extend(rows) or len(rows), flush_interval=60)
+    for i in range(10):
+        store.record(1, 16.8 + i * 0.001, 96.1)
+        store.record(2, 16.9, 96.2 + i * 0.001)
+    assert store.get(1)["current_latitude"] == 16.8 + 9 * 0.001
+    assert store.flush() == 2
+    assert sorted(r["id"] for r in written) == [1, 2]
+    assert store.flush() == 0  # nothing moved since
+    m = store.metrics()
+    assert m["pings"] == 20 and m["rows_written"] == 2 and m["write_reduction"] == 10.0
+
+
+def test_failed_flush_keeps_rows_and_stale_fixes_are_ignored():
+    calls = []
+
+    def flaky(rows):
+        calls.append(rows)
+        return 0 if len(calls) == 1 else len(rows)
+
+    store = LocationStore(flaky, flush_interval=60)
+    now = datetime.utcnow()
+    store.record(1, 1.0, 1.0, at=now)
+    store.record(1, 2.0, 2.0, at=now - timedelta(seconds=5))  # arrives late, older fix
+    assert store.get(1)["current_latitude"] == 1.0
+    assert store.flush() == 0 and store.metrics()["pending_rows"] == 1
+    assert store.flush() == 1 and calls[1][0]["current_latitude"] == 1.0
+
+
+def test_zero_interval_writes_through():
+    written = []
+    store = LocationStore(lambda rows: written.extend(rows) or len(rows), flush_interval=0)
+    store.record(1, 1.0, 1.0)
+    store.record(1, 1.1, 1.0)
+    assert len(written) == 2
+    store.seed(5, 3.0, 3.0)
+    assert store.get(5)["current_latitude"] == 3.0 and len(written) == 2
+
+
+def test_write_through_pings_are_written_off_the_event_loop():
+    from fastapi.testclient import TestClient
+
+    from app import supabase_client
+    from app.core.fake_supabase import FakeSupabase, install
+    from app.core.location_frames import pack_location_points
+    from app.main import app
+    from app.routes import delivery_routes
+    from app.services import location_service
+
+    threads = []
+    store = LocationStore(lambda rows: threads.append(threading.current_thread().name) or len(rows), flush_interval=0)
+    shared = location_service.rider_locations, delivery_routes.rider_locations
+    location_service.rider_locations = delivery_routes.rider_locations = store
+    original = supabase_client.supabase
+    install(FakeSupabase(tables={"riders": [{"id": 7, "user_id": 70, "status": "available"}]}))
+    try:
+        client = TestClient(app)
+        r = client.post("/delivery/location", json={"rider_id": 7, "latitude": 16.8, "longitude": 96.1})
+        assert r.status_code == 200, r.text
+        with client.websocket_connect("/delivery/ws/70") as ws:
+            ws.send_bytes(pack_location_points([(16.81, 96.11, int(time.time() * 1000))]))
+            deadline = time.monotonic() + 5
+            while len(threads) < 2 and time.monotonic() < deadline:  # closing first could cancel the handler mid-frame
+                time.sleep(0.01)
+        assert len(threads) == 2 and all(t.startswith("db") for t in threads), threads  # the DB pool, not the loop
+        assert store.get(7)["current_latitude"] == 16.81
+    finally:
+        install(original)
+        location_service.rider_locations, delivery_routes.rider_locations = shared
+
+
+def main():
+    test_pings_are_coalesced_per_rider()
+    test_failed_flush_keeps_rows_and_stale_fixes_are_ignored()
+    test_zero_interval_writes_through()
+    test_write_through_pings_are_written_off_the_event_loop()
+    print("location store tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
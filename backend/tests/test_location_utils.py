@@ -0,0 +1,52 @@
+"""
+Offline tests for the batch distance API in core.location_utils.
+From backend dir: python tests/test_location_utils.py  (or python -m pytest tests/test_location_utils.py)
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.location_utils import haversine_distance, haversine_distances, haversine_matrix
+
+
+def _points(rng, n):
+    return [rng.uniform(-89.9, 89.9) for _ in range(n)], [rng.uniform(-180, 180) for _ in range(n)]
+
+
+def test_batch_matches_scalar():
+    rng = random.Random(3)
+    lats, lons = _points(rng, 500)
+    got = haversine_distances(16.87, 96.20, lats, lons)
+    assert got.shape == (500,)
+    for g, la, lo in zip(got.tolist(), lats, lons):
+        assert abs(g - haversine_distance(16.87, 96.20, la, lo)) < 1e-9
+
+
+def test_matrix_matches_scalar():
+    rng = random.Random(4)
+    lats1, lons1 = _points(rng, 20)
+    lats2, lons2 = _points(rng, 30)
+    got = haversine_matrix(lats1, lons1, lats2, lons2)
+    assert got.shape == (20, 30)
+    for i in range(20):
+        for j in range(30):
+            assert abs(got[i, j] - haversine_distance(lats1[i], lons1[i], lats2[j], lons2[j])) < 1e-9
+
+
+def test_empty_and_same_point():
+    assert haversine_distances(1.0, 2.0, [], []).shape == (0,)
+    assert haversine_distances(1.0, 2.0, [1.0], [2.0])[0] == 0.0
+
+
+def main():
+    test_batch_matches_scalar()
+    test_matrix_matches_scalar()
+    test_empty_and_same_point()
+    print("location utils tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Offline tests for MessageLog and WebSocket resume (no server or Supabase needed).
+From backend dir: python tests/test_message_log.py  (or python -m pytest tests/test_message_log.py)
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.message_log import MessageLog
+from app.core.websocket_manager import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_sequence_numbers_are_per_recipient():
+    log = MessageLog(capacity=5)
+    assert log.append("a", {"n": 1})["seq"] == 1
+    assert log.append("a", {"n": 2})["seq"] == 2
+    assert log.append("b", {"n": 1})["seq"] == 1
+    assert log.last_seq("a") == 2 and log.last_seq("missing") == 0
+
+
+def test_since_returns_only_the_gap():
+    log = MessageLog(capacity=5)
+    for i in range(1, 8):
+        log.append("a", {"n": i})
+    assert [m["n"] for m in log.since("a", 5)] == [6, 7]
+    assert log.since("a", 7) == []
+    assert [m["n"] for m in log.since("a", 2, log.epoch)] == [3, 4, 5, 6, 7]
+    assert log.since("a", 1) is None  # seq 2 already fell out of the buffer
+    assert log.since("a", 9) is None  # ahead of us: another process's numbering
+    assert log.since("a", 5, "other-epoch") is None
+    assert log.since("unknown", 0) == [] and log.since("unknown", 3) is None
+
+
+def test_oldest_streams_are_evicted():
+    log = MessageLog(capacity=2, max_streams=2)
+    log.append("a", {})
+    log.append("b", {})
+    log.append("a", {})
+    log.append("c", {})
+    assert len(log) == 2 and log.last_seq("b") == 0 and log.last_seq("a") == 2
+
+
+def test_reconnect_replays_missed_messages():
+    async def scenario():
+        m = ConnectionManager(queue_size=10)
+        first = FakeSocket()
+        await m.connect(4, first)
+        await m.send_personal_message({"n": 1}, 4)
+        await asyncio.sleep(0.01)
+        sync, msg = first.sent
+        assert sync["type"] == "SYNC" and not sync["resumed"] and msg == {"n": 1, "seq": 1}
+        m.disconnect(4, first)
+
+        await m.send_personal_message({"n": 2}, 4)
+        await m.send_personal_message({"n": 3}, 4)
+        second = FakeSocket()
+        conn = await m.connect(4, second, last_seq=1, epoch=sync["epoch"])
+        await asyncio.sleep(0.01)
+        assert conn.resumed
+        assert second.sent[0]["resumed"] and second.sent[0]["replayed"] == 2 and second.sent[0]["seq"] == 3
+        assert [x["n"] for x in second.sent[1:]] == [2, 3]
+
+        third = FakeSocket()
+        conn = await m.connect(4, third, last_seq=1, epoch="stale")
+        await asyncio.sleep(0.01)
+        assert not conn.resumed and third.sent == [dict(third.sent[0], resumed=False, replayed=0)]
+
+    asyncio.run(scenario())
+
+
+def test_transient_frames_do_not_use_up_the_replay_buffer():
+    async def scenario():
+        m = ConnectionManager(queue_size=10)
+        m.message_log = MessageLog(capacity=3)
+        first = FakeSocket()
+        await m.connect_customer(5, first)
+        await m.send_to_customer(5, {"type": "ORDER_STATUS_UPDATE", "status": "picked_up"})
+        await asyncio.sleep(0.01)
+        sync, status = first.sent
+        m.disconnect_customer(5, first)
+
+        for i in range(10):  # a few minutes of position pushes while the customer is away
+            assert not await m.send_to_customer(5, {"type": "RIDER_LOCATION", "d": [i, i]}, replay=False)
+        await m.send_to_customer(5, {"type": "ORDER_STATUS_UPDATE", "status": "delivered"})
+        second = FakeSocket()
+        conn = await m.connect_customer(5, second, last_seq=status["seq"], epoch=sync["epoch"])
+        assert await m.send_to_customer(5, {"type": "RIDER_LOCATION", "p": [1, 2]}, replay=False)
+        await asyncio.sleep(0.01)
+        assert conn.resumed and [x.get("status") for x in second.sent[1:3]] == ["delivered", None]
+        assert second.sent[1]["seq"] == 2 and "seq" not in second.sent[2]
+
+    asyncio.run(scenario())
+
+
+def main():
+    test_sequence_numbers_are_per_recipient()
+    test_since_returns_only_the_gap()
+    test_oldest_streams_are_evicted()
+    test_reconnect_replays_missed_messages()
+    test_transient_frames_do_not_use_up_the_replay_buffer()
+    print("message log tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
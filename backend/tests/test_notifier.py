@@ -0,0 +1,37 @@
+"""
+Offline tests for the long-poll notifier (no server or Supabase needed).
+From backend dir: python tests/test_notifier.py  (or python -m pytest tests/test_notifier.py)
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.notifier import KeyedNotifier
+
+
+def test_notify_wakes_only_that_key():
+    async def scenario():
+        n = KeyedNotifier()
+        a = asyncio.create_task(n.wait(1, timeout=1))
+        b = asyncio.create_task(n.wait(2, timeout=0.05))
+        await asyncio.sleep(0)
+        assert n.waiting(1) == 1 and n.waiting(2) == 1
+        assert n.notify(1) == 1
+        assert await a is True
+        assert await b is False
+        assert n.waiting(1) == 0 and n.waiting(2) == 0
+        assert n.notify(3) == 0
+
+    asyncio.run(scenario())
+
+
+def main():
+    test_notify_wakes_only_that_key()
+    print("notifier tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Offline tests for the direct-Postgres prepared read path (no server, Postgres or Supabase needed).
+From backend dir: python tests/test_pg_reads.py  (or python -m pytest tests/test_pg_reads.py)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core import pg
+from app.core.pg import PreparedQuery
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.fail:
+            raise RuntimeError("connection lost")
+        self.conn.statements.append((sql, params))
+
+    def fetchone(self):
+        return (self.conn.result,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Stands in for a pooled DBAPI connection: .info survives check-out / check-in."""
+
+    def __init__(self, result):
+        self.info = {}
+        self.statements = []
+        self.result = result
+        self.fail = False
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed += 1
+
+
+class FakePool:
+    def status(self):
+        return "fake pool"
+
+
+class FakeEngine:
+    def __init__(self, conns):
+        self.conns = conns
+        self.next = 0
+        self.pool = FakePool()
+
+    def raw_connection(self):
+        conn = self.conns[self.next % len(self.conns)]
+        self.next += 1
+        return conn
+
+
+def with_engine(conns):
+    pg._engine = FakeEngine(conns)
+
+
+def test_statement_is_prepared_once_per_connection():
+    a, b = FakeConnection([{"id": 1}]), FakeConnection([])
+    with_engine([a, b])
+    q = PreparedQuery("test_orders", "SELECT json_agg(o) FROM orders o WHERE o.id = ANY($1::bigint[]) AND $2::text IS NULL")
+    assert q.arity == 2
+    assert q([1, 2], None) == [{"id": 1}]  # a: PREPARE + EXECUTE
+    assert q([3], None) == []              # b: PREPARE + EXECUTE
+    assert q([1], "x") == [{"id": 1}]      # a again: EXECUTE only
+    assert [s for s, _ in a.statements] == [
+        "PREPARE test_orders AS " + q.sql,
+        "EXECUTE test_orders(%s, %s)",
+        "EXECUTE test_orders(%s, %s)",
+    ]
+    assert a.statements[-1][1] == ([1], "x")
+    assert len(b.statements) == 2 and a.closed == 2 and b.closed == 1
+    s = pg.stats()["statements"]["test_orders"]
+    assert s["calls"] == 3 and s["prepares"] == 2 and s["errors"] == 0
+    pg._engine = None
+
+
+def test_errors_are_counted_and_the_connection_returned():
+    conn = FakeConnection(None)
+    with_engine([conn])
+    q = PreparedQuery("test_fail", "SELECT 1")
+    conn.fail = True
+    try:
+        q()
+        raise AssertionError("expected the driver error")
+    except RuntimeError:
+        pass
+    assert conn.closed == 1 and "test_fail" not in conn.info["prepared"]
+    conn.fail = False
+    assert q() is None  # no row
+    assert pg.stats()["statements"]["test_fail"]["errors"] == 1
+    try:
+        q(1)
+        raise AssertionError("expected a parameter count error")
+    except TypeError:
+        pass
+    pg._engine = None
+
+
+def test_repositories_are_enabled_only_with_a_database_url():
+    url, repos = pg.DATABASE_URL, pg.PG_READ_REPOSITORIES
+    try:
+        pg.PG_READ_REPOSITORIES = {"dispatch"}
+        pg.DATABASE_URL = ""
+        assert not pg.enabled("dispatch")
+        pg.DATABASE_URL = "postgresql://localhost/app"
+        assert pg.enabled("dispatch") and not pg.enabled("customer")
+    finally:
+        pg.DATABASE_URL, pg.PG_READ_REPOSITORIES = url, repos
+
+
+def main():
+    test_statement_is_prepared_once_per_connection()
+    test_errors_are_counted_and_the_connection_returned()
+    test_repositories_are_enabled_only_with_a_database_url()
+    print("pg read tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Offline tests for decayed popularity scores and the popular items endpoint (no server or Supabase needed).
+From backend dir: python tests/test_popular_items.py  (or python -m pytest tests/test_popular_items.py)
+"""
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from fastapi.testclient import TestClient
+
+from app.core import query_stats
+from app.core.fake_supabase import FakeSupabase, install
+from app.core.popularity import current_score, log_add, log_weight
+from app.core.query_stats import query_budget
+
+HALF_LIFE = 168
+NOW = datetime.now(timezone.utc)
+
+
+def ago(days):
+    return (NOW - timedelta(days=days)).isoformat()
+
+
+def trend(*lines):
+    score = None
+    for qty, at in lines:
+        score = log_add(score, log_weight(qty, at, HALF_LIFE))
+    return score
+
+
+def test_decayed_scores():
+    assert math.isclose(current_score(log_weight(4, NOW, HALF_LIFE), HALF_LIFE, NOW), 4)
+    assert math.isclose(current_score(log_weight(4, ago(7), HALF_LIFE), HALF_LIFE, NOW), 2)  # one half-life
+    assert math.isclose(current_score(trend((1, NOW), (4, ago(14))), HALF_LIFE, NOW), 2)
+    assert trend((3, ago(14))) < trend((1, NOW))  # 0.75 vs 1: recent orders win
+    assert log_add(None, 1.0) == 1.0 and current_score(None, HALF_LIFE) == 0.0
+    far = log_weight(1, datetime(2100, 1, 1, tzinfo=timezone.utc), HALF_LIFE)
+    assert math.isfinite(log_add(far, far))  # log space: no overflow decades after the landmark
+
+
+def items():
+    return [{"id": i, "menu_id": 1 if i <= 3 else 2, "name": f"Dish {i}", "description": "", "price_cents": 100 * i,
+             "image_url": None, "is_available": True} for i in range(1, 6)]
+
+
+def summary_shop():
+    return FakeSupabase(tables={
+        "menus": [{"id": 1, "restaurant_id": 1}, {"id": 2, "restaurant_id": 2}],
+        "menu_items": items(),
+        "menu_item_popularity": [
+            {"id": 1, "menu_item_id": 1, "restaurant_id": 1, "total_qty": 40, "order_count": 20, "trend_log": trend((40, ago(60)))},
+            {"id": 2, "menu_item_id": 2, "restaurant_id": 1, "total_qty": 12, "order_count": 10, "trend_log": trend((12, ago(1)))},
+            {"id": 3, "menu_item_id": 4, "restaurant_id": 2, "total_qty": 12, "order_count": 12, "trend_log": trend((12, ago(3)))},
+            {"id": 4, "menu_item_id": 5, "restaurant_id": 2, "total_qty": 1, "order_count": 1, "trend_log": None},
+        ],
+    })
+
+
+def test_endpoint_reads_top_k_from_the_summary():
+    from app import supabase_client
+    from app.main import app
+    from app.services import consumer_service
+
+    original = supabase_client.supabase
+    query_stats.instrument()
+    install(summary_shop())
+    consumer_service._popular_cache.clear()
+    try:
+        client = TestClient(app)
+        with query_budget(1):
+            top = client.get("/consumer/popular-items").json()
+        assert [i["id"] for i in top] == [1, 4, 2, 5]  # qty, then order count
+        assert top[0]["restaurant_id"] == 1 and top[0]["total_ordered_qty"] == 40 and top[0]["order_count"] == 20
+        with query_budget(0):
+            assert client.get("/consumer/popular-items").json() == top  # served from the short cache
+        trending = client.get("/consumer/popular-items", params={"trending": True, "limit": 3}).json()
+        assert [i["id"] for i in trending] == [2, 4, 1]
+        assert math.isclose(trending[0]["trending_score"], 12 * 2 ** (-1 / 7), rel_tol=1e-3)
+        mine = client.get("/consumer/popular-items", params={"restaurant_id": 2}).json()
+        assert [i["id"] for i in mine] == [4, 5] and {i["restaurant_id"] for i in mine} == {2}
+        assert client.get("/consumer/popular-items", params={"limit": 0}).status_code == 422
+    finally:
+        install(original)
+        consumer_service._popular_cache.clear()
+
+
+def test_order_items_fallback_matches_the_summary_semantics():
+    from app import supabase_client
+    from app.services.consumer_service import ConsumerService
+
+    original = supabase_client.supabase
+    db = FakeSupabase(tables={
+        "menus": [{"id": 1, "restaurant_id": 1}, {"id": 2, "restaurant_id": 2}],
+        "menu_items": items(),
+        "orders": [{"id": 1, "restaurant_id": 1, "created_at": ago(60)}, {"id": 2, "restaurant_id": 1, "created_at": ago(1)},
+                   {"id": 3, "restaurant_id": 2, "created_at": ago(3)}],
+        "order_items": [{"id": 1, "order_id": 1, "menu_item_id": 1, "quantity": 40},
+                        {"id": 2, "order_id": 2, "menu_item_id": 2, "quantity": 12},
+                        {"id": 3, "order_id": 3, "menu_item_id": 4, "quantity": 6},
+                        {"id": 4, "order_id": 3, "menu_item_id": 4, "quantity": 6}],
+    })
+    try:
+        install(db)
+        assert [i["id"] for i in ConsumerService._popular_from_order_items(None, False, 10)] == [1, 4, 2]
+        trending = ConsumerService._popular_from_order_items(None, True, 2)
+        assert [i["id"] for i in trending] == [2, 4] and trending[1]["order_count"] == 2
+        assert trending[1]["restaurant_id"] == 2
+        assert [i["id"] for i in ConsumerService._popular_from_order_items(2, False, 10)] == [4]
+        db.tables["order_items"].clear()
+        assert [i["id"] for i in ConsumerService._popular_from_order_items(1, False, 2)] == [1, 2]  # nothing ordered yet
+    finally:
+        install(original)
+
+
+class FailingSupabase(FakeSupabase):
+    """Raises the given error on reads of the summary table."""
+
+    def __init__(self, error, **kwargs):
+        super().__init__(**kwargs)
+        self.error = error
+
+    def table(self, name):
+        if name == "menu_item_popularity":
+            raise self.error
+        return super().table(name)
+
+
+def test_only_a_missing_summary_table_falls_back_to_order_items():
+    from postgrest import APIError
+
+    from app import supabase_client
+    from app.services import consumer_service
+    from app.services.consumer_service import ConsumerService
+
+    original = supabase_client.supabase
+    consumer_service._popular_cache.clear()
+    try:
+        for code in ("PGRST205", "42P01"):
+            db = FailingSupabase(APIError({"message": "no such relation", "code": code}), tables=summary_shop().tables)
+            install(db)
+            assert ConsumerService._popular_from_summary(None, False, 10) is None
+        for error in (APIError({"message": "canceling statement due to statement timeout", "code": "57014"}),
+                      ConnectionError("database unavailable")):
+            db = FailingSupabase(error, tables=summary_shop().tables)
+            install(db)
+            try:
+                ConsumerService.get_popular_items()
+                raise AssertionError("expected the error to be raised")
+            except type(error):
+                pass
+            assert db.calls[("order_items", "select")] == 0  # no full scan on a transient failure
+    finally:
+        install(original)
+
+
+def main():
+    test_decayed_scores()
+    test_endpoint_reads_top_k_from_the_summary()
+    test_order_items_fallback_matches_the_summary_semantics()
+    test_only_a_missing_summary_table_falls_back_to_order_items()
+    print("popular items tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Offline tests for PositionThrottle (no server or Supabase needed).
+From backend dir: python tests/test_position_throttle.py  (or python -m pytest tests/test_position_throttle.py)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.position_throttle import decode_position, PositionThrottle
+
+
+def test_keyframe_then_deltas_round_trip():
+    t = PositionThrottle(min_interval=2, min_move_m=10, keyframe_every=2)
+    first = t.offer(1, 16.800000, 96.100000, now=0)
+    assert first["p"] == [16800000, 96100000]
+    second = t.offer(1, 16.801000, 96.100500, now=2)
+    assert second["d"] == [1000, 500]
+    third = t.offer(1, 16.802000, 96.101000, now=4)
+    assert "p" in third  # every 2nd update is absolute again
+    pos = None
+    for update in (first, second, third):
+        pos = decode_position(pos, update)
+    assert pos == [16802000, 96101000]
+    assert decode_position(None, second) is None
+
+
+def test_rate_limit_and_small_moves_are_suppressed():
+    t = PositionThrottle(min_interval=2, min_move_m=10, keyframe_every=100)
+    assert t.offer(1, 16.8, 96.1, now=0) is not None
+    assert t.offer(1, 16.81, 96.1, now=1) is None  # too soon
+    assert t.offer(1, 16.80005, 96.1, now=3) is None  # ~5.5 m
+    assert t.offer(1, 16.8001, 96.1, now=4)["d"] == [100, 0]  # ~11 m from the last one sent
+    assert t.offer(2, 16.8, 96.1, now=1) is not None  # limits are per subscriber
+    m = t.metrics()
+    assert (m["offered"], m["sent"], m["rate_limited"], m["too_small"]) == (5, 3, 1, 1)
+
+
+def test_gap_forces_keyframe():
+    t = PositionThrottle(min_interval=1, keyframe_every=100, keyframe_after=30)
+    t.offer(1, 16.8, 96.1, now=0)
+    assert "p" in t.offer(1, 16.9, 96.1, now=40)
+    t.forget(1)
+    assert len(t) == 0
+
+
+def main():
+    test_keyframe_then_deltas_round_trip()
+    test_rate_limit_and_small_moves_are_suppressed()
+    test_gap_forces_keyframe()
+    print("position throttle tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
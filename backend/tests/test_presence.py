@@ -0,0 +1,139 @@
+"""
+Offline tests for PresenceTracker and live-rider filtering (no server or Supabase needed).
+From backend dir: python tests/test_presence.py  (or python -m pytest tests/test_presence.py)
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from app.core.presence import PresenceTracker
+from app.core.rider_index import RiderIndex
+
+
+def test_heartbeats_keep_keys_live_until_timeout():
+    p = PresenceTracker(timeout=30)
+    p.seen(1, now=100.0)
+    p.seen(2, now=100.0)
+    p.seen(2, now=125.0)
+    assert p.is_live(1, now=120.0) and not p.is_live(1, now=131.0)
+    assert p.live([1, 2, 3], now=131.0) == [2]
+    assert p.expire(now=131.0) == [1]
+    assert 1 not in p and 2 in p and p.metrics()["expired_total"] == 1
+
+
+def test_stale_key_coming_back_is_reported_once():
+    p = PresenceTracker(timeout=10)
+    p.seen(5, now=0.0)
+    p.expire(now=20.0)
+    assert p.seen(5, now=21.0) is True
+    assert p.seen(5, now=22.0) is False
+    p.mark_expired([9], now=30.0)  # never seen, downgraded anyway
+    assert p.seen(9, now=31.0) is True
+    p.seen(6, now=40.0)
+    p.forget(6)
+    assert p.expire(now=100.0) == [5, 9] and p.seen(6, now=101.0) is False
+
+
+def test_background_task_hands_stale_keys_over_in_bulk():
+    async def scenario():
+        ticks, stale = [], []
+
+        async def on_tick():
+            ticks.append(1)
+
+        async def on_stale(keys):
+            stale.append(sorted(keys))
+
+        p = PresenceTracker(timeout=0.02, interval=0.03, on_tick=on_tick, on_stale=on_stale)
+        for key in (1, 2, 3):
+            p.seen(key)
+        p.start()
+        await asyncio.sleep(0.05)
+        await p.stop()
+        assert ticks and stale == [[1, 2, 3]]
+
+    asyncio.run(scenario())
+
+
+def test_nearest_skips_riders_rejected_by_where():
+    index = RiderIndex(cell_size_deg=0.01)
+    index.load([(1, 11, 16.870, 96.200), (2, 12, 16.871, 96.200), (3, 13, 16.900, 96.250)])
+    assert [r["rider_id"] for r in index.nearest(16.87, 96.2, k=2)] == [1, 2]
+    live = index.nearest(16.87, 96.2, k=2, where=lambda c: c["rider_id"] != 1)
+    assert [r["rider_id"] for r in live] == [2, 3]
+    assert sorted(index.rider_ids()) == [1, 2, 3]
+
+
+def test_dead_riders_are_counted_once_when_nearest_falls_back_to_a_flat_scan():
+    import time
+
+    from app.services import presence_service
+
+    index = RiderIndex(cell_size_deg=0.01)
+    # Two occupied cells: the ring search gives up after ring 0 and scans every rider.
+    index.load([(1, 11, 16.870, 96.200), (2, 12, 16.871, 96.200), (3, 13, 16.950, 96.300)])
+    presence = PresenceTracker(timeout=30)
+    presence.started_at = time.monotonic() - 60
+    presence.seen(2)
+    presence.seen(3)
+    calls = []
+    saved = presence_service.rider_index, presence_service.rider_presence
+    presence_service.rider_index, presence_service.rider_presence = index, presence
+    try:
+        assert presence_service.PresenceService.enabled()
+        live = presence_service.PresenceService.nearest_live(16.87, 96.2, k=3)
+        assert [r["rider_id"] for r in live] == [2, 3] and presence.offers_avoided == 1
+        index.nearest(16.87, 96.2, k=3, where=lambda c: calls.append(c["rider_id"]) or c["rider_id"] != 1)
+        assert sorted(calls) == [1, 2, 3]
+    finally:
+        presence_service.rider_index, presence_service.rider_presence = saved
+
+
+def test_riders_never_heard_from_are_downgraded_only_when_enabled():
+    import time
+
+    from app.services import presence_service
+
+    index = RiderIndex(cell_size_deg=0.01)
+    index.load([(1, 11, 16.870, 96.200), (2, 12, 16.871, 96.200)])
+    presence = PresenceTracker(timeout=30)
+    presence.started_at = time.monotonic() - 60
+    presence.seen(2)
+    downgraded = []
+
+    async def downgrade(rider_ids):
+        downgraded.append(sorted(rider_ids))
+
+    saved = (presence_service.rider_index, presence_service.rider_presence,
+             presence_service.RIDER_PRESENCE_DOWNGRADE_SILENT, vars(presence_service.PresenceService)["_downgrade"])
+    presence_service.rider_index, presence_service.rider_presence = index, presence
+    presence_service.PresenceService._downgrade = staticmethod(downgrade)
+    try:
+        presence_service.RIDER_PRESENCE_DOWNGRADE_SILENT = False
+        asyncio.run(presence_service.PresenceService._tick())
+        assert downgraded == [] and 1 not in presence  # e.g. an app build that never answers PING
+        presence_service.RIDER_PRESENCE_DOWNGRADE_SILENT = True
+        asyncio.run(presence_service.PresenceService._tick())
+        assert downgraded == [[1]]
+    finally:
+        (presence_service.rider_index, presence_service.rider_presence,
+         presence_service.RIDER_PRESENCE_DOWNGRADE_SILENT, presence_service.PresenceService._downgrade) = saved
+
+
+def main():
+    test_heartbeats_keep_keys_live_until_timeout()
+    test_stale_key_coming_back_is_reported_once()
+    test_background_task_hands_stale_keys_over_in_bulk()
+    test_nearest_skips_riders_rejected_by_where()
+    test_dead_riders_are_counted_once_when_nearest_falls_back_to_a_flat_scan()
+    test_riders_never_heard_from_are_downgraded_only_when_enabled()
+    print("presence tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Offline tests for per-request query accounting (no server or Supabase needed).
+From backend dir: python tests/test_query_stats.py  (or python -m pytest tests/test_query_stats.py)
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from fastapi.testclient import TestClient
+
+from app.core import query_stats
+from app.core.db_executor import run_db
+from app.core.fake_supabase import FakeSupabase, install
+from app.core.query_stats import query_budget
+
+
+def menu_db():
+    return FakeSupabase(tables={
+        "restaurants": [{"id": 1, "name": "Luigi's", "status": "approved"}],
+        "menus": [{"id": 1, "restaurant_id": 1}, {"id": 2, "restaurant_id": 1}],
+        "menu_items": [
+            {"id": 1, "menu_id": 1, "name": "Margherita", "price_cents": 950},
+            {"id": 2, "menu_id": 2, "name": "Tiramisu", "price_cents": 600},
+        ],
+    })
+
+
+def test_budget_counts_direct_calls_by_table():
+    query_stats.instrument()
+    db = menu_db()
+    with query_budget(3) as q:
+        db.table("menus").select("*").eq("restaurant_id", 1).execute()
+        db.table("menu_items").select("*").eq("menu_id", 1).execute()
+        db.table("menu_items").select("*").eq("menu_id", 2).maybe_single().execute()
+    assert q.queries == 3 and q.rows == 4
+    assert q.tables["menu_items"]["queries"] == 2 and q.tables["menu_items"]["operations"] == {"select": 2}
+    try:
+        with query_budget(1):
+            db.table("menus").select("*").execute()
+            db.table("menu_items").select("*").execute()
+        raise AssertionError("expected the budget to fail")
+    except AssertionError as e:
+        assert "2 queries, budget 1" in str(e) and "menu_items x1" in str(e)
+
+
+def test_run_db_queries_count_for_the_caller():
+    query_stats.instrument()
+    db = menu_db()
+
+    async def handler():
+        with query_budget(5) as q:
+            await asyncio.gather(*(run_db(db.table("menus").select("*").execute) for _ in range(4)))
+        return q
+
+    assert asyncio.run(handler()).queries == 4
+
+
+def test_tasks_started_by_a_request_count_as_background():
+    query_stats.instrument()
+    query_stats.reset()
+    db = menu_db()
+
+    async def request():
+        queries = query_stats.RequestQueries("POST /orders")
+        token = query_stats._current.set(queries)  # what QueryStatsMiddleware does around the handler
+        try:
+            release = asyncio.Event()
+
+            async def dispatch():
+                await release.wait()
+                await run_db(db.table("menus").select("*").execute)
+
+            spawned = query_stats.spawn_background(dispatch())
+            inherited = asyncio.create_task(dispatch())  # still holds the request in its context
+            await run_db(db.table("restaurants").select("*").execute)
+            await asyncio.sleep(0)
+        finally:
+            query_stats._current.reset(token)
+            query_stats._finish(queries)
+        release.set()
+        await asyncio.gather(spawned, inherited)
+        return queries
+
+    queries = asyncio.run(request())
+    assert queries.queries == 1 and list(queries.tables) == ["restaurants"]
+    assert query_stats.stats()["background"]["tables"]["menus"]["queries"] == 2
+
+
+def test_endpoint_server_timing_and_debug_endpoint():
+    from app import supabase_client
+    from app.core.catalog_cache import menu_cache
+    from app.main import app
+
+    original = supabase_client.supabase
+    install(menu_db())
+    query_stats.reset()
+    try:
+        client = TestClient(app)
+        menu_cache.invalidate()
+        with query_budget(3):
+            r = client.get("/consumer/restaurants/1/menu")  # restaurant, menus, items
+        assert r.status_code == 200, r.text
+        timing = r.headers["server-timing"]
+        assert timing.startswith("db;dur=") and '"3 queries, 5 rows"' in timing and 'db-menu_items;' in timing
+        menu_cache.invalidate()
+        try:
+            with query_budget(2):
+                client.get("/consumer/restaurants/1/menu")
+            raise AssertionError("expected the budget to fail")
+        except AssertionError as e:
+            assert "GET /consumer/restaurants/{restaurant_id}/menu: 3 queries, budget 2" in str(e)
+        assert client.get("/consumer/restaurants/1/menu").headers["server-timing"].startswith('db;dur=0.0;desc="0 queries')
+        routes = client.get("/debug/queries").json()["routes"]
+        menu = routes["GET /consumer/restaurants/{restaurant_id}/menu"]
+        assert menu["requests"] == 3 and menu["max_queries"] == 3 and menu["avg_queries"] == 2
+    finally:
+        install(original)
+        menu_cache.invalidate()
+
+
+def main():
+    test_budget_counts_direct_calls_by_table()
+    test_run_db_queries_count_for_the_caller()
+    test_tasks_started_by_a_request_count_as_background()
+    test_endpoint_server_timing_and_debug_endpoint()
+    print("query stats tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
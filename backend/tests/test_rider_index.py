@@ -0,0 +1,67 @@
+"""
+Offline tests for the dispatch rider index (no server or Supabase needed).
+From backend dir: python tests/test_rider_index.py  (or python -m pytest tests/test_rider_index.py)
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.location_utils import haversine_distance
+from app.core.rider_index import RiderIndex
+
+
+def _brute_force(riders, lat, lon, k, radius_km=None, exclude=()):
+    scored = [
+        (haversine_distance(lat, lon, rlat, rlon), rid)
+        for rid, _, rlat, rlon in riders
+        if rid not in exclude
+    ]
+    if radius_km is not None:
+        scored = [s for s in scored if s[0] <= radius_km]
+    return [rid for _, rid in sorted(scored)[:k]]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    riders = [(i, 1000 + i, 16.8 + rng.random() * 0.2, 96.1 + rng.random() * 0.2) for i in range(2000)]
+    index = RiderIndex(cell_size_deg=0.01)
+    index.load(riders)
+    assert index.warm and len(index) == 2000
+    for _ in range(50):
+        lat, lon = 16.8 + rng.random() * 0.2, 96.1 + rng.random() * 0.2
+        got = [r["rider_id"] for r in index.nearest(lat, lon, k=5)]
+        assert got == _brute_force(riders, lat, lon, 5)
+        got = [r["rider_id"] for r in index.nearest(lat, lon, k=5, radius_km=1.5, exclude={1, 2, 3})]
+        assert got == _brute_force(riders, lat, lon, 5, radius_km=1.5, exclude={1, 2, 3})
+
+
+def test_updates_move_and_remove_riders():
+    index = RiderIndex(cell_size_deg=0.01)
+    index.load([(1, 11, 16.80, 96.10), (2, 12, 16.90, 96.20)])
+    near = index.nearest(16.90, 96.20, k=1)
+    assert near[0]["rider_id"] == 2 and near[0]["user_id"] == 12
+
+    assert index.update_location(1, 16.9001, 96.2001)
+    assert not index.update_location(99, 16.9, 96.2)  # not available -> not indexed
+    index.remove(2)
+    near = index.nearest(16.90, 96.20, k=2)
+    assert [r["rider_id"] for r in near] == [1]
+
+    index.upsert(3, 13, 16.95, 96.25)
+    assert 3 in index
+    assert index.nearest(16.90, 96.20, k=5, radius_km=1.0)[0]["rider_id"] == 1
+    index.invalidate()
+    assert not index.warm and index.nearest(16.90, 96.20) == []
+
+
+def main():
+    test_nearest_matches_brute_force()
+    test_updates_move_and_remove_riders()
+    print("rider index tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Offline tests for the SSE order tracking stream (no server or Supabase needed).
+From backend dir: python tests/test_tracking_stream.py  (or python -m pytest tests/test_tracking_stream.py)
+"""
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from app.core.sse import diff, format_event, parse_event_id
+from app.core.websocket_manager import manager
+from app.services.rider_position_service import RiderPositionService
+from app.services.tracking_service import TrackingService
+
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":"))
+    return fields.get("event"), json.loads(fields["data"]), fields.get("id")
+
+
+def test_helpers():
+    assert format_event({"a": 1}, event="delta", event_id="e:3") == 'id: e:3\nevent: delta\ndata: {"a":1}\n\n'
+    assert parse_event_id("abc:12") == (12, "abc")
+    assert parse_event_id(None) == (None, None) and parse_event_id("junk") == (None, None)
+    assert diff({"status": "ready", "x": 1}, {"status": "picked_up", "x": 1, "rider": {}}) == {"status": "picked_up", "rider": {}}
+
+
+def test_snapshot_then_deltas():
+    async def scenario():
+        doc = {"id": 9, "user_id": 501, "status": "ready"}
+        snapshots = []
+
+        def snapshot():
+            snapshots.append(1)
+            if len(snapshots) > 1:
+                return {**doc, "status": "rider_assigned", "delivery": {"rider_id": 77}, "rider": {"id": 77}}
+            return dict(doc)
+
+        stream = TrackingService.stream(9, 501, snapshot)
+        event, data, first_id = parse(await stream.__anext__())
+        assert event == "snapshot" and data["status"] == "ready"
+
+        await manager.send_to_customer(501, {"type": "ORDER_STATUS_UPDATE", "order_id": 8, "status": "picked_up"})
+        await manager.send_to_customer(501, {"type": "ORDER_STATUS_UPDATE", "order_id": 9, "status": "rider_assigned"})
+        event, data, _ = parse(await stream.__anext__())
+        assert event == "delta" and data["status"] == "rider_assigned" and data["rider"] == {"id": 77}
+        assert len(snapshots) == 2
+
+        RiderPositionService.delivery_started(77, 9, 501)
+        assert await RiderPositionService.publish(77, 16.8, 96.1) == 1
+        assert await RiderPositionService.publish(77, 16.81, 96.1) == 0  # rate limited
+        assert manager.message_log.last_seq(("customer", 501)) == 2  # positions are not sequenced
+        event, data, _ = parse(await stream.__anext__())
+        assert data["rider_location"]["latitude"] == 16.8 and data["rider_location"]["longitude"] == 96.1
+
+        await manager.send_to_customer(501, {"type": "ORDER_STATUS_UPDATE", "order_id": 9, "status": "delivered"})
+        event, data, last_id = parse(await stream.__anext__())
+        assert event == "delta" and data == {"status": "delivered"}
+        event, data, _ = parse(await stream.__anext__())
+        assert event == "end"
+        await stream.aclose()
+        assert 501 not in manager.customer_connections
+
+        # Reconnect from the first event: the buffered deltas are replayed without a new snapshot.
+        again = TrackingService.stream(9, 501, lambda: dict(doc), first_id)
+        event, data, _ = parse(await again.__anext__())
+        assert event == "delta" and data == {"status": "rider_assigned"}
+        await again.aclose()
+
+    asyncio.run(scenario())
+
+
+def main():
+    test_helpers()
+    test_snapshot_then_deltas()
+    print("tracking stream tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
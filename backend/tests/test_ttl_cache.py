@@ -0,0 +1,46 @@
+"""
+Offline tests for the in-process TTL cache (no server or Supabase needed).
+From backend dir: python tests/test_ttl_cache.py  (or python -m pytest tests/test_ttl_cache.py)
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.ttl_cache import TTLCache
+
+
+def test_entries_expire_and_invalidate():
+    cache = TTLCache(ttl_seconds=0.05)
+    cache.set(1, {"status": "ready"})
+    assert cache.get(1) == {"status": "ready"}
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    cache.set(2, "x")
+    time.sleep(0.06)
+    assert cache.get(2) is None and len(cache) == 0
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_bounded_and_disabled():
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)  # 1 is now most recently used
+    cache.set(3, "c")
+    assert cache.get(2) is None and cache.get(1) == "a" and cache.get(3) == "c"
+    off = TTLCache(ttl_seconds=0)
+    off.set(1, "a")
+    assert off.get(1) is None
+
+
+def main():
+    test_entries_expire_and_invalidate()
+    test_bounded_and_disabled()
+    print("ttl cache tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
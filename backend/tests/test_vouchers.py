@@ -0,0 +1,303 @@
+"""
+Offline tests for voucher redemption, the voucher rule cache and its Bloom filter (no server or Supabase needed).
+From backend dir: python tests/test_vouchers.py  (or python -m pytest tests/test_vouchers.py)
+"""
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_FAKE", "1")
+
+from fastapi.testclient import TestClient
+
+from app.core import query_stats
+from app.core.bloom import BloomFilter
+from app.core.fake_supabase import FakeSupabase, install
+from app.core.query_stats import query_budget
+
+
+def shop(**voucher):
+    return FakeSupabase(tables={
+        "vouchers": [{"id": 1, "code": "SAVE10", "discount_type": "percentage", "discount_value": 10, "min_order_cents": 2000,
+                      "valid_from": None, "valid_until": None, "max_uses": None, "use_count": 0, "is_active": True,
+                      "restaurant_id": None, "max_uses_per_user": None, **voucher}],
+        "voucher_redemptions": [],
+    })
+
+
+def redeem_voucher(client, p_code, p_subtotal_cents, p_restaurant_id=None, p_user_id=None):
+    """What supabase/voucher_redemption_rpc.sql does, for the fake (runs under the client lock)."""
+    v = next((r for r in client.tables["vouchers"] if r["code"].upper() == p_code.strip().upper()), None)
+    if v is None:
+        return {"error": "not_found", "min_order_cents": 0}
+    if p_subtotal_cents < v["min_order_cents"]:
+        return {"error": "min_order", "min_order_cents": v["min_order_cents"]}
+    if v["max_uses"] is not None and v["use_count"] >= v["max_uses"]:
+        return {"error": "use_limit", "min_order_cents": v["min_order_cents"]}
+    if p_user_id is not None:
+        row = next((r for r in client.tables["voucher_redemptions"] if r["user_id"] == p_user_id), None)
+        if row is None:
+            row = {"voucher_id": v["id"], "user_id": p_user_id, "uses": 0}
+            client.tables["voucher_redemptions"].append(row)
+        if v["max_uses_per_user"] is not None and row["uses"] >= v["max_uses_per_user"]:
+            return {"error": "user_limit", "min_order_cents": v["min_order_cents"]}
+        row["uses"] += 1
+    v["use_count"] += 1
+    return {**v, "discount_cents": p_subtotal_cents * v["discount_value"] // 100}
+
+
+def release_voucher(client, p_voucher_id, p_user_id=None):
+    v = next(r for r in client.tables["vouchers"] if r["id"] == p_voucher_id)
+    v["use_count"] = max(v["use_count"] - 1, 0)
+    for row in client.tables["voucher_redemptions"]:
+        if row["user_id"] == p_user_id:
+            row["uses"] = max(row["uses"] - 1, 0)
+    return True
+
+
+def with_fake(db, test):
+    from app import supabase_client
+
+    original = supabase_client.supabase
+    query_stats.instrument()
+    install(db)
+    try:
+        test()
+    finally:
+        install(original)
+
+
+def test_rpc_redeems_in_one_call_and_enforces_per_user_limits():
+    from app.repositories.voucher_repo import VoucherRepository
+
+    db = shop(max_uses_per_user=1)
+    db.register_rpc("redeem_voucher", redeem_voucher)
+    db.register_rpc("release_voucher", release_voucher)
+
+    def run():
+        with query_budget(1):
+            voucher, err = VoucherRepository.redeem(" save10 ", 3000, None, user_id=7)
+        assert err is None and voucher["discount_cents"] == 300 and voucher["id"] == 1
+        assert VoucherRepository.redeem("SAVE10", 3000, None, user_id=7) == (
+            None, "You have already used this voucher the maximum number of times")
+        assert VoucherRepository.redeem("SAVE10", 3000, None, user_id=8)[1] is None
+        assert VoucherRepository.redeem("SAVE10", 1000)[1] == "Minimum order for this voucher is 20.00"
+        assert VoucherRepository.redeem("NOPE", 3000)[1] == "Invalid voucher code"
+        assert db.tables["vouchers"][0]["use_count"] == 2
+        assert VoucherRepository.release(1, 7)  # that order was not created: user 7 may use it again
+        assert VoucherRepository.redeem("SAVE10", 3000, None, user_id=7)[1] is None
+        assert db.calls[("vouchers", "select")] == 0 and db.calls[("vouchers", "update")] == 0
+
+    with_fake(db, run)
+
+
+def test_fallback_never_overshoots_max_uses_under_concurrency():
+    from app.repositories.voucher_repo import VoucherRepository
+
+    db = shop(max_uses=3)
+    db.latency = 0.002  # lets concurrent read-then-write sequences interleave
+
+    def run():
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(VoucherRepository.redeem("SAVE10", 3000)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sum(1 for _, err in results if err is None) == 3
+        assert {err for _, err in results if err} == {"Voucher has reached its use limit"}
+        assert db.tables["vouchers"][0]["use_count"] == 3
+        assert VoucherRepository.release(1) and db.tables["vouchers"][0]["use_count"] == 2
+
+    with_fake(db, run)
+
+
+def test_rpc_failures_other_than_a_missing_function_are_raised():
+    from postgrest import APIError
+
+    from app.repositories.voucher_repo import VoucherRepository
+
+    def timed_out(client, **params):
+        raise APIError({"message": "canceling statement due to statement timeout", "code": "57014"})
+
+    db = shop(max_uses_per_user=1)
+    db.register_rpc("redeem_voucher", timed_out)
+    db.register_rpc("release_voucher", timed_out)
+
+    def run():
+        for call in (lambda: VoucherRepository.redeem("SAVE10", 3000, None, user_id=7), lambda: VoucherRepository.release(1, 7)):
+            try:
+                call()
+                raise AssertionError("expected the RPC error")
+            except APIError as e:
+                assert e.code == "57014"
+        assert db.tables["vouchers"][0]["use_count"] == 0  # no validate + increment_use fallback
+        assert db.calls[("vouchers", "update")] == 0
+
+    with_fake(db, run)
+
+
+def test_increment_use_handles_a_null_use_count():
+    from app.repositories.voucher_repo import VoucherRepository
+
+    db = shop(use_count=None)
+    with_fake(db, lambda: VoucherRepository.increment_use(1))
+    assert db.tables["vouchers"][0]["use_count"] == 1
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    codes = [f"CODE{i}" for i in range(1000)]
+    bloom = BloomFilter.of(codes)
+    assert all(c in bloom for c in codes) and bloom.count == 1000 and bloom.capacity >= 1500
+    false_positives = sum(f"OTHER{i}" in bloom for i in range(10000))
+    assert false_positives < 200, false_positives  # sized for 1%
+    assert bloom.size_bytes < 2000
+
+
+def rules_shop():
+    db = shop(updated_at="2026-03-01T10:00:00+00:00")
+    db.seed("vouchers", [
+        {"code": "FLAT5", "discount_type": "fixed", "discount_value": 500, "min_order_cents": 0, "is_active": True,
+         "use_count": 0, "max_uses": 1, "updated_at": "2026-03-01T11:00:00+00:00"},
+        {"code": "OLD", "discount_type": "fixed", "discount_value": 100, "min_order_cents": 0, "is_active": True,
+         "valid_until": "2026-02-01T00:00:00+00:00", "updated_at": "2026-03-01T09:00:00+00:00"},
+    ])
+    return db
+
+
+def test_rule_cache_rejects_unknown_codes_without_a_query_and_applies_changes():
+    from app.services.voucher_service import VoucherRuleCache
+
+    db = rules_shop()
+    rules = VoucherRuleCache(refresh_seconds=3600, rebuild_seconds=3600)
+
+    def run():
+        with query_budget(3):  # latest update, active codes, then the one rule
+            assert rules.validate("save10", 3000)[0]["discount_cents"] == 300
+        with query_budget(0):
+            for _ in range(3):
+                assert rules.validate("SAVE10", 3000)[0]["discount_cents"] == 300
+                assert rules.validate("GUESS", 3000) == (None, "Invalid voucher code")
+                assert rules.validate("", 3000) == (None, "Invalid voucher code")
+        assert rules.validate("OLD", 3000) == (None, "Voucher has expired")  # aware timestamps are compared
+        assert rules.validate("FLAT5", 3000)[1] is None
+        assert rules.stats()["rejected"] == 3 and rules.stats()["codes"] == 3
+
+        db.table("vouchers").update({"use_count": 1, "updated_at": "2026-03-01T12:00:00+00:00"}).eq("code", "FLAT5").execute()
+        db.table("vouchers").update({"is_active": False, "updated_at": "2026-03-01T12:00:00+00:00"}).eq("code", "SAVE10").execute()
+        db.seed("vouchers", [{"code": "NEW20", "discount_type": "percentage", "discount_value": 20, "min_order_cents": 0,
+                              "is_active": True, "use_count": 0, "updated_at": "2026-03-01T12:30:00+00:00"}])
+        assert rules.validate("NEW20", 3000) == (None, "Invalid voucher code")  # not polled yet
+        with query_budget(2):  # the rest of the overlap window's first timestamp, then newer ones
+            rules.refresh(force=True)
+        with query_budget(0):
+            assert rules.validate("FLAT5", 3000) == (None, "Voucher has reached its use limit")
+            assert rules.validate("SAVE10", 3000) == (None, "Voucher is no longer active")
+            assert rules.validate("NEW20", 3000)[0]["discount_cents"] == 600
+
+    with_fake(db, run)
+
+
+class TouchingSupabase(FakeSupabase):
+    """What supabase/vouchers_updated_at_trigger.sql does, for the fake: every UPDATE of vouchers sets updated_at."""
+
+    def table(self, name):
+        query = super().table(name)
+        if name == "vouchers":
+            update = query.update
+            query.update = lambda values, **kw: update({**values, "updated_at": datetime.now(timezone.utc).isoformat()}, **kw)
+        return query
+
+
+def test_updates_without_an_explicit_updated_at_are_picked_up():
+    from app.services.voucher_service import VoucherRuleCache
+
+    db = TouchingSupabase(tables=rules_shop().tables)
+    rules = VoucherRuleCache(refresh_seconds=3600, rebuild_seconds=3600)
+
+    def run():
+        assert rules.validate("FLAT5", 3000)[1] is None
+        db.table("vouchers").update({"is_active": False}).eq("code", "FLAT5").execute()  # e.g. from the SQL editor
+        rules.refresh(force=True)
+        with query_budget(0):
+            assert rules.validate("FLAT5", 3000) == (None, "Voucher is no longer active")
+
+    with_fake(db, run)
+
+
+def test_poll_pages_past_shared_timestamps_and_rereads_the_overlap_window():
+    from app.services.voucher_service import VoucherRuleCache
+
+    db = rules_shop()
+    rules = VoucherRuleCache(refresh_seconds=3600, rebuild_seconds=3600, overlap_seconds=60)
+    rules.page_size = 2
+
+    def run():
+        rules.refresh(force=True)
+        bulk = "2026-03-01T12:00:00+00:00"  # one UPDATE touching more rows than a page
+        db.seed("vouchers", [{"code": f"BULK{i}", "discount_type": "fixed", "discount_value": 100, "min_order_cents": 0,
+                              "is_active": True, "use_count": 0, "updated_at": bulk} for i in range(5)])
+        rules.refresh(force=True)
+        assert all(rules.validate(f"BULK{i}", 3000)[1] is None for i in range(5))
+        generation = rules._generation
+        rules.refresh(force=True)  # the overlap window only holds rows already applied
+        assert rules._generation == generation
+
+        # committed after the bulk rows were polled, stamped before them
+        db.seed("vouchers", [{"code": "LATE", "discount_type": "fixed", "discount_value": 100, "min_order_cents": 0,
+                              "is_active": True, "use_count": 0, "updated_at": "2026-03-01T11:59:58+00:00"}])
+        rules.refresh(force=True)
+        assert rules._generation == generation + 1
+        with query_budget(0):
+            assert rules.validate("LATE", 3000)[1] is None
+        assert rules._marker[0] == bulk
+
+    with_fake(db, run)
+
+
+def test_bulk_validate_endpoint():
+    from app.main import app
+    from app.services import voucher_service
+    from app.services.voucher_service import VoucherRuleCache
+
+    def run():
+        client = TestClient(app)
+        r = client.post("/consumer/vouchers/validate-bulk",
+                        json={"codes": ["save10", "FLAT5", "GUESS", "SAVE10", "OLD"], "subtotal_cents": 3000})
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert [x["code"] for x in body["results"]] == ["SAVE10", "FLAT5", "GUESS", "OLD"]
+        assert [x["valid"] for x in body["results"]] == [True, True, False, False]
+        assert body["results"][2]["message"] == "Invalid voucher code" and body["best_code"] == "FLAT5"
+        assert client.post("/consumer/vouchers/validate-bulk", json={"codes": [], "subtotal_cents": 1}).status_code == 422
+        single = client.get("/consumer/vouchers/validate", params={"code": "save10", "subtotal_cents": 1000}).json()
+        assert single == {"valid": False, "discount_cents": 0, "message": "Minimum order for this voucher is 20.00"}
+
+    shared = voucher_service.voucher_rules
+    voucher_service.voucher_rules = VoucherRuleCache(refresh_seconds=3600, rebuild_seconds=3600)
+    try:
+        with_fake(rules_shop(), run)
+    finally:
+        voucher_service.voucher_rules = shared
+
+
+def main():
+    test_rpc_redeems_in_one_call_and_enforces_per_user_limits()
+    test_fallback_never_overshoots_max_uses_under_concurrency()
+    test_rpc_failures_other_than_a_missing_function_are_raised()
+    test_increment_use_handles_a_null_use_count()
+    test_bloom_filter_has_no_false_negatives_and_few_false_positives()
+    test_rule_cache_rejects_unknown_codes_without_a_query_and_applies_changes()
+    test_updates_without_an_explicit_updated_at_are_picked_up()
+    test_poll_pages_past_shared_timestamps_and_rereads_the_overlap_window()
+    test_bulk_validate_endpoint()
+    print("voucher tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Offline tests for ConnectionManager send queues (no server or Supabase needed).
+From backend dir: python tests/test_websocket_manager.py  (or python -m pytest tests/test_websocket_manager.py)
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.websocket_manager import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.syncs = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        if not delay:
+            self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        frame = json.loads(text)
+        if frame.get("type") == "SYNC":
+            self.syncs.append(frame)
+            return
+        frame.pop("seq", None)
+        self.sent.append(frame)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_fan_out_to_every_device_without_waiting_for_slow_one():
+    async def scenario():
+        m = ConnectionManager(queue_size=10)
+        fast, slow = FakeSocket(), FakeSocket()
+        slow.gate.clear()  # never completes a send until released
+        await m.connect_customer(7, fast)
+        await m.connect_customer(7, slow)
+        started = asyncio.get_running_loop().time()
+        assert await m.send_to_customer(7, {"n": 1})
+        assert asyncio.get_running_loop().time() - started < 0.05
+        await asyncio.sleep(0.01)
+        assert fast.sent == [{"n": 1}] and slow.sent == []
+        stats = m.stats()["groups"]["customer"]
+        assert stats["keys"] == 1 and stats["connections"] == 2 and stats["dropped_messages"] == 0
+        slow.gate.set()
+        await asyncio.sleep(0.01)
+        assert slow.sent == [{"n": 1}]
+        m.disconnect_customer(7, fast)
+        assert len(m.customer_connections[7]) == 1
+        m.disconnect_customer(7)
+        assert 7 not in m.customer_connections
+        assert not await m.send_to_customer(7, {"n": 2})
+
+    asyncio.run(scenario())
+
+
+def test_drop_oldest_policy_keeps_newest_messages():
+    async def scenario():
+        m = ConnectionManager(queue_size=3, policy="drop_oldest")
+        ws = FakeSocket()
+        ws.gate.clear()
+        await m.connect(1, ws)
+        await asyncio.sleep(0)
+        for i in range(10):
+            await m.send_personal_message({"n": i}, 1)
+        ws.gate.set()
+        await asyncio.sleep(0.01)
+        # Sends never yield to the writer, so only the 3 newest messages survive.
+        assert [x["n"] for x in ws.sent] == [7, 8, 9]
+        assert len(ws.syncs) == 1
+        assert m.stats()["send_latency_ms"]["samples"] == 4  # SYNC frame + 3 messages
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_cuts_off_slow_client():
+    async def scenario():
+        m = ConnectionManager(queue_size=2, policy="disconnect")
+        ws = FakeSocket()
+        ws.gate.clear()
+        await m.connect_restaurant(3, ws)
+        await asyncio.sleep(0)
+        results = [await m.send_to_restaurant(3, {"n": i}) for i in range(4)]
+        await asyncio.sleep(0)
+        assert results == [True, True, False, False]
+        assert 3 not in m.restaurant_connections and ws.closed_with == 1013
+        assert m.stats()["dropped_connections"] == 1
+
+    asyncio.run(scenario())
+
+
+def main():
+    test_fan_out_to_every_device_without_waiting_for_slow_one()
+    test_drop_oldest_policy_keeps_newest_messages()
+    test_disconnect_policy_cuts_off_slow_client()
+    print("websocket manager tests OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
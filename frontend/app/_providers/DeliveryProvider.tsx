@@ -52,6 +52,17 @@ export function DeliveryProvider({ children }: { children: React.ReactNode }) {
     (user as { rider?: { user_id?: number } })?.rider?.user_id ||
     0;
   const socketRef = useRef<WebSocket | null>(null);
+  // Last message seq/epoch seen on the rider socket, so a reconnect only replays what was missed
+  const wsResumeRef = useRef<{ userId: unknown; epoch: string | null; seq: number }>({ userId: null, epoch: null, seq: 0 });
+
+  // Location over the open rider socket (no HTTP round trip); false if the socket is not open
+  const sendLocationFrame = (latitude: number, longitude: number) => {
+    const socket = socketRef.current;
+    if (!socket || socket.readyState !== WebSocket.OPEN) return false;
+    socket.send(JSON.stringify({ type: "LOCATION", points: [[latitude, longitude, Date.now()]] }));
+    setCurrentLocation({ latitude, longitude });
+    return true;
+  };
   const isInitialized = useRef(false);
 
   console.log("[DeliveryProvider] Initializing with user:", user);
@@ -152,6 +163,7 @@ export function DeliveryProvider({ children }: { children: React.ReactNode }) {
     const sendLocation = async (latitude: number, longitude: number) => {
       const riderId = (user as { rider?: { id?: number } })?.rider?.id;
       if (!riderId) return;
+      if (sendLocationFrame(latitude, longitude)) return;
       try {
         await fetch("http://localhost:8000/delivery/location", {
           method: "POST",
@@ -216,65 +228,97 @@ export function DeliveryProvider({ children }: { children: React.ReactNode }) {
       return;
     }
 
-    const wsUrl = `ws://localhost:8000/delivery/ws/${websocketUserId}`;
-    console.log("[Delivery] Connecting WebSocket as user_id:", websocketUserId, "url:", wsUrl);
-    const socket = new WebSocket(wsUrl);
-    socketRef.current = socket;
-
-    socket.onopen = () => {
-      console.log("[Delivery] WebSocket connected (user_id:", websocketUserId, ")");
-    };
-    socket.onerror = (err) => {
-      console.warn("[Delivery] WebSocket error:", err);
-    };
-    socket.onclose = (ev) => {
-      console.log("[Delivery] WebSocket closed code:", ev.code, "reason:", ev.reason);
-    };
-
-    socket.onmessage = (event) => {
-      let data: any;
-      try {
-        data = JSON.parse(event.data);
-      } catch {
-        return;
-      }
-      console.log("[Delivery] WebSocket message:", data.type || "unknown", data.order_id != null ? "order_id=" + data.order_id : "");
-      if (data.type === "NEW_ORDER_REQUEST") {
-        const newRequest: DeliveryRequest = {
-          id: String(data.order_id),
-          requestId: String(data.request_id),
-          shop: {
+    if (wsResumeRef.current.userId !== websocketUserId) {
+      wsResumeRef.current = { userId: websocketUserId, epoch: null, seq: 0 };
+    }
+    let stopped = false;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+
+    const connect = () => {
+      const { epoch, seq } = wsResumeRef.current;
+      const resume = epoch ? `?last_seq=${seq}&epoch=${epoch}` : "";
+      const wsUrl = `ws://localhost:8000/delivery/ws/${websocketUserId}${resume}`;
+      console.log("[Delivery] Connecting WebSocket as user_id:", websocketUserId, "url:", wsUrl);
+      const socket = new WebSocket(wsUrl);
+      socketRef.current = socket;
+
+      socket.onopen = () => {
+        console.log("[Delivery] WebSocket connected (user_id:", websocketUserId, ")");
+      };
+      socket.onerror = (err) => {
+        console.warn("[Delivery] WebSocket error:", err);
+      };
+      socket.onclose = (ev) => {
+        console.log("[Delivery] WebSocket closed code:", ev.code, "reason:", ev.reason);
+        if (socketRef.current === socket) socketRef.current = null;
+        if (!stopped) retry = setTimeout(connect, 2000);
+      };
+
+      socket.onmessage = (event) => {
+        let data: any;
+        try {
+          data = JSON.parse(event.data);
+        } catch {
+          return;
+        }
+        if (data.type === "SYNC") {
+          // resumed=false: the backend re-sends pending requests itself, so only the cursor needs resetting
+          wsResumeRef.current = { userId: websocketUserId, epoch: data.epoch, seq: data.seq };
+          return;
+        }
+        if (data.type === "PING") {
+          // Heartbeat: riders that stop answering are set unavailable by the backend
+          socket.send(JSON.stringify({ type: "PONG", ts: data.ts }));
+          return;
+        }
+        if (typeof data.seq === "number") wsResumeRef.current.seq = data.seq;
+        console.log("[Delivery] WebSocket message:", data.type || "unknown", data.order_id != null ? "order_id=" + data.order_id : "");
+        if (data.type === "NEW_ORDER_REQUEST") {
+          const newRequest: DeliveryRequest = {
             id: String(data.order_id),
-            name: String(data.restaurant_name ?? ""),
-            address: "Restaurant Address",
-            distance: Number(data.distance ?? 0),
-            latitude: Number(data.restaurant_latitude) || undefined,
-            longitude: Number(data.restaurant_longitude) || undefined,
-          },
-          items: Array.isArray(data.items) ? data.items.map((item: { name?: string; quantity?: number }, idx: number) => ({
-            id: `item-${idx}`,
-            name: item.name ?? "Item",
-            quantity: item.quantity ?? 0,
-          })) : [],
-          customer: {
-            id: "c1",
-            name: String(data.customer_name || "Customer"),
-            address: String(data.delivery_address || ""),
-            latitude: Number(data.delivery_latitude) || undefined,
-            longitude: Number(data.delivery_longitude) || undefined,
-            phone: String(data.customer_phone || ""),
-          },
-          deliveryDistance: Number(data.distance_to_customer) || Number(data.distance) || 0,
-          estimatedPickupTime: 5,
-          estimatedDeliveryTime: 15,
-          expiresAt: new Date(data.expires_at ?? Date.now() + 60000),
-        };
-        setIncomingRequests((prev) => [...prev, newRequest]);
-      }
+            requestId: String(data.request_id),
+            shop: {
+              id: String(data.order_id),
+              name: String(data.restaurant_name ?? ""),
+              address: "Restaurant Address",
+              distance: Number(data.distance ?? 0),
+              latitude: Number(data.restaurant_latitude) || undefined,
+              longitude: Number(data.restaurant_longitude) || undefined,
+            },
+            items: Array.isArray(data.items) ? data.items.map((item: { name?: string; quantity?: number }, idx: number) => ({
+              id: `item-${idx}`,
+              name: item.name ?? "Item",
+              quantity: item.quantity ?? 0,
+            })) : [],
+            customer: {
+              id: "c1",
+              name: String(data.customer_name || "Customer"),
+              address: String(data.delivery_address || ""),
+              latitude: Number(data.delivery_latitude) || undefined,
+              longitude: Number(data.delivery_longitude) || undefined,
+              phone: String(data.customer_phone || ""),
+            },
+            deliveryDistance: Number(data.distance_to_customer) || Number(data.distance) || 0,
+            estimatedPickupTime: 5,
+            estimatedDeliveryTime: 15,
+            expiresAt: new Date(data.expires_at ?? Date.now() + 60000),
+          };
+          setIncomingRequests((prev) =>
+            prev.some((r) => r.requestId === newRequest.requestId) ? prev : [...prev, newRequest]
+          );
+        } else if (data.type === "REQUEST_EXPIRED") {
+          // Another rider accepted first (parallel offers)
+          const expiredId = String(data.request_id);
+          setIncomingRequests((prev) => prev.filter((r) => r.requestId !== expiredId));
+        }
+      };
     };
 
+    connect();
     return () => {
-      socket.close();
+      stopped = true;
+      if (retry) clearTimeout(retry);
+      socketRef.current?.close();
       socketRef.current = null;
     };
   }, [status, websocketUserId]);
@@ -282,15 +326,25 @@ export function DeliveryProvider({ children }: { children: React.ReactNode }) {
   const riderId = (user as { rider?: { id?: number } })?.rider?.id;
   useEffect(() => {
     if (status !== "online" || !riderId || !isClient) return;
+    // Long-poll: the backend holds the call until a request newer than afterId exists (or ~25s pass)
+    let cancelled = false;
+    let afterId = 0;
+    const controller = new AbortController();
     const poll = async () => {
       try {
-        const res = await fetch(`http://localhost:8000/delivery/requests?rider_id=${riderId}`);
-        if (!res.ok) return;
+        const res = await fetch(
+          `http://localhost:8000/delivery/requests/wait?rider_id=${riderId}&after_id=${afterId}&timeout=25`,
+          { signal: controller.signal },
+        );
+        if (!res.ok) return false;
         const data = await res.json();
         const requests = data.requests || [];
+        for (const d of requests) {
+          if (d.request_id) afterId = Math.max(afterId, Number(d.request_id));
+        }
         if (requests.length === 0) {
           console.log("[DeliveryProvider] Polling: No new requests.");
-          return;
+          return true;
         }
         setIncomingRequests((prev) => {
           const byRequestId = new Map(prev.map((r) => [r.requestId, r]));
@@ -333,15 +387,23 @@ export function DeliveryProvider({ children }: { children: React.ReactNode }) {
           console.log("[DeliveryProvider] Polling: Incoming requests updated.", updatedRequests);
           return updatedRequests;
         });
+        return true;
       } catch {
-        // ignore
+        return false;
+      }
+    };
+    const loop = async () => {
+      await new Promise((r) => setTimeout(r, 500));
+      while (!cancelled) {
+        const ok = await poll();
+        // Back off on errors so a down backend is not hammered
+        if (!ok && !cancelled) await new Promise((r) => setTimeout(r, 4000));
       }
     };
-    const t = setTimeout(poll, 500);
-    const interval = setInterval(poll, 4000);
+    loop();
     return () => {
-      clearTimeout(t);
-      clearInterval(interval);
+      cancelled = true;
+      controller.abort();
     };
   }, [status, riderId, isClient]);
 
@@ -375,6 +437,7 @@ export function DeliveryProvider({ children }: { children: React.ReactNode }) {
     const FALLBACK_LNG = 96.1951;
 
     const postLocation = async (latitude: number, longitude: number) => {
+      if (sendLocationFrame(latitude, longitude)) return;
       try {
         await fetch("http://localhost:8000/delivery/location", {
           method: "POST",
@@ -32,6 +32,7 @@ interface TrackingData {
     users?: { first_name: string; last_name: string; phone: string };
   };
   delivery?: { status: string };
+  rider_location?: { latitude: number; longitude: number; at?: string | null };
 }
 
 const STATUS_STEPS = [
@@ -72,8 +73,33 @@ export default function OrderTrackingPage() {
     };
 
     fetchTracking();
-    const interval = setInterval(fetchTracking, 10000);
-    return () => clearInterval(interval);
+    // Server-Sent Events: full snapshot once, then only deltas. Falls back to polling if unavailable.
+    let interval: ReturnType<typeof setInterval> | null = null;
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchTracking, 10000);
+    };
+    let source: EventSource | null = null;
+    if (typeof EventSource !== "undefined") {
+      source = new EventSource(`${API_BASE}/consumer/orders/${orderId}/track/stream`);
+      source.addEventListener("snapshot", (e) => {
+        setTracking(JSON.parse((e as MessageEvent).data));
+        setLoading(false);
+      });
+      source.addEventListener("delta", (e) => {
+        const delta = JSON.parse((e as MessageEvent).data);
+        setTracking((prev) => (prev ? { ...prev, ...delta } : prev));
+      });
+      source.addEventListener("end", () => source?.close());
+      source.onerror = () => {
+        if (source?.readyState === EventSource.CLOSED) startPolling();
+      };
+    } else {
+      startPolling();
+    }
+    return () => {
+      source?.close();
+      if (interval) clearInterval(interval);
+    };
   }, [orderId]);
 
   useEffect(() => {
@@ -81,23 +107,71 @@ export default function OrderTrackingPage() {
     const userId = tracking.user_id;
     if (!userId) return;
 
-    const ws = new WebSocket(`ws://localhost:8000/consumer/ws/${userId}`);
-    wsRef.current = ws;
+    // Last seq/epoch seen, so a reconnect only replays what was missed
+    let epoch: string | null = null;
+    let lastSeq = 0;
+    // Rider position arrives as integer microdegrees: "p" absolute, "d" delta from the previous one
+    let riderE6: [number, number] | null = null;
+    let stopped = false;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+
+    const connect = () => {
+      const resume = epoch ? `?last_seq=${lastSeq}&epoch=${epoch}` : "";
+      const ws = new WebSocket(`ws://localhost:8000/consumer/ws/${userId}${resume}`);
+      wsRef.current = ws;
 
-    ws.onmessage = (event) => {
+      ws.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          if (data.type === "SYNC") {
+            // A gap the server could not replay: refetch the order instead
+            if (epoch && !data.resumed) {
+              riderE6 = null;
+              refreshTracking();
+            }
+            epoch = data.epoch;
+            lastSeq = data.seq;
+            return;
+          }
+          if (typeof data.seq === "number") lastSeq = data.seq;
+          if (data.type === "RIDER_LOCATION" && data.order_id === tracking.id) {
+            if (data.p) riderE6 = [data.p[0], data.p[1]];
+            else if (data.d && riderE6) riderE6 = [riderE6[0] + data.d[0], riderE6[1] + data.d[1]];
+            else return; // delta before any keyframe: wait for the next one
+            const [lat, lon] = riderE6;
+            setTracking((prev) =>
+              prev
+                ? { ...prev, rider_location: { latitude: lat / 1e6, longitude: lon / 1e6, at: new Date(data.t).toISOString() } }
+                : prev
+            );
+            return;
+          }
+          if (data.type === "ORDER_STATUS_UPDATE" && data.order_id === tracking.id) {
+            setTracking((prev) =>
+              prev ? { ...prev, status: data.status, updated_at: data.timestamp ?? prev.updated_at } : prev
+            );
+          }
+        } catch {}
+      };
+
+      ws.onerror = () => {};
+      ws.onclose = () => {
+        if (!stopped) retry = setTimeout(connect, 2000);
+      };
+    };
+
+    const refreshTracking = async () => {
       try {
-        const data = JSON.parse(event.data);
-        if (data.type === "ORDER_STATUS_UPDATE" && data.order_id === tracking.id) {
-          setTracking((prev) =>
-            prev ? { ...prev, status: data.status, updated_at: data.timestamp ?? prev.updated_at } : prev
-          );
-        }
+        const res = await fetch(`${API_BASE}/consumer/orders/${tracking.id}/track`);
+        if (res.ok) setTracking(await res.json());
       } catch {}
     };
 
-    ws.onerror = () => {};
+    connect();
     return () => {
-      ws.close();
+      stopped = true;
+      if (retry) clearTimeout(retry);
+      wsRef.current?.close();
       wsRef.current = null;
     };
   }, [tracking?.id, tracking?.user_id]);
@@ -231,6 +305,18 @@ export default function OrderTrackingPage() {
                     {tracking.rider.users.phone}
                   </div>
                 )}
+                {tracking.rider_location && (
+                  <a
+                    href={`https://www.google.com/maps?q=${tracking.rider_location.latitude},${tracking.rider_location.longitude}`}
+                    target="_blank"
+                    rel="noreferrer"
+                    className="flex items-center gap-1 text-sm text-red-500 mt-1 underline"
+                  >
+                    <MapPin className="w-4 h-4" />
+                    Rider location
+                    {tracking.rider_location.at && ` (updated ${new Date(tracking.rider_location.at).toLocaleTimeString()})`}
+                  </a>
+                )}
               </div>
             </div>
           </div>
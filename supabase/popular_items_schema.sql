@@ -0,0 +1,89 @@
+-- Popular items summary, kept up to date as orders are placed.
+-- Used by GET /consumer/popular-items (PopularityRepository.top_items): the endpoint
+-- reads the top K rows by index instead of aggregating every order_items row.
+-- Run in Supabase SQL editor. Without this table the backend falls back to the full scan.
+--
+-- trend_log is a forward-decayed score kept in log space:
+--   trend_log = ln(sum(quantity * 2 ^ ((ordered_at - 2026-01-01) / half_life)))
+-- Every item decays by the same factor as time passes, so ordering by trend_log
+-- is the time-decayed ranking at any moment, and nothing has to be rescanned or
+-- rescaled. The half-life (168 hours here) must match POPULAR_ITEMS_HALF_LIFE_HOURS.
+
+CREATE TABLE IF NOT EXISTS menu_item_popularity (
+    menu_item_id BIGINT PRIMARY KEY REFERENCES menu_items(id) ON DELETE CASCADE,
+    restaurant_id BIGINT REFERENCES restaurants(id) ON DELETE CASCADE,
+    total_qty BIGINT NOT NULL DEFAULT 0,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    trend_log DOUBLE PRECISION,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_popularity_total ON menu_item_popularity(total_qty DESC, order_count DESC);
+CREATE INDEX IF NOT EXISTS idx_popularity_trend ON menu_item_popularity(trend_log DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_popularity_restaurant_total ON menu_item_popularity(restaurant_id, total_qty DESC, order_count DESC);
+CREATE INDEX IF NOT EXISTS idx_popularity_restaurant_trend ON menu_item_popularity(restaurant_id, trend_log DESC NULLS LAST);
+
+-- ln(qty * 2 ^ ((at - landmark) / half_life))
+CREATE OR REPLACE FUNCTION popularity_log_weight(qty BIGINT, at TIMESTAMPTZ)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT ln(qty::double precision)
+         + ln(2.0) * extract(epoch FROM at - TIMESTAMPTZ '2026-01-01 00:00:00+00') / (168 * 3600.0);
+$$;
+
+-- ln(exp(a) + exp(b)) without overflow; NULL is an empty score
+CREATE OR REPLACE FUNCTION popularity_log_add(a DOUBLE PRECISION, b DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN a IS NULL THEN b
+        WHEN b IS NULL THEN a
+        ELSE greatest(a, b) + ln(1 + exp(-abs(a - b)))
+    END;
+$$;
+
+CREATE OR REPLACE FUNCTION bump_menu_item_popularity()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.menu_item_id IS NULL OR coalesce(NEW.quantity, 0) <= 0 THEN
+        RETURN NEW;
+    END IF;
+    INSERT INTO menu_item_popularity (menu_item_id, restaurant_id, total_qty, order_count, trend_log, updated_at)
+    SELECT NEW.menu_item_id, m.restaurant_id, NEW.quantity, 1, popularity_log_weight(NEW.quantity, NOW()), NOW()
+    FROM menu_items mi LEFT JOIN menus m ON m.id = mi.menu_id
+    WHERE mi.id = NEW.menu_item_id
+    ON CONFLICT (menu_item_id) DO UPDATE
+    SET total_qty = menu_item_popularity.total_qty + EXCLUDED.total_qty,
+        order_count = menu_item_popularity.order_count + 1,
+        trend_log = popularity_log_add(menu_item_popularity.trend_log, EXCLUDED.trend_log),
+        updated_at = EXCLUDED.updated_at;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS order_items_popularity ON order_items;
+CREATE TRIGGER order_items_popularity
+    AFTER INSERT ON order_items
+    FOR EACH ROW EXECUTE FUNCTION bump_menu_item_popularity();
+
+-- One-time backfill from existing order history (safe to re-run: it rebuilds the table).
+TRUNCATE menu_item_popularity;
+INSERT INTO menu_item_popularity (menu_item_id, restaurant_id, total_qty, order_count, trend_log)
+SELECT oi.menu_item_id,
+       max(m.restaurant_id),
+       sum(oi.quantity),
+       count(*),
+       max(oi.w_max) + ln(sum(exp(oi.w - oi.w_max)))
+FROM (
+    SELECT oi.*, popularity_log_weight(oi.quantity, o.created_at) AS w,
+           max(popularity_log_weight(oi.quantity, o.created_at)) OVER (PARTITION BY oi.menu_item_id) AS w_max
+    FROM order_items oi JOIN orders o ON o.id = oi.order_id
+    WHERE oi.quantity > 0
+) oi
+JOIN menu_items mi ON mi.id = oi.menu_item_id
+LEFT JOIN menus m ON m.id = mi.menu_id
+GROUP BY oi.menu_item_id;
@@ -0,0 +1,20 @@
+-- Bulk rider location write used by the write-behind location store
+-- (DeliveryRepository.bulk_update_rider_locations). One statement per flush
+-- instead of one UPDATE per GPS ping. Run in Supabase SQL Editor.
+-- Without this function the backend falls back to one UPDATE per rider per flush.
+
+CREATE OR REPLACE FUNCTION bulk_update_rider_locations(locations JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE riders r
+        SET current_latitude = (l->>'current_latitude')::double precision,
+            current_longitude = (l->>'current_longitude')::double precision,
+            last_location_update = (l->>'last_location_update')::timestamptz
+        FROM jsonb_array_elements(locations) AS l
+        WHERE r.id = (l->>'id')::bigint
+        RETURNING 1
+    )
+    SELECT count(*)::int FROM updated;
+$$;
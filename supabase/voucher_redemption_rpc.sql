@@ -0,0 +1,99 @@
+-- Atomic voucher redemption with per-user limits (VoucherRepository.redeem / release).
+-- Run in Supabase SQL Editor after vouchers_schema.sql.
+-- Without these functions the backend validates, then counts the use with a
+-- compare-and-set UPDATE (no per-user limits).
+
+ALTER TABLE vouchers ADD COLUMN IF NOT EXISTS max_uses_per_user INTEGER;  -- NULL = unlimited
+
+-- One row per (voucher, user) with how many times that user redeemed it.
+CREATE TABLE IF NOT EXISTS voucher_redemptions (
+    voucher_id BIGINT NOT NULL REFERENCES vouchers(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    uses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (voucher_id, user_id)
+);
+
+-- Validate and count one use in a single call. The conditional UPDATE takes the
+-- voucher row lock, so concurrent checkouts can never push use_count past max_uses.
+-- Returns the voucher row plus discount_cents, or {"error": reason} where reason is
+-- not_found, inactive, not_started, expired, min_order, wrong_restaurant, use_limit or user_limit.
+CREATE OR REPLACE FUNCTION redeem_voucher(
+    p_code TEXT,
+    p_subtotal_cents INTEGER,
+    p_restaurant_id BIGINT DEFAULT NULL,
+    p_user_id BIGINT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v vouchers%ROWTYPE;
+    redeemed INTEGER;
+BEGIN
+    UPDATE vouchers
+    SET use_count = coalesce(use_count, 0) + 1, updated_at = NOW()
+    WHERE upper(code) = upper(trim(p_code))
+      AND is_active
+      AND (valid_from IS NULL OR valid_from <= NOW())
+      AND (valid_until IS NULL OR valid_until >= NOW())
+      AND p_subtotal_cents >= coalesce(min_order_cents, 0)
+      AND (restaurant_id IS NULL OR p_restaurant_id IS NULL OR restaurant_id = p_restaurant_id)
+      AND (max_uses IS NULL OR coalesce(use_count, 0) < max_uses)
+    RETURNING * INTO v;
+
+    IF NOT FOUND THEN
+        SELECT * INTO v FROM vouchers WHERE upper(code) = upper(trim(p_code));
+        RETURN jsonb_build_object(
+            'error', CASE
+                WHEN v.id IS NULL THEN 'not_found'
+                WHEN NOT v.is_active THEN 'inactive'
+                WHEN v.valid_from IS NOT NULL AND v.valid_from > NOW() THEN 'not_started'
+                WHEN v.valid_until IS NOT NULL AND v.valid_until < NOW() THEN 'expired'
+                WHEN p_subtotal_cents < coalesce(v.min_order_cents, 0) THEN 'min_order'
+                WHEN v.restaurant_id IS NOT NULL AND p_restaurant_id IS NOT NULL AND v.restaurant_id <> p_restaurant_id THEN 'wrong_restaurant'
+                ELSE 'use_limit'
+            END,
+            'min_order_cents', coalesce(v.min_order_cents, 0)
+        );
+    END IF;
+
+    IF p_user_id IS NOT NULL THEN
+        INSERT INTO voucher_redemptions AS r (voucher_id, user_id, uses)
+        VALUES (v.id, p_user_id, 1)
+        ON CONFLICT (voucher_id, user_id) DO UPDATE
+        SET uses = r.uses + 1
+        WHERE v.max_uses_per_user IS NULL OR r.uses < v.max_uses_per_user
+        RETURNING uses INTO redeemed;
+        IF redeemed IS NULL THEN
+            -- still holding the row lock: nobody saw the increment
+            UPDATE vouchers SET use_count = use_count - 1 WHERE id = v.id;
+            RETURN jsonb_build_object('error', 'user_limit', 'min_order_cents', coalesce(v.min_order_cents, 0));
+        END IF;
+    END IF;
+
+    RETURN to_jsonb(v) || jsonb_build_object(
+        'discount_cents', CASE
+            WHEN v.discount_type = 'percentage' THEN least(p_subtotal_cents * v.discount_value / 100, p_subtotal_cents)
+            ELSE least(v.discount_value, p_subtotal_cents)
+        END
+    );
+END;
+$$;
+
+-- Give back a use taken by redeem_voucher (the order it was for was not created).
+CREATE OR REPLACE FUNCTION release_voucher(p_voucher_id BIGINT, p_user_id BIGINT DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    released BOOLEAN;
+BEGIN
+    UPDATE vouchers SET use_count = greatest(coalesce(use_count, 0) - 1, 0), updated_at = NOW() WHERE id = p_voucher_id;
+    released := FOUND;
+    IF p_user_id IS NOT NULL THEN
+        UPDATE voucher_redemptions SET uses = greatest(uses - 1, 0)
+        WHERE voucher_id = p_voucher_id AND user_id = p_user_id;
+    END IF;
+    RETURN released;
+END;
+$$;
@@ -0,0 +1,28 @@
+-- Keep vouchers.updated_at current on every UPDATE.
+-- The voucher rule cache (app/services/voucher_service.py) polls for vouchers
+-- changed since its last check by updated_at, so an edit that does not set it
+-- (SQL editor, dashboard) would otherwise never reach the workers' cached rules.
+-- clock_timestamp(), not NOW(): NOW() is the transaction start, so a long
+-- transaction would commit rows stamped well before changes already polled.
+-- The poll still re-reads a few seconds before its marker for commits that
+-- land out of order.
+-- Run in Supabase SQL Editor after vouchers_schema.sql.
+
+CREATE OR REPLACE FUNCTION touch_voucher_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS vouchers_touch_updated_at ON vouchers;
+CREATE TRIGGER vouchers_touch_updated_at
+    BEFORE UPDATE ON vouchers
+    FOR EACH ROW EXECUTE FUNCTION touch_voucher_updated_at();
+
+-- The poll pages on (updated_at, id): rows after the last key seen, in that order.
+DROP INDEX IF EXISTS idx_vouchers_updated_at;
+CREATE INDEX IF NOT EXISTS idx_vouchers_updated_at_id ON vouchers(updated_at, id);